@@ -0,0 +1,273 @@
+"""OpenAI-compatible stub of the chat completions API for offline benchmarks.
+
+Answers ``POST /v1/chat/completions`` with canned output shaped like each
+agent's expected response (picked from the system prompt), after a simulated
+latency. Supports streaming, and injects server errors and 429s at
+configurable rates. Run standalone with ``python -m benchmarks.fake_llm_server``.
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import math
+import random
+import socket
+import threading
+import time
+import uuid
+from collections import Counter
+from dataclasses import dataclass
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+from src.utils.token_estimator import estimate_tokens
+
+# System prompt markers, checked in order (the batch prompt contains the analyzer prompt)
+AGENT_MARKERS = (
+    ("batch_analyzer", "**Batch mode**"),
+    ("fused", "in a single pass"),
+    ("translator", "translation agent"),
+    ("reply", "generating personalized replies"),
+    ("analyzer", "Analyze reviews for sentiment"),
+)
+
+SENTIMENTS = ("Positive", "Negative", "Neutral")
+
+
+@dataclass
+class FakeLLMConfig:
+    latency_ms: float = 800.0
+    latency_sigma: float = 0.35
+    token_delay_ms: float = 5.0
+    error_rate: float = 0.0
+    rate_limit_rate: float = 0.0
+    seed: int = 7
+
+    def sample_latency(self, rng: random.Random) -> float:
+        """Seconds before the first token: log-normal around ``latency_ms``."""
+        if self.latency_ms <= 0:
+            return 0.0
+        return self.latency_ms / 1000.0 * math.exp(rng.gauss(0.0, self.latency_sigma))
+
+
+def classify_agent(messages: list) -> str:
+    system = "\n".join(str(m.get("content", "")) for m in messages if m.get("role") == "system")
+    for agent, marker in AGENT_MARKERS:
+        if marker in system:
+            return agent
+    return "unknown"
+
+
+def _message_text(message: dict) -> str:
+    content = message.get("content", "")
+    if isinstance(content, list):
+        return "".join(part.get("text", "") for part in content if isinstance(part, dict))
+    return str(content)
+
+
+def _analysis(text: str) -> dict:
+    digest = int(hashlib.sha256(text.encode("utf-8")).hexdigest(), 16)
+    issues = []
+    if digest % 3 == 1:
+        issues.append({"title": "App crashes on launch", "description": "The app closes right after it is opened.", "tags": ["HOME", "CRASH"]})
+    requests = []
+    if digest % 4 == 2:
+        requests.append({"title": "Offline downloads", "description": "Allow downloading songs for offline listening.", "tags": ["DOWNLOAD"]})
+    return {"sentiment": SENTIMENTS[digest % 3], "issues": issues, "new_requests": requests}
+
+
+def canned_response(agent: str, user_text: str) -> str:
+    """Deterministic output with the shape each agent parses."""
+    translation = f"English translation of a {len(user_text)} character review."
+    reply = {
+        "ai_reply": "ご意見ありがとうございます。アプリ内のお問い合わせフォームからもご連絡いただけます。",
+        "en_reply": "Thank you for your feedback. You can also contact us via the inquiry form in the app.",
+    }
+    if agent == "translator":
+        return translation
+    if agent == "reply":
+        return json.dumps(reply, ensure_ascii=False)
+    if agent == "analyzer":
+        return json.dumps(_analysis(user_text))
+    if agent == "batch_analyzer":
+        try:
+            items = json.loads(user_text)
+        except json.JSONDecodeError:
+            items = []
+        return json.dumps([{"id": item.get("id"), **_analysis(item.get("text", ""))} for item in items if isinstance(item, dict)])
+    if agent == "fused":
+        return json.dumps({"enReview": translation, "analysis": _analysis(user_text), **reply}, ensure_ascii=False)
+    return "OK"
+
+
+class FakeLLMStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.requests = Counter()
+            self.prompt_tokens = Counter()
+            self.completion_tokens = Counter()
+            self.errors = 0
+            self.rate_limited = 0
+
+    def record(self, agent: str, prompt_tokens: int, completion_tokens: int):
+        with self._lock:
+            self.requests[agent] += 1
+            self.prompt_tokens[agent] += prompt_tokens
+            self.completion_tokens[agent] += completion_tokens
+
+    def record_injected(self, status_code: int):
+        with self._lock:
+            if status_code == 429:
+                self.rate_limited += 1
+            else:
+                self.errors += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "requests": sum(self.requests.values()),
+                "prompt_tokens": sum(self.prompt_tokens.values()),
+                "completion_tokens": sum(self.completion_tokens.values()),
+                "injected_errors": self.errors,
+                "injected_rate_limits": self.rate_limited,
+                "by_agent": {
+                    agent: {"requests": count, "prompt_tokens": self.prompt_tokens[agent], "completion_tokens": self.completion_tokens[agent]}
+                    for agent, count in sorted(self.requests.items())
+                },
+            }
+
+
+def _chunks(text: str, size: int = 16):
+    return [text[i:i + size] for i in range(0, len(text), size)] or [""]
+
+
+def create_fake_llm_app(config: FakeLLMConfig = None, stats: FakeLLMStats = None) -> FastAPI:
+    config = config or FakeLLMConfig()
+    stats = stats or FakeLLMStats()
+    rng = random.Random(config.seed)
+    app = FastAPI()
+    app.state.config = config
+    app.state.stats = stats
+
+    @app.get("/stats")
+    async def get_stats():
+        return stats.snapshot()
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        messages = body.get("messages", [])
+        agent = classify_agent(messages)
+        user_text = next((_message_text(m) for m in reversed(messages) if m.get("role") == "user"), "")
+        await asyncio.sleep(config.sample_latency(rng))
+
+        roll = rng.random()
+        if roll < config.rate_limit_rate:
+            stats.record_injected(429)
+            return JSONResponse({"error": {"message": "Rate limit reached (injected)", "type": "rate_limit_error", "code": "rate_limit_exceeded"}}, status_code=429, headers={"retry-after": "1"})
+        if roll < config.rate_limit_rate + config.error_rate:
+            stats.record_injected(500)
+            return JSONResponse({"error": {"message": "Internal server error (injected)", "type": "server_error"}}, status_code=500)
+
+        content = canned_response(agent, user_text)
+        prompt_tokens = sum(estimate_tokens(_message_text(m)) for m in messages)
+        completion_tokens = estimate_tokens(content)
+        stats.record(agent, prompt_tokens, completion_tokens)
+        usage = {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens, "total_tokens": prompt_tokens + completion_tokens}
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+        model = body.get("model", "fake-model")
+        created = int(time.time())
+
+        if not body.get("stream"):
+            return {
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+                "usage": usage,
+            }
+
+        async def events():
+            def chunk(delta, finish_reason=None, **extra):
+                payload = {"id": completion_id, "object": "chat.completion.chunk", "created": created, "model": model,
+                           "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}], **extra}
+                return f"data: {json.dumps(payload, ensure_ascii=False)}\n\n"
+
+            pieces = _chunks(content)
+            for i, piece in enumerate(pieces):
+                yield chunk({"role": "assistant", "content": piece} if i == 0 else {"content": piece})
+                if config.token_delay_ms > 0:
+                    await asyncio.sleep(config.token_delay_ms / 1000.0)
+            yield chunk({}, "stop", usage=usage)
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    return app
+
+
+class FakeLLMServer:
+    """Runs the stub with uvicorn on a free local port in a background thread."""
+
+    def __init__(self, config: FakeLLMConfig = None, host: str = "127.0.0.1", port: int = 0):
+        self.stats = FakeLLMStats()
+        self.app = create_fake_llm_app(config, self.stats)
+        self.host = host
+        self.port = port
+        self.server = None
+        self.thread = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}/v1"
+
+    def start(self):
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind((self.host, self.port))
+        self.port = sock.getsockname()[1]
+        self.server = uvicorn.Server(uvicorn.Config(self.app, log_level="warning", access_log=False))
+        self.thread = threading.Thread(target=self.server.run, kwargs={"sockets": [sock]}, name="fake-llm", daemon=True)
+        self.thread.start()
+        deadline = time.monotonic() + 10
+        while not self.server.started:
+            if time.monotonic() > deadline:
+                raise RuntimeError("Fake LLM server did not start")
+            time.sleep(0.01)
+        return self
+
+    def stop(self):
+        if self.server is not None:
+            self.server.should_exit = True
+            self.thread.join(timeout=10)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="OpenAI-compatible fake LLM for offline benchmarks")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--latency-ms", type=float, default=800.0, help="Median time to first token")
+    parser.add_argument("--latency-sigma", type=float, default=0.35, help="Log-normal spread of the latency")
+    parser.add_argument("--token-delay-ms", type=float, default=5.0, help="Delay between streamed chunks")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of requests answered with HTTP 500")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Share of requests answered with HTTP 429")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    config = FakeLLMConfig(args.latency_ms, args.latency_sigma, args.token_delay_ms, args.error_rate, args.rate_limit_rate, args.seed)
+    print(f"Fake LLM listening on http://{args.host}:{args.port}/v1 (set OPENAI_API_BASE and MODEL_NAME=openai/<any>)")
+    uvicorn.run(create_fake_llm_app(config), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
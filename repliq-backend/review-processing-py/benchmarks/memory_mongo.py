@@ -0,0 +1,199 @@
+"""In-memory stand-in for the async Mongo API used by the review pipeline.
+
+Implements the subset of ``AsyncMongoClient`` collection calls the service
+makes (equality, dotted paths and ``$in`` filters, inclusion projections,
+``$set``/``$setOnInsert`` upserts and ``bulk_write``) and counts every call
+that would be a server round trip. An optional per-call delay simulates
+network latency.
+"""
+import asyncio
+import copy
+import itertools
+import threading
+from collections import Counter
+from pymongo import InsertOne, UpdateOne
+
+_MISSING = object()
+
+
+def get_path(doc: dict, path: str):
+    value = doc
+    for part in path.split("."):
+        if not isinstance(value, dict) or part not in value:
+            return _MISSING
+        value = value[part]
+    return value
+
+
+def matches(doc: dict, query: dict) -> bool:
+    for path, condition in (query or {}).items():
+        value = get_path(doc, path)
+        if isinstance(condition, dict) and any(key.startswith("$") for key in condition):
+            for operator, operand in condition.items():
+                if operator == "$in":
+                    if value is _MISSING or value not in operand:
+                        return False
+                elif operator == "$exists":
+                    if (value is not _MISSING) != bool(operand):
+                        return False
+                else:
+                    raise NotImplementedError(f"Unsupported query operator {operator}")
+        elif value is _MISSING or value != condition:
+            return False
+    return True
+
+
+def project(doc: dict, projection: dict) -> dict:
+    if not projection:
+        return copy.deepcopy(doc)
+    include = [path for path, flag in projection.items() if flag and path != "_id"]
+    if not include:
+        return {key: copy.deepcopy(value) for key, value in doc.items() if not (key == "_id" and not projection.get("_id", 1))}
+    result = {}
+    if projection.get("_id", 1) and "_id" in doc:
+        result["_id"] = doc["_id"]
+    for path in include:
+        value = get_path(doc, path)
+        if value is _MISSING:
+            continue
+        target = result
+        parts = path.split(".")
+        for part in parts[:-1]:
+            target = target.setdefault(part, {})
+        target[parts[-1]] = copy.deepcopy(value)
+    return result
+
+
+class MemoryCursor:
+    def __init__(self, collection, query, projection):
+        self.collection = collection
+        self.query = query
+        self.projection = projection
+
+    async def to_list(self, length=None):
+        docs = await self.collection._run(lambda: [project(d, self.projection) for d in self.collection._find(self.query)])
+        return docs if length is None else docs[:length]
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for doc in await self.to_list(None):
+            yield doc
+
+
+class MemoryCollection:
+    def __init__(self, database, name: str):
+        self.database = database
+        self.name = name
+        self.docs = []
+        self._ids = itertools.count(1)
+
+    async def _run(self, operation):
+        self.database.record(self.name)
+        if self.database.latency_seconds:
+            await asyncio.sleep(self.database.latency_seconds)
+        with self.database.lock:
+            return operation()
+
+    def _find(self, query):
+        return [doc for doc in self.docs if matches(doc, query)]
+
+    def _insert(self, doc: dict):
+        doc = copy.deepcopy(doc)
+        doc.setdefault("_id", next(self._ids))
+        self.docs.append(doc)
+        return doc["_id"]
+
+    def _update(self, query: dict, update: dict, upsert: bool):
+        found = self._find(query)
+        if found:
+            found[0].update(copy.deepcopy(update.get("$set", {})))
+            return
+        if upsert:
+            doc = {key: value for key, value in query.items() if not isinstance(value, dict)}
+            doc.update(update.get("$setOnInsert", {}))
+            doc.update(update.get("$set", {}))
+            self._insert(doc)
+
+    def find(self, query=None, projection=None):
+        return MemoryCursor(self, query, projection)
+
+    async def find_one(self, query=None, projection=None):
+        return await self._run(lambda: next((project(d, projection) for d in self._find(query)), None))
+
+    async def count_documents(self, query):
+        return await self._run(lambda: len(self._find(query)))
+
+    async def insert_one(self, doc):
+        return await self._run(lambda: self._insert(doc))
+
+    async def insert_many(self, docs, ordered=True):
+        return await self._run(lambda: [self._insert(doc) for doc in docs])
+
+    async def update_one(self, query, update, upsert=False):
+        return await self._run(lambda: self._update(query, update, upsert))
+
+    async def bulk_write(self, operations, ordered=True):
+        def apply():
+            for operation in operations:
+                if isinstance(operation, UpdateOne):
+                    self._update(operation._filter, operation._doc, bool(operation._upsert))
+                elif isinstance(operation, InsertOne):
+                    self._insert(operation._doc)
+                else:
+                    raise NotImplementedError(f"Unsupported bulk operation {type(operation).__name__}")
+        return await self._run(apply)
+
+    async def create_index(self, keys, **options):
+        return await self._run(lambda: options.get("name", "index"))
+
+
+class MemoryDatabase:
+    name = "benchmark"
+
+    def __init__(self, latency_seconds: float = 0.0):
+        self.latency_seconds = latency_seconds
+        self.collections = {}
+        self.round_trips = Counter()
+        self.lock = threading.Lock()
+
+    def record(self, collection: str):
+        with self.lock:
+            self.round_trips[collection] += 1
+
+    def reset_round_trips(self):
+        with self.lock:
+            self.round_trips = Counter()
+
+    def __getitem__(self, name: str) -> MemoryCollection:
+        with self.lock:
+            if name not in self.collections:
+                self.collections[name] = MemoryCollection(self, name)
+            return self.collections[name]
+
+    def __getattr__(self, name: str) -> MemoryCollection:
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return self[name]
+
+    async def list_collection_names(self):
+        self.record("admin")
+        return list(self.collections)
+
+
+class MemoryDatabaseService:
+    """Drop-in for ``AsyncDatabaseService`` backed by a ``MemoryDatabase``."""
+
+    def __init__(self, db: MemoryDatabase):
+        self._db = db
+
+    @property
+    def db(self):
+        return self._db
+
+    def get_collection(self, name):
+        return self._db[name]
+
+    async def close(self):
+        pass
@@ -0,0 +1,419 @@
+"""Offline throughput and latency benchmark for the review pipeline and HTTP endpoints.
+
+Starts the fake OpenAI-compatible server, points LiteLLM at it, runs the
+batch review pipeline against the in-memory Mongo stand-in in each requested
+agent mode, then load-tests the translate/analyze/reply endpoints in process.
+Results are written as JSON and can be compared with an earlier run::
+
+    python -m benchmarks.run_benchmark --reviews 200 --output benchmarks/results/latest.json
+    python -m benchmarks.run_benchmark --compare benchmarks/results/baseline.json
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+from functools import wraps
+from pathlib import Path
+from typing import Dict, List
+
+from benchmarks.fake_llm_server import FakeLLMConfig, FakeLLMServer
+from benchmarks.memory_mongo import MemoryDatabase, MemoryDatabaseService
+
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+
+# Pipeline modes: environment applied before the processor is built
+MODES = {
+    "split": {"REVIEW_AGENT_MODE": "split", "ANALYZER_BATCH_SIZE": "1"},
+    "split-batch": {"REVIEW_AGENT_MODE": "split", "ANALYZER_BATCH_SIZE": "8"},
+    "fused": {"REVIEW_AGENT_MODE": "fused", "ANALYZER_BATCH_SIZE": "1"},
+}
+
+TITLES = ["使いやすい", "アップデート後に不具合", "最高のアプリ", "広告が多すぎる", "ログインできない", "音質が良い", "改善してほしい"]
+SENTENCES = [
+    "毎日このアプリを使っています。",
+    "プレイリストを開くとアプリが落ちます。",
+    "オフラインで聴けるようにダウンロード機能を追加してほしいです。",
+    "検索結果がもっと正確だと嬉しいです。",
+    "サポートの対応がとても丁寧でした。",
+    "最新のアップデートから動作が重くなりました。",
+    "パスワードを何度入力してもログインできません。",
+    "歌詞の表示機能が便利です。",
+    "月額料金が少し高いと思います。",
+    "バックグラウンド再生が途中で止まります。",
+]
+ENGLISH_SENTENCES = [
+    "I use this app every day.",
+    "The app crashes when I open my playlist.",
+    "Please add offline downloads.",
+    "Search results could be more relevant.",
+    "Support was very helpful.",
+    "It got slow after the latest update.",
+]
+
+
+def percentiles(samples: List[float]) -> dict:
+    """Count, mean and p50/p95/p99/max of ``samples`` (seconds) in milliseconds."""
+    if not samples:
+        return {"count": 0}
+    ordered = sorted(samples)
+
+    def pick(q):
+        return ordered[min(len(ordered) - 1, max(0, int(round(q * (len(ordered) - 1)))))]
+
+    return {
+        "count": len(ordered),
+        "mean_ms": round(sum(ordered) / len(ordered) * 1000, 2),
+        "p50_ms": round(pick(0.50) * 1000, 2),
+        "p95_ms": round(pick(0.95) * 1000, 2),
+        "p99_ms": round(pick(0.99) * 1000, 2),
+        "max_ms": round(ordered[-1] * 1000, 2),
+    }
+
+
+class StageTimer:
+    """Collects wall-clock durations of wrapped coroutine functions by stage name."""
+
+    def __init__(self):
+        self.samples = defaultdict(list)
+
+    def wrap(self, stage: str, func):
+        @wraps(func)
+        async def timed(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                self.samples[stage].append(time.perf_counter() - started)
+        return timed
+
+    def instrument(self, obj, stages: Dict[str, str]):
+        for attribute, stage in stages.items():
+            setattr(obj, attribute, self.wrap(stage, getattr(obj, attribute)))
+
+    def summary(self) -> dict:
+        return {stage: percentiles(samples) for stage, samples in sorted(self.samples.items())}
+
+
+def make_reviews(count: int, products: int, duplicate_ratio: float, english_ratio: float, seed: int) -> List[dict]:
+    """Synthetic ``reviews`` documents; a share of them near-duplicate an earlier review."""
+    rng = random.Random(seed)
+    reviews = []
+    for i in range(count):
+        product_id = f"bench-product-{i % products}"
+        earlier = [r for r in reviews[-200:] if r["productId"] == product_id]
+        if earlier and rng.random() < duplicate_ratio:
+            attrs = dict(rng.choice(earlier)["rawReview"]["attributes"])
+            attrs["body"] = attrs["body"] + "！"
+        elif rng.random() < english_ratio:
+            attrs = {"title": "Feedback", "body": " ".join(rng.sample(ENGLISH_SENTENCES, 3))}
+        else:
+            attrs = {"title": rng.choice(TITLES), "body": "".join(rng.sample(SENTENCES, rng.randint(2, 5)))}
+        attrs.update({"reviewerNickname": f"user{i}", "createdDate": "2026-01-01T00:00:00Z"})
+        reviews.append({
+            "sourceReviewId": f"bench-{i:06d}",
+            "productId": product_id,
+            "source": "appstore",
+            "rawReview": {"attributes": attrs},
+        })
+    return reviews
+
+
+def configure_environment(args, base_url: str):
+    os.environ.update({
+        "LITELLM_LOCAL_MODEL_COST_MAP": "True",
+        "OPENAI_API_BASE": base_url,
+        "OPENAI_API_KEY": "benchmark",
+        "MODEL_NAME": args.model,
+        "LLM_CACHE_ENABLED": "true" if args.cache else "false",
+        "LLM_CACHE_MONGO_ENABLED": "false",
+        "NEAR_DUPLICATE_ENABLED": "true" if args.duplicate_ratio > 0 else "false",
+        "SESSION_BACKEND": "memory",
+    })
+
+
+def reset_singletons():
+    from src.agents.llm_rate_limiter import LLMRateLimiter
+    from src.agents.response_cache import ResponseCache
+    from src.tasks.near_duplicate_index import NearDuplicateIndex
+    from src.utils.language_detector import LanguageDetector
+    for singleton in (LLMRateLimiter, ResponseCache, NearDuplicateIndex, LanguageDetector):
+        singleton.reset_instance()
+
+
+def llm_delta(before: dict, after: dict) -> dict:
+    return {key: after[key] - before[key] for key in ("requests", "prompt_tokens", "completion_tokens", "injected_errors", "injected_rate_limits")}
+
+
+async def run_pipeline(args, mode: str, server: FakeLLMServer) -> dict:
+    from src.utils.async_db_service import AsyncDatabaseService
+    from src.tasks.batch_review_pipeline import BatchReviewPipeline, STATUS_PROCESSED
+    from src.tasks.process_review_tasks import ReviewProcessor
+
+    os.environ.update(MODES[mode])
+    reset_singletons()
+    db = MemoryDatabase(latency_seconds=args.mongo_latency_ms / 1000.0)
+    reviews = make_reviews(args.reviews, args.products, args.duplicate_ratio, args.english_ratio, args.seed)
+    for review in reviews:
+        db.reviews._insert(review)
+    service = MemoryDatabaseService(db)
+    previous_service = AsyncDatabaseService._instance
+    AsyncDatabaseService._instance = service
+    try:
+        timer = StageTimer()
+        processor = ReviewProcessor(db_service=service)
+        timer.instrument(processor, {
+            "translation_task": "translate",
+            "analysis_task": "analyze",
+            "reply_task": "reply",
+            "fused_task": "fused",
+            "analyze_reviews_batched": "analyze_batch",
+        })
+        pipeline = BatchReviewPipeline(processor=processor, db_service=service, concurrency=args.concurrency)
+        timer.instrument(pipeline, {"process_review": "review", "flush": "mongo_flush"})
+
+        ids = [review["sourceReviewId"] for review in reviews]
+        chunks = asyncio.Queue()
+        for i in range(0, len(ids), args.lease_batch):
+            chunks.put_nowait(ids[i:i + args.lease_batch])
+        statuses = {}
+
+        async def worker():
+            # Mirrors the job workers: each leases a chunk and runs it through the pipeline
+            while not chunks.empty():
+                chunk = chunks.get_nowait()
+                statuses.update(await timer.wrap("lease_batch", pipeline.run)(chunk))
+
+        llm_before = server.stats.snapshot()
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(args.workers)))
+        elapsed = time.perf_counter() - started
+        llm = llm_delta(llm_before, server.stats.snapshot())
+    finally:
+        AsyncDatabaseService._instance = previous_service
+
+    processed = sum(1 for status in statuses.values() if status == STATUS_PROCESSED)
+    near_duplicates = sum(1 for doc in db.processed_review.docs if "nearDuplicateOf" in doc)
+    round_trips = sum(db.round_trips.values())
+    return {
+        "mode": mode,
+        "reviews": len(ids),
+        "processed": processed,
+        "failed": len(ids) - processed,
+        "near_duplicates": near_duplicates,
+        "seconds": round(elapsed, 3),
+        "reviews_per_second": round(processed / elapsed, 2) if elapsed else None,
+        "stages": timer.summary(),
+        "mongo": {
+            "round_trips": round_trips,
+            "round_trips_per_review": round(round_trips / len(ids), 3) if ids else None,
+            "by_collection": dict(db.round_trips),
+        },
+        "llm": {
+            **llm,
+            "requests_per_review": round(llm["requests"] / len(ids), 3) if ids else None,
+            "tokens_per_review": round((llm["prompt_tokens"] + llm["completion_tokens"]) / len(ids), 1) if ids else None,
+        },
+    }
+
+
+def build_http_app():
+    from fastapi import FastAPI
+    from src.controllers.translation_controller import TranslationController
+    from src.controllers.review_analysis_controller import ReviewAnalysisController
+    from src.controllers.reply_generator_controller import ReplyGeneratorController
+    app = FastAPI()
+    for controller in (TranslationController(), ReviewAnalysisController(), ReplyGeneratorController()):
+        app.include_router(controller.router)
+    return app
+
+
+async def run_http(args, server: FakeLLMServer) -> dict:
+    import httpx
+    reset_singletons()
+    app = build_http_app()
+    rng = random.Random(args.seed)
+    bodies = {
+        "/translate": lambda i: {"japanese_text": "".join(rng.sample(SENTENCES, 3)) + f"({i})"},
+        "/analyze-review": lambda i: {"review_text": "".join(rng.sample(SENTENCES, 3)) + f"({i})"},
+        "/generate-reply": lambda i: {"customer_review": "".join(rng.sample(SENTENCES, 3)) + f"({i})", "customer_name": f"user{i}"},
+        "/translate/stream": lambda i: {"japanese_text": "".join(rng.sample(SENTENCES, 3)) + f"({i})"},
+    }
+    results = {}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=120) as client:
+        for path, make_body in bodies.items():
+            semaphore = asyncio.Semaphore(args.http_concurrency)
+            latencies, first_bytes, errors = [], [], 0
+
+            async def call(i):
+                nonlocal errors
+                async with semaphore:
+                    started = time.perf_counter()
+                    async with client.stream("POST", path, json=make_body(i)) as response:
+                        first = None
+                        async for _ in response.aiter_bytes():
+                            if first is None:
+                                first = time.perf_counter() - started
+                        if response.status_code != 200:
+                            errors += 1
+                    latencies.append(time.perf_counter() - started)
+                    first_bytes.append(first if first is not None else latencies[-1])
+
+            llm_before = server.stats.snapshot()
+            started = time.perf_counter()
+            await asyncio.gather(*(call(i) for i in range(args.http_requests)))
+            elapsed = time.perf_counter() - started
+            results[path] = {
+                "requests": args.http_requests,
+                "concurrency": args.http_concurrency,
+                "errors": errors,
+                "requests_per_second": round(args.http_requests / elapsed, 2),
+                "latency": percentiles(latencies),
+                "time_to_first_byte": percentiles(first_bytes),
+                "llm_requests": llm_delta(llm_before, server.stats.snapshot())["requests"],
+            }
+    return results
+
+
+def git_revision() -> dict:
+    def git(*command):
+        try:
+            return subprocess.run(["git", *command], capture_output=True, text=True, timeout=30, cwd=Path(__file__).parent).stdout.strip()
+        except Exception:
+            return ""
+    return {"commit": git("rev-parse", "--short", "HEAD") or "unknown", "dirty": bool(git("status", "--porcelain", "--", "."))}
+
+
+# Metrics compared between runs: (path into the result, True when higher is better)
+COMPARED_METRICS = [
+    ("reviews_per_second", True),
+    ("stages.review.p50_ms", False),
+    ("stages.review.p95_ms", False),
+    ("stages.review.p99_ms", False),
+    ("mongo.round_trips_per_review", False),
+    ("llm.requests_per_review", False),
+    ("llm.tokens_per_review", False),
+]
+
+
+def _lookup(data: dict, path: str):
+    for part in path.split("."):
+        if not isinstance(data, dict) or part not in data:
+            return None
+        data = data[part]
+    return data
+
+
+def compare_results(baseline: dict, current: dict, tolerance: float) -> List[dict]:
+    """Per pipeline mode, the change of each compared metric and whether it regressed beyond ``tolerance``."""
+    rows = []
+    for mode, result in current.get("pipeline", {}).items():
+        before_mode = baseline.get("pipeline", {}).get(mode)
+        if not before_mode:
+            continue
+        for path, higher_is_better in COMPARED_METRICS:
+            before, after = _lookup(before_mode, path), _lookup(result, path)
+            if not isinstance(before, (int, float)) or not isinstance(after, (int, float)) or before == 0:
+                continue
+            change = (after - before) / before
+            regressed = (-change if higher_is_better else change) > tolerance
+            rows.append({"mode": mode, "metric": path, "baseline": before, "current": after, "change": round(change, 4), "regressed": regressed})
+    return rows
+
+
+def print_summary(result: dict):
+    print(f"\nBenchmark @ {result['revision']['commit']}{' (dirty)' if result['revision']['dirty'] else ''}")
+    for mode, run in result["pipeline"].items():
+        review = run["stages"].get("review", {})
+        print(
+            f"  pipeline[{mode}]: {run['reviews_per_second']} reviews/s, review p50/p95/p99 "
+            f"{review.get('p50_ms')}/{review.get('p95_ms')}/{review.get('p99_ms')} ms, "
+            f"{run['mongo']['round_trips_per_review']} Mongo round trips/review, "
+            f"{run['llm']['requests_per_review']} LLM calls/review, {run['llm']['tokens_per_review']} tokens/review, "
+            f"{run['failed']} failed"
+        )
+    for path, run in result.get("http", {}).items():
+        print(f"  http {path}: {run['requests_per_second']} req/s, p50/p95/p99 {run['latency'].get('p50_ms')}/{run['latency'].get('p95_ms')}/{run['latency'].get('p99_ms')} ms, {run['errors']} errors")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--reviews", type=int, default=200, help="Reviews processed per pipeline mode")
+    parser.add_argument("--products", type=int, default=4)
+    parser.add_argument("--duplicate-ratio", type=float, default=0.2, help="Share of near-duplicate reviews")
+    parser.add_argument("--english-ratio", type=float, default=0.1, help="Share of reviews written in English")
+    parser.add_argument("--modes", default="split,split-batch,fused", help=f"Comma-separated pipeline modes: {', '.join(MODES)}")
+    parser.add_argument("--workers", type=int, default=2, help="Concurrent pipeline runs, like JOB_WORKER_COUNT")
+    parser.add_argument("--lease-batch", type=int, default=10, help="Reviews per pipeline run, like JOB_LEASE_BATCH")
+    parser.add_argument("--concurrency", type=int, default=16, help="REVIEW_BATCH_CONCURRENCY")
+    parser.add_argument("--http-requests", type=int, default=100, help="Requests per endpoint (0 skips the HTTP scenario)")
+    parser.add_argument("--http-concurrency", type=int, default=50)
+    parser.add_argument("--latency-ms", type=float, default=800.0, help="Median fake LLM latency")
+    parser.add_argument("--latency-sigma", type=float, default=0.35)
+    parser.add_argument("--token-delay-ms", type=float, default=5.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0)
+    parser.add_argument("--mongo-latency-ms", type=float, default=1.0, help="Simulated latency of each Mongo round trip")
+    parser.add_argument("--model", default="openai/benchmark-model")
+    parser.add_argument("--cache", action="store_true", help="Keep the in-process response cache enabled")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", help="Result file (default: benchmarks/results/<commit>.json)")
+    parser.add_argument("--compare", help="Earlier result file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="Relative change counted as a regression")
+    parser.add_argument("--verbose", action="store_true", help="Keep the service's INFO logging")
+    args = parser.parse_args(argv)
+    unknown = set(args.modes.split(",")) - set(MODES)
+    if unknown:
+        parser.error(f"Unknown modes: {', '.join(sorted(unknown))}")
+    return args
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    config = FakeLLMConfig(args.latency_ms, args.latency_sigma, args.token_delay_ms, args.error_rate, args.rate_limit_rate, args.seed)
+    with FakeLLMServer(config) as server:
+        configure_environment(args, server.base_url)
+        if not args.verbose:
+            logging.getLogger().setLevel(logging.WARNING)
+
+        async def run_all():
+            pipeline = {mode: await run_pipeline(args, mode, server) for mode in args.modes.split(",")}
+            http = await run_http(args, server) if args.http_requests > 0 else {}
+            return pipeline, http
+
+        pipeline, http = asyncio.run(run_all())
+
+    revision = git_revision()
+    result = {
+        "revision": revision,
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "config": {key: value for key, value in vars(args).items() if key not in ("output", "compare", "verbose")},
+        "pipeline": pipeline,
+        "http": http,
+    }
+    output = Path(args.output) if args.output else RESULTS_DIR / f"{revision['commit']}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(result, indent=2, ensure_ascii=False))
+    print_summary(result)
+    print(f"\nResults written to {output}")
+
+    if args.compare:
+        rows = compare_results(json.loads(Path(args.compare).read_text()), result, args.tolerance)
+        print(f"\nCompared with {args.compare} (tolerance {args.tolerance:.0%}):")
+        for row in rows:
+            flag = "REGRESSION" if row["regressed"] else ""
+            print(f"  [{row['mode']}] {row['metric']}: {row['baseline']} -> {row['current']} ({row['change']:+.1%}) {flag}")
+        if any(row["regressed"] for row in rows):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,77 @@
+import logging
+import os
+import threading
+from src.agents.ai_agents.ai_agent_translator import AIAgentTranslator
+from src.agents.ai_agents.ai_agent_reply_generator import AIAgentReplyGenerator
+from src.agents.ai_agents.ai_agent_review_analyzer import AIAgentReviewAnalyzer
+
+DEFAULT_AGENT_CLASSES = (AIAgentTranslator, AIAgentReplyGenerator, AIAgentReviewAnalyzer)
+
+
+class AgentRegistry:
+    """Process-wide cache of agent instances.
+
+    Building an agent creates a google-adk ``Agent`` and ``LiteLlm`` client, so
+    instances are built once per (agent class, model, prompt version) and shared
+    by every controller and review flow.
+    """
+
+    _instance = None
+    _lock = threading.RLock()
+
+    @classmethod
+    def reset_instance(cls):
+        """Reset the singleton instance for test isolation."""
+        cls._instance = None
+
+    def __new__(cls, *args, **kwargs):
+        with cls._lock:
+            if not cls._instance:
+                cls._instance = super(AgentRegistry, cls).__new__(cls)
+                cls._instance._agents = {}
+        return cls._instance
+
+    @staticmethod
+    def make_key(agent_cls, model: str = None):
+        model = model or os.getenv('MODEL_NAME', 'gpt-4.1')
+        prompt_version = getattr(agent_cls, "PROMPT_VERSION", "v1")
+        return (agent_cls, model, prompt_version)
+
+    def get(self, agent_cls, model: str = None, db_service=None):
+        """Return the shared instance of ``agent_cls``, building it on first use.
+
+        ``db_service`` is only passed to the constructor when the agent is first
+        built; every caller shares the same process-wide database service.
+        """
+        key = self.make_key(agent_cls, model)
+        agent = self._agents.get(key)
+        if agent is not None:
+            return agent
+        with self._lock:
+            agent = self._agents.get(key)
+            if agent is None:
+                logging.info(f"Building agent {getattr(agent_cls, '__name__', agent_cls)} for model={key[1]}, prompt={key[2]}")
+                agent = agent_cls(model=key[1], db_service=db_service)
+                self._agents[key] = agent
+        return agent
+
+    def warm_up(self, agent_classes=None, model: str = None):
+        """Eagerly build the given agents (all review agents by default)."""
+        built = []
+        for agent_cls in agent_classes or DEFAULT_AGENT_CLASSES:
+            try:
+                built.append(self.get(agent_cls, model=model))
+            except Exception as e:
+                logging.error(f"Failed to warm up agent {getattr(agent_cls, '__name__', agent_cls)}: {e}")
+        return built
+
+    def invalidate(self, agent_cls=None) -> int:
+        """Drop cached agents of ``agent_cls`` (or all of them) and return how many were removed."""
+        with self._lock:
+            keys = [key for key in self._agents if agent_cls is None or key[0] is agent_cls]
+            for key in keys:
+                del self._agents[key]
+        return len(keys)
+
+    def __len__(self):
+        return len(self._agents)
@@ -1,55 +1,54 @@
 import logging
 from src.agents.base.base_agent import BaseAgent
-from src.utils.mongo_session_service import MongoSessionService
-from google.adk.sessions.session import Session
-from google.adk.runners import Runner as AgentRunner
-from google.genai import types
-import uuid
+from src.agents.response_cache import cached_response
 from src.agents.prompts.reply_generator.v1 import PROMPT
 import json
 import re
 import os
 
+REPLY_KEYS = ("ai_reply", "en_reply")
+
 class AIAgentReplyGenerator(BaseAgent):
-    def __init__(self, db_service=None):
+    PROMPT_VERSION = "v1"
+
+    def __init__(self, db_service=None, model: str = None):
         super().__init__(
             name="reply_generator",
-            model=os.getenv('MODEL_NAME', 'gpt-4.1'),
+            model=model or os.getenv('MODEL_NAME', 'gpt-4.1'),
             description="Generates personalized acknowledgment replies",
-            instruction=PROMPT
+            instruction=PROMPT,
+            db_service=db_service
         )
-        self.db_service = db_service
 
+    @cached_response()
     async def perform_task(self, input_data: str) -> dict:
         logging.info("Starting reply generation process...")
-        session = Session(app_name="reply_generator_app", user_id="user_123", id=str(uuid.uuid4()))
-
-        session_service = MongoSessionService(db_service=self.db_service)
-        session_service.create_session(session.id, session)
-        runner = AgentRunner(agent=self.agent, session_service=session_service, app_name="reply_generator_app")
-
-        user_content = types.UserContent(input_data)
         try:
-            async for event in runner.run_async(session_id=session.id, user_id=session.user_id, new_message=user_content):
-                if event.is_final_response():
-                    for part in event.content.parts:
-                        if part.text:
-                            logging.debug(f"Agent raw response: {part.text}")
-                            clean_text = re.sub(r"<think>.*?</think>", "", part.text, flags=re.DOTALL).strip()
-                            try:
-                                parsed_response = json.loads(clean_text)
-                                if not all(key in parsed_response for key in ["ai_reply", "en_reply"]):
-                                    raise ValueError("Response JSON does not contain the required keys.")
-                                logging.info(f"Agent reply generated successfully for input.")
-                                return parsed_response
-                            except (json.JSONDecodeError, ValueError) as e:
-                                logging.error(f"Invalid response format: {str(e)}")
-                                return {"error": f"Invalid response format: {str(e)}"}
+            response = await self.run_agent(input_data, app_name="reply_generator_app")
         except Exception as e:
             logging.error(f"Error during reply generation: {e}")
             return {"error": str(e)}
-        finally:
-            session_service.delete_session(session.id)
-            session_service.close()
-        logging.error("Reply generation failed or no response.")
-        return {"error": "Reply generation failed or no response."}
+        if not response:
+            logging.error("Reply generation failed or no response.")
+            return {"error": "Reply generation failed or no response."}
+
+        logging.debug(f"Agent raw response: {response}")
+        clean_text = re.sub(r"<think>.*?</think>", "", response, flags=re.DOTALL).strip()
+        return self.finalize_response(clean_text)
+
+    def finalize_response(self, clean_text: str) -> dict:
+        if not clean_text:
+            logging.error("Reply generation failed or no response.")
+            return {"error": "Reply generation failed or no response."}
+        try:
+            parsed_response = json.loads(clean_text)
+            if not all(key in parsed_response for key in REPLY_KEYS):
+                raise ValueError("Response JSON does not contain the required keys.")
+            logging.info(f"Agent reply generated successfully for input.")
+            return parsed_response
+        except (json.JSONDecodeError, ValueError) as e:
+            logging.error(f"Invalid response format: {str(e)}")
+            return {"error": f"Invalid response format: {str(e)}"}
+
+    def stream_task(self, input_data: str, bypass_cache: bool = False):
+        return super().stream_task(input_data, app_name="reply_generator_app", bypass_cache=bypass_cache)
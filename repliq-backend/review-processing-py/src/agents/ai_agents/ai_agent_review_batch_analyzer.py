@@ -0,0 +1,92 @@
+import asyncio
+import json
+import logging
+import os
+import re
+from typing import Dict, List, Tuple
+from src.agents.base.base_agent import BaseAgent
+from src.agents.ai_agents.ai_agent_review_analyzer import ANALYSIS_KEYS
+from src.agents.prompts.ai_agent_review_batch_analyzer.v1 import PROMPT
+from src.utils.token_estimator import estimate_tokens
+
+
+def parse_batch_analysis(response: str, ids: List[str]) -> Dict[str, dict]:
+    """Map each id to its analysis, or ``None`` when the entry is missing or malformed."""
+    results = {review_id: None for review_id in ids}
+    clean_text = re.sub(r"<think>.*?</think>", "", response or "", flags=re.DOTALL).strip()
+    try:
+        parsed = json.loads(clean_text)
+    except json.JSONDecodeError as e:
+        logging.error(f"Invalid batch analysis format: {e}")
+        return results
+    if isinstance(parsed, dict):
+        parsed = parsed.get("results", [])
+    if not isinstance(parsed, list):
+        return results
+    for entry in parsed:
+        if not isinstance(entry, dict):
+            continue
+        review_id = str(entry.get("id"))
+        if review_id in results and all(key in entry for key in ANALYSIS_KEYS):
+            results[review_id] = {key: entry[key] for key in ANALYSIS_KEYS}
+    return results
+
+
+class AIAgentReviewBatchAnalyzer(BaseAgent):
+    """Analyzes several short reviews per request so the long analyzer prompt is paid once per batch."""
+
+    PROMPT_VERSION = "v1"
+
+    def __init__(self, db_service=None, model: str = None):
+        super().__init__(
+            name="api_review_batch_analyzer",
+            model=model or os.getenv('MODEL_NAME', 'gpt-4.1'),
+            description="Analyzes batches of user reviews",
+            instruction=PROMPT,
+            db_service=db_service
+        )
+        self.max_reviews = int(os.getenv("ANALYZER_BATCH_SIZE", "8"))
+        self.token_budget = int(os.getenv("ANALYZER_BATCH_TOKEN_BUDGET", "2000"))
+        self.concurrency = int(os.getenv("ANALYZER_BATCH_CONCURRENCY", "4"))
+
+    def pack(self, reviews: List[Tuple[str, str]]) -> List[List[Tuple[str, str]]]:
+        """Group reviews into batches of at most ``max_reviews`` within ``token_budget``."""
+        batches, batch, tokens = [], [], 0
+        for review_id, text in reviews:
+            cost = estimate_tokens(text)
+            if batch and (len(batch) >= self.max_reviews or tokens + cost > self.token_budget):
+                batches.append(batch)
+                batch, tokens = [], 0
+            batch.append((review_id, text))
+            tokens += cost
+        if batch:
+            batches.append(batch)
+        return batches
+
+    async def perform_task(self, input_data: List[Tuple[str, str]]) -> Dict[str, dict]:
+        # Short positional ids keep the request small; they are mapped back below
+        local_ids = [str(i + 1) for i in range(len(input_data))]
+        payload = json.dumps([{"id": local_id, "text": text} for local_id, (_, text) in zip(local_ids, input_data)], ensure_ascii=False)
+        try:
+            response = await self.run_agent(payload, app_name="batch_analyzer_app")
+            parsed = parse_batch_analysis(response, local_ids)
+        except Exception as e:
+            logging.error(f"Error during batch analysis of {len(input_data)} reviews: {e}")
+            parsed = {}
+        return {review_id: parsed.get(local_id) for local_id, (review_id, _) in zip(local_ids, input_data)}
+
+    async def analyze_many(self, reviews: List[Tuple[str, str]], limiter: asyncio.Semaphore = None) -> Dict[str, dict]:
+        """Analyze ``(review_id, text)`` pairs in packed batches; failed entries map to ``None``.
+
+        ``limiter`` bounds the concurrent requests (default ``concurrency`` slots).
+        """
+        semaphore = limiter or asyncio.Semaphore(self.concurrency)
+
+        async def run_batch(batch):
+            async with semaphore:
+                return await self.perform_task(batch)
+
+        results = {}
+        for batch_result in await asyncio.gather(*(run_batch(batch) for batch in self.pack(reviews))):
+            results.update(batch_result)
+        return results
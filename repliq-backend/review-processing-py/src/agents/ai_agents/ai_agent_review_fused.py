@@ -0,0 +1,97 @@
+import json
+import logging
+import os
+import re
+from typing import List
+from google.adk.agents import Agent
+from google.adk.models.lite_llm import LiteLlm
+from pydantic import BaseModel
+from src.agents.base.base_agent import BaseAgent
+from src.agents.response_cache import cached_response
+from src.agents.ai_agents.ai_agent_reply_generator import REPLY_KEYS
+from src.agents.ai_agents.ai_agent_review_analyzer import ANALYSIS_KEYS
+from src.agents.prompts.ai_agent_review_fused.v1 import PROMPT
+
+
+class ReviewItem(BaseModel):
+    title: str
+    description: str
+    tags: List[str]
+
+
+class ReviewAnalysis(BaseModel):
+    sentiment: str
+    issues: List[ReviewItem]
+    new_requests: List[ReviewItem]
+
+
+class FusedReviewResult(BaseModel):
+    enReview: str
+    analysis: ReviewAnalysis
+    ai_reply: str
+    en_reply: str
+
+
+def parse_fused_response(response: str) -> dict:
+    """Validate each field of a fused response on its own.
+
+    Returns ``{"enReview", "analysis", "reply"}`` with ``None`` for every field
+    that fails the checks the translator, analyzer and reply agents apply.
+    """
+    result = {"enReview": None, "analysis": None, "reply": None}
+    clean_text = re.sub(r"<think>.*?</think>", "", response or "", flags=re.DOTALL).strip()
+    try:
+        parsed = json.loads(clean_text)
+    except json.JSONDecodeError as e:
+        logging.error(f"Invalid fused response format: {e}")
+        return result
+    if not isinstance(parsed, dict):
+        return result
+    if isinstance(parsed.get("enReview"), str) and parsed["enReview"].strip():
+        result["enReview"] = parsed["enReview"].strip()
+    analysis = parsed.get("analysis")
+    if isinstance(analysis, dict) and all(key in analysis for key in ANALYSIS_KEYS):
+        result["analysis"] = analysis
+    if all(isinstance(parsed.get(key), str) and parsed[key] for key in REPLY_KEYS):
+        result["reply"] = {key: parsed[key] for key in REPLY_KEYS}
+    return result
+
+
+def is_complete_fused_result(result) -> bool:
+    return isinstance(result, dict) and all(result.get(field) is not None for field in ("enReview", "analysis", "reply"))
+
+
+class AIAgentReviewFused(BaseAgent):
+    """Translation, analysis and reply for one review in a single LLM call."""
+
+    PROMPT_VERSION = "v1"
+
+    def __init__(self, db_service=None, model: str = None):
+        super().__init__(
+            name="review_fused",
+            model=model or os.getenv('MODEL_NAME', 'gpt-4.1'),
+            description="Translates, analyzes and replies to a review in one pass",
+            instruction=PROMPT,
+            db_service=db_service
+        )
+
+    def create_agent(self, model: str = None):
+        """Create the agent with a strict JSON output schema."""
+        return Agent(
+            name=self.name,
+            model=LiteLlm(model=model or self.model),
+            description=self.description,
+            instruction=self.instruction,
+            output_schema=FusedReviewResult
+        )
+
+    @cached_response(is_cacheable=is_complete_fused_result)
+    async def perform_task(self, input_data: str) -> dict:
+        logging.info("Starting fused review processing...")
+        try:
+            response = await self.run_agent(input_data, app_name="review_fused_app")
+        except Exception as e:
+            logging.error(f"Error during fused review processing: {e}")
+            return {"enReview": None, "analysis": None, "reply": None}
+        logging.debug(f"Agent raw response: {response}")
+        return parse_fused_response(response)
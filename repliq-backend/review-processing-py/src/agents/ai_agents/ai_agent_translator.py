@@ -1,47 +1,48 @@
 import logging
 from src.agents.base.base_agent import BaseAgent
-from google.adk.models.lite_llm import LiteLlm
-from google.adk.agents import Agent
-from google.adk.sessions.session import Session
-from google.adk.runners import Runner as AgentRunner
-from google.genai import types
+from src.agents.response_cache import cached_response
 import re
-from src.utils.mongo_session_service import MongoSessionService
-import uuid
 import os
 from src.agents.prompts.ai_agent_translator.v1 import PROMPT
 
+TRANSLATION_FAILED = "Translation failed or no response."
+
+
+def is_cacheable_translation(result) -> bool:
+    return bool(result) and result != TRANSLATION_FAILED
+
+
 class AIAgentTranslator(BaseAgent):
-    def __init__(self, db_service=None):
+    PROMPT_VERSION = "v1"
+
+    def __init__(self, db_service=None, model: str = None):
         super().__init__(
             name="ai_agent_translator",
-            model=os.getenv('MODEL_NAME', 'gpt-4.1'),
+            model=model or os.getenv('MODEL_NAME', 'gpt-4.1'),
             description="Agent to translate Japanese text to English.",
-            instruction=PROMPT
+            instruction=PROMPT,
+            db_service=db_service
         )
-        self.db_service = db_service
 
+    @cached_response(is_cacheable=is_cacheable_translation)
     async def perform_task(self, input_data: str) -> str:
         logging.info("Starting translation process...")
-        session = Session(app_name="translation_app", user_id="user_123", id=str(uuid.uuid4()))
-
-        session_service = MongoSessionService(db_service=self.db_service)
-        session_service.create_session(session.id, session)
-        runner = AgentRunner(agent=self.agent, session_service=session_service, app_name="translation_app")
-
-        user_content = types.UserContent(input_data)
         try:
-            async for event in runner.run_async(session_id=session.id, user_id=session.user_id, new_message=user_content):
-                if event.is_final_response():
-                    for part in event.content.parts:
-                        if part.text:
-                            logging.debug(f"Agent raw response: {part.text}")
-                            clean_text = re.sub(r"<think>.*?</think>", "", part.text, flags=re.DOTALL).strip()
-                            logging.debug(f"Agent cleaned response: {clean_text}")
-                            return clean_text
+            response = await self.run_agent(input_data, app_name="translation_app")
+            if response:
+                logging.debug(f"Agent raw response: {response}")
+                clean_text = re.sub(r"<think>.*?</think>", "", response, flags=re.DOTALL).strip()
+                logging.debug(f"Agent cleaned response: {clean_text}")
+                return clean_text
         except Exception as e:
             logging.error(f"Error during translation: {e}")
-        finally:
-            session_service.delete_session(session.id)
-            session_service.close()
-        return "Translation failed or no response."
+        return TRANSLATION_FAILED
+
+    def finalize_response(self, text: str) -> str:
+        return text or TRANSLATION_FAILED
+
+    def is_cacheable_result(self, result) -> bool:
+        return is_cacheable_translation(result)
+
+    def stream_task(self, input_data: str, bypass_cache: bool = False):
+        return super().stream_task(input_data, app_name="translation_app", bypass_cache=bypass_cache)
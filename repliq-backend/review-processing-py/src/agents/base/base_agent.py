@@ -1,24 +1,339 @@
 from abc import ABC, abstractmethod
+import asyncio
+import logging
+import time
+import uuid
 from google.adk.models.lite_llm import LiteLlm
 from google.adk.agents import Agent
+from google.adk.sessions.session import Session
+from google.adk.runners import Runner as AgentRunner
+from google.adk.agents.run_config import RunConfig, StreamingMode
+from google.genai import types
+from src.utils.session_service_factory import get_session_service
+from src.utils.token_estimator import estimate_tokens
+from src.agents.llm_rate_limiter import LLMRateLimiter, is_rate_limit_error
+from src.agents.model_router import ModelRouter, model_pool
+from src.agents.response_cache import ResponseCache, answered_by_primary, answering_model, is_cacheable_response, reset_answering_model, response_cache_key
+from src.utils.think_tag_stripper import ThinkTagStripper
+from src.utils.metrics import LLM_FAILOVERS, LLM_HEDGES, LLM_REQUEST_SECONDS, LLM_REQUESTS, LLM_TOKENS
+from src.utils.tracing import get_tracer, record_error
+from opentelemetry.trace import SpanKind
 
 class BaseAgent(ABC):
-    def __init__(self, name: str, model: str, description: str, instruction: str):
+    def __init__(self, name: str, model: str, description: str, instruction: str, db_service=None):
         self.name = name
         self.model = model
         self.description = description
         self.instruction = instruction
+        self.db_service = db_service
+        # Ordered model pool; the router skips models whose circuit is open
+        self.models = model_pool(self.name, self.model)
+        self._model_agents = {}
         self.agent = self.create_agent()  # Initialize the agent during instantiation
 
-    def create_agent(self):
-        """Create the agent instance."""
+    def create_agent(self, model: str = None):
+        """Create the agent instance (for ``model``, the agent's own model by default)."""
         return Agent(
             name=self.name,
-            model=LiteLlm(model=self.model),
+            model=LiteLlm(model=model or self.model),
             description=self.description,
             instruction=self.instruction
         )
 
+    def agent_for(self, model: str = None):
+        """The google-adk agent bound to ``model``; fallback models are built on first use."""
+        if model is None or model == self.model:
+            return self.agent
+        agent = self._model_agents.get(model)
+        if agent is None:
+            agent = self._model_agents.setdefault(model, self.create_agent(model))
+        return agent
+
+    async def run_agent(self, input_data: str, app_name: str) -> str:
+        """Run the agent once in a throwaway session and return the final response text.
+
+        Calls go through the shared per-model limiter; provider throttling
+        (429) is retried after the limiter backs off instead of failing.
+        With a model pool, an error fails over to the next available model,
+        and a slow call may be hedged to it (see ``ModelRouter``).
+        """
+        router = ModelRouter()
+        models = router.candidates(self.models)
+        index = 0
+        while True:
+            model = models[index]
+            hedge_delay = router.hedge_delay(model) if index + 1 < len(models) else None
+            try:
+                if hedge_delay is None:
+                    response, answered_by = await self._run_model(input_data, app_name, model), model
+                else:
+                    response, answered_by = await self._run_hedged(input_data, app_name, model, models[index + 1], hedge_delay)
+                # Lets the response cache skip answers from fallback models
+                answering_model.set(answered_by)
+                return response
+            except Exception as e:
+                index += 1 if hedge_delay is None else 2
+                if index >= len(models):
+                    raise
+                LLM_FAILOVERS.labels(self.name, model).inc()
+                logging.warning(f"{self.name}: model {model} failed ({e}), failing over to {models[index]}")
+
+    async def _run_model(self, input_data: str, app_name: str, model: str) -> str:
+        started = time.perf_counter()
+        try:
+            with get_tracer().start_as_current_span(f"llm {self.name}", kind=SpanKind.CLIENT, attributes=self._span_attributes(app_name, model)) as span:
+                response, used_tokens = await self._run_with_limiter(input_data, app_name, span, model)
+        except Exception:
+            elapsed = time.perf_counter() - started
+            LLM_REQUESTS.labels(model, "error").inc()
+            LLM_REQUEST_SECONDS.labels(model, self.name).observe(elapsed)
+            ModelRouter().record(model, elapsed, ok=False)
+            raise
+        elapsed = time.perf_counter() - started
+        LLM_REQUEST_SECONDS.labels(model, self.name).observe(elapsed)
+        ModelRouter().record(model, elapsed, ok=True)
+        self._record_usage(used_tokens, model)
+        return response
+
+    async def _run_hedged(self, input_data: str, app_name: str, primary: str, secondary: str, delay: float):
+        """Call ``primary``; if it has not answered after ``delay`` seconds, also call
+        ``secondary`` and return ``(answer, model)`` of the first successful one, cancelling
+        the other call. A primary that fails before the delay is replaced by ``secondary`` right away.
+        """
+        first = asyncio.ensure_future(self._run_model(input_data, app_name, primary))
+        tasks = {first: "primary"}
+        models = {"primary": primary, "secondary": secondary}
+        try:
+            done, _ = await asyncio.wait({first}, timeout=delay)
+            if done and first.exception() is None:
+                return first.result(), primary
+            if done:
+                LLM_FAILOVERS.labels(self.name, primary).inc()
+                logging.warning(f"{self.name}: model {primary} failed ({first.exception()}), failing over to {secondary}")
+                return await self._run_model(input_data, app_name, secondary), secondary
+            second = asyncio.ensure_future(self._run_model(input_data, app_name, secondary))
+            tasks[second] = "secondary"
+            pending = set(tasks)
+            error = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        LLM_HEDGES.labels(self.name, tasks[task]).inc()
+                        return task.result(), models[tasks[task]]
+                    error = task.exception()
+            LLM_HEDGES.labels(self.name, "none").inc()
+            raise error
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    def _record_usage(self, used_tokens: int, model: str = None):
+        model = model or self.model
+        LLM_REQUESTS.labels(model, "ok").inc()
+        if used_tokens:
+            LLM_TOKENS.labels(model).inc(used_tokens)
+
+    async def _run_with_limiter(self, input_data: str, app_name: str, span, model: str = None):
+        model = model or self.model
+        limiter = LLMRateLimiter()
+        if not limiter.enabled:
+            response, used_tokens = await self._run_once(input_data, app_name, model)
+            span.set_attribute("gen_ai.usage.total_tokens", used_tokens)
+            return response, used_tokens
+        model_limiter = limiter.for_model(model)
+        estimated_tokens = estimate_tokens(self.instruction) + estimate_tokens(input_data)
+        attempt = 0
+        while True:
+            await model_limiter.acquire(estimated_tokens)
+            started = time.monotonic()
+            try:
+                response, used_tokens = await self._run_once(input_data, app_name, model)
+            except Exception as e:
+                if is_rate_limit_error(e) and attempt < model_limiter.max_retries:
+                    model_limiter.on_throttled()
+                    LLM_REQUESTS.labels(model, "throttled").inc()
+                    attempt += 1
+                    span.set_attribute("repliq.llm.retries", attempt)
+                    continue
+                model_limiter.on_failure()
+                raise
+            except BaseException:
+                model_limiter.on_failure()
+                raise
+            model_limiter.on_success(time.monotonic() - started, estimated_tokens, used_tokens)
+            span.set_attributes({"gen_ai.usage.total_tokens": used_tokens, "repliq.llm.estimated_tokens": estimated_tokens, "repliq.llm.retries": attempt})
+            return response, used_tokens
+
+    def _span_attributes(self, app_name: str, model: str = None) -> dict:
+        return {"gen_ai.operation.name": "chat", "gen_ai.request.model": model or self.model, "gen_ai.agent.name": self.name, "repliq.llm.app": app_name}
+
+    async def _run_once(self, input_data: str, app_name: str, model: str = None):
+        response = ""
+        used_tokens = 0
+        async for text, tokens in self._events(input_data, app_name, model=model):
+            response += text
+            used_tokens += tokens
+        return response, used_tokens
+
+    async def _events(self, input_data: str, app_name: str, streaming: bool = False, model: str = None):
+        """Yield ``(text, used_tokens)`` pairs from one run in a throwaway session.
+
+        Without streaming only the final response text is yielded. With
+        streaming the partial deltas are yielded as they arrive, and the final
+        aggregated event is skipped unless the model produced no partial events.
+        """
+        session = Session(app_name=app_name, user_id="user_123", id=str(uuid.uuid4()))
+        session_service = get_session_service(self.db_service)
+        session_service.create_session(session.id, session)
+        try:
+            runner = AgentRunner(agent=self.agent_for(model), session_service=session_service, app_name=app_name)
+            user_content = types.UserContent(input_data)
+            options = {"run_config": RunConfig(streaming_mode=StreamingMode.SSE)} if streaming else {}
+            streamed = False
+            async for event in runner.run_async(session_id=session.id, user_id=session.user_id, new_message=user_content, **options):
+                usage = getattr(event, "usage_metadata", None)
+                tokens = usage.total_token_count if isinstance(getattr(usage, "total_token_count", None), int) else 0
+                texts = [part.text for part in (event.content.parts if event.content else []) if part.text]
+                if streaming and getattr(event, "partial", False) is True:
+                    streamed = True
+                    for text in texts:
+                        yield text, 0
+                    continue
+                if event.is_final_response() and not streamed:
+                    for text in texts:
+                        yield text, 0
+                if tokens:
+                    yield "", tokens
+        finally:
+            session_service.delete_session(session.id)
+
+    async def stream_agent(self, input_data: str, app_name: str):
+        """Yield the response text incrementally as the model streams it.
+
+        Goes through the same limiter as ``run_agent``; a 429 is only retried
+        while nothing has been yielded yet. Streams use the first available
+        model of the pool and are neither failed over nor hedged, since text
+        may already have reached the client.
+        """
+        router = ModelRouter()
+        model = router.candidates(self.models)[0]
+        model_token = answering_model.set(model)
+        limiter = LLMRateLimiter()
+        model_limiter = limiter.for_model(model) if limiter.enabled else None
+        estimated_tokens = estimate_tokens(self.instruction) + estimate_tokens(input_data)
+        # Not made current: the context would leak into the consumer between yields
+        span = get_tracer().start_span(f"llm {self.name}", kind=SpanKind.CLIENT, attributes={**self._span_attributes(app_name, model), "repliq.llm.streaming": True})
+        chunks = self._stream_with_limiter(input_data, app_name, model_limiter, estimated_tokens, span, model)
+        started = time.perf_counter()
+        ok = False
+        try:
+            async for text in chunks:
+                yield text
+            ok = True
+        except Exception as e:
+            record_error(span, e)
+            LLM_REQUESTS.labels(model, "error").inc()
+            raise
+        finally:
+            # Release the limiter slot right away when the consumer stops early
+            await chunks.aclose()
+            span.end()
+            elapsed = time.perf_counter() - started
+            LLM_REQUEST_SECONDS.labels(model, self.name).observe(elapsed)
+            router.record(model, elapsed, ok=ok)
+            # The generator runs in the consumer's context, which must not keep the model
+            reset_answering_model(model_token)
+
+    async def _stream_with_limiter(self, input_data: str, app_name: str, model_limiter, estimated_tokens: int, span, model: str = None):
+        model = model or self.model
+        attempt = 0
+        while True:
+            if model_limiter:
+                await model_limiter.acquire(estimated_tokens)
+            started = time.monotonic()
+            yielded = False
+            used_tokens = 0
+            try:
+                async for text, tokens in self._events(input_data, app_name, streaming=True, model=model):
+                    used_tokens += tokens
+                    if text:
+                        yielded = True
+                        yield text
+            except Exception as e:
+                if model_limiter and is_rate_limit_error(e) and not yielded and attempt < model_limiter.max_retries:
+                    model_limiter.on_throttled()
+                    LLM_REQUESTS.labels(model, "throttled").inc()
+                    attempt += 1
+                    span.set_attribute("repliq.llm.retries", attempt)
+                    continue
+                if model_limiter:
+                    model_limiter.on_failure()
+                raise
+            except BaseException:
+                if model_limiter:
+                    model_limiter.on_failure()
+                raise
+            if model_limiter:
+                model_limiter.on_success(time.monotonic() - started, estimated_tokens, used_tokens)
+            span.set_attributes({"gen_ai.usage.total_tokens": used_tokens, "repliq.llm.retries": attempt})
+            self._record_usage(used_tokens, model)
+            return
+
+    def finalize_response(self, text: str):
+        """Turn the complete think-stripped response text into the task result."""
+        return text
+
+    def is_cacheable_result(self, result) -> bool:
+        return is_cacheable_response(result)
+
+    async def stream_task(self, input_data: str, app_name: str, bypass_cache: bool = False):
+        """Yield ``{"type": "delta", "text": ...}`` events while the model streams,
+        then ``{"type": "done", "result": ...}`` with the same result ``perform_task`` returns.
+
+        ``<think>`` blocks are removed incrementally, and results are shared
+        with the response cache used by ``perform_task``. A stream that fails
+        before any text ends like a failed ``perform_task``; one that fails
+        after text was sent re-raises, so the truncated text is never
+        finalized or cached and the caller can report the error.
+        """
+        cache = ResponseCache()
+        use_cache = cache.enabled
+        key = response_cache_key(self, input_data) if use_cache else None
+        if use_cache and not bypass_cache:
+            cached = await cache.get(key)
+            if cached is not None:
+                yield {"type": "done", "result": cached}
+                return
+        token = answering_model.set(None)
+        try:
+            stripper = ThinkTagStripper()
+            parts = []
+            primary = True
+            try:
+                async for chunk in self.stream_agent(input_data, app_name):
+                    # Read while stream_agent still holds the model it streams from
+                    primary = answered_by_primary(self)
+                    text = stripper.feed(chunk)
+                    if text:
+                        parts.append(text)
+                        yield {"type": "delta", "text": text}
+            except Exception as e:
+                logging.error(f"Error while streaming {self.name}: {e}")
+                if parts:
+                    raise
+            tail = stripper.flush()
+            if tail:
+                parts.append(tail)
+                yield {"type": "delta", "text": tail}
+            result = self.finalize_response("".join(parts))
+            if use_cache and self.is_cacheable_result(result) and primary:
+                await cache.set(key, result, agent=self.name, model=self.model)
+            yield {"type": "done", "result": result}
+        finally:
+            reset_answering_model(token)
+
     @abstractmethod
     async def perform_task(self, input_data):
         """Perform the task using the agent."""
@@ -0,0 +1,175 @@
+import asyncio
+import logging
+import os
+import threading
+import time
+from typing import Dict
+
+
+def is_rate_limit_error(error: Exception) -> bool:
+    """True for provider throttling (HTTP 429) as raised by LiteLLM or the OpenAI client."""
+    if getattr(error, "status_code", None) == 429 or type(error).__name__ == "RateLimitError":
+        return True
+    return "429" in str(error) and "rate" in str(error).lower()
+
+
+class TokenBucket:
+    """Refills ``per_minute`` units evenly over a minute; ``per_minute <= 0`` means unlimited."""
+
+    def __init__(self, per_minute: float, clock=time.monotonic):
+        self.capacity = per_minute
+        self.available = per_minute
+        self.clock = clock
+        self.updated = clock()
+
+    def _refill(self):
+        now = self.clock()
+        self.available = min(self.capacity, self.available + (now - self.updated) * self.capacity / 60.0)
+        self.updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until ``amount`` units are available (0 when they are)."""
+        if self.capacity <= 0:
+            return 0.0
+        self._refill()
+        amount = min(amount, self.capacity)
+        if self.available >= amount:
+            return 0.0
+        return (amount - self.available) * 60.0 / self.capacity
+
+    def take(self, amount: float):
+        if self.capacity > 0:
+            self.available -= min(amount, self.capacity)
+
+    def adjust(self, amount: float):
+        """Correct an earlier estimate once the real usage is known (negative refunds)."""
+        if self.capacity > 0:
+            self.available = min(self.capacity, self.available - amount)
+
+
+class ModelLimiter:
+    """Concurrency cap plus RPM/TPM buckets for one model, tuned with AIMD.
+
+    The cap grows by ``1/limit`` per successful call and halves on a 429
+    (or shrinks by 10% when latency exceeds ``LLM_LATENCY_TARGET_SECONDS``).
+    Callers wait instead of failing; state is shared by every thread and
+    event loop in the process, so waiting is done by short async polling.
+    """
+
+    def __init__(self, model: str, clock=time.monotonic):
+        self.model = model
+        self.clock = clock
+        self.min_limit = float(os.getenv("LLM_MIN_CONCURRENCY", "1"))
+        self.max_limit = float(os.getenv("LLM_MAX_CONCURRENCY", "16"))
+        self.limit = self.max_limit
+        self.latency_target = float(os.getenv("LLM_LATENCY_TARGET_SECONDS", "0"))
+        self.max_retries = int(os.getenv("LLM_RATE_LIMIT_RETRIES", "5"))
+        self.cooldown_seconds = float(os.getenv("LLM_THROTTLE_COOLDOWN_SECONDS", "2"))
+        self.poll_interval = 0.05
+        self.requests = TokenBucket(float(os.getenv("LLM_RPM", "0")), clock)
+        self.tokens = TokenBucket(float(os.getenv("LLM_TPM", "0")), clock)
+        self.in_flight = 0
+        self.waiting = 0
+        self.paused_until = 0.0
+        self.latency_ewma = None
+        self.counters = {"started": 0, "succeeded": 0, "throttled": 0, "failed": 0}
+        self._lock = threading.Lock()
+
+    def try_acquire(self, estimated_tokens: int) -> float:
+        """Take a slot if possible; otherwise return how long to wait before retrying."""
+        with self._lock:
+            now = self.clock()
+            if now < self.paused_until:
+                return self.paused_until - now
+            if self.in_flight >= int(self.limit):
+                return self.poll_interval
+            wait = max(self.requests.wait_time(1), self.tokens.wait_time(estimated_tokens))
+            if wait > 0:
+                return wait
+            self.requests.take(1)
+            self.tokens.take(estimated_tokens)
+            self.in_flight += 1
+            self.counters["started"] += 1
+            return 0.0
+
+    async def acquire(self, estimated_tokens: int):
+        with self._lock:
+            self.waiting += 1
+        try:
+            while True:
+                wait = self.try_acquire(estimated_tokens)
+                if wait <= 0:
+                    return
+                await asyncio.sleep(min(max(wait, 0.005), 1.0))
+        finally:
+            with self._lock:
+                self.waiting -= 1
+
+    def on_success(self, latency: float, estimated_tokens: int, used_tokens: int = None):
+        with self._lock:
+            self.in_flight -= 1
+            self.counters["succeeded"] += 1
+            self.latency_ewma = latency if self.latency_ewma is None else 0.8 * self.latency_ewma + 0.2 * latency
+            if used_tokens:
+                self.tokens.adjust(used_tokens - estimated_tokens)
+            if self.latency_target and latency > self.latency_target:
+                self.limit = max(self.min_limit, self.limit * 0.9)
+            else:
+                self.limit = min(self.max_limit, self.limit + 1.0 / max(self.limit, 1.0))
+
+    def on_throttled(self):
+        with self._lock:
+            self.in_flight -= 1
+            self.counters["throttled"] += 1
+            self.limit = max(self.min_limit, self.limit / 2)
+            self.paused_until = max(self.paused_until, self.clock() + self.cooldown_seconds)
+        logging.warning(f"LLM provider throttled model {self.model}; concurrency limit now {int(self.limit)}")
+
+    def on_failure(self):
+        with self._lock:
+            self.in_flight -= 1
+            self.counters["failed"] += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "limit": round(self.limit, 2),
+                "in_flight": self.in_flight,
+                "waiting": self.waiting,
+                "paused_for_seconds": round(max(0.0, self.paused_until - self.clock()), 3),
+                "latency_ewma_seconds": None if self.latency_ewma is None else round(self.latency_ewma, 3),
+                "rpm_available": None if self.requests.capacity <= 0 else round(self.requests.available, 1),
+                "tpm_available": None if self.tokens.capacity <= 0 else round(self.tokens.available, 1),
+                **self.counters,
+            }
+
+
+class LLMRateLimiter:
+    """Process-wide registry of per-model limiters used by ``BaseAgent.run_agent``."""
+
+    _instance = None
+    _lock = threading.Lock()
+
+    @classmethod
+    def reset_instance(cls):
+        """Reset the singleton instance for test isolation."""
+        cls._instance = None
+
+    def __new__(cls, *args, **kwargs):
+        with cls._lock:
+            if not cls._instance:
+                instance = super(LLMRateLimiter, cls).__new__(cls)
+                instance.enabled = os.getenv("LLM_LIMITER_ENABLED", "true").lower() == "true"
+                instance.models: Dict[str, ModelLimiter] = {}
+                cls._instance = instance
+        return cls._instance
+
+    def for_model(self, model: str) -> ModelLimiter:
+        limiter = self.models.get(model)
+        if limiter is None:
+            with self._lock:
+                limiter = self.models.setdefault(model, ModelLimiter(model))
+        return limiter
+
+    def snapshot(self) -> dict:
+        return {"enabled": self.enabled, "models": {model: limiter.snapshot() for model, limiter in list(self.models.items())}}
@@ -0,0 +1,184 @@
+import logging
+import math
+import os
+import threading
+import time
+from collections import deque
+from typing import Dict, List
+
+from src.utils.metrics import LLM_CIRCUIT_TRIPS
+
+CIRCUIT_CLOSED = "closed"
+CIRCUIT_OPEN = "open"
+CIRCUIT_HALF_OPEN = "half_open"
+
+
+def parse_model_list(spec: str) -> List[str]:
+    """Split ``"model-a,model-b"`` into an ordered list without duplicates."""
+    models = []
+    for model in (part.strip() for part in (spec or "").split(",")):
+        if model and model not in models:
+            models.append(model)
+    return models
+
+
+def model_pool(agent_name: str, primary: str) -> List[str]:
+    """Ordered models an agent may use: its own model first, then the configured fallbacks.
+
+    Fallbacks come from ``MODEL_POOL_<AGENT_NAME>`` (e.g. ``MODEL_POOL_REPLY_GENERATOR``)
+    or, when that is unset, from ``MODEL_POOL``.
+    """
+    spec = os.getenv(f"MODEL_POOL_{agent_name.upper()}") or os.getenv("MODEL_POOL", "")
+    return [primary] + [model for model in parse_model_list(spec) if model != primary]
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of ``values`` (``pct`` in 0..100)."""
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100.0 * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+class ModelHealth:
+    """Rolling latency and error window of one model plus its circuit breaker.
+
+    The breaker opens when the window holds at least ``min_requests`` calls
+    and the error rate reaches ``error_rate``, or after ``consecutive_failures``
+    failures in a row. After ``open_seconds`` the model is tried again
+    (half-open): a success closes the breaker, a failure re-opens it.
+    """
+
+    def __init__(self, model: str, clock=time.monotonic):
+        self.model = model
+        self.clock = clock
+        self.window = deque(maxlen=int(os.getenv("MODEL_ROUTER_WINDOW", "50")))
+        self.error_rate_threshold = float(os.getenv("MODEL_ROUTER_BREAKER_ERROR_RATE", "0.5"))
+        self.min_requests = int(os.getenv("MODEL_ROUTER_BREAKER_MIN_REQUESTS", "10"))
+        self.max_consecutive_failures = int(os.getenv("MODEL_ROUTER_BREAKER_CONSECUTIVE_FAILURES", "5"))
+        self.open_seconds = float(os.getenv("MODEL_ROUTER_BREAKER_OPEN_SECONDS", "30"))
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self.counters = {"succeeded": 0, "failed": 0, "trips": 0}
+        self._lock = threading.Lock()
+
+    def _state(self) -> str:
+        if self.opened_at is None:
+            return CIRCUIT_CLOSED
+        return CIRCUIT_OPEN if self.clock() - self.opened_at < self.open_seconds else CIRCUIT_HALF_OPEN
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state()
+
+    def available(self) -> bool:
+        return self.state != CIRCUIT_OPEN
+
+    def _error_rate(self) -> float:
+        if not self.window:
+            return 0.0
+        return sum(1 for _, ok in self.window if not ok) / len(self.window)
+
+    def _trip(self):
+        self.opened_at = self.clock()
+        # Start the next half-open period from a clean window
+        self.window.clear()
+        self.counters["trips"] += 1
+        LLM_CIRCUIT_TRIPS.labels(self.model).inc()
+        logging.warning(f"Circuit breaker opened for model {self.model} for {self.open_seconds}s")
+
+    def record(self, latency: float, ok: bool):
+        with self._lock:
+            state = self._state()
+            self.window.append((latency, ok))
+            if ok:
+                self.counters["succeeded"] += 1
+                self.consecutive_failures = 0
+                if state == CIRCUIT_HALF_OPEN:
+                    self.opened_at = None
+                    logging.info(f"Circuit breaker closed for model {self.model}")
+                return
+            self.counters["failed"] += 1
+            self.consecutive_failures += 1
+            if state == CIRCUIT_HALF_OPEN:
+                self._trip()
+            elif state == CIRCUIT_CLOSED and (
+                self.consecutive_failures >= self.max_consecutive_failures
+                or (len(self.window) >= self.min_requests and self._error_rate() >= self.error_rate_threshold)
+            ):
+                self._trip()
+
+    def latencies(self) -> List[float]:
+        with self._lock:
+            return [latency for latency, ok in self.window if ok]
+
+    def snapshot(self) -> dict:
+        latencies = self.latencies()
+        with self._lock:
+            return {
+                "state": self._state(),
+                "window": len(self.window),
+                "error_rate": round(self._error_rate(), 3),
+                "consecutive_failures": self.consecutive_failures,
+                "latency_p50_seconds": round(percentile(latencies, 50), 3) if latencies else None,
+                "latency_p95_seconds": round(percentile(latencies, 95), 3) if latencies else None,
+                **self.counters,
+            }
+
+
+class ModelRouter:
+    """Process-wide per-model health used by ``BaseAgent.run_agent`` to pick models.
+
+    Models with an open circuit are skipped; when every model of a pool is
+    open the whole pool is tried anyway rather than failing without a call.
+    With ``MODEL_ROUTER_HEDGE_ENABLED`` a call still running after the
+    primary's ``MODEL_ROUTER_HEDGE_PERCENTILE`` latency is duplicated to the
+    next model and the first successful answer wins.
+    """
+
+    _instance = None
+    _lock = threading.Lock()
+
+    @classmethod
+    def reset_instance(cls):
+        """Reset the singleton instance for test isolation."""
+        cls._instance = None
+
+    def __new__(cls, *args, **kwargs):
+        with cls._lock:
+            if not cls._instance:
+                instance = super(ModelRouter, cls).__new__(cls)
+                instance.hedge_enabled = os.getenv("MODEL_ROUTER_HEDGE_ENABLED", "false").lower() == "true"
+                instance.hedge_percentile = float(os.getenv("MODEL_ROUTER_HEDGE_PERCENTILE", "95"))
+                instance.hedge_min_samples = int(os.getenv("MODEL_ROUTER_HEDGE_MIN_SAMPLES", "10"))
+                instance.hedge_min_delay = float(os.getenv("MODEL_ROUTER_HEDGE_MIN_DELAY_SECONDS", "0.5"))
+                instance.models: Dict[str, ModelHealth] = {}
+                cls._instance = instance
+        return cls._instance
+
+    def for_model(self, model: str) -> ModelHealth:
+        health = self.models.get(model)
+        if health is None:
+            with self._lock:
+                health = self.models.setdefault(model, ModelHealth(model))
+        return health
+
+    def candidates(self, pool: List[str]) -> List[str]:
+        """Models of ``pool`` whose circuit is not open, in pool order."""
+        available = [model for model in pool if self.for_model(model).available()]
+        return available or list(pool)
+
+    def hedge_delay(self, model: str):
+        """Seconds to wait before hedging a call to ``model``, or ``None`` to not hedge."""
+        if not self.hedge_enabled:
+            return None
+        latencies = self.for_model(model).latencies()
+        if len(latencies) < self.hedge_min_samples:
+            return None
+        return max(self.hedge_min_delay, percentile(latencies, self.hedge_percentile))
+
+    def record(self, model: str, latency: float, ok: bool):
+        self.for_model(model).record(latency, ok)
+
+    def snapshot(self) -> dict:
+        return {"hedge_enabled": self.hedge_enabled, "models": {model: health.snapshot() for model, health in list(self.models.items())}}
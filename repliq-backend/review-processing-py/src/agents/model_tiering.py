@@ -0,0 +1,77 @@
+import os
+import unicodedata
+from collections import Counter
+from src.utils.language_detector import script_of
+from src.utils.token_estimator import estimate_tokens
+
+TIER_SMALL = "small"
+TIER_LARGE = "large"
+
+# Reviews mentioning these need the large model's analysis and a careful reply
+DEFAULT_COMPLAINT_KEYWORDS = (
+    "crash", "bug", "error", "broken", "refund", "charged", "cancel", "scam", "not working", "doesn't work",
+    "can't", "cannot", "log in", "login", "worst", "uninstall",
+    "落ち", "クラッシュ", "不具合", "バグ", "エラー", "返金", "課金", "解約", "ログイン", "使えない", "できない", "最悪",
+)
+
+
+def normalize(text: str) -> str:
+    return unicodedata.normalize("NFKC", text or "").lower()
+
+
+def dominant_script(text: str) -> str:
+    scripts = Counter(script for script in map(script_of, text or "") if script)
+    if not scripts:
+        return None
+    if scripts["kana"]:
+        # Japanese mixes kana with Han; report it as one script
+        return "kana" if scripts["kana"] + scripts["han"] >= scripts["latin"] else "latin"
+    return scripts.most_common(1)[0][0]
+
+
+class ModelTieringPolicy:
+    """Chooses the model tier for a review from cheap text features.
+
+    A review goes to the small model (``MODEL_NAME_SMALL``) only when it is
+    short (``MODEL_TIERING_MAX_TOKENS`` estimated tokens and
+    ``MODEL_TIERING_MAX_CHARS`` characters), written in one of
+    ``MODEL_TIERING_SCRIPTS`` and free of complaint keywords; everything else
+    keeps the large model (``MODEL_NAME``).
+    """
+
+    def __init__(self, enabled: bool = None, small_model: str = None, large_model: str = None):
+        self.enabled = os.getenv("MODEL_TIERING_ENABLED", "false").lower() == "true" if enabled is None else enabled
+        self.small_model = small_model or os.getenv("MODEL_NAME_SMALL", "gpt-4.1-mini")
+        self.large_model = large_model or os.getenv("MODEL_NAME", "gpt-4.1")
+        self.max_tokens = int(os.getenv("MODEL_TIERING_MAX_TOKENS", "40"))
+        self.max_chars = int(os.getenv("MODEL_TIERING_MAX_CHARS", "200"))
+        self.scripts = {s.strip() for s in os.getenv("MODEL_TIERING_SCRIPTS", "latin,kana,han,hangul").split(",") if s.strip()}
+        keywords = os.getenv("MODEL_TIERING_COMPLAINT_KEYWORDS")
+        self.keywords = tuple(normalize(k).strip() for k in keywords.split(",") if k.strip()) if keywords else DEFAULT_COMPLAINT_KEYWORDS
+
+    def model_for(self, tier: str) -> str:
+        return self.small_model if tier == TIER_SMALL else self.large_model
+
+    def features(self, text: str) -> dict:
+        normalized = normalize(text)
+        return {
+            "chars": len(text.strip()),
+            "tokens": estimate_tokens(text.strip()),
+            "script": dominant_script(text),
+            "complaint": any(keyword in normalized for keyword in self.keywords),
+        }
+
+    def decide(self, text: str) -> dict:
+        """Return ``{"tier", "reason", "model", "features"}`` for ``text``."""
+        features = self.features(text or "")
+        if not self.enabled:
+            tier, reason = TIER_LARGE, "disabled"
+        elif features["complaint"]:
+            tier, reason = TIER_LARGE, "complaint"
+        elif features["tokens"] > self.max_tokens or features["chars"] > self.max_chars:
+            tier, reason = TIER_LARGE, "long"
+        elif features["script"] not in self.scripts:
+            tier, reason = TIER_LARGE, "script"
+        else:
+            tier, reason = TIER_SMALL, "short"
+        return {"tier": tier, "reason": reason, "model": self.model_for(tier), "features": features}
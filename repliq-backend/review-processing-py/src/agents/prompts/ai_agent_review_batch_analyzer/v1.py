@@ -0,0 +1,17 @@
+"""
+Prompt for AI Agent Review Batch Analyzer (Version 1)
+"""
+
+from src.agents.prompts.ai_agent_review_analyzer.v1 import PROMPT as ANALYZER_PROMPT
+
+PROMPT = ANALYZER_PROMPT + """
+
+**Batch mode**: The input is a JSON array of reviews, each with an "id" and a "text":
+[{"id": "1", "text": "..."}, {"id": "2", "text": "..."}]
+Analyze every review independently using the rules above and respond with a JSON array only,
+containing exactly one object per input review with the same "id":
+[
+  {"id": "1", "sentiment": "...", "issues": [...], "new_requests": [...]},
+  {"id": "2", "sentiment": "...", "issues": [...], "new_requests": [...]}
+]
+"""
@@ -0,0 +1,189 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+import unicodedata
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from functools import wraps
+from opentelemetry import trace
+from src.utils.async_db_service import AsyncDatabaseService
+from src.utils.ttl_cache import TTLCache
+from src.utils.metrics import AGENT_SECONDS
+from src.utils.tracing import get_tracer
+
+# Model that produced the current task's answer, set by ``BaseAgent`` when it is known
+answering_model: ContextVar = ContextVar("repliq_answering_model", default=None)
+
+
+def normalize_input(text: str) -> str:
+    """Normalize text so trivially different inputs share a cache entry."""
+    return re.sub(r"\s+", " ", unicodedata.normalize("NFKC", text or "")).strip()
+
+
+class ResponseCache:
+    """Content-addressed cache of successful agent responses.
+
+    Tier one is an in-process LRU with TTL, tier two the ``llm_cache`` Mongo
+    collection (expired by a TTL index). Keys hash the agent name, model,
+    prompt version and normalized input, so changing the model or prompt
+    version never serves stale answers. Answers from a fallback model of the
+    pool are not stored under the agent's own model.
+    """
+
+    _instance = None
+    _lock = threading.Lock()
+
+    @classmethod
+    def reset_instance(cls):
+        """Reset the singleton instance for test isolation."""
+        cls._instance = None
+
+    def __new__(cls, *args, **kwargs):
+        with cls._lock:
+            if not cls._instance:
+                instance = super(ResponseCache, cls).__new__(cls)
+                instance.enabled = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+                instance.mongo_enabled = os.getenv("LLM_CACHE_MONGO_ENABLED", "true").lower() == "true"
+                instance.memory = TTLCache(
+                    max_size=int(os.getenv("LLM_CACHE_MAX_ENTRIES", "5000")),
+                    ttl_seconds=float(os.getenv("LLM_CACHE_TTL_SECONDS", "86400")),
+                )
+                instance.db_service = AsyncDatabaseService()
+                instance.counters = {"memory_hits": 0, "mongo_hits": 0, "misses": 0, "stores": 0, "errors": 0}
+                instance._counter_lock = threading.Lock()
+                cls._instance = instance
+        return cls._instance
+
+    @staticmethod
+    def make_key(agent_name: str, model: str, prompt_version: str, input_data: str) -> str:
+        payload = json.dumps([agent_name, model, prompt_version, normalize_input(input_data)], ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _count(self, name: str):
+        with self._counter_lock:
+            self.counters[name] += 1
+
+    def _collection(self):
+        if not self.mongo_enabled:
+            return None
+        db = self.db_service.db
+        return None if db is None else db.llm_cache
+
+    async def get(self, key: str):
+        value = self.memory.get(key)
+        if value is not None:
+            self._count("memory_hits")
+            trace.get_current_span().set_attribute("repliq.cache.tier", "memory")
+            return value
+        collection = self._collection()
+        if collection is not None:
+            try:
+                doc = await collection.find_one({"_id": key}, {"value": 1})
+            except Exception as e:
+                logging.error(f"LLM cache lookup failed: {e}")
+                self._count("errors")
+                doc = None
+            if doc is not None:
+                self.memory.set(key, doc["value"])
+                self._count("mongo_hits")
+                trace.get_current_span().set_attribute("repliq.cache.tier", "mongo")
+                return doc["value"]
+        self._count("misses")
+        return None
+
+    async def set(self, key: str, value, **metadata):
+        self.memory.set(key, value)
+        self._count("stores")
+        collection = self._collection()
+        if collection is None:
+            return
+        try:
+            await collection.update_one(
+                {"_id": key},
+                {"$set": {"value": value, "createdAt": datetime.now(timezone.utc), **metadata}},
+                upsert=True,
+            )
+        except Exception as e:
+            logging.error(f"LLM cache store failed: {e}")
+            self._count("errors")
+
+    def stats(self) -> dict:
+        with self._counter_lock:
+            counters = dict(self.counters)
+        lookups = counters["memory_hits"] + counters["mongo_hits"] + counters["misses"]
+        hits = counters["memory_hits"] + counters["mongo_hits"]
+        return {
+            "enabled": self.enabled,
+            "memory_entries": len(self.memory),
+            "hit_ratio": hits / lookups if lookups else 0.0,
+            **counters,
+        }
+
+
+def is_cacheable_response(result) -> bool:
+    """Only successful responses are cached; error dicts and empty results are not."""
+    if not result:
+        return False
+    return not (isinstance(result, dict) and "error" in result)
+
+
+def response_cache_key(agent, input_data: str) -> str:
+    return ResponseCache.make_key(agent.name, agent.model, getattr(agent, "PROMPT_VERSION", "v1"), input_data)
+
+
+def answered_by_primary(agent) -> bool:
+    """Whether the last answer in this context came from ``agent.model`` (or its model is unknown)."""
+    return answering_model.get() in (None, agent.model)
+
+
+def reset_answering_model(token):
+    """Undo an ``answering_model.set``; a generator finalized in another context leaves the variable alone."""
+    try:
+        answering_model.reset(token)
+    except ValueError:
+        pass
+
+
+def cached_response(is_cacheable=is_cacheable_response):
+    """Put ``ResponseCache`` in front of an agent's ``perform_task``.
+
+    The wrapped method accepts ``bypass_cache=True`` to force a fresh model call
+    (the fresh result still refreshes the cache).
+    """
+    def decorator(func):
+        @wraps(func)
+        async def wrapper(self, input_data, bypass_cache: bool = False):
+            cache = ResponseCache()
+            started = time.perf_counter()
+            outcome = "disabled"
+            try:
+                with get_tracer().start_as_current_span(f"agent {self.name}", attributes={"repliq.cache.enabled": cache.enabled, "repliq.cache.bypass": bypass_cache}) as span:
+                    if not cache.enabled:
+                        return await func(self, input_data)
+                    key = response_cache_key(self, input_data)
+                    outcome = "bypass"
+                    if not bypass_cache:
+                        cached = await cache.get(key)
+                        span.set_attribute("repliq.cache.hit", cached is not None)
+                        if cached is not None:
+                            logging.debug(f"LLM cache hit for {self.name}")
+                            outcome = "hit"
+                            return cached
+                        outcome = "miss"
+                    token = answering_model.set(None)
+                    try:
+                        result = await func(self, input_data)
+                        primary = answered_by_primary(self)
+                    finally:
+                        answering_model.reset(token)
+                    if is_cacheable(result) and primary:
+                        await cache.set(key, result, agent=self.name, model=self.model)
+                    return result
+            finally:
+                AGENT_SECONDS.labels(self.name, outcome).observe(time.perf_counter() - started)
+        return wrapper
+    return decorator
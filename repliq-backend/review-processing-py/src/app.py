@@ -1,9 +1,24 @@
+import anyio.to_thread
 from fastapi import FastAPI
 from contextlib import asynccontextmanager
 from src.routes import register_routes
 from src.utils.db_service import DatabaseService
+from src.utils.async_runtime import AsyncRuntime
+from src.utils.async_db_service import AsyncDatabaseService
+from src.utils.db_indexes import ensure_indexes
+from src.jobs.job_queue import JobQueue
+from src.jobs.worker import JobWorkerPool
+from src.jobs.review_watcher import ReviewWatcherRunner
+from src.agents.agent_registry import AgentRegistry, DEFAULT_AGENT_CLASSES
+from src.agents.ai_agents.ai_agent_review_fused import AIAgentReviewFused
+from src.agents.model_tiering import ModelTieringPolicy
+from src.tasks.process_review_tasks import review_agent_mode
+from src.utils.session_service_factory import close_session_services
+from src.utils.metrics import MetricsSnapshotWriter
+from src.utils.tracing import TracingMiddleware, configure_tracing, shutdown_tracing
 
 import logging
+import os
 
 logging.basicConfig(
     level=logging.INFO,
@@ -12,6 +27,61 @@ logging.basicConfig(
 )
 
 
+def warm_up_agents():
+    """Build the shared review agents up front unless AGENT_WARMUP is disabled."""
+    if os.getenv("AGENT_WARMUP", "true").lower() == "true":
+        fused = (AIAgentReviewFused,) if review_agent_mode() == "fused" else ()
+        AgentRegistry().warm_up(DEFAULT_AGENT_CLASSES + fused)
+        tiering = ModelTieringPolicy()
+        if tiering.enabled:
+            AgentRegistry().warm_up(DEFAULT_AGENT_CLASSES + fused, model=tiering.small_model)
+
+
+def configure_threadpool():
+    """Size the thread pool that runs sync (``def``) handlers and other blocking work."""
+    size = int(os.getenv("THREADPOOL_SIZE", "40"))
+    anyio.to_thread.current_default_thread_limiter().total_tokens = size
+    logging.info(f"Thread pool limited to {size} threads")
+
+
+job_worker_pool = JobWorkerPool()
+review_watcher = ReviewWatcherRunner()
+metrics_writer = MetricsSnapshotWriter()
+
+
+async def start_services(db_service=None):
+    logging.info("Starting up the application")
+    configure_threadpool()
+    metrics_writer.start()
+    if db_service:
+        db_service.connect()
+    AsyncRuntime().start()
+    db = AsyncDatabaseService().db
+    if db is not None:
+        if os.getenv("ENSURE_INDEXES", "true").lower() == "true":
+            await ensure_indexes(db)
+            await JobQueue().ensure_indexes()
+        if os.getenv("JOB_WORKERS_IN_PROCESS", "true").lower() == "true":
+            job_worker_pool.start()
+        review_watcher.start()
+    warm_up_agents()
+
+
+async def stop_services(db_service=None):
+    logging.info("Shutting down the application")
+    job_worker_pool.stop()
+    # Before the clients close, so the watcher can still release its lease
+    await review_watcher.stop()
+    async_db = AsyncDatabaseService()
+    await AsyncRuntime().run_on_each_loop(async_db.close)
+    await async_db.close()
+    AsyncRuntime().stop()
+    close_session_services()
+    if db_service:
+        db_service.close()
+    metrics_writer.stop()
+    shutdown_tracing()
+
 
 def create_app(db_service=None):
     if db_service is None:
@@ -20,14 +90,14 @@ def create_app(db_service=None):
     @asynccontextmanager
     async def lifespan(app: FastAPI):
         # Startup logic
-        logging.info("Starting up the application")
-        db_service.connect()
+        await start_services(db_service)
         yield
         # Shutdown logic
-        logging.info("Shutting down the application")
-        db_service.close()
+        await stop_services(db_service)
 
+    configure_tracing()
     app = FastAPI(lifespan=lifespan)
+    app.add_middleware(TracingMiddleware)
     # Attach db_service to app for access in routes/controllers if needed
     app.state.db_service = db_service
     register_routes(app)
@@ -37,13 +107,9 @@ def create_app(db_service=None):
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     db_service = getattr(app.state, "db_service", None)
-    logging.info("Starting up the application")
-    if db_service:
-        db_service.connect()
+    await start_services(db_service)
     yield
-    logging.info("Shutting down the application")
-    if db_service:
-        db_service.close()
+    await stop_services(db_service)
 
 # Default app for production
 app = create_app()
@@ -1,73 +1,131 @@
+import json
 import logging
-from bson import ObjectId
+import os
 from fastapi import HTTPException
-from fastapi.background import BackgroundTasks
-from src.utils.db_service import DatabaseService
-from src.tasks.process_review_tasks import process_review_flow
+from src.utils.async_db_service import AsyncDatabaseService
+from src.jobs.job_queue import JobQueue
+from src.jobs.scheduler import PRIORITY_BACKFILL, PRIORITY_NEW, PRIORITY_PROJECTION, review_priority_class
+from src.utils.product_catalog import ProductCatalog
+from src.utils.streaming import iter_lines
+
+# Upper bound on the ids echoed back in a 404, so the error stays small
+MAX_REPORTED_MISSING_IDS = 20
+
+
+def parse_source_review_id(line: str) -> str:
+    """One bulk-ingest line: a JSON string, ``{"sourceReviewId": ...}`` or a bare id."""
+    if line[0] not in "{\"":
+        return line
+    value = json.loads(line)
+    if isinstance(value, dict):
+        value = value.get("sourceReviewId")
+    if not isinstance(value, str) or not value:
+        raise ValueError(f"Expected a sourceReviewId, got {line[:100]}")
+    return value
 
 class ProcessReviewController:
-    def __init__(self):
-        self.db = DatabaseService().db
+    def __init__(self, db_service=None, job_queue=None, product_catalog=None):
+        self.db_service = db_service or AsyncDatabaseService()
+        self.job_queue = job_queue or JobQueue(db_service=self.db_service)
+        self.product_catalog = product_catalog or ProductCatalog()
+
+    @property
+    def db(self):
+        return self.db_service.db
 
-    def validate_and_process_reviews(self, product_id: str, sourceReviewIds: list, background_tasks: BackgroundTasks):
+    async def validate_and_process_reviews(self, product_id: str, sourceReviewIds: list):
+        db = self.db
         # Validate productId
-        if self.db is None:
+        if db is None:
             raise RuntimeError("Database connection is not established. Ensure the application has started and the database is connected.")
 
-        product = self.db.products.find_one({"productId": product_id})
-        if not product:
-            # Fetch all available productIds
-            all_products = list(self.db.products.find({}, {"productId": 1, "_id": 0}))
-            available_product_ids = [p["productId"] for p in all_products]
-
-            # Get DB info for debugging
-            db_info = {}
-            try:
-                db_url = getattr(self.db.client, 'address', None)
-                db_name = self.db.name
-                collections = self.db.list_collection_names()
-                collections_info = {}
-                for coll in collections:
-                    collections_info[coll] = self.db[coll].count_documents({})
-                db_info = {
-                    "db_url": str(db_url),
-                    "db_name": db_name,
-                    "collections": collections_info
-                }
-            except Exception as e:
-                db_info = {"error": str(e)}
-
-            raise HTTPException(
-                status_code=404,
-                detail={
-                    "message": f"Product with ID {product_id} not found.",
-                    "availableProductIds": available_product_ids,
-                    "db_info": db_info
-                }
-            )
+        if not await self.product_catalog.exists(db, product_id):
+            raise HTTPException(status_code=404, detail={"message": "Product not found.", "productId": product_id})
 
         # Validate sourceReviewIds existence and productId match
         if not isinstance(sourceReviewIds, list) or not all(isinstance(sid, str) for sid in sourceReviewIds):
             raise HTTPException(status_code=400, detail="sourceReviewIds must be a list of strings.")
+        # One queue item per review, however often it was listed
+        sourceReviewIds = list(dict.fromkeys(sourceReviewIds))
 
-        # Debug log: Log the query for the specific sourceReviewId
-        for source_review_id in sourceReviewIds:
-            logging.debug(f"Querying review: db.reviews.find({{ sourceReviewId: '{source_review_id}', productId: '{product_id}' }})")
+        # One projected query over the (sourceReviewId, productId) index; rating and date set the priority class
+        found = await db.reviews.find(
+            {"sourceReviewId": {"$in": sourceReviewIds}, "productId": product_id},
+            PRIORITY_PROJECTION
+        ).to_list(None)
+        priority_classes = {review["sourceReviewId"]: review_priority_class(review, PRIORITY_NEW) for review in found}
+        found_ids = set(priority_classes)
+        missing = [sid for sid in sourceReviewIds if sid not in found_ids]
+        if missing:
+            raise HTTPException(status_code=404, detail={
+                "message": "Some reviews not found or do not belong to the given productId (checked by sourceReviewId)",
+                "missingSourceReviewIds": missing[:MAX_REPORTED_MISSING_IDS],
+                "missingCount": len(missing),
+            })
 
-        # Debug log: Perform a simple find query for the sourceReviewId and log the result
-        for source_review_id in sourceReviewIds:
-            review = self.db.reviews.find_one({"sourceReviewId": source_review_id, "productId": product_id})
-            logging.debug(f"Simple find result for sourceReviewId {source_review_id} and productId {product_id}: {review}")
+        # Enqueue the reviews on the durable job queue; workers pick them up
+        try:
+            job_id = await self.job_queue.create_job(product_id, sourceReviewIds, priority_classes=priority_classes)
+            return {"status": "Tasks submitted for processing", "product_id": product_id, "sourceReviewIds": sourceReviewIds, "jobId": job_id}
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Failed to submit tasks for processing: {str(e)}")
 
-        # Validate sourceReviewIds existence and productId match
-        reviews = list(self.db.reviews.find({"sourceReviewId": {"$in": sourceReviewIds}, "productId": product_id}))
-        if len(reviews) != len(sourceReviewIds):
-            raise HTTPException(status_code=404, detail="Some reviews not found or do not belong to the given productId (checked by sourceReviewId)")
+    async def ingest_review_stream(self, product_id: str, chunks, batch_size: int = None, priority: str = PRIORITY_BACKFILL):
+        """Validate and enqueue review ids streamed as NDJSON without holding them in memory.
+
+        Ids are checked against ``reviews`` one batch at a time with a single
+        projected query and enqueued as soon as the batch is validated, so
+        workers can start before the upload finishes. Ids that do not exist for
+        the product are counted as rejected rather than failing the upload.
+        Items are queued as ``priority`` (``backfill`` by default); recent
+        low-star reviews are still queued as ``urgent``.
+        """
+        db = self.db
+        if db is None:
+            raise RuntimeError("Database connection is not established. Ensure the application has started and the database is connected.")
+        if not await self.product_catalog.exists(db, product_id):
+            raise HTTPException(status_code=404, detail={"message": "Product not found.", "productId": product_id})
 
-        # Trigger the review processing flow for each sourceReviewId asynchronously
+        batch_size = batch_size or int(os.getenv("BULK_INGEST_BATCH_SIZE", "1000"))
+        job_id = await self.job_queue.create_job(product_id, ingesting=True)
+        counts = {"accepted": 0, "rejected": 0, "duplicates": 0}
+        rejected_sample = []
+        batch = []
         try:
-            for source_review_id in sourceReviewIds:
-                background_tasks.add_task(process_review_flow, source_review_id)
-            return {"status": "Tasks submitted for processing", "product_id": product_id, "sourceReviewIds": sourceReviewIds}
+            async for line in iter_lines(chunks):
+                batch.append(parse_source_review_id(line))
+                if len(batch) >= batch_size:
+                    await self._ingest_batch(db, job_id, product_id, batch, counts, rejected_sample, priority)
+                    batch = []
+            if batch:
+                await self._ingest_batch(db, job_id, product_id, batch, counts, rejected_sample, priority)
+        except ValueError as e:
+            await self.job_queue.finish_ingest(job_id, counts["accepted"], counts["rejected"], error=str(e))
+            raise HTTPException(status_code=400, detail={"message": f"Invalid bulk upload: {e}", "jobId": job_id, **counts})
         except Exception as e:
-            raise HTTPException(status_code=500, detail=f"Failed to submit tasks for processing: {str(e)}")
+            logging.error(f"Bulk ingest of job {job_id} failed after {counts['accepted']} ids: {e}")
+            await self.job_queue.finish_ingest(job_id, counts["accepted"], counts["rejected"], error=str(e))
+            raise HTTPException(status_code=500, detail={"message": f"Failed to submit tasks for processing: {e}", "jobId": job_id, **counts})
+        await self.job_queue.finish_ingest(job_id, counts["accepted"], counts["rejected"])
+        return {"status": "Tasks submitted for processing", "product_id": product_id, "jobId": job_id, **counts, "rejectedSample": rejected_sample}
+
+    async def _ingest_batch(self, db, job_id: str, product_id: str, batch: list, counts: dict, rejected_sample: list, priority: str):
+        unique = list(dict.fromkeys(batch))
+        found = await db.reviews.find(
+            {"sourceReviewId": {"$in": unique}, "productId": product_id},
+            PRIORITY_PROJECTION
+        ).to_list(None)
+        priority_classes = {review["sourceReviewId"]: review_priority_class(review, priority) for review in found}
+        valid = [sid for sid in unique if sid in priority_classes]
+        rejected = [sid for sid in unique if sid not in priority_classes]
+        enqueued = await self.job_queue.enqueue_new(job_id, product_id, valid, priority_classes) if valid else 0
+        counts["accepted"] += enqueued
+        counts["rejected"] += len(rejected)
+        counts["duplicates"] += len(batch) - len(unique) + len(valid) - enqueued
+        rejected_sample.extend(rejected[:MAX_REPORTED_MISSING_IDS - len(rejected_sample)])
+
+    async def get_job_status(self, job_id: str, skip: int = 0, limit: int = 1000):
+        status = await self.job_queue.job_status(job_id, skip=skip, limit=limit)
+        if status is None:
+            raise HTTPException(status_code=404, detail=f"Job {job_id} not found.")
+        return status
@@ -1,10 +1,13 @@
+from typing import Literal
 from fastapi import APIRouter
-from src.tasks.reply_generation_tasks import reply_generation_flow
+from src.tasks.reply_generation_tasks import reply_generation_flow_async, generate_reply_stream_task
+from src.utils.streaming import stream_events
 from pydantic import BaseModel
 
 class ReplyGenerationRequest(BaseModel):
     customer_review: str
     customer_name: str
+    bypass_cache: bool = False
 
 
 class ReplyGeneratorController:
@@ -12,7 +15,12 @@ class ReplyGeneratorController:
         self.db_service = db_service
         self.router = APIRouter()
         self.router.post("/generate-reply")(self.generate_reply_endpoint)
+        self.router.post("/generate-reply/stream")(self.generate_reply_stream_endpoint)
 
-    def generate_reply_endpoint(self, request: ReplyGenerationRequest):
-        reply = reply_generation_flow(request.customer_review, request.customer_name, db_service=self.db_service)
+    async def generate_reply_endpoint(self, request: ReplyGenerationRequest):
+        reply = await reply_generation_flow_async(request.customer_review, request.customer_name, db_service=self.db_service, bypass_cache=request.bypass_cache)
         return {"generated_reply": reply}
+
+    async def generate_reply_stream_endpoint(self, request: ReplyGenerationRequest, format: Literal["ndjson", "sse"] = "ndjson"):
+        events = generate_reply_stream_task(request.customer_review, request.customer_name, db_service=self.db_service, bypass_cache=request.bypass_cache)
+        return stream_events(events, "generated_reply", format)
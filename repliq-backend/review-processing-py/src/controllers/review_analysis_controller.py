@@ -1,9 +1,10 @@
 from fastapi import APIRouter
-from src.tasks.review_analysis_tasks import review_analysis_flow
+from src.tasks.review_analysis_tasks import review_analysis_flow_async
 from pydantic import BaseModel
 
 class ReviewAnalysisRequest(BaseModel):
     review_text: str
+    bypass_cache: bool = False
 
 
 class ReviewAnalysisController:
@@ -12,6 +13,6 @@ class ReviewAnalysisController:
         self.router = APIRouter()
         self.router.post("/analyze-review")(self.analyze_review_endpoint)
 
-    def analyze_review_endpoint(self, request: ReviewAnalysisRequest):
-        analysis_result = review_analysis_flow(request.review_text, db_service=self.db_service)
+    async def analyze_review_endpoint(self, request: ReviewAnalysisRequest):
+        analysis_result = await review_analysis_flow_async(request.review_text, db_service=self.db_service, bypass_cache=request.bypass_cache)
         return {"analysis_result": analysis_result}
@@ -1,9 +1,12 @@
+from typing import Literal
 from fastapi import APIRouter
-from src.tasks.translation_tasks import translation_flow
+from src.tasks.translation_tasks import translation_flow_async, translate_text_stream_task
+from src.utils.streaming import stream_events
 from pydantic import BaseModel
 
 class TranslationRequest(BaseModel):
     japanese_text: str
+    bypass_cache: bool = False
 
 
 class TranslationController:
@@ -11,7 +14,12 @@ class TranslationController:
         self.db_service = db_service
         self.router = APIRouter()
         self.router.post("/translate")(self.translate_endpoint)
+        self.router.post("/translate/stream")(self.translate_stream_endpoint)
 
-    def translate_endpoint(self, request: TranslationRequest):
-        english_text = translation_flow(request.japanese_text, db_service=self.db_service)
+    async def translate_endpoint(self, request: TranslationRequest):
+        english_text = await translation_flow_async(request.japanese_text, db_service=self.db_service, bypass_cache=request.bypass_cache)
         return {"translated_text": english_text}
+
+    async def translate_stream_endpoint(self, request: TranslationRequest, format: Literal["ndjson", "sse"] = "ndjson"):
+        events = translate_text_stream_task(request.japanese_text, db_service=self.db_service, bypass_cache=request.bypass_cache)
+        return stream_events(events, "translated_text", format)
@@ -0,0 +1,287 @@
+import logging
+import os
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List
+from pymongo import ASCENDING, ReturnDocument, UpdateOne
+from src.jobs.scheduler import PRIORITY_NEW, FairShareScheduler, ReadyGroupCache
+from src.utils.async_db_service import AsyncDatabaseService
+from src.utils.metrics import JOB_LEASES
+from src.utils.tracing import inject_context
+
+STATUS_QUEUED = "queued"
+STATUS_LEASED = "leased"
+STATUS_DONE = "done"
+STATUS_DEAD = "dead"
+
+
+def utcnow():
+    return datetime.now(timezone.utc)
+
+
+class JobQueue:
+    """Durable review job queue stored in MongoDB.
+
+    A job is one ``/process-review`` submission (``review_jobs``); each of its
+    ``sourceReviewId`` values is a queue item (``review_job_items``) that workers
+    lease for ``JOB_LEASE_SECONDS`` and keep alive with heartbeats. Failed items
+    are retried with exponential backoff and dead-lettered after
+    ``JOB_MAX_ATTEMPTS`` attempts. Expired leases are picked up again, so work
+    survives a worker or API restart; an item whose lease expires on its
+    last allowed attempt is dead-lettered instead of being leased again.
+
+    Items carry a ``priorityClass``. Leases are shared between classes and,
+    within a class, between products by ``FairShareScheduler``; items waiting
+    longer than ``JOB_MAX_WAIT_SECONDS`` are leased first whatever their class.
+    """
+
+    def __init__(self, db_service=None, lease_seconds: float = None, max_attempts: int = None,
+                 retry_base_seconds: float = None, retry_max_seconds: float = None,
+                 max_wait_seconds: float = None, scheduler: FairShareScheduler = None):
+        self.db_service = db_service or AsyncDatabaseService()
+        self.lease_seconds = lease_seconds or float(os.getenv("JOB_LEASE_SECONDS", "120"))
+        self.max_attempts = max_attempts or int(os.getenv("JOB_MAX_ATTEMPTS", "5"))
+        self.retry_base_seconds = retry_base_seconds or float(os.getenv("JOB_RETRY_BASE_SECONDS", "5"))
+        self.retry_max_seconds = retry_max_seconds or float(os.getenv("JOB_RETRY_MAX_SECONDS", "300"))
+        self.max_wait_seconds = max_wait_seconds or float(os.getenv("JOB_MAX_WAIT_SECONDS", "900"))
+        self.scheduler = scheduler or FairShareScheduler()
+        self.ready_groups = ReadyGroupCache()
+
+    @property
+    def jobs(self):
+        return self.db_service.get_collection("review_jobs")
+
+    @property
+    def items(self):
+        return self.db_service.get_collection("review_job_items")
+
+    async def ensure_indexes(self):
+        await self.items.create_index([("status", ASCENDING), ("availableAt", ASCENDING)], name="status_availableAt")
+        await self.items.create_index([("status", ASCENDING), ("leaseExpiresAt", ASCENDING)], name="status_leaseExpiresAt")
+        await self.items.create_index([("status", ASCENDING), ("priorityClass", ASCENDING), ("productId", ASCENDING), ("availableAt", ASCENDING)], name="status_priorityClass_productId_availableAt")
+        await self.items.create_index([("jobId", ASCENDING), ("sourceReviewId", ASCENDING)], name="jobId_sourceReviewId")
+        await self.jobs.create_index("jobId", unique=True, name="jobId_unique")
+
+    def backoff_seconds(self, attempts: int) -> float:
+        return min(self.retry_max_seconds, self.retry_base_seconds * (2 ** max(0, attempts - 1)))
+
+    async def create_job(self, product_id: str, source_review_ids: List[str] = None, ingesting: bool = False,
+                         priority_classes: Dict[str, str] = None, default_class: str = PRIORITY_NEW) -> str:
+        """Create a job; ``ingesting`` jobs receive their items in batches until ``finish_ingest``."""
+        job_id = str(uuid.uuid4())
+        job = {"jobId": job_id, "productId": product_id, "total": 0, "createdAt": utcnow()}
+        if ingesting:
+            job["ingest"] = {"complete": False}
+        await self.jobs.insert_one(job)
+        if source_review_ids:
+            await self.enqueue(job_id, product_id, source_review_ids, priority_classes, default_class)
+        return job_id
+
+    async def enqueue(self, job_id: str, product_id: str, source_review_ids: List[str],
+                      priority_classes: Dict[str, str] = None, default_class: str = PRIORITY_NEW) -> int:
+        """Queue ``source_review_ids``, each in its class from ``priority_classes`` or ``default_class``."""
+        now = utcnow()
+        priority_classes = priority_classes or {}
+        # Lets the worker span link back to the request that enqueued the item
+        trace_context = inject_context()
+        items = [
+            {
+                "jobId": job_id,
+                "productId": product_id,
+                "sourceReviewId": source_review_id,
+                "priorityClass": priority_classes.get(source_review_id, default_class),
+                "status": STATUS_QUEUED,
+                "attempts": 0,
+                "availableAt": now,
+                "createdAt": now,
+                **({"traceContext": trace_context} if trace_context else {}),
+            }
+            for source_review_id in source_review_ids
+        ]
+        if not items:
+            return 0
+        await self.items.insert_many(items, ordered=False)
+        await self.jobs.update_one({"jobId": job_id}, {"$inc": {"total": len(items)}})
+        return len(items)
+
+    async def enqueue_new(self, job_id: str, product_id: str, source_review_ids: List[str],
+                          priority_classes: Dict[str, str] = None, default_class: str = PRIORITY_NEW) -> int:
+        """Enqueue only the ids not already queued for ``job_id``."""
+        existing = await self.items.find(
+            {"jobId": job_id, "sourceReviewId": {"$in": source_review_ids}},
+            {"sourceReviewId": 1, "_id": 0},
+        ).to_list(None)
+        queued = {item["sourceReviewId"] for item in existing}
+        return await self.enqueue(job_id, product_id, [sid for sid in source_review_ids if sid not in queued], priority_classes, default_class)
+
+    async def finish_ingest(self, job_id: str, accepted: int, rejected: int, error: str = None):
+        ingest = {"complete": True, "accepted": accepted, "rejected": rejected, "finishedAt": utcnow()}
+        if error is not None:
+            ingest["error"] = error
+        await self.jobs.update_one({"jobId": job_id}, {"$set": {"ingest": ingest}})
+
+    async def lease(self, worker_id: str, limit: int = 1) -> List[dict]:
+        """Lease up to ``limit`` due items.
+
+        Expired leases and items overdue by ``max_wait_seconds`` come first
+        (starvation protection), then items chosen by the fair-share scheduler.
+        """
+        await self.dead_letter_expired()
+        leased = []
+        overdue = True
+        while len(leased) < limit:
+            item = await self._lease_overdue(worker_id) if overdue else None
+            if item is None:
+                overdue = False
+                item = await self._lease_fair_share(worker_id)
+            if item is None:
+                break
+            leased.append(item)
+        return leased
+
+    async def _lease_one(self, query: dict, worker_id: str, now) -> dict:
+        return await self.items.find_one_and_update(
+            query,
+            {
+                "$set": {"status": STATUS_LEASED, "leaseOwner": worker_id, "leaseExpiresAt": now + timedelta(seconds=self.lease_seconds)},
+                "$inc": {"attempts": 1},
+            },
+            sort=[("availableAt", ASCENDING)],
+            return_document=ReturnDocument.AFTER,
+        )
+
+    async def dead_letter_expired(self) -> int:
+        """Dead-letter items whose lease expired after ``max_attempts`` attempts.
+
+        ``settle`` never runs for an item whose worker keeps dying, so this is
+        the only place such an item stops being retried.
+        """
+        now = utcnow()
+        result = await self.items.update_many(
+            {"status": STATUS_LEASED, "leaseExpiresAt": {"$lt": now}, "attempts": {"$gte": self.max_attempts}},
+            {
+                "$set": {"status": STATUS_DEAD, "lastError": "lease expired on the last attempt", "finishedAt": now},
+                "$unset": {"leaseOwner": "", "leaseExpiresAt": ""},
+            },
+        )
+        if result.modified_count:
+            logging.error(f"Dead-lettered {result.modified_count} job items whose lease expired after {self.max_attempts} attempts")
+        return result.modified_count
+
+    async def _lease_overdue(self, worker_id: str) -> dict:
+        now = utcnow()
+        item = await self._lease_one({"$or": [
+            {"status": STATUS_LEASED, "leaseExpiresAt": {"$lt": now}, "attempts": {"$lt": self.max_attempts}},
+            {"status": STATUS_QUEUED, "availableAt": {"$lte": now - timedelta(seconds=self.max_wait_seconds)}},
+        ]}, worker_id, now)
+        if item is not None:
+            JOB_LEASES.labels(item.get("priorityClass") or PRIORITY_NEW, "overdue").inc()
+        return item
+
+    async def load_ready_groups(self) -> List[tuple]:
+        """Distinct ``(priorityClass, productId)`` pairs with at least one due item."""
+        groups = []
+        async for row in await self.items.aggregate([
+            {"$match": {"status": STATUS_QUEUED, "availableAt": {"$lte": utcnow()}}},
+            {"$group": {"_id": {"priorityClass": "$priorityClass", "productId": "$productId"}}},
+        ]):
+            groups.append((row["_id"].get("priorityClass"), row["_id"].get("productId")))
+        self.ready_groups.set(groups)
+        self.scheduler.forget(groups)
+        return groups
+
+    async def _lease_fair_share(self, worker_id: str) -> dict:
+        reloaded = False
+        while True:
+            if self.ready_groups.stale() or (not self.ready_groups.groups and not reloaded):
+                await self.load_ready_groups()
+                reloaded = True
+            if not self.ready_groups.groups:
+                return None
+            priority_class, product_id = self.scheduler.next_group(self.ready_groups.groups)
+            now = utcnow()
+            item = await self._lease_one(
+                {"status": STATUS_QUEUED, "availableAt": {"$lte": now}, "priorityClass": priority_class, "productId": product_id},
+                worker_id, now,
+            )
+            if item is not None:
+                JOB_LEASES.labels(priority_class or PRIORITY_NEW, "fair_share").inc()
+                return item
+            # Drained since the groups were loaded
+            self.ready_groups.discard((priority_class, product_id))
+
+    async def heartbeat(self, item_ids: list, worker_id: str) -> int:
+        result = await self.items.update_many(
+            {"_id": {"$in": item_ids}, "status": STATUS_LEASED, "leaseOwner": worker_id},
+            {"$set": {"leaseExpiresAt": utcnow() + timedelta(seconds=self.lease_seconds)}},
+        )
+        return result.modified_count
+
+    async def settle(self, worker_id: str, results: Dict[object, dict]):
+        """Record outcomes for leased items in one bulk write.
+
+        ``results`` maps item ``_id`` to ``{"result": ...}`` on success or
+        ``{"error": ..., "attempts": n}`` on failure.
+        """
+        now = utcnow()
+        operations = []
+        for item_id, outcome in results.items():
+            owned = {"_id": item_id, "status": STATUS_LEASED, "leaseOwner": worker_id}
+            if "error" not in outcome:
+                update = {"status": STATUS_DONE, "result": outcome["result"], "finishedAt": now}
+            elif outcome["attempts"] >= self.max_attempts:
+                logging.error(f"Dead-lettering job item {item_id} after {outcome['attempts']} attempts: {outcome['error']}")
+                update = {"status": STATUS_DEAD, "lastError": outcome["error"], "finishedAt": now}
+            else:
+                retry_at = now + timedelta(seconds=self.backoff_seconds(outcome["attempts"]))
+                update = {"status": STATUS_QUEUED, "lastError": outcome["error"], "availableAt": retry_at}
+            operations.append(UpdateOne(owned, {"$set": update, "$unset": {"leaseOwner": "", "leaseExpiresAt": ""}}))
+        if operations:
+            await self.items.bulk_write(operations, ordered=False)
+
+    async def queue_depth_by_class(self) -> Dict[str, dict]:
+        """Queued items and the age in seconds of the oldest one, per priority class."""
+        now = utcnow()
+        depth = {}
+        async for row in await self.items.aggregate([
+            {"$match": {"status": STATUS_QUEUED}},
+            {"$group": {"_id": "$priorityClass", "count": {"$sum": 1}, "oldest": {"$min": "$availableAt"}}},
+        ]):
+            oldest = row.get("oldest")
+            if oldest is not None and oldest.tzinfo is None:
+                oldest = oldest.replace(tzinfo=timezone.utc)
+            # Items queued before priority classes existed count as "new"
+            entry = depth.setdefault(row["_id"] or PRIORITY_NEW, {"queued": 0, "oldest_age_seconds": 0.0})
+            entry["queued"] += row["count"]
+            if oldest is not None:
+                entry["oldest_age_seconds"] = max(entry["oldest_age_seconds"], (now - oldest).total_seconds())
+        return depth
+
+    async def status_counts(self) -> Dict[str, int]:
+        """Number of queue items per status across all jobs."""
+        counts = {}
+        async for row in await self.items.aggregate([{"$group": {"_id": "$status", "count": {"$sum": 1}}}]):
+            counts[row["_id"]] = row["count"]
+        return counts
+
+    async def job_status(self, job_id: str, skip: int = 0, limit: int = 1000) -> dict:
+        job = await self.jobs.find_one({"jobId": job_id}, {"_id": 0})
+        if job is None:
+            return None
+        counts = {}
+        async for row in await self.items.aggregate([
+            {"$match": {"jobId": job_id}},
+            {"$group": {"_id": "$status", "count": {"$sum": 1}}},
+        ]):
+            counts[row["_id"]] = row["count"]
+        items = await self.items.find(
+            {"jobId": job_id},
+            {"_id": 0, "sourceReviewId": 1, "status": 1, "result": 1, "attempts": 1, "lastError": 1},
+        ).sort("_id", ASCENDING).skip(skip).limit(limit).to_list(None)
+        finished = counts.get(STATUS_DONE, 0) + counts.get(STATUS_DEAD, 0)
+        return {
+            **job,
+            "counts": counts,
+            "completed": job.get("ingest", {}).get("complete", True) and job.get("total", 0) > 0 and finished >= job["total"],
+            "items": items,
+        }
@@ -0,0 +1,272 @@
+import asyncio
+import logging
+import os
+import socket
+import time
+import uuid
+from datetime import timedelta
+from bson import ObjectId
+from pymongo import ASCENDING, ReturnDocument
+from pymongo.errors import DuplicateKeyError, OperationFailure
+from src.jobs.job_queue import JobQueue, utcnow
+from src.jobs.scheduler import PRIORITY_NEW, review_priority_class
+from src.utils.async_db_service import AsyncDatabaseService
+from src.utils.async_runtime import AsyncRuntime
+from src.utils.metrics import REVIEW_WATCHER_LAG_SECONDS, REVIEW_WATCHER_REVIEWS
+
+STATE_ID = "reviews"
+# Fields of a new review the watcher needs; the rest stays in Mongo
+REVIEW_PROJECTION = {"_id": 1, "sourceReviewId": 1, "productId": 1, "rawReview.attributes.rating": 1, "rawReview.attributes.createdDate": 1}
+# $changeStream needs a replica set or sharded cluster
+CHANGE_STREAM_UNSUPPORTED_CODES = {40573, 20}
+# The stored resume token fell off the oplog or no longer applies
+RESUME_TOKEN_INVALID_CODES = {286, 260, 280}
+
+
+class ReviewWatcher:
+    """Feeds newly inserted ``reviews`` into the job queue without a ``/process-review`` call.
+
+    Tails inserts with a change stream and stores its resume token in
+    ``review_watcher_state``. Without change streams (a standalone mongod) it
+    falls back to polling ``_id`` greater than the last one seen. New reviews
+    are micro-batched by ``REVIEW_WATCHER_BATCH_SIZE`` or
+    ``REVIEW_WATCHER_BATCH_SECONDS`` and enqueued as one job per product;
+    the checkpoint moves only after the enqueue succeeded, so delivery is
+    at-least-once (the pipeline skips reviews already processed). A lease on
+    the state document keeps a single watcher active across processes.
+    """
+
+    def __init__(self, db_service=None, job_queue: JobQueue = None, mode: str = None, batch_size: int = None,
+                 batch_seconds: float = None, poll_interval: float = None, lease_seconds: float = None):
+        self.db_service = db_service or AsyncDatabaseService()
+        self.job_queue = job_queue or JobQueue(db_service=self.db_service)
+        self.mode = (mode or os.getenv("REVIEW_WATCHER_MODE", "auto")).lower()
+        if self.mode not in ("auto", "change_stream", "poll"):
+            raise ValueError(f"Unsupported REVIEW_WATCHER_MODE: {self.mode}")
+        self.batch_size = batch_size or int(os.getenv("REVIEW_WATCHER_BATCH_SIZE", "100"))
+        self.batch_seconds = batch_seconds or float(os.getenv("REVIEW_WATCHER_BATCH_SECONDS", "1.0"))
+        self.poll_interval = poll_interval or float(os.getenv("REVIEW_WATCHER_POLL_INTERVAL_SECONDS", "1.0"))
+        self.lease_seconds = lease_seconds or float(os.getenv("REVIEW_WATCHER_LEASE_SECONDS", "30"))
+        self.owner = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._stopping = asyncio.Event()
+        self._loop = None
+        self._pending = []
+        self._pending_since = None
+        self._lease_renewed_at = 0.0
+
+    @property
+    def reviews(self):
+        return self.db_service.get_collection("reviews")
+
+    @property
+    def state(self):
+        return self.db_service.get_collection("review_watcher_state")
+
+    def stop(self):
+        """Ask ``run`` to finish; may be called from a thread other than the watcher's loop."""
+        try:
+            current = asyncio.get_running_loop()
+        except RuntimeError:
+            current = None
+        if self._loop is None or self._loop is current:
+            self._stopping.set()
+        else:
+            self._loop.call_soon_threadsafe(self._stopping.set)
+
+    async def acquire_lease(self) -> bool:
+        """Take or renew the single-watcher lease; ``False`` while another process holds it."""
+        now = utcnow()
+        try:
+            state = await self.state.find_one_and_update(
+                {"_id": STATE_ID, "$or": [{"leaseOwner": self.owner}, {"leaseExpiresAt": {"$lt": now}}, {"leaseOwner": {"$exists": False}}]},
+                {"$set": {"leaseOwner": self.owner, "leaseExpiresAt": now + timedelta(seconds=self.lease_seconds)}},
+                upsert=True,
+                return_document=ReturnDocument.AFTER,
+            )
+        except DuplicateKeyError:
+            return False
+        self._lease_renewed_at = time.monotonic()
+        return state is not None
+
+    async def release_lease(self):
+        """Give the lease up on shutdown so another process can take over right away."""
+        try:
+            await self.state.update_one({"_id": STATE_ID, "leaseOwner": self.owner}, {"$unset": {"leaseOwner": "", "leaseExpiresAt": ""}})
+        except Exception as e:
+            logging.warning(f"Review watcher {self.owner} could not release its lease: {e}")
+
+    async def _keep_lease(self) -> bool:
+        if time.monotonic() - self._lease_renewed_at < self.lease_seconds / 3:
+            return True
+        if await self.acquire_lease():
+            return True
+        logging.warning(f"Review watcher {self.owner} lost its lease")
+        return False
+
+    async def load_state(self) -> dict:
+        return await self.state.find_one({"_id": STATE_ID}) or {}
+
+    async def checkpoint(self, resume_token=None, last_id=None):
+        update = {"updatedAt": utcnow()}
+        if resume_token is not None:
+            update["resumeToken"] = resume_token
+        if last_id is not None:
+            update["lastId"] = last_id
+        await self.state.update_one({"_id": STATE_ID, "leaseOwner": self.owner}, {"$set": update})
+
+    def add(self, review: dict):
+        if not review or not review.get("sourceReviewId") or not review.get("productId"):
+            return
+        if not self._pending:
+            self._pending_since = time.monotonic()
+        self._pending.append(review)
+
+    def batch_due(self) -> bool:
+        if not self._pending:
+            return False
+        return len(self._pending) >= self.batch_size or time.monotonic() - self._pending_since >= self.batch_seconds
+
+    async def flush(self, mode: str, resume_token=None, last_id=None):
+        """Enqueue pending reviews (one job per product), then advance the checkpoint."""
+        reviews, self._pending = self._pending, []
+        seen_ids = [review["_id"] for review in reviews if isinstance(review.get("_id"), ObjectId)]
+        last_id = max(seen_ids + ([last_id] if last_id is not None else []), default=None)
+        by_product = {}
+        for review in reviews:
+            by_product.setdefault(review["productId"], {})[review["sourceReviewId"]] = review_priority_class(review, PRIORITY_NEW)
+        try:
+            for product_id, priority_classes in by_product.items():
+                await self.job_queue.create_job(product_id, list(priority_classes), priority_classes=priority_classes)
+        except Exception:
+            # Nothing was checkpointed, so a restart re-reads these reviews
+            self._pending = reviews + self._pending
+            raise
+        now = utcnow()
+        for review in reviews:
+            if isinstance(review.get("_id"), ObjectId):
+                REVIEW_WATCHER_LAG_SECONDS.labels().observe(max(0.0, (now - review["_id"].generation_time).total_seconds()))
+        REVIEW_WATCHER_REVIEWS.labels(mode).inc(len(reviews))
+        if reviews:
+            logging.info(f"Review watcher enqueued {len(reviews)} new reviews for {len(by_product)} product(s)")
+        await self.checkpoint(resume_token, last_id)
+
+    async def _flush_if_due(self, mode: str, resume_token=None):
+        if self.batch_due():
+            await self.flush(mode, resume_token)
+
+    async def catch_up(self, last_id) -> ObjectId:
+        """Enqueue every review with ``_id`` greater than ``last_id``; returns the new high-water mark."""
+        while not self._stopping.is_set() and await self._keep_lease():
+            docs = await self.reviews.find({"_id": {"$gt": last_id}}, REVIEW_PROJECTION).sort("_id", ASCENDING).limit(self.batch_size).to_list(None)
+            if not docs:
+                break
+            for doc in docs:
+                self.add(doc)
+            last_id = docs[-1]["_id"]
+            await self.flush("poll", last_id=last_id)
+        return last_id
+
+    async def poll(self, state: dict):
+        """Tailing query on ``_id`` for deployments without change streams."""
+        last_id = state.get("lastId") or ObjectId.from_datetime(utcnow())
+        logging.info(f"Review watcher {self.owner} polling reviews after _id {last_id}")
+        while not self._stopping.is_set() and await self._keep_lease():
+            last_id = await self.catch_up(last_id)
+            try:
+                await asyncio.wait_for(self._stopping.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def follow_change_stream(self, state: dict):
+        pipeline = [{"$match": {"operationType": "insert"}}, {"$project": {f"fullDocument.{field}": 1 for field in REVIEW_PROJECTION}}]
+        resume_token = state.get("resumeToken")
+        options = {"resume_after": resume_token} if resume_token else {}
+        async with await self.reviews.watch(pipeline, max_await_time_ms=int(self.batch_seconds * 1000), **options) as stream:
+            logging.info(f"Review watcher {self.owner} following the reviews change stream")
+            if resume_token is None and state.get("lastId") is not None:
+                # Reviews inserted while no watcher ran; the stream is already open, so none are lost in between
+                await self.catch_up(state["lastId"])
+            while not self._stopping.is_set() and await self._keep_lease():
+                change = await stream.try_next()
+                if change is not None:
+                    self.add(change.get("fullDocument"))
+                if self.batch_due():
+                    await self.flush("change_stream", stream.resume_token)
+                elif change is None and not self._pending and stream.resume_token is not None:
+                    # Idle: keep the stored token near the head of the oplog
+                    await self.checkpoint(stream.resume_token)
+
+    async def run_as_leader(self):
+        state = await self.load_state()
+        if self.mode == "poll":
+            await self.poll(state)
+            return
+        try:
+            await self.follow_change_stream(state)
+        except OperationFailure as e:
+            if e.code in RESUME_TOKEN_INVALID_CODES:
+                logging.warning(f"Review watcher resume token is no longer usable, catching up from lastId: {e}")
+                await self.state.update_one({"_id": STATE_ID}, {"$unset": {"resumeToken": ""}})
+                return
+            if self.mode == "auto" and e.code in CHANGE_STREAM_UNSUPPORTED_CODES:
+                logging.warning(f"Change streams unavailable, review watcher falls back to polling: {e}")
+                self.mode = "poll"
+                await self.poll(state)
+                return
+            raise
+
+    async def run(self):
+        logging.info(f"Review watcher {self.owner} started in {self.mode} mode")
+        self._loop = asyncio.get_running_loop()
+        try:
+            while not self._stopping.is_set():
+                try:
+                    if await self.acquire_lease():
+                        await self.run_as_leader()
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    logging.error(f"Review watcher {self.owner} error: {e}")
+                try:
+                    await asyncio.wait_for(self._stopping.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            await self.release_lease()
+        logging.info(f"Review watcher {self.owner} stopped")
+
+
+class ReviewWatcherRunner:
+    """Runs a ``ReviewWatcher`` on the async runtime when ``REVIEW_WATCHER_ENABLED`` is true."""
+
+    def __init__(self, watcher_factory=ReviewWatcher):
+        self.watcher_factory = watcher_factory
+        self.watcher = None
+        self.future = None
+
+    @staticmethod
+    def enabled() -> bool:
+        return os.getenv("REVIEW_WATCHER_ENABLED", "false").lower() == "true"
+
+    def start(self):
+        if not self.enabled() or self.future is not None:
+            return
+        self.watcher = self.watcher_factory()
+        self.future = AsyncRuntime().submit(self.watcher.run())
+
+    async def stop(self, timeout: float = 5.0):
+        """Stop the watcher and wait up to ``timeout`` seconds for it to release its lease.
+
+        Must finish before the async clients are closed; a watcher still
+        running after ``timeout`` is cancelled and its lease simply expires.
+        """
+        future, self.future = self.future, None
+        if future is None or future.done():
+            return
+        self.watcher.stop()
+        try:
+            await asyncio.wait_for(asyncio.wrap_future(future), timeout)
+        except asyncio.TimeoutError:
+            logging.warning(f"Review watcher did not stop within {timeout}s; its lease expires on its own")
+        except Exception as e:
+            logging.error(f"Review watcher failed while stopping: {e}")
@@ -0,0 +1,128 @@
+import os
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Tuple
+
+PRIORITY_URGENT = "urgent"
+PRIORITY_NEW = "new"
+PRIORITY_BACKFILL = "backfill"
+PRIORITY_CLASSES = (PRIORITY_URGENT, PRIORITY_NEW, PRIORITY_BACKFILL)
+
+# Review fields the priority class is derived from, as a Mongo projection
+PRIORITY_PROJECTION = {"sourceReviewId": 1, "rawReview.attributes.rating": 1, "rawReview.attributes.createdDate": 1, "_id": 0}
+
+
+def parse_weights(spec: str, default: Dict[str, float] = None) -> Dict[str, float]:
+    """Parse ``"name=weight,name=weight"`` into a dict; invalid weights raise ``ValueError``."""
+    weights = dict(default or {})
+    for part in filter(None, (p.strip() for p in spec.split(","))):
+        name, _, value = part.partition("=")
+        weight = float(value)
+        if weight <= 0:
+            raise ValueError(f"Scheduler weight for {name} must be positive, got {value}")
+        weights[name.strip()] = weight
+    return weights
+
+
+def _created_at(value):
+    if isinstance(value, datetime):
+        created = value
+    elif isinstance(value, str) and value:
+        try:
+            created = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        except ValueError:
+            return None
+    else:
+        return None
+    return created if created.tzinfo else created.replace(tzinfo=timezone.utc)
+
+
+def review_priority_class(review: dict, default: str = PRIORITY_NEW, now: datetime = None) -> str:
+    """``urgent`` for recent low-star reviews, otherwise the class of the submission (``new`` or ``backfill``)."""
+    attrs = (review.get("rawReview") or {}).get("attributes") or {}
+    rating = attrs.get("rating")
+    if isinstance(rating, (int, float)) and rating <= float(os.getenv("PRIORITY_URGENT_MAX_RATING", "2")):
+        created = _created_at(attrs.get("createdDate"))
+        window = timedelta(hours=float(os.getenv("PRIORITY_RECENT_HOURS", "72")))
+        if created is not None and (now or datetime.now(timezone.utc)) - created <= window:
+            return PRIORITY_URGENT
+    return default
+
+
+class FairShareScheduler:
+    """Chooses which ``(priorityClass, productId)`` group the next lease comes from.
+
+    Stride scheduling at two levels: classes share leases in proportion to
+    ``JOB_PRIORITY_WEIGHTS`` and, within a class, products share them in
+    proportion to ``JOB_PRODUCT_WEIGHTS`` (default 1 each). A group that
+    becomes ready starts at the current virtual time, so an idle product does
+    not bank credit and a 50k-review backfill cannot crowd out the others.
+    """
+
+    def __init__(self, class_weights: Dict[str, float] = None, product_weights: Dict[str, float] = None):
+        self.class_weights = class_weights or parse_weights(
+            os.getenv("JOB_PRIORITY_WEIGHTS", ""), {PRIORITY_URGENT: 8, PRIORITY_NEW: 4, PRIORITY_BACKFILL: 1})
+        self.product_weights = product_weights or parse_weights(os.getenv("JOB_PRODUCT_WEIGHTS", ""))
+        self._class_pass = {}
+        self._product_pass = {}
+        self._lock = threading.Lock()
+
+    def class_weight(self, priority_class: str) -> float:
+        return self.class_weights.get(priority_class or PRIORITY_NEW, 1.0)
+
+    def product_weight(self, product_id: str) -> float:
+        return self.product_weights.get(product_id, 1.0)
+
+    @staticmethod
+    def _pick(passes: dict, candidates, weight):
+        floor = min(passes.values(), default=0.0)
+        # Newly ready candidates join at the current minimum instead of replaying idle time
+        best = min(candidates, key=lambda key: (passes.setdefault(key, floor), -weight(key)))
+        passes[best] += 1.0 / weight(best)
+        return best
+
+    def next_group(self, groups: List[Tuple[str, str]]) -> Tuple[str, str]:
+        """Pick one of the ready ``(priority_class, product_id)`` groups."""
+        with self._lock:
+            by_class = {}
+            for priority_class, product_id in groups:
+                by_class.setdefault(priority_class, []).append(product_id)
+            priority_class = self._pick(self._class_pass, list(by_class), self.class_weight)
+            passes = self._product_pass.setdefault(priority_class, {})
+            product_id = self._pick(passes, by_class[priority_class], self.product_weight)
+            return priority_class, product_id
+
+    def forget(self, ready_groups: List[Tuple[str, str]]):
+        """Drop state of groups that have no ready work, keeping memory bounded by active products."""
+        with self._lock:
+            ready_classes = {priority_class for priority_class, _ in ready_groups}
+            for priority_class in list(self._class_pass):
+                if priority_class not in ready_classes:
+                    del self._class_pass[priority_class]
+            for priority_class, passes in list(self._product_pass.items()):
+                ready_products = {product for cls, product in ready_groups if cls == priority_class}
+                for product_id in list(passes):
+                    if product_id not in ready_products:
+                        del passes[product_id]
+
+
+class ReadyGroupCache:
+    """Ready ``(priorityClass, productId)`` groups, re-read at most every ``ttl_seconds``."""
+
+    def __init__(self, ttl_seconds: float = None, clock=time.monotonic):
+        self.ttl_seconds = float(os.getenv("JOB_SCHEDULER_REFRESH_SECONDS", "2")) if ttl_seconds is None else ttl_seconds
+        self.clock = clock
+        self.groups = []
+        self.loaded_at = None
+
+    def stale(self) -> bool:
+        return self.loaded_at is None or self.clock() - self.loaded_at >= self.ttl_seconds
+
+    def set(self, groups: List[Tuple[str, str]]):
+        self.groups = list(groups)
+        self.loaded_at = self.clock()
+
+    def discard(self, group: Tuple[str, str]):
+        if group in self.groups:
+            self.groups.remove(group)
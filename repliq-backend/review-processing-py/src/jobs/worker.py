@@ -0,0 +1,109 @@
+import asyncio
+import logging
+import os
+import socket
+import uuid
+from src.jobs.job_queue import JobQueue
+from src.tasks.batch_review_pipeline import BatchReviewPipeline, STATUS_FAILED
+from src.utils.async_runtime import AsyncRuntime
+from src.utils.metrics import JOB_ITEMS_IN_FLIGHT
+from src.utils.tracing import get_tracer, link_from_carrier
+from opentelemetry.trace import SpanKind
+
+
+class JobWorker:
+    """Consumes leased review items and runs them through the batch pipeline."""
+
+    def __init__(self, queue: JobQueue = None, pipeline: BatchReviewPipeline = None, batch_size: int = None, poll_interval: float = None):
+        self.queue = queue or JobQueue()
+        self.pipeline = pipeline
+        self.batch_size = batch_size or int(os.getenv("JOB_LEASE_BATCH", "10"))
+        self.poll_interval = poll_interval or float(os.getenv("JOB_POLL_INTERVAL_SECONDS", "1.0"))
+        self.worker_id = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._stopping = asyncio.Event()
+
+    def stop(self):
+        self._stopping.set()
+
+    async def _heartbeat(self, item_ids: list):
+        interval = self.queue.lease_seconds / 3
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.queue.heartbeat(item_ids, self.worker_id)
+            except Exception as e:
+                logging.error(f"Job heartbeat failed for worker {self.worker_id}: {e}")
+
+    async def process_items(self, items: list):
+        links = [link for link in (link_from_carrier(item.get("traceContext")) for item in items) if link is not None]
+        attributes = {"repliq.worker.id": self.worker_id, "repliq.batch.size": len(items)}
+        with get_tracer().start_as_current_span("review_job process_items", kind=SpanKind.CONSUMER, links=links, attributes=attributes):
+            return await self._process_items(items)
+
+    async def _process_items(self, items: list):
+        pipeline = self.pipeline or BatchReviewPipeline()
+        heartbeat = asyncio.create_task(self._heartbeat([item["_id"] for item in items]))
+        JOB_ITEMS_IN_FLIGHT.labels().inc(len(items))
+        try:
+            statuses = await pipeline.run([item["sourceReviewId"] for item in items])
+            error = None
+        except Exception as e:
+            logging.error(f"Worker {self.worker_id} failed to process {len(items)} items: {e}")
+            statuses, error = {}, str(e)
+        finally:
+            heartbeat.cancel()
+            JOB_ITEMS_IN_FLIGHT.labels().dec(len(items))
+
+        results = {}
+        for item in items:
+            status = statuses.get(item["sourceReviewId"], STATUS_FAILED)
+            if error is not None or status == STATUS_FAILED:
+                results[item["_id"]] = {"error": error or "One or more review stages failed.", "attempts": item["attempts"]}
+            else:
+                results[item["_id"]] = {"result": status}
+        await self.queue.settle(self.worker_id, results)
+        return results
+
+    async def run_once(self) -> int:
+        items = await self.queue.lease(self.worker_id, self.batch_size)
+        if items:
+            await self.process_items(items)
+        return len(items)
+
+    async def run(self):
+        logging.info(f"Job worker {self.worker_id} started")
+        while not self._stopping.is_set():
+            try:
+                processed = await self.run_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logging.error(f"Job worker {self.worker_id} loop error: {e}")
+                processed = 0
+            if not processed:
+                try:
+                    await asyncio.wait_for(self._stopping.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+        logging.info(f"Job worker {self.worker_id} stopped")
+
+
+class JobWorkerPool:
+    """Runs ``JOB_WORKER_COUNT`` workers as coroutines on the async runtime."""
+
+    def __init__(self, worker_count: int = None, worker_factory=JobWorker):
+        self.worker_count = worker_count or int(os.getenv("JOB_WORKER_COUNT", "2"))
+        self.worker_factory = worker_factory
+        self.futures = []
+
+    def start(self):
+        runtime = AsyncRuntime()
+        for _ in range(self.worker_count):
+            self.futures.append(runtime.submit(self.worker_factory().run()))
+        logging.info(f"Started {self.worker_count} job worker(s)")
+
+    def stop(self):
+        """Cancel the workers; leased items are picked up again once their lease expires."""
+        for future in self.futures:
+            future.cancel()
+        self.futures = []
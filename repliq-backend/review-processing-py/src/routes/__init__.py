@@ -5,6 +5,12 @@ from src.routes.db_test import router as db_test_router
 from src.routes.health import router as health_router
 from src.controllers.reply_generator_controller import ReplyGeneratorController
 from src.routes.process_review_routes import router as process_review_router
+from src.routes.db_stats import router as db_stats_router
+from src.routes.llm_cache import router as llm_cache_router
+from src.routes.language_stats import router as language_stats_router
+from src.routes.llm_limiter import router as llm_limiter_router
+from src.routes.metrics import router as metrics_router
+from src.routes.product_catalog import router as product_catalog_router
 
 def register_routes(app: FastAPI):
     db_service = getattr(app.state, "db_service", None)
@@ -28,4 +34,22 @@ def register_routes(app: FastAPI):
     app.include_router(process_review_router)
 
     # Include health check route
-    app.include_router(health_router)
\ No newline at end of file
+    app.include_router(health_router)
+
+    # Include database pool statistics route
+    app.include_router(db_stats_router)
+
+    # Include LLM response cache statistics route
+    app.include_router(llm_cache_router)
+
+    # Include review language statistics route
+    app.include_router(language_stats_router)
+
+    # Include LLM rate limiter state route
+    app.include_router(llm_limiter_router)
+
+    # Include Prometheus metrics route
+    app.include_router(metrics_router)
+
+    # Include product id cache refresh route
+    app.include_router(product_catalog_router)
@@ -0,0 +1,13 @@
+from fastapi import APIRouter
+from src.utils.async_db_service import AsyncDatabaseService
+from src.utils.db_service import DatabaseService
+
+router = APIRouter()
+
+@router.get("/db/pool-stats")
+def pool_stats():
+    sync_stats = getattr(DatabaseService(), "pool_stats", None)
+    return {
+        "sync": sync_stats.snapshot() if sync_stats else {},
+        "async": AsyncDatabaseService().pool_statistics(),
+    }
@@ -0,0 +1,8 @@
+from fastapi import APIRouter
+from src.utils.language_detector import LanguageDetector
+
+router = APIRouter()
+
+@router.get("/language/stats")
+def language_stats():
+    return LanguageDetector().stats()
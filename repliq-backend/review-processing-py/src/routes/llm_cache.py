@@ -0,0 +1,8 @@
+from fastapi import APIRouter
+from src.agents.response_cache import ResponseCache
+
+router = APIRouter()
+
+@router.get("/llm-cache/stats")
+def llm_cache_stats():
+    return ResponseCache().stats()
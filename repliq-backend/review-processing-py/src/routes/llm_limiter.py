@@ -0,0 +1,13 @@
+from fastapi import APIRouter
+from src.agents.llm_rate_limiter import LLMRateLimiter
+from src.agents.model_router import ModelRouter
+
+router = APIRouter()
+
+@router.get("/llm/limiter")
+def llm_limiter_state():
+    return LLMRateLimiter().snapshot()
+
+@router.get("/llm/router")
+def llm_router_state():
+    return ModelRouter().snapshot()
@@ -0,0 +1,73 @@
+import logging
+from fastapi import APIRouter, Response
+from src.agents.llm_rate_limiter import LLMRateLimiter
+from src.agents.model_router import CIRCUIT_OPEN, ModelRouter
+from src.agents.response_cache import ResponseCache
+from src.jobs.scheduler import PRIORITY_CLASSES
+from src.jobs.job_queue import STATUS_DEAD, STATUS_DONE, STATUS_LEASED, STATUS_QUEUED, JobQueue
+from src.utils.async_db_service import AsyncDatabaseService
+from src.utils.metrics import CONTENT_TYPE, Counter, Gauge, MetricsRegistry, collect_families, render, with_pid
+
+router = APIRouter()
+
+
+def limiter_and_cache_families() -> list:
+    """Per-process state read at scrape time from the limiter and the response cache."""
+    registry = MetricsRegistry()
+    limit = Gauge("repliq_llm_limiter_concurrency_limit", "Current adaptive concurrency limit per model.", ("model",), registry)
+    in_flight = Gauge("repliq_llm_limiter_in_flight", "Model calls holding a limiter slot.", ("model",), registry)
+    waiting = Gauge("repliq_llm_limiter_waiting", "Model calls waiting for a limiter slot.", ("model",), registry)
+    cache_events = Counter("repliq_llm_cache_events_total", "Response cache lookups and writes, by event.", ("event",), registry)
+    for model, state in LLMRateLimiter().snapshot()["models"].items():
+        limit.labels(model).set(state["limit"])
+        in_flight.labels(model).set(state["in_flight"])
+        waiting.labels(model).set(state["waiting"])
+    for event, value in ResponseCache().stats().items():
+        if isinstance(value, int) and not isinstance(value, bool) and event != "memory_entries":
+            cache_events.labels(event).inc(value)
+    return registry.collect()
+
+
+def model_router_families() -> list:
+    """Rolling per-model health the router bases failover and hedging on."""
+    registry = MetricsRegistry()
+    circuit_open = Gauge("repliq_llm_circuit_open", "1 while the model's circuit breaker is open.", ("model",), registry)
+    error_rate = Gauge("repliq_llm_model_error_rate", "Error rate over the model's rolling window.", ("model",), registry)
+    latency_p95 = Gauge("repliq_llm_model_latency_p95_seconds", "95th percentile latency of successful calls in the rolling window.", ("model",), registry)
+    for model, state in ModelRouter().snapshot()["models"].items():
+        circuit_open.labels(model).set(1 if state["state"] == CIRCUIT_OPEN else 0)
+        error_rate.labels(model).set(state["error_rate"])
+        if state["latency_p95_seconds"] is not None:
+            latency_p95.labels(model).set(state["latency_p95_seconds"])
+    return registry.collect()
+
+
+async def job_queue_families() -> list:
+    """Queue depth is shared by all processes, so it is reported without a ``pid`` label."""
+    if AsyncDatabaseService().db is None:
+        return []
+    registry = MetricsRegistry()
+    items = Gauge("repliq_job_queue_items", "Review job queue items by status.", ("status",), registry)
+    depth = Gauge("repliq_job_queue_depth", "Queued review job items by priority class.", ("priority_class",), registry)
+    oldest = Gauge("repliq_job_queue_oldest_age_seconds", "Age of the oldest queued item by priority class.", ("priority_class",), registry)
+    try:
+        queue = JobQueue()
+        counts = await queue.status_counts()
+        by_class = await queue.queue_depth_by_class()
+    except Exception as e:
+        logging.warning(f"Could not read job queue depth for /metrics: {e}")
+        return []
+    for status in (STATUS_QUEUED, STATUS_LEASED, STATUS_DONE, STATUS_DEAD):
+        items.labels(status).set(counts.get(status, 0))
+    for priority_class in PRIORITY_CLASSES:
+        state = by_class.get(priority_class, {})
+        depth.labels(priority_class).set(state.get("queued", 0))
+        oldest.labels(priority_class).set(state.get("oldest_age_seconds", 0.0))
+    return registry.collect()
+
+
+@router.get("/metrics")
+async def metrics():
+    families = collect_families() + [with_pid(family) for family in limiter_and_cache_families() + model_router_families()]
+    body = render(families + await job_queue_families())
+    return Response(content=body, media_type=CONTENT_TYPE)
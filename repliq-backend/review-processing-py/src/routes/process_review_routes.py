@@ -1,6 +1,6 @@
-from fastapi import APIRouter, BackgroundTasks
+from fastapi import APIRouter, Query, Request
 from pydantic import BaseModel
-from typing import List
+from typing import List, Literal
 from src.controllers.process_review_controller import ProcessReviewController
 
 # Define request model
@@ -13,5 +13,14 @@ router = APIRouter()
 controller = ProcessReviewController()
 
 @router.post("/process-review")
-async def process_review(request: ProcessReviewRequest, background_tasks: BackgroundTasks):
-    return controller.validate_and_process_reviews(request.productId, request.sourceReviewIds, background_tasks)
+async def process_review(request: ProcessReviewRequest):
+    return await controller.validate_and_process_reviews(request.productId, request.sourceReviewIds)
+
+@router.post("/process-review/bulk")
+async def process_review_bulk(request: Request, productId: str = Query(..., min_length=1), priority: Literal["new", "backfill"] = "backfill"):
+    """Body: one sourceReviewId per line (NDJSON strings, ``{"sourceReviewId": ...}`` objects or bare ids)."""
+    return await controller.ingest_review_stream(productId, request.stream(), priority=priority)
+
+@router.get("/process-review/jobs/{job_id}")
+async def process_review_job_status(job_id: str, skip: int = Query(0, ge=0), limit: int = Query(1000, ge=1, le=10000)):
+    return await controller.get_job_status(job_id, skip=skip, limit=limit)
@@ -0,0 +1,12 @@
+from fastapi import APIRouter, HTTPException
+from src.utils.async_db_service import AsyncDatabaseService
+from src.utils.product_catalog import ProductCatalog
+
+router = APIRouter()
+
+@router.post("/products/cache/refresh")
+async def refresh_product_cache():
+    db = AsyncDatabaseService().db
+    if db is None:
+        raise HTTPException(status_code=503, detail="Database connection is not established.")
+    return {"productIds": await ProductCatalog().refresh(db)}
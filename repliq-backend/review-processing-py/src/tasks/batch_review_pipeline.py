@@ -0,0 +1,223 @@
+import asyncio
+import logging
+import os
+from typing import Dict, List
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+from src.utils.async_db_service import AsyncDatabaseService
+from src.utils.metrics import MODEL_TIER_DECISIONS, REVIEW_BATCHES_IN_FLIGHT, REVIEW_SKIPS, REVIEWS, REVIEWS_IN_FLIGHT
+from src.utils.tracing import get_tracer
+from src.tasks.near_duplicate_index import NearDuplicateIndex, processed_review_text
+from src.tasks.stage_state import STAGE_ANALYSIS, STAGE_REPLY, STAGE_TRANSLATION, STAGES, StageCheckpointBuffer, clear_stage_states, load_stage_states
+from src.tasks.process_review_tasks import ReviewProcessor, build_processed_review, detect_review_language, extract_review_fields, upsert_filter_and_update
+
+STATUS_PROCESSED = "processed"
+STATUS_ALREADY_PROCESSED = "already_processed"
+STATUS_NOT_FOUND = "not_found"
+STATUS_FAILED = "failed"
+
+# A concurrent upsert inserted the same orgReviewId first
+DUPLICATE_KEY_ERROR = 11000
+
+
+def _document_stages(document: dict) -> dict:
+    """Stage outputs held by a processed_review document."""
+    return {STAGE_TRANSLATION: document["enReview"], STAGE_REPLY: document["aiGeneratedReply"]["aiReply"], STAGE_ANALYSIS: document["analysis"]}
+
+
+class BatchReviewPipeline:
+    """Process many reviews with a fixed number of Mongo round trips.
+
+    One ``$in`` lookup excludes already-processed ids, one ``$in`` query loads
+    the pending reviews and one more their stage checkpoints, the LLM stages
+    run with at most ``concurrency`` reviews in flight, and results are
+    flushed with ``bulk_write`` every ``write_chunk_size`` documents. Each
+    finished stage goes to a ``StageCheckpointBuffer`` that is written every
+    ``write_chunk_size`` reviews or ``REVIEW_STAGE_CHECKPOINT_SECONDS``, and
+    with each chunk; reviews that are saved in time never get a checkpoint.
+    A retry only runs the stages that are not checkpointed.
+    """
+
+    def __init__(self, processor: ReviewProcessor = None, db_service=None, concurrency: int = None, write_chunk_size: int = None):
+        self.processor = processor or ReviewProcessor()
+        self.near_duplicates = NearDuplicateIndex()
+        self.db_service = db_service or AsyncDatabaseService()
+        self.concurrency = concurrency or int(os.getenv("REVIEW_BATCH_CONCURRENCY", "16"))
+        self.write_chunk_size = write_chunk_size or int(os.getenv("REVIEW_BATCH_WRITE_CHUNK", "100"))
+
+    async def load_pending_reviews(self, db, source_review_ids: List[str]):
+        processed = await db.processed_review.find(
+            {"orgReviewId": {"$in": source_review_ids}, "isProcessed": True},
+            {"orgReviewId": 1, "_id": 0}
+        ).to_list(None)
+        processed_ids = {doc["orgReviewId"] for doc in processed}
+        pending_ids = [sid for sid in source_review_ids if sid not in processed_ids]
+        reviews = []
+        if pending_ids:
+            reviews = await db.reviews.find({"sourceReviewId": {"$in": pending_ids}}).to_list(None)
+        return processed_ids, reviews
+
+    async def find_near_duplicates(self, db, reviews: List[dict]) -> Dict[str, dict]:
+        try:
+            candidates = []
+            for review in reviews:
+                fields = extract_review_fields(review)
+                candidates.append((review["sourceReviewId"], fields["product_id"], fields["review_text"]))
+            return await self.near_duplicates.find_matches(candidates, db=db)
+        except Exception as e:
+            logging.error(f"Near-duplicate lookup failed, processing all reviews in full: {e}")
+            return {}
+
+    def start_batch_analysis(self, reviews: List[dict], matches: Dict[str, dict], states: Dict[str, dict] = None) -> Dict[str, asyncio.Future]:
+        """Start packed analysis of every review without a near-duplicate match or checkpointed analysis.
+
+        Reviews are packed per model tier, so short reviews share requests to
+        the small model. Returns the future of each review's pack.
+        """
+        if not self.processor.batch_analysis_enabled:
+            return {}
+        by_tier = {}
+        for review in reviews:
+            if review["sourceReviewId"] in matches or STAGE_ANALYSIS in (states or {}).get(review["sourceReviewId"], {}):
+                continue
+            try:
+                review_text = extract_review_fields(review)["review_text"]
+            except Exception:
+                continue  # reported when the review itself is processed
+            tier = self.processor.route_review(review_text)["tier"]
+            by_tier.setdefault(tier, []).append((review["sourceReviewId"], review_text))
+        futures = {}
+        for tier, pending in by_tier.items():
+            futures.update(self.processor.start_packed_analysis(pending, tier))
+        return futures
+
+    async def process_review(self, semaphore: asyncio.Semaphore, review: dict, match: dict = None, analysis: asyncio.Future = None,
+                             completed: dict = None, checkpoints: StageCheckpointBuffer = None):
+        attributes = {"repliq.review.source_id": review["sourceReviewId"], "repliq.review.near_duplicate": match is not None}
+        with get_tracer().start_as_current_span("process_review", attributes=attributes) as span, REVIEWS_IN_FLIGHT.labels("batch").track():
+            source_review_id, document = await self._process_review(semaphore, review, match, analysis, completed, checkpoints)
+            span.set_attribute("repliq.review.processed", document is not None)
+            return source_review_id, document
+
+    async def _process_review(self, semaphore: asyncio.Semaphore, review: dict, match: dict = None, analysis: asyncio.Future = None,
+                              completed: dict = None, checkpoints: StageCheckpointBuffer = None):
+        source_review_id = review["sourceReviewId"]
+        completed = completed or {}
+
+        async def on_stage(stage, value, reason):
+            if checkpoints is None:
+                return
+            checkpoints.record(source_review_id, stage, value, reason)
+            if checkpoints.due():
+                await checkpoints.flush()
+
+        try:
+            async with semaphore:
+                fields = extract_review_fields(review)
+                language = detect_review_language(fields["review_text"])
+                routing = self.processor.route_review(fields["review_text"])
+                MODEL_TIER_DECISIONS.labels(routing["tier"], routing["reason"]).inc()
+                analysis_source = None
+                if match is None and analysis is not None and STAGE_ANALYSIS not in completed:
+                    async def analysis_source():
+                        return (await analysis).get(source_review_id)
+                results, failures = await self.processor.run_missing_stages(
+                    fields["review_text"], fields["customer_name"], completed, match, language, routing["tier"], analysis_source, on_stage
+                )
+        except Exception as e:
+            logging.error(f"Review processing failed for sourceReviewId={source_review_id}: {e}")
+            return source_review_id, None
+        missing = [stage for stage in STAGES if stage not in results]
+        if missing:
+            logging.error(f"Stages {', '.join(missing)} failed for sourceReviewId={source_review_id} ({failures}). Skipping DB save.")
+            for stage in missing:
+                REVIEW_SKIPS.labels("batch", f"{stage}_missing").inc()
+            return source_review_id, None
+        return source_review_id, build_processed_review(
+            source_review_id, results[STAGE_TRANSLATION], results[STAGE_REPLY], results[STAGE_ANALYSIS],
+            fields["review_date"], fields["source"], fields["product_id"], fields["raw_review"], match, language, routing
+        )
+
+    async def flush(self, db, documents: List[dict], statuses: Dict[str, str], checkpoints: StageCheckpointBuffer = None):
+        """Write processed reviews, then the buffered stage checkpoints.
+
+        The unordered ``bulk_write`` keeps going past failed documents, so a
+        ``BulkWriteError`` only fails the documents it lists; a duplicate key
+        means a concurrent run inserted the review first. Checkpoints of saved
+        reviews are dropped (or cleared when already written); the outputs of
+        documents whose write failed are checkpointed instead, so a retry does
+        not pay for their model calls again.
+        """
+        if documents:
+            failed, duplicates = set(), set()
+            try:
+                operations = [UpdateOne(*upsert_filter_and_update(doc), upsert=True) for doc in documents]
+                await db.processed_review.bulk_write(operations, ordered=False)
+                logging.info(f"Flushed {len(documents)} processed reviews")
+            except BulkWriteError as e:
+                for error in e.details.get("writeErrors", []):
+                    (duplicates if error.get("code") == DUPLICATE_KEY_ERROR else failed).add(error["index"])
+                logging.error(f"Failed to flush {len(failed)} of {len(documents)} processed reviews ({len(duplicates)} already processed): {e}")
+            except Exception as e:
+                logging.error(f"Failed to flush {len(documents)} processed reviews: {e}")
+                failed = set(range(len(documents)))
+            for index in duplicates:
+                statuses[documents[index]["orgReviewId"]] = STATUS_ALREADY_PROCESSED
+            for index in failed:
+                doc = documents[index]
+                statuses[doc["orgReviewId"]] = STATUS_FAILED
+                if checkpoints is not None:
+                    for stage, value in _document_stages(doc).items():
+                        checkpoints.record(doc["orgReviewId"], stage, value)
+            inserted = [doc for index, doc in enumerate(documents) if index not in failed and index not in duplicates]
+            if inserted:
+                self.near_duplicates.add([(doc["orgReviewId"], doc["productId"], processed_review_text(doc)) for doc in inserted])
+            saved = [doc["orgReviewId"] for index, doc in enumerate(documents) if index not in failed]
+            if saved and checkpoints is not None:
+                checkpoints.discard(saved)
+                await clear_stage_states(db, [sid for sid in saved if sid in checkpoints.written])
+        if checkpoints is not None:
+            await checkpoints.flush()
+
+    async def run(self, source_review_ids: List[str]) -> Dict[str, str]:
+        """Process ``source_review_ids`` and return a status per id."""
+        with get_tracer().start_as_current_span("review_batch", attributes={"repliq.batch.size": len(source_review_ids)}) as span, REVIEW_BATCHES_IN_FLIGHT.labels().track():
+            statuses = await self._run(source_review_ids)
+            span.set_attribute("repliq.batch.processed", sum(1 for status in statuses.values() if status == STATUS_PROCESSED))
+            for status in statuses.values():
+                REVIEWS.labels("batch", status).inc()
+            return statuses
+
+    async def _run(self, source_review_ids: List[str]) -> Dict[str, str]:
+        source_review_ids = list(dict.fromkeys(source_review_ids))
+        db = self.db_service.db
+        if db is None:
+            raise RuntimeError("Database connection is not established.")
+
+        processed_ids, reviews = await self.load_pending_reviews(db, source_review_ids)
+        statuses = {sid: STATUS_ALREADY_PROCESSED if sid in processed_ids else STATUS_NOT_FOUND for sid in source_review_ids}
+
+        states = await load_stage_states(db, [review["sourceReviewId"] for review in reviews])
+        matches = await self.find_near_duplicates(db, reviews)
+        analyses = self.start_batch_analysis(reviews, matches, states)
+        semaphore = asyncio.Semaphore(self.concurrency)
+        buffer = []
+        checkpoints = StageCheckpointBuffer(db, self.write_chunk_size)
+        checkpoints.written.update(states)
+        tasks = [
+            self.process_review(semaphore, review, matches.get(review["sourceReviewId"]), analyses.get(review["sourceReviewId"]), states.get(review["sourceReviewId"]), checkpoints)
+            for review in reviews
+        ]
+        for next_result in asyncio.as_completed(tasks):
+            source_review_id, document = await next_result
+            if document is None:
+                statuses[source_review_id] = STATUS_FAILED
+                continue
+            buffer.append(document)
+            statuses[source_review_id] = STATUS_PROCESSED
+            if len(buffer) >= self.write_chunk_size:
+                await self.flush(db, buffer, statuses, checkpoints)
+                buffer = []
+        await self.flush(db, buffer, statuses, checkpoints)
+        return statuses
+
@@ -0,0 +1,125 @@
+import logging
+import os
+import threading
+from typing import Dict, List, Tuple
+from src.utils.async_db_service import AsyncDatabaseService
+from src.utils.minhash_lsh import MinHasher, MinHashLSH
+
+
+def processed_review_text(doc: dict) -> str:
+    """Rebuild the ``review_text`` of ``extract_review_fields`` from a processed review."""
+    raw = doc.get("rawReview") or {}
+    return f"{raw.get('title', '')}\n{raw.get('body', '')}"
+
+
+class NearDuplicateIndex:
+    """Per-product MinHash/LSH index of processed reviews.
+
+    A product's index is loaded from ``processed_review`` on first use and
+    updated as reviews are saved. ``find_matches`` returns, for reviews whose
+    text is at least ``NEAR_DUPLICATE_THRESHOLD`` similar to an already
+    processed review, that review's translation and analysis so only the reply
+    has to be generated.
+    """
+
+    _instance = None
+    _lock = threading.Lock()
+
+    @classmethod
+    def reset_instance(cls):
+        """Reset the singleton instance for test isolation."""
+        cls._instance = None
+
+    def __new__(cls, *args, **kwargs):
+        with cls._lock:
+            if not cls._instance:
+                instance = super(NearDuplicateIndex, cls).__new__(cls)
+                instance.enabled = os.getenv("NEAR_DUPLICATE_ENABLED", "true").lower() == "true"
+                instance.threshold = float(os.getenv("NEAR_DUPLICATE_THRESHOLD", "0.85"))
+                num_perm = int(os.getenv("NEAR_DUPLICATE_NUM_PERM", "64"))
+                instance.bands = int(os.getenv("NEAR_DUPLICATE_BANDS", "16"))
+                instance.hasher = MinHasher(num_perm=num_perm)
+                instance.products: Dict[str, MinHashLSH] = {}
+                instance._loading = set()
+                instance._index_lock = threading.Lock()
+                cls._instance = instance
+        return cls._instance
+
+    async def _load_product(self, db, product_id: str, chunk_size: int = 1000):
+        with self._index_lock:
+            if product_id in self.products or product_id in self._loading:
+                return
+            self._loading.add(product_id)
+        index = MinHashLSH(num_perm=self.hasher.num_perm, bands=self.bands)
+        try:
+            cursor = db.processed_review.find(
+                {"productId": product_id, "isProcessed": True},
+                {"_id": 0, "orgReviewId": 1, "rawReview.title": 1, "rawReview.body": 1},
+            )
+            chunk = []
+            async for doc in cursor:
+                chunk.append(doc)
+                if len(chunk) >= chunk_size:
+                    index.add_many([d["orgReviewId"] for d in chunk], self.hasher.signatures([processed_review_text(d) for d in chunk]))
+                    chunk = []
+            index.add_many([d["orgReviewId"] for d in chunk], self.hasher.signatures([processed_review_text(d) for d in chunk]))
+            logging.info(f"Loaded near-duplicate index for product {product_id} with {len(index)} reviews")
+            with self._index_lock:
+                self.products[product_id] = index
+        except Exception as e:
+            logging.error(f"Failed to load near-duplicate index for product {product_id}: {e}")
+        finally:
+            with self._index_lock:
+                self._loading.discard(product_id)
+
+    async def find_matches(self, reviews: List[Tuple[str, str, str]], db=None) -> Dict[str, dict]:
+        """Match ``(source_review_id, product_id, review_text)`` tuples against processed reviews.
+
+        Returns ``{source_review_id: {"orgReviewId", "similarity", "enReview", "analysis"}}``
+        for the reviews that have a near duplicate.
+        """
+        if not self.enabled or not reviews:
+            return {}
+        db = db if db is not None else AsyncDatabaseService().db
+        if db is None:
+            return {}
+        for product_id in {product_id for _, product_id, _ in reviews}:
+            await self._load_product(db, product_id)
+
+        signatures = self.hasher.signatures([text for _, _, text in reviews])
+        hits = {}
+        for (source_review_id, product_id, _), signature in zip(reviews, signatures):
+            index = self.products.get(product_id)
+            if index is None:
+                continue
+            with self._index_lock:
+                hit = index.query(signature, self.threshold)
+            if hit is not None and hit[0] != source_review_id:
+                hits[source_review_id] = hit
+        if not hits:
+            return {}
+
+        docs = await db.processed_review.find(
+            {"orgReviewId": {"$in": list({org_id for org_id, _ in hits.values()})}},
+            {"_id": 0, "orgReviewId": 1, "enReview": 1, "analysis": 1},
+        ).to_list(None)
+        by_id = {doc["orgReviewId"]: doc for doc in docs}
+        matches = {}
+        for source_review_id, (org_id, similarity) in hits.items():
+            doc = by_id.get(org_id)
+            if doc and doc.get("enReview") and isinstance(doc.get("analysis"), dict) and "error" not in doc["analysis"]:
+                matches[source_review_id] = {**doc, "similarity": similarity}
+        logging.info(f"Reusing translation and analysis for {len(matches)} of {len(reviews)} reviews")
+        return matches
+
+    def add(self, reviews: List[Tuple[str, str, str]]):
+        """Index newly processed ``(source_review_id, product_id, review_text)`` tuples."""
+        if not self.enabled or not reviews:
+            return
+        signatures = self.hasher.signatures([text for _, _, text in reviews])
+        with self._index_lock:
+            for (source_review_id, product_id, _), signature in zip(reviews, signatures):
+                index = self.products.get(product_id)
+                # Products not loaded yet pick the review up when they are loaded
+                if index is not None:
+                    index.add_many([source_review_id], signature[None, :])
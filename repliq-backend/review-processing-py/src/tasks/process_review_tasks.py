@@ -1,21 +1,30 @@
-import concurrent.futures
+import inspect
 import threading
+import time
 import logging
 from functools import wraps
-from typing import Any, Dict
+from typing import Any, Dict, List, Tuple
 import asyncio
+import os
 from ..agents.ai_agents.ai_agent_translator import AIAgentTranslator
 from ..agents.ai_agents.ai_agent_reply_generator import AIAgentReplyGenerator
 from ..agents.ai_agents.ai_agent_review_analyzer import AIAgentReviewAnalyzer
+from ..agents.ai_agents.ai_agent_review_fused import AIAgentReviewFused
+from ..agents.ai_agents.ai_agent_review_batch_analyzer import AIAgentReviewBatchAnalyzer
+from ..agents.agent_registry import AgentRegistry
+from ..agents.model_tiering import TIER_LARGE, TIER_SMALL, ModelTieringPolicy
+from src.tasks.near_duplicate_index import NearDuplicateIndex
+from src.tasks.stage_state import STAGE_ANALYSIS, STAGE_REPLY, STAGE_TRANSLATION, STAGES, StageCheckpointBuffer, clear_stage_states, load_stage_states, stage_failure
 from src.utils.db_service import DatabaseService
+from src.utils.async_runtime import AsyncRuntime
+from src.utils.async_db_service import AsyncDatabaseService
+from src.utils.language_detector import LanguageDetector
+from src.utils.metrics import MODEL_TIER_DECISIONS, REVIEW_SKIPS, REVIEW_STAGE_FAILURES, REVIEW_STAGE_SECONDS, REVIEW_STAGES_RESUMED, REVIEWS, REVIEWS_IN_FLIGHT
+from src.utils.tracing import get_tracer, record_error
 from bson import ObjectId
 
 
-def save_to_database_task(review_id: str, translation: str, reply: str, analysis: dict, review_date: str, source: str, product_id: str, raw_review: dict):
-    if is_review_already_processed(review_id):
-        logging.info(f"[SKIP] Review with orgReviewId={review_id} already processed, skipping save.")
-        return
-    db = DatabaseService().db
+def build_processed_review(review_id: str, translation: str, reply: str, analysis: dict, review_date: str, source: str, product_id: str, raw_review: dict, near_duplicate_of: dict = None, language: dict = None, model_routing: dict = None) -> dict:
     processed_review = {
         "orgReviewId": review_id,
         "isProcessed": True,
@@ -30,7 +39,41 @@ def save_to_database_task(review_id: str, translation: str, reply: str, analysis
         "productId": product_id,
         "rawReview": raw_review
     }
-    db.processed_review.insert_one(processed_review)
+    if language:
+        processed_review["language"] = language
+    if model_routing:
+        processed_review["modelRouting"] = model_routing
+    if near_duplicate_of:
+        processed_review["nearDuplicateOf"] = {
+            "orgReviewId": near_duplicate_of["orgReviewId"],
+            "similarity": near_duplicate_of["similarity"],
+        }
+    return processed_review
+
+
+def upsert_filter_and_update(processed_review: dict):
+    """Filter and update for an idempotent insert keyed on the unique orgReviewId index."""
+    fields = {key: value for key, value in processed_review.items() if key != "orgReviewId"}
+    return {"orgReviewId": processed_review["orgReviewId"]}, {"$setOnInsert": fields}
+
+
+def save_to_database_task(review_id: str, translation: str, reply: str, analysis: dict, review_date: str, source: str, product_id: str, raw_review: dict):
+    db = DatabaseService().db
+    processed_review = build_processed_review(review_id, translation, reply, analysis, review_date, source, product_id, raw_review)
+    result = db.processed_review.update_one(*upsert_filter_and_update(processed_review), upsert=True)
+    if result.upserted_id is None:
+        logging.info(f"[SKIP] Review with orgReviewId={review_id} already processed, skipping save.")
+
+
+async def save_to_database_task_async(review_id: str, translation: str, reply: str, analysis: dict, review_date: str, source: str, product_id: str, raw_review: dict, near_duplicate_of: dict = None, language: dict = None, model_routing: dict = None) -> bool:
+    """Insert the processed review unless it exists; returns whether this call inserted it."""
+    db = AsyncDatabaseService().db
+    processed_review = build_processed_review(review_id, translation, reply, analysis, review_date, source, product_id, raw_review, near_duplicate_of, language, model_routing)
+    result = await db.processed_review.update_one(*upsert_filter_and_update(processed_review), upsert=True)
+    if result.upserted_id is None:
+        logging.info(f"[SKIP] Review with orgReviewId={review_id} already processed, skipping save.")
+        return False
+    return True
 
 
 def fetch_review_details_task(source_review_id: str) -> dict:
@@ -43,6 +86,24 @@ def fetch_review_details_task(source_review_id: str) -> dict:
     logging.debug(f"Fetched review details for sourceReviewId {source_review_id}: {review}")
     return review
 
+
+async def fetch_review_details_task_async(source_review_id: str) -> dict:
+    logging.info(f"Fetching review details for sourceReviewId: {source_review_id}")
+    db = AsyncDatabaseService().db
+    review = await db.reviews.find_one({"sourceReviewId": source_review_id})
+    if not review:
+        logging.error(f"Review with sourceReviewId {source_review_id} not found in the database.")
+        raise ValueError(f"Review with sourceReviewId {source_review_id} not found.")
+    logging.debug(f"Fetched review details for sourceReviewId {source_review_id}: {review}")
+    return review
+
+def detect_review_language(review_text: str) -> dict:
+    """Detect the review language offline and count it in the per-language stats."""
+    detector = LanguageDetector()
+    language = detector.detect(review_text)
+    detector.record(language)
+    return language
+
 # Helper for extracting review fields safely
 def extract_review_fields(review_details: dict) -> Dict[str, Any]:
     try:
@@ -66,50 +127,246 @@ def extract_review_fields(review_details: dict) -> Dict[str, Any]:
 
 # Decorator for logging and error handling
 def log_and_run_decorator(func):
+    if inspect.iscoroutinefunction(func):
+        @wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            t = threading.current_thread()
+            logging.info(f"[subtask] Thread name: {t.name}, Thread id: {t.ident}, Function: {func.__name__}")
+            with get_tracer().start_as_current_span(func.__name__, attributes={"thread.name": t.name, "thread.id": t.ident}) as span:
+                started = time.perf_counter()
+                try:
+                    return await func(*args, **kwargs)
+                except Exception as e:
+                    logging.error(f"Exception in {func.__name__}: {e}")
+                    record_error(span, e)
+                    REVIEW_STAGE_FAILURES.labels(func.__name__).inc()
+                    return None
+                finally:
+                    REVIEW_STAGE_SECONDS.labels(func.__name__).observe(time.perf_counter() - started)
+        return async_wrapper
+
     @wraps(func)
     def wrapper(*args, **kwargs):
         t = threading.current_thread()
         logging.info(f"[subtask] Thread name: {t.name}, Thread id: {t.ident}, Function: {func.__name__}")
-        try:
-            return func(*args, **kwargs)
-        except Exception as e:
-            logging.error(f"Exception in {func.__name__}: {e}")
-            return None
+        with get_tracer().start_as_current_span(func.__name__, attributes={"thread.name": t.name, "thread.id": t.ident}) as span:
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            except Exception as e:
+                logging.error(f"Exception in {func.__name__}: {e}")
+                record_error(span, e)
+                REVIEW_STAGE_FAILURES.labels(func.__name__).inc()
+                return None
+            finally:
+                REVIEW_STAGE_SECONDS.labels(func.__name__).observe(time.perf_counter() - started)
     return wrapper
 
 
 
+def review_agent_mode() -> str:
+    """``split`` runs three agents per review, ``fused`` one combined call with per-field fallback."""
+    mode = os.getenv("REVIEW_AGENT_MODE", "split").lower()
+    if mode not in ("split", "fused"):
+        raise ValueError(f"Unsupported REVIEW_AGENT_MODE: {mode}")
+    return mode
+
+
 class ReviewProcessor:
     def __init__(self, db_service=None):
         self.db_service = db_service or DatabaseService()
-        self.translation_agent = AIAgentTranslator()
-        self.reply_agent = AIAgentReplyGenerator()
-        self.analysis_agent = AIAgentReviewAnalyzer()
+        registry = AgentRegistry()
+        self.translation_agent = registry.get(AIAgentTranslator)
+        self.reply_agent = registry.get(AIAgentReplyGenerator)
+        self.analysis_agent = registry.get(AIAgentReviewAnalyzer)
+        self.near_duplicates = NearDuplicateIndex()
+        self.mode = review_agent_mode()
+        self.fused_agent = registry.get(AIAgentReviewFused) if self.mode == "fused" else None
+        self.language_detector = LanguageDetector()
+        self.tiering = ModelTieringPolicy()
+        # Packed analysis is used by the batch pipeline in split mode
+        self.batch_analysis_enabled = self.mode == "split" and int(os.getenv("ANALYZER_BATCH_SIZE", "8")) > 1
 
+    def route_review(self, review_text: str) -> dict:
+        """Model tier for a review; see ``ModelTieringPolicy.decide``."""
+        return self.tiering.decide(review_text)
+
+    def agent_for(self, agent_cls, tier: str = TIER_LARGE):
+        """The agent of ``agent_cls`` for ``tier``; the large tier uses the agents built above."""
+        if tier != TIER_SMALL:
+            return {
+                AIAgentTranslator: self.translation_agent,
+                AIAgentReplyGenerator: self.reply_agent,
+                AIAgentReviewAnalyzer: self.analysis_agent,
+                AIAgentReviewFused: self.fused_agent,
+            }.get(agent_cls) or AgentRegistry().get(agent_cls)
+        return AgentRegistry().get(agent_cls, model=self.tiering.small_model)
 
     @log_and_run_decorator
-    def translation_task(self, review_text):
-        return asyncio.run(self.translation_agent.perform_task(review_text))
+    async def translation_task(self, review_text, tier: str = TIER_LARGE):
+        return await self.agent_for(AIAgentTranslator, tier).perform_task(review_text)
 
     @log_and_run_decorator
-    def reply_task(self, review_text, customer_name):
+    async def reply_task(self, review_text, customer_name, tier: str = TIER_LARGE):
         full_review_text = f"customer name: {customer_name}\nreview text: {review_text}"
         logging.info(f"Generating reply for review text: {full_review_text}")
-        return asyncio.run(self.reply_agent.perform_task(full_review_text))
+        return await self.agent_for(AIAgentReplyGenerator, tier).perform_task(full_review_text)
 
     @log_and_run_decorator
-    def analysis_task(self, review_text):
-        return asyncio.run(self.analysis_agent.perform_task(review_text))
+    async def analysis_task(self, review_text, tier: str = TIER_LARGE):
+        return await self.agent_for(AIAgentReviewAnalyzer, tier).perform_task(review_text)
 
-    def process_review_flow(self, source_review_id: str):
+    @log_and_run_decorator
+    async def fused_task(self, review_text, customer_name, tier: str = TIER_LARGE):
+        full_review_text = f"customer name: {customer_name}\nreview text: {review_text}"
+        return await self.agent_for(AIAgentReviewFused, tier).perform_task(full_review_text)
+
+    def is_english(self, language: dict) -> bool:
+        return self.language_detector.is_confident(language, "en")
+
+    async def run_fused_stages(self, review_text: str, customer_name: str, language: dict = None, tier: str = TIER_LARGE, needed=STAGES):
+        """One fused call, then the split agents only for the ``needed`` fields it did not get right.
+
+        Fields of stages outside ``needed`` come back as whatever the fused call returned.
+        """
+        # A copy: the fused answer may be the object held by the response cache
+        fused = dict(await self.fused_task(review_text, customer_name, tier) or {})
+        if self.is_english(language):
+            fused["enReview"] = review_text
+        fallbacks = {}
+        if fused.get("enReview") is None and STAGE_TRANSLATION in needed:
+            fallbacks["enReview"] = self.translation_task(review_text, tier)
+        if fused.get("reply") is None and STAGE_REPLY in needed:
+            fallbacks["reply"] = self.reply_task(review_text, customer_name, tier)
+        if fused.get("analysis") is None and STAGE_ANALYSIS in needed:
+            fallbacks["analysis"] = self.analysis_task(review_text, tier)
+        if fallbacks:
+            logging.warning(f"Fused agent output incomplete, falling back to split agents for: {', '.join(fallbacks)}")
+            for field, value in zip(fallbacks, await asyncio.gather(*fallbacks.values())):
+                fused[field] = value
+        return fused.get("enReview"), fused.get("reply"), fused.get("analysis")
+
+    async def run_missing_stages(self, review_text: str, customer_name: str, completed: dict = None, match: dict = None,
+                                 language: dict = None, tier: str = TIER_LARGE, analysis_source=None, on_stage=None):
+        """Run only the stages without a usable output and return ``(results, failures)``.
+
+        ``completed`` holds stage outputs checkpointed by an earlier attempt;
+        a near-duplicate ``match`` supplies translation and analysis, and text
+        detected as English with enough confidence is its own translation.
+        The remaining stages run concurrently on the current event loop
+        (through the fused agent when reply and analysis are both missing).
+        ``analysis_source`` replaces the analyzer call, e.g. with a packed
+        batch result. ``on_stage(stage, value, reason)`` is awaited as soon as
+        each stage finishes. Outputs that ``stage_failure`` rejects, including
+        the agents' ``{"error": ...}`` dicts, land in ``failures``.
+        """
+        results = dict(completed or {})
+        for stage in results:
+            REVIEW_STAGES_RESUMED.labels(stage).inc()
+        if match is not None:
+            results.setdefault(STAGE_TRANSLATION, match["enReview"])
+            results.setdefault(STAGE_ANALYSIS, match["analysis"])
+        if STAGE_TRANSLATION not in results and self.is_english(language):
+            self.language_detector.record_skipped_translation()
+            results[STAGE_TRANSLATION] = review_text
+        missing = [stage for stage in STAGES if stage not in results]
+        failures = {}
+
+        async def finish(stage, value):
+            reason = stage_failure(stage, value)
+            if reason is None:
+                results[stage] = value
+            else:
+                failures[stage] = reason
+            if on_stage is not None:
+                await on_stage(stage, value, reason)
+
+        if self.fused_agent is not None and STAGE_REPLY in missing and STAGE_ANALYSIS in missing:
+            translation, reply, analysis = await self.run_fused_stages(review_text, customer_name, language, tier, missing)
+            outputs = {STAGE_TRANSLATION: translation, STAGE_REPLY: reply, STAGE_ANALYSIS: analysis}
+            for stage in missing:
+                await finish(stage, outputs[stage])
+            return results, failures
+
+        runners = {
+            STAGE_TRANSLATION: lambda: self.translation_task(review_text, tier),
+            STAGE_REPLY: lambda: self.reply_task(review_text, customer_name, tier),
+            STAGE_ANALYSIS: analysis_source or (lambda: self.analysis_task(review_text, tier)),
+        }
+
+        async def run(stage):
+            await finish(stage, await runners[stage]())
+
+        await asyncio.gather(*(run(stage) for stage in missing))
+        return results, failures
+
+    async def run_review_stages(self, review_text: str, customer_name: str, language: dict = None, tier: str = TIER_LARGE):
+        """Run translation, reply and analysis; a failed stage comes back as ``None``.
+
+        ``tier`` selects the model tier of every stage (see ``route_review``).
+        """
+        results, _ = await self.run_missing_stages(review_text, customer_name, language=language, tier=tier)
+        return results.get(STAGE_TRANSLATION), results.get(STAGE_REPLY), results.get(STAGE_ANALYSIS)
+
+    def batch_analyzer(self, tier: str = TIER_LARGE) -> AIAgentReviewBatchAnalyzer:
+        model = self.tiering.small_model if tier == TIER_SMALL else None
+        return AgentRegistry().get(AIAgentReviewBatchAnalyzer, model=model)
+
+    def start_packed_analysis(self, reviews: List[Tuple[str, str]], tier: str = TIER_LARGE) -> Dict[str, asyncio.Future]:
+        """Start one ``analyze_reviews_batched`` task per pack of ``(source_review_id, review_text)`` pairs.
+
+        Returns the future of each review's pack, so a review only waits for
+        its own pack. Pack requests and their individual retries share one
+        limiter of ``ANALYZER_BATCH_CONCURRENCY`` slots.
+        """
+        batch_agent = self.batch_analyzer(tier)
+        limiter = asyncio.Semaphore(batch_agent.concurrency)
+        futures = {}
+        for pack in batch_agent.pack(reviews):
+            future = asyncio.ensure_future(self.analyze_reviews_batched(pack, tier, limiter))
+            futures.update(dict.fromkeys((review_id for review_id, _ in pack), future))
+        return futures
+
+    async def analyze_reviews_batched(self, reviews: List[Tuple[str, str]], tier: str = TIER_LARGE, limiter: asyncio.Semaphore = None) -> Dict[str, dict]:
+        """Analyze ``(source_review_id, review_text)`` pairs packed into shared requests.
+
+        Entries the batch response is missing or got wrong are retried one by
+        one with the regular analyzer. ``limiter`` bounds the concurrent
+        requests, packs and retries alike.
+        """
+        batch_agent = self.batch_analyzer(tier)
+        limiter = limiter or asyncio.Semaphore(batch_agent.concurrency)
+        try:
+            results = await batch_agent.analyze_many(reviews, limiter)
+        except Exception as e:
+            logging.error(f"Batch analysis failed, analyzing {len(reviews)} reviews individually: {e}")
+            results = {}
+        retry = [(review_id, text) for review_id, text in reviews if results.get(review_id) is None]
+        if retry:
+            logging.warning(f"Retrying analysis individually for {len(retry)} of {len(reviews)} reviews")
+
+            async def analyze(text):
+                async with limiter:
+                    return await self.analysis_task(text, tier)
+
+            for (review_id, _), analysis in zip(retry, await asyncio.gather(*(analyze(text) for _, text in retry))):
+                results[review_id] = analysis
+        return results
+
+    async def process_review_flow_async(self, source_review_id: str):
+        with get_tracer().start_as_current_span("process_review_flow", attributes={"repliq.review.source_id": source_review_id}), REVIEWS_IN_FLIGHT.labels("single").track():
+            try:
+                outcome = await self._process_review_flow(source_review_id)
+            except Exception:
+                REVIEWS.labels("single", "failed").inc()
+                raise
+            REVIEWS.labels("single", outcome).inc()
+
+    async def _process_review_flow(self, source_review_id: str):
         thread = threading.current_thread()
         logging.info(f"[process_review_flow] Thread name: {thread.name}, Thread id: {thread.ident}, SourceReviewId: {source_review_id}")
 
-        # Check if already processed before starting
-        if is_review_already_processed(source_review_id):
-            return
-
-        review_details = fetch_review_details_task(source_review_id)
+        review_details = await fetch_review_details_task_async(source_review_id)
         fields = extract_review_fields(review_details)
         review_text = fields["review_text"]
         customer_name = fields["customer_name"]
@@ -118,29 +375,52 @@ class ReviewProcessor:
         product_id = fields["product_id"]
         raw_review = fields["raw_review"]
 
-        # Run tasks in parallel using ThreadPoolExecutor
-        with concurrent.futures.ThreadPoolExecutor() as executor:
-            t_future = executor.submit(self.translation_task, review_text)
-            r_future = executor.submit(self.reply_task, review_text, customer_name)
-            a_future = executor.submit(self.analysis_task, review_text)
+        language = detect_review_language(review_text)
+        matches = await self.near_duplicates.find_matches([(source_review_id, product_id, review_text)])
+        match = matches.get(source_review_id)
+        routing = self.route_review(review_text)
+        MODEL_TIER_DECISIONS.labels(routing["tier"], routing["reason"]).inc()
 
-            translation = t_future.result()
-            reply = r_future.result()
-            analysis = a_future.result()
+        # Finished stages are buffered like in the batch pipeline: a review saved
+        # within REVIEW_STAGE_CHECKPOINT_SECONDS never writes a checkpoint
+        db = AsyncDatabaseService().db
+        completed = (await load_stage_states(db, [source_review_id])).get(source_review_id, {})
+        checkpoints = StageCheckpointBuffer(db)
 
-        # If any task failed, log and skip saving
-        if translation is None or reply is None or analysis is None:
-            logging.error(f"One or more subtasks failed for sourceReviewId={source_review_id}. Skipping DB save.")
-            return
+        async def checkpoint(stage, value, reason):
+            checkpoints.record(source_review_id, stage, value, reason)
+            if checkpoints.due():
+                await checkpoints.flush()
 
-        # Check again before saving
-        if is_review_already_processed(source_review_id):
-            return
+        try:
+            results, failures = await self.run_missing_stages(review_text, customer_name, completed, match, language, routing["tier"], on_stage=checkpoint)
+        except Exception:
+            await checkpoints.flush()
+            raise
+        missing = [stage for stage in STAGES if stage not in results]
+        if missing:
+            logging.error(f"Stages {', '.join(missing)} failed for sourceReviewId={source_review_id} ({failures}). Skipping DB save; completed stages are kept for the retry.")
+            for stage in missing:
+                REVIEW_SKIPS.labels("single", f"{stage}_missing").inc()
+            await checkpoints.flush()
+            return "skipped"
 
-        save_to_database_task(
-            source_review_id, translation, reply, analysis,
-            review_date, source, product_id, raw_review
+        # The $setOnInsert upsert on the unique orgReviewId index is the only duplicate check
+        inserted = await save_to_database_task_async(
+            source_review_id, results[STAGE_TRANSLATION], results[STAGE_REPLY], results[STAGE_ANALYSIS],
+            review_date, source, product_id, raw_review, match, language, routing
         )
+        checkpoints.discard([source_review_id])
+        if completed or source_review_id in checkpoints.written:
+            await clear_stage_states(db, [source_review_id])
+        if not inserted:
+            return "already_processed"
+        self.near_duplicates.add([(source_review_id, product_id, review_text)])
+        return "processed"
+
+    def process_review_flow(self, source_review_id: str):
+        """Run the flow on the shared async runtime and wait for it to finish."""
+        return AsyncRuntime().run(self.process_review_flow_async(source_review_id))
 
 # For backward compatibility, keep the old function name
 def process_review_flow(source_review_id: str):
@@ -153,4 +433,12 @@ def is_review_already_processed(review_id: str) -> str:
     if existing:
         logging.info(f"Review with orgReviewId={review_id} already processed. Existing _id: {existing.get('_id')}")
         return existing.get('_id')
-    return None
\ No newline at end of file
+    return None
+
+async def is_review_already_processed_async(review_id: str) -> str:
+    db = AsyncDatabaseService().db
+    existing = await db.processed_review.find_one({"orgReviewId": review_id, "isProcessed": True})
+    if existing:
+        logging.info(f"Review with orgReviewId={review_id} already processed. Existing _id: {existing.get('_id')}")
+        return existing.get('_id')
+    return None
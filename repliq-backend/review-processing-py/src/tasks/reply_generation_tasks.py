@@ -1,9 +1,21 @@
-import asyncio
+from src.agents.agent_registry import AgentRegistry
+from src.utils.async_runtime import AsyncRuntime
 from src.agents.ai_agents.ai_agent_reply_generator import AIAgentReplyGenerator
 
-def generate_reply_task(review: str, name: str, db_service=None) -> str:
-    agent = AIAgentReplyGenerator(db_service=db_service)
-    return asyncio.run(agent.perform_task(f"Review: {review}\nName: {name}"))
+async def generate_reply_task_async(review: str, name: str, db_service=None, bypass_cache: bool = False) -> str:
+    agent = AgentRegistry().get(AIAgentReplyGenerator, db_service=db_service)
+    return await agent.perform_task(f"Review: {review}\nName: {name}", bypass_cache=bypass_cache)
 
-def reply_generation_flow(customer_review: str, customer_name: str, db_service=None):
-    return generate_reply_task(customer_review, customer_name, db_service=db_service)
+def generate_reply_task(review: str, name: str, db_service=None, bypass_cache: bool = False) -> str:
+    return AsyncRuntime().run(generate_reply_task_async(review, name, db_service=db_service, bypass_cache=bypass_cache))
+
+async def reply_generation_flow_async(customer_review: str, customer_name: str, db_service=None, bypass_cache: bool = False):
+    return await generate_reply_task_async(customer_review, customer_name, db_service=db_service, bypass_cache=bypass_cache)
+
+def reply_generation_flow(customer_review: str, customer_name: str, db_service=None, bypass_cache: bool = False):
+    return generate_reply_task(customer_review, customer_name, db_service=db_service, bypass_cache=bypass_cache)
+
+def generate_reply_stream_task(review: str, name: str, db_service=None, bypass_cache: bool = False):
+    """Async generator of ``delta``/``done`` events for one reply."""
+    agent = AgentRegistry().get(AIAgentReplyGenerator, db_service=db_service)
+    return agent.stream_task(f"Review: {review}\nName: {name}", bypass_cache=bypass_cache)
@@ -1,10 +1,16 @@
-import asyncio
+from src.agents.agent_registry import AgentRegistry
+from src.utils.async_runtime import AsyncRuntime
 from src.agents.ai_agents.ai_agent_review_analyzer import AIAgentReviewAnalyzer
 
-def analyze_review_task(text: str, db_service=None) -> dict:
-    agent = AIAgentReviewAnalyzer(db_service=db_service)
-    agent.create_agent()
-    return asyncio.run(agent.perform_task(text))
+async def analyze_review_task_async(text: str, db_service=None, bypass_cache: bool = False) -> dict:
+    agent = AgentRegistry().get(AIAgentReviewAnalyzer, db_service=db_service)
+    return await agent.perform_task(text, bypass_cache=bypass_cache)
 
-def review_analysis_flow(review_text: str, db_service=None):
-    return analyze_review_task(review_text, db_service=db_service)
+def analyze_review_task(text: str, db_service=None, bypass_cache: bool = False) -> dict:
+    return AsyncRuntime().run(analyze_review_task_async(text, db_service=db_service, bypass_cache=bypass_cache))
+
+async def review_analysis_flow_async(review_text: str, db_service=None, bypass_cache: bool = False):
+    return await analyze_review_task_async(review_text, db_service=db_service, bypass_cache=bypass_cache)
+
+def review_analysis_flow(review_text: str, db_service=None, bypass_cache: bool = False):
+    return analyze_review_task(review_text, db_service=db_service, bypass_cache=bypass_cache)
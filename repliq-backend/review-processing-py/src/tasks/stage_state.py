@@ -0,0 +1,140 @@
+import logging
+import os
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+from pymongo import UpdateOne
+from src.agents.ai_agents.ai_agent_translator import TRANSLATION_FAILED
+
+STAGE_TRANSLATION = "translation"
+STAGE_REPLY = "reply"
+STAGE_ANALYSIS = "analysis"
+STAGES = (STAGE_TRANSLATION, STAGE_REPLY, STAGE_ANALYSIS)
+
+# Checkpoints of reviews that have not reached processed_review yet, keyed by sourceReviewId
+COLLECTION = "review_stage_state"
+
+
+def stage_failure(stage: str, value) -> Optional[str]:
+    """Why a stage output is unusable, or ``None`` when it can be saved.
+
+    Agents report failures as ``None``, as ``{"error": ...}`` dicts (analyzer
+    and reply generator) or as the translator's failure text.
+    """
+    if value is None:
+        return "no result"
+    if isinstance(value, dict) and "error" in value:
+        return str(value["error"]) or "error"
+    if stage == STAGE_TRANSLATION and (not isinstance(value, str) or not value.strip() or value == TRANSLATION_FAILED):
+        return TRANSLATION_FAILED
+    return None
+
+
+def _stage_update(results: Dict[str, object], failures: Dict[str, str]) -> dict:
+    now = datetime.now(timezone.utc)
+    update = {"$set": {"updatedAt": now}, "$setOnInsert": {"createdAt": now}}
+    for stage, value in results.items():
+        update["$set"][f"stages.{stage}"] = {"value": value, "completedAt": now}
+    for stage, reason in failures.items():
+        update["$set"][f"lastErrors.{stage}"] = reason
+        update.setdefault("$inc", {})[f"attempts.{stage}"] = 1
+    return update
+
+
+async def load_stage_states(db, source_review_ids: List[str]) -> Dict[str, Dict[str, object]]:
+    """Completed stage outputs per review, with one ``$in`` query.
+
+    Checkpoints are an optimization: when they cannot be read every stage
+    simply runs again.
+    """
+    if db is None or not source_review_ids:
+        return {}
+    try:
+        docs = await db[COLLECTION].find({"_id": {"$in": list(source_review_ids)}}, {"stages": 1}).to_list(None)
+    except Exception as e:
+        logging.warning(f"Could not load stage checkpoints for {len(source_review_ids)} reviews: {e}")
+        return {}
+    return {
+        doc["_id"]: {stage: entry["value"] for stage, entry in (doc.get("stages") or {}).items() if stage in STAGES}
+        for doc in docs
+    }
+
+
+async def checkpoint_stages(db, source_review_id: str, results: Dict[str, object], failures: Dict[str, str] = None):
+    """Store successful stage outputs and count failed attempts in one upsert."""
+    if db is None or not (results or failures):
+        return
+    try:
+        await db[COLLECTION].update_one({"_id": source_review_id}, _stage_update(results, failures or {}), upsert=True)
+    except Exception as e:
+        logging.warning(f"Could not checkpoint stages {sorted(results)} of sourceReviewId={source_review_id}: {e}")
+
+
+async def checkpoint_many(db, checkpoints: Dict[str, tuple]):
+    """``checkpoint_stages`` for several reviews (``{id: (results, failures)}``) in one ``bulk_write``."""
+    operations = [
+        UpdateOne({"_id": source_review_id}, _stage_update(results, failures), upsert=True)
+        for source_review_id, (results, failures) in checkpoints.items() if results or failures
+    ]
+    if db is None or not operations:
+        return
+    try:
+        await db[COLLECTION].bulk_write(operations, ordered=False)
+    except Exception as e:
+        logging.warning(f"Could not checkpoint stages of {len(operations)} reviews: {e}")
+
+
+async def clear_stage_states(db, source_review_ids: List[str]):
+    """Drop checkpoints of reviews that reached ``processed_review``."""
+    if db is None or not source_review_ids:
+        return
+    try:
+        await db[COLLECTION].delete_many({"_id": {"$in": list(source_review_ids)}})
+    except Exception as e:
+        logging.warning(f"Could not clear stage checkpoints of {len(source_review_ids)} reviews: {e}")
+
+
+class StageCheckpointBuffer:
+    """Collects stage outcomes of many reviews as they finish and writes them with ``checkpoint_many``.
+
+    Outcomes are written once ``max_reviews`` reviews have some buffered (no
+    limit when ``None``) or ``REVIEW_STAGE_CHECKPOINT_SECONDS`` passed since
+    the last write, so a crash loses at most that window of finished stages
+    while the number of writes stays proportional to the batch. ``written``
+    holds the reviews that have a checkpoint document to clear once they are
+    saved.
+    """
+
+    def __init__(self, db, max_reviews: int = None, max_seconds: float = None, clock=time.monotonic):
+        self.db = db
+        self.max_reviews = max_reviews
+        self.max_seconds = max_seconds if max_seconds is not None else float(os.getenv("REVIEW_STAGE_CHECKPOINT_SECONDS", "1.0"))
+        self.clock = clock
+        self.pending: Dict[str, tuple] = {}
+        self.written = set()
+        self._last_write = clock()
+
+    def record(self, source_review_id: str, stage: str, value, reason: Optional[str] = None):
+        results, failures = self.pending.setdefault(source_review_id, ({}, {}))
+        if reason is None:
+            results[stage] = value
+        else:
+            failures[stage] = reason
+
+    def discard(self, source_review_ids: List[str]):
+        for source_review_id in source_review_ids:
+            self.pending.pop(source_review_id, None)
+
+    def due(self) -> bool:
+        if not self.pending:
+            return False
+        if self.max_reviews is not None and len(self.pending) >= self.max_reviews:
+            return True
+        return self.clock() - self._last_write >= self.max_seconds
+
+    async def flush(self):
+        pending, self.pending = self.pending, {}
+        self._last_write = self.clock()
+        if pending:
+            await checkpoint_many(self.db, pending)
+            self.written.update(pending)
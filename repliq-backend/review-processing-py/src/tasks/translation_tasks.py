@@ -1,10 +1,21 @@
-import asyncio
+from src.agents.agent_registry import AgentRegistry
+from src.utils.async_runtime import AsyncRuntime
 from src.agents.ai_agents.ai_agent_translator import AIAgentTranslator
 
-def translate_text_task(text: str, db_service=None) -> str:
-    agent = AIAgentTranslator(db_service=db_service)
-    return asyncio.run(agent.perform_task(text))
+async def translate_text_task_async(text: str, db_service=None, bypass_cache: bool = False) -> str:
+    agent = AgentRegistry().get(AIAgentTranslator, db_service=db_service)
+    return await agent.perform_task(text, bypass_cache=bypass_cache)
 
-def translation_flow(japanese_text: str, db_service=None):
-    return translate_text_task(japanese_text, db_service=db_service)
+def translate_text_task(text: str, db_service=None, bypass_cache: bool = False) -> str:
+    return AsyncRuntime().run(translate_text_task_async(text, db_service=db_service, bypass_cache=bypass_cache))
 
+async def translation_flow_async(japanese_text: str, db_service=None, bypass_cache: bool = False):
+    return await translate_text_task_async(japanese_text, db_service=db_service, bypass_cache=bypass_cache)
+
+def translation_flow(japanese_text: str, db_service=None, bypass_cache: bool = False):
+    return translate_text_task(japanese_text, db_service=db_service, bypass_cache=bypass_cache)
+
+def translate_text_stream_task(text: str, db_service=None, bypass_cache: bool = False):
+    """Async generator of ``delta``/``done`` events for one translation."""
+    agent = AgentRegistry().get(AIAgentTranslator, db_service=db_service)
+    return agent.stream_task(text, bypass_cache=bypass_cache)
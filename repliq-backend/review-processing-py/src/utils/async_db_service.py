@@ -0,0 +1,78 @@
+import asyncio
+import logging
+import threading
+import weakref
+from pymongo import AsyncMongoClient
+from .db_service import get_mongo_uri, mongo_client_options
+from .mongo_pool_stats import PoolStatsListener
+from .mongo_tracing import MongoTracingListener
+from .mongo_command_metrics import MongoCommandMetricsListener
+
+
+class AsyncDatabaseService:
+    """Native asyncio MongoDB access sharing configuration with ``DatabaseService``.
+
+    An ``AsyncMongoClient`` is bound to the event loop it first runs on, so one
+    pooled client is kept per loop (the server loop and each ``AsyncRuntime``
+    loop). Pool sizes and timeouts come from ``mongo_client_options()``.
+    """
+
+    _instance = None
+    _lock = threading.Lock()
+
+    @classmethod
+    def reset_instance(cls):
+        """Reset the singleton instance for test isolation."""
+        cls._instance = None
+
+    def __new__(cls, *args, **kwargs):
+        with cls._lock:
+            if not cls._instance:
+                cls._instance = super(AsyncDatabaseService, cls).__new__(cls)
+                cls._instance._clients = weakref.WeakKeyDictionary()
+                cls._instance.pool_stats = PoolStatsListener()
+                cls._instance.command_tracing = MongoTracingListener()
+                cls._instance.command_metrics = MongoCommandMetricsListener()
+        return cls._instance
+
+    def get_client(self) -> AsyncMongoClient:
+        """Return the client for the running event loop, creating it on first use."""
+        loop = asyncio.get_running_loop()
+        client = self._clients.get(loop)
+        if client is None:
+            with self._lock:
+                client = self._clients.get(loop)
+                if client is None:
+                    client = AsyncMongoClient(get_mongo_uri(), event_listeners=[self.pool_stats, self.command_tracing, self.command_metrics], **mongo_client_options())
+                    self._clients[loop] = client
+        return client
+
+    @property
+    def db(self):
+        try:
+            return self.get_client().get_default_database()
+        except Exception as e:
+            logging.error(f"Error connecting to the async database: {e}")
+            return None
+
+    def get_collection(self, collection_name):
+        db = self.db
+        if db is None:
+            raise Exception("Async database not connected.")
+        return db[collection_name]
+
+    async def close(self):
+        """Close the client bound to the running event loop."""
+        client = self._clients.pop(asyncio.get_running_loop(), None)
+        if client is not None:
+            await client.close()
+            logging.info("Async database connection closed.")
+
+    def pool_statistics(self) -> dict:
+        options = mongo_client_options()
+        return {
+            "clients": len(self._clients),
+            "max_pool_size": options["maxPoolSize"],
+            "min_pool_size": options["minPoolSize"],
+            **self.pool_stats.snapshot(),
+        }
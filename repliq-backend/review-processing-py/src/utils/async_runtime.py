@@ -0,0 +1,116 @@
+import asyncio
+import itertools
+import logging
+import os
+import threading
+from src.utils.tracing import bind_context
+
+
+class AsyncRuntime:
+    """Long-lived event loops running in dedicated daemon threads.
+
+    Review flows are submitted here as coroutines instead of spinning up a
+    thread pool and a fresh ``asyncio.run`` loop per subtask, so any number of
+    reviews can be in flight on a fixed number of threads and client state
+    created on a loop survives between calls.
+    """
+
+    _instance = None
+    _lock = threading.Lock()
+
+    @classmethod
+    def reset_instance(cls):
+        """Stop and drop the singleton instance for test isolation."""
+        if cls._instance is not None:
+            try:
+                cls._instance.stop()
+            except Exception:
+                pass
+        cls._instance = None
+
+    def __new__(cls, *args, **kwargs):
+        with cls._lock:
+            if not cls._instance:
+                cls._instance = super(AsyncRuntime, cls).__new__(cls)
+                cls._instance.loops = []
+                cls._instance.threads = []
+                cls._instance._next_loop = None
+        return cls._instance
+
+    @property
+    def is_running(self) -> bool:
+        return bool(self.loops)
+
+    def start(self, num_loops: int = None):
+        """Start ``num_loops`` event loops (``REVIEW_RUNTIME_LOOPS``, default 1)."""
+        with self._lock:
+            if self.loops:
+                return
+            if num_loops is None:
+                num_loops = int(os.getenv("REVIEW_RUNTIME_LOOPS", "1"))
+            for index in range(max(1, num_loops)):
+                loop = asyncio.new_event_loop()
+                ready = threading.Event()
+                thread = threading.Thread(
+                    target=self._run_loop,
+                    args=(loop, ready),
+                    name=f"review-runtime-{index}",
+                    daemon=True,
+                )
+                thread.start()
+                ready.wait()
+                self.loops.append(loop)
+                self.threads.append(thread)
+            self._next_loop = itertools.cycle(self.loops)
+            logging.info(f"Async runtime started with {len(self.loops)} event loop(s)")
+
+    @staticmethod
+    def _run_loop(loop: asyncio.AbstractEventLoop, ready: threading.Event):
+        asyncio.set_event_loop(loop)
+        loop.call_soon(ready.set)
+        loop.run_forever()
+        loop.run_until_complete(loop.shutdown_asyncgens())
+        loop.close()
+
+    def stop(self, timeout: float = 5.0):
+        """Cancel pending work, stop every loop and join the threads."""
+        with self._lock:
+            loops, threads = self.loops, self.threads
+            self.loops, self.threads, self._next_loop = [], [], None
+        for loop in loops:
+            loop.call_soon_threadsafe(self._cancel_pending, loop)
+        for thread in threads:
+            thread.join(timeout)
+        if loops:
+            logging.info("Async runtime stopped")
+
+    @staticmethod
+    def _cancel_pending(loop: asyncio.AbstractEventLoop):
+        for task in asyncio.all_tasks(loop):
+            task.cancel()
+        loop.call_soon(loop.stop)
+
+    def submit(self, coro):
+        """Schedule ``coro`` on one of the loops and return a ``concurrent.futures.Future``.
+
+        The runtime is started lazily, so scripts and tests can submit work
+        without going through the FastAPI lifespan. The caller's trace context
+        is carried over to the loop thread.
+        """
+        if not self.loops:
+            self.start()
+        with self._lock:
+            loop = next(self._next_loop)
+        return asyncio.run_coroutine_threadsafe(bind_context(coro), loop)
+
+    async def run_on_each_loop(self, coro_factory):
+        """Await ``coro_factory()`` once on every runtime loop (e.g. to close per-loop clients)."""
+        futures = [asyncio.run_coroutine_threadsafe(coro_factory(), loop) for loop in list(self.loops)]
+        return await asyncio.gather(*(asyncio.wrap_future(future) for future in futures))
+
+    def run(self, coro, timeout: float = None):
+        """Submit ``coro`` and block the calling thread until it completes."""
+        if threading.current_thread() in self.threads:
+            coro.close()
+            raise RuntimeError("AsyncRuntime.run() cannot block one of the runtime's own loop threads; await the coroutine instead.")
+        return self.submit(coro).result(timeout)
@@ -0,0 +1,88 @@
+import logging
+import os
+from pymongo import ASCENDING
+from pymongo.errors import ConnectionFailure
+
+# Indexes the service relies on, by collection
+REQUIRED_INDEXES = {
+    "processed_review": [
+        {"keys": [("orgReviewId", ASCENDING)], "name": "orgReviewId_unique", "unique": True},
+        {"keys": [("productId", ASCENDING)], "name": "productId"},
+    ],
+    "reviews": [
+        {"keys": [("sourceReviewId", ASCENDING), ("productId", ASCENDING)], "name": "sourceReviewId_productId"},
+    ],
+    "products": [
+        {"keys": [("productId", ASCENDING)], "name": "productId"},
+    ],
+    "llm_cache": [
+        {"keys": [("createdAt", ASCENDING)], "name": "createdAt_ttl",
+         "expireAfterSeconds": int(os.getenv("LLM_CACHE_MONGO_TTL_SECONDS", "604800"))},
+    ],
+    "review_stage_state": [
+        {"keys": [("updatedAt", ASCENDING)], "name": "updatedAt_ttl",
+         "expireAfterSeconds": int(os.getenv("REVIEW_STAGE_STATE_TTL_SECONDS", "604800"))},
+    ],
+}
+
+
+def _index_matches(info: dict, spec: dict) -> bool:
+    return (
+        list(info.get("key", [])) == spec["keys"]
+        and bool(info.get("unique", False)) == spec.get("unique", False)
+        and info.get("expireAfterSeconds") == spec.get("expireAfterSeconds")
+    )
+
+
+async def _update_ttls(db, collection_name: str, specs: list, existing: dict):
+    """Move TTL indexes created with another ``expireAfterSeconds`` to the configured one with ``collMod``.
+
+    ``create_index`` refuses such an index with IndexOptionsConflict.
+    """
+    for spec in specs:
+        if "expireAfterSeconds" not in spec:
+            continue
+        for info in existing.values():
+            if list(info.get("key", [])) != spec["keys"] or info.get("expireAfterSeconds") in (None, spec["expireAfterSeconds"]):
+                continue
+            try:
+                await db.command("collMod", collection_name, index={"keyPattern": dict(spec["keys"]), "expireAfterSeconds": spec["expireAfterSeconds"]})
+            except Exception as e:
+                logging.error(f"Failed to update the TTL of {spec['name']} on {collection_name}: {e}")
+                continue
+            logging.info(f"Updated the TTL of {spec['name']} on {collection_name} from {info['expireAfterSeconds']}s to {spec['expireAfterSeconds']}s")
+            info["expireAfterSeconds"] = spec["expireAfterSeconds"]
+
+
+async def ensure_indexes(db) -> dict:
+    """Create the required indexes and verify they exist.
+
+    TTL indexes whose ``expireAfterSeconds`` changed are updated in place.
+    Returns ``{"collection.index_name": True/False}``; failures (for example
+    duplicate ``orgReviewId`` values blocking the unique index) are logged
+    rather than raised so the service can still start.
+    """
+    report = {}
+    for collection_name, specs in REQUIRED_INDEXES.items():
+        collection = db[collection_name]
+        for spec in specs:
+            options = {key: value for key, value in spec.items() if key != "keys"}
+            try:
+                await collection.create_index(spec["keys"], **options)
+            except ConnectionFailure as e:
+                logging.error(f"Cannot reach MongoDB to ensure indexes: {e}")
+                return report
+            except Exception as e:
+                logging.error(f"Failed to create index {spec['name']} on {collection_name}: {e}")
+        try:
+            existing = await collection.index_information()
+        except Exception as e:
+            logging.error(f"Failed to read indexes of {collection_name}: {e}")
+            existing = {}
+        await _update_ttls(db, collection_name, specs, existing)
+        for spec in specs:
+            present = any(_index_matches(info, spec) for info in existing.values())
+            report[f"{collection_name}.{spec['name']}"] = present
+            if not present:
+                logging.error(f"Required index {spec['name']} is missing on {collection_name}")
+    return report
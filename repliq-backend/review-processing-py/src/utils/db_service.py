@@ -3,10 +3,37 @@ import pymongo
 from pymongo import MongoClient
 import os
 from dotenv import load_dotenv
+from .mongo_pool_stats import PoolStatsListener
+from .mongo_tracing import MongoTracingListener
+from .mongo_command_metrics import MongoCommandMetricsListener
 
 # Load environment variables from .env file
 load_dotenv()
 
+
+def get_mongo_uri():
+    return os.getenv('MONGODB_URI')
+
+
+def mongo_client_options() -> dict:
+    """Connection pool and timeout options shared by the sync and async clients."""
+    options = {
+        "maxPoolSize": int(os.getenv("MONGODB_MAX_POOL_SIZE", "100")),
+        "minPoolSize": int(os.getenv("MONGODB_MIN_POOL_SIZE", "0")),
+        "connectTimeoutMS": int(os.getenv("MONGODB_CONNECT_TIMEOUT_MS", "20000")),
+        "serverSelectionTimeoutMS": int(os.getenv("MONGODB_SERVER_SELECTION_TIMEOUT_MS", "30000")),
+    }
+    optional = {
+        "maxIdleTimeMS": "MONGODB_MAX_IDLE_TIME_MS",
+        "socketTimeoutMS": "MONGODB_SOCKET_TIMEOUT_MS",
+        "waitQueueTimeoutMS": "MONGODB_WAIT_QUEUE_TIMEOUT_MS",
+    }
+    for option, env_var in optional.items():
+        if os.getenv(env_var):
+            options[option] = int(os.getenv(env_var))
+    return options
+
+
 class DatabaseService:
     @classmethod
     def reset_instance(cls):
@@ -24,15 +51,18 @@ class DatabaseService:
             cls._instance = super(DatabaseService, cls).__new__(cls, *args, **kwargs)
             cls._instance.client = None
             cls._instance.db = None
+            cls._instance.pool_stats = PoolStatsListener()
+            cls._instance.command_tracing = MongoTracingListener()
+            cls._instance.command_metrics = MongoCommandMetricsListener()
             cls._instance.connect()  # Automatically connect during initialization
         return cls._instance
 
     def connect(self):
         if not self.client:
             try:
-                mongo_uri = os.getenv('MONGODB_URI')
+                mongo_uri = get_mongo_uri()
                 logging.info(f"Attempting to connect to MongoDB at: {mongo_uri}")  # Log the MongoDB URI
-                self.client = MongoClient(mongo_uri)
+                self.client = MongoClient(mongo_uri, event_listeners=[self.pool_stats, self.command_tracing, self.command_metrics], **mongo_client_options())
                 self.db = self.client.get_default_database()
                 logging.info("Database connection established.")
             except Exception as e:
@@ -48,4 +78,4 @@ class DatabaseService:
             self.client.close()
             self.client = None
             self.db = None
-            logging.info("Database connection closed.")
\ No newline at end of file
+            logging.info("Database connection closed.")
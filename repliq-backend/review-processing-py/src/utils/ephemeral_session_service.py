@@ -0,0 +1,35 @@
+import logging
+import os
+from google.adk.sessions.base_session_service import BaseSessionService
+from google.adk.sessions.session import Session
+from .ttl_cache import TTLCache
+
+
+class EphemeralSessionService(BaseSessionService):
+    """In-process session store for one-shot agent runs.
+
+    Sessions live in a bounded LRU with TTL eviction, so a run that never
+    deletes its session (an early return or a crash) cannot leak storage.
+    """
+
+    def __init__(self, max_sessions: int = None, ttl_seconds: float = None):
+        self.sessions = TTLCache(
+            max_size=max_sessions or int(os.getenv("SESSION_MAX_ENTRIES", "10000")),
+            ttl_seconds=ttl_seconds or float(os.getenv("SESSION_TTL_SECONDS", "600")),
+        )
+
+    def create_session(self, session_id: str, session: Session):
+        self.sessions.set(session_id, session)
+
+    def delete_session(self, session_id: str):
+        self.sessions.pop(session_id)
+
+    async def get_session(self, session_id: str = None, app_name: str = None, user_id: str = None, **kwargs) -> Session:
+        return self.sessions.get(session_id)
+
+    def list_sessions(self):
+        return self.sessions.values()
+
+    def close(self):
+        logging.info("Closing ephemeral session service")
+        self.sessions.clear()
@@ -0,0 +1,182 @@
+import math
+import os
+import re
+import threading
+from collections import Counter
+from typing import Dict, Tuple
+
+# Unicode ranges of the scripts we can attribute without a model
+SCRIPT_RANGES = (
+    ("kana", ((0x3040, 0x30FF), (0x31F0, 0x31FF), (0xFF66, 0xFF9F))),
+    ("han", ((0x4E00, 0x9FFF), (0x3400, 0x4DBF), (0xF900, 0xFAFF))),
+    ("hangul", ((0xAC00, 0xD7AF), (0x1100, 0x11FF), (0x3130, 0x318F))),
+    ("cyrillic", ((0x0400, 0x04FF),)),
+    ("greek", ((0x0370, 0x03FF),)),
+    ("hebrew", ((0x0590, 0x05FF),)),
+    ("arabic", ((0x0600, 0x06FF), (0x0750, 0x077F))),
+    ("devanagari", ((0x0900, 0x097F),)),
+    ("thai", ((0x0E00, 0x0E7F),)),
+    ("latin", ((0x0041, 0x005A), (0x0061, 0x007A), (0x00C0, 0x024F))),
+)
+SCRIPT_LANGUAGES = {"hangul": "ko", "cyrillic": "ru", "greek": "el", "hebrew": "he", "arabic": "ar", "devanagari": "hi", "thai": "th"}
+
+# Small review-style samples the Latin-script trigram profiles are built from
+LATIN_SAMPLES = {
+    "en": (
+        "I love this app and use it every day. The new update is great but it crashes when I open my playlist. "
+        "Please fix the bug and add an option to download songs for offline listening. Customer support was very helpful. "
+        "It would be nice if the search showed more relevant results. The sound quality is good, but there are too many ads. "
+        "I can't log in since yesterday, and the app keeps asking for my password. Thank you for the great service, "
+        "highly recommended. Why is the subscription so expensive? The interface is easy to use and looks clean."
+    ),
+    "es": (
+        "Me encanta esta aplicación y la uso todos los días. La nueva actualización es buena pero se cierra cuando abro mi lista. "
+        "Por favor arreglen el error y añadan una opción para descargar canciones sin conexión. El servicio al cliente fue muy útil. "
+        "Sería bueno que la búsqueda mostrara resultados más relevantes. La calidad del sonido es buena, pero hay demasiados anuncios. "
+        "No puedo iniciar sesión desde ayer y la aplicación sigue pidiendo mi contraseña. Gracias por el excelente servicio."
+    ),
+    "fr": (
+        "J'adore cette application et je l'utilise tous les jours. La nouvelle mise à jour est bien mais elle plante quand j'ouvre ma liste. "
+        "Merci de corriger le bug et d'ajouter une option pour télécharger les chansons hors ligne. Le service client était très utile. "
+        "Ce serait bien que la recherche affiche des résultats plus pertinents. La qualité du son est bonne, mais il y a trop de publicités. "
+        "Je ne peux plus me connecter depuis hier et l'application me demande toujours mon mot de passe. Merci pour ce service."
+    ),
+    "de": (
+        "Ich liebe diese App und benutze sie jeden Tag. Das neue Update ist gut, aber sie stürzt ab, wenn ich meine Playlist öffne. "
+        "Bitte behebt den Fehler und fügt eine Option zum Herunterladen von Liedern für die Offline-Nutzung hinzu. Der Kundendienst war sehr hilfreich. "
+        "Es wäre schön, wenn die Suche relevantere Ergebnisse zeigen würde. Die Klangqualität ist gut, aber es gibt zu viel Werbung. "
+        "Seit gestern kann ich mich nicht anmelden und die App fragt immer wieder nach meinem Passwort. Danke für den tollen Service."
+    ),
+    "pt": (
+        "Eu adoro este aplicativo e uso todos os dias. A nova atualização é boa, mas fecha quando abro minha playlist. "
+        "Por favor corrijam o erro e adicionem uma opção para baixar músicas para ouvir sem internet. O suporte ao cliente foi muito útil. "
+        "Seria bom se a busca mostrasse resultados mais relevantes. A qualidade do som é boa, mas há muitos anúncios. "
+        "Não consigo entrar desde ontem e o aplicativo continua pedindo minha senha. Obrigado pelo ótimo serviço."
+    ),
+    "it": (
+        "Adoro questa applicazione e la uso ogni giorno. Il nuovo aggiornamento è buono ma si blocca quando apro la mia playlist. "
+        "Per favore correggete l'errore e aggiungete un'opzione per scaricare le canzoni da ascoltare offline. L'assistenza clienti è stata molto utile. "
+        "Sarebbe bello se la ricerca mostrasse risultati più pertinenti. La qualità del suono è buona, ma ci sono troppe pubblicità. "
+        "Non riesco ad accedere da ieri e l'applicazione continua a chiedere la mia password. Grazie per l'ottimo servizio."
+    ),
+    "nl": (
+        "Ik hou van deze app en gebruik hem elke dag. De nieuwe update is goed maar hij crasht als ik mijn afspeellijst open. "
+        "Los alsjeblieft de fout op en voeg een optie toe om nummers te downloaden voor offline luisteren. De klantenservice was erg behulpzaam. "
+        "Het zou fijn zijn als de zoekfunctie relevantere resultaten liet zien. De geluidskwaliteit is goed, maar er zijn te veel advertenties. "
+        "Sinds gisteren kan ik niet inloggen en de app blijft om mijn wachtwoord vragen. Bedankt voor de geweldige service."
+    ),
+    "id": (
+        "Saya suka aplikasi ini dan menggunakannya setiap hari. Pembaruan baru bagus tetapi aplikasi keluar sendiri saat saya membuka daftar putar. "
+        "Tolong perbaiki masalah ini dan tambahkan pilihan untuk mengunduh lagu agar bisa didengar tanpa internet. Layanan pelanggan sangat membantu. "
+        "Akan lebih baik jika pencarian menampilkan hasil yang lebih relevan. Kualitas suaranya bagus, tetapi terlalu banyak iklan. "
+        "Saya tidak bisa masuk sejak kemarin dan aplikasi terus meminta kata sandi saya. Terima kasih atas layanan yang luar biasa."
+    ),
+}
+
+_WORDS = re.compile(r"[^\W\d_]+")
+_VOCABULARY_SIZE = 4000
+_MIN_TRIGRAMS = 12
+
+
+def script_of(char: str) -> str:
+    code = ord(char)
+    for script, ranges in SCRIPT_RANGES:
+        for start, end in ranges:
+            if start <= code <= end:
+                return script
+    return None
+
+
+def trigrams(text: str) -> Counter:
+    grams = Counter()
+    for word in _WORDS.findall(text.lower()):
+        padded = f" {word} "
+        for i in range(len(padded) - 2):
+            grams[padded[i:i + 3]] += 1
+    return grams
+
+
+class LanguageDetector:
+    """Offline language detection from character scripts plus trigram profiles.
+
+    Non-Latin scripts decide the language directly (kana means Japanese, Han
+    without kana Chinese, Hangul Korean, ...). Latin-script text is scored
+    against per-language trigram models; the confidence combines the script
+    share with the model posterior, damped for very short texts.
+    """
+
+    _instance = None
+    _lock = threading.Lock()
+
+    @classmethod
+    def reset_instance(cls):
+        """Reset the singleton instance for test isolation."""
+        cls._instance = None
+
+    def __new__(cls, *args, **kwargs):
+        with cls._lock:
+            if not cls._instance:
+                instance = super(LanguageDetector, cls).__new__(cls)
+                instance.threshold = float(os.getenv("LANGUAGE_DETECTION_THRESHOLD", "0.9"))
+                instance.profiles = instance._build_profiles()
+                instance.counts = Counter()
+                instance.translations_skipped = 0
+                instance._stats_lock = threading.Lock()
+                cls._instance = instance
+        return cls._instance
+
+    @staticmethod
+    def _build_profiles() -> Dict[str, Tuple[Dict[str, float], float]]:
+        profiles = {}
+        for language, sample in LATIN_SAMPLES.items():
+            grams = trigrams(sample)
+            total = sum(grams.values()) + _VOCABULARY_SIZE
+            profiles[language] = ({gram: math.log((count + 1) / total) for gram, count in grams.items()}, math.log(1 / total))
+        return profiles
+
+    def _score_latin(self, text: str) -> Tuple[str, float]:
+        grams = trigrams(text)
+        n = sum(grams.values())
+        if not n:
+            return "und", 0.0
+        scores = {}
+        for language, (log_probs, unseen) in self.profiles.items():
+            scores[language] = sum(log_probs.get(gram, unseen) * count for gram, count in grams.items())
+        best = max(scores, key=scores.get)
+        posterior = 1 / sum(math.exp(score - scores[best]) for score in scores.values())
+        return best, posterior * min(1.0, n / _MIN_TRIGRAMS)
+
+    def detect(self, text: str) -> dict:
+        """Return ``{"code": ISO 639-1 code or "und", "confidence": 0..1}``."""
+        scripts = Counter(script for script in map(script_of, text or "") if script)
+        letters = sum(scripts.values())
+        if not letters:
+            return {"code": "und", "confidence": 0.0}
+        cjk = scripts["kana"] + scripts["han"]
+        if scripts["kana"] and cjk >= scripts["latin"]:
+            code, confidence = "ja", cjk / letters
+        else:
+            script, count = scripts.most_common(1)[0]
+            if script == "latin":
+                code, posterior = self._score_latin(text)
+                confidence = posterior * count / letters
+            elif script == "han":
+                code, confidence = "zh", count / letters
+            else:
+                code, confidence = SCRIPT_LANGUAGES[script], count / letters
+        return {"code": code, "confidence": round(confidence, 4)}
+
+    def is_confident(self, language: dict, code: str) -> bool:
+        return bool(language) and language["code"] == code and language["confidence"] >= self.threshold
+
+    def record(self, language: dict):
+        with self._stats_lock:
+            self.counts[language["code"] if language else "und"] += 1
+
+    def record_skipped_translation(self):
+        with self._stats_lock:
+            self.translations_skipped += 1
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            return {"threshold": self.threshold, "languages": dict(self.counts), "translations_skipped": self.translations_skipped}
@@ -0,0 +1,342 @@
+import bisect
+import glob
+import json
+import logging
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds; spans cache hits (milliseconds) up to slow LLM calls
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class _CounterChild:
+    __slots__ = ("_lock", "value")
+
+    def __init__(self, lock):
+        self._lock = lock
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self.value += amount
+
+
+class _GaugeChild(_CounterChild):
+    __slots__ = ()
+
+    def dec(self, amount: float = 1.0):
+        self.inc(-amount)
+
+    def set(self, value: float):
+        with self._lock:
+            self.value = float(value)
+
+    @contextmanager
+    def track(self):
+        """Count the enclosed block as in flight."""
+        self.inc()
+        try:
+            yield
+        finally:
+            self.dec()
+
+
+class _HistogramChild:
+    __slots__ = ("_lock", "_bounds", "counts", "sum")
+
+    def __init__(self, lock, bounds):
+        self._lock = lock
+        self._bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # last slot is +Inf
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        index = bisect.bisect_left(self._bounds, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+
+    @contextmanager
+    def time(self):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started)
+
+
+class Metric:
+    """A metric family; ``labels(...)`` returns the child holding one series."""
+
+    kind = None
+
+    def __init__(self, name: str, documentation: str, labelnames=(), registry=None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._children = {}
+        if registry is not None:
+            registry.register(self)
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values):
+        key = tuple(str(value) for value in values)
+        child = self._children.get(key)
+        if child is None:
+            if len(key) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}, got {values}")
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def clear(self):
+        with self._lock:
+            self._children = {}
+
+    def _sample(self, child):
+        return child.value
+
+    def collect(self) -> dict:
+        with self._lock:
+            samples = [[list(key), self._sample(child)] for key, child in self._children.items()]
+        return {"name": self.name, "type": self.kind, "help": self.documentation, "labels": list(self.labelnames), "samples": samples}
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def _new_child(self):
+        return _CounterChild(self._lock)
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def _new_child(self):
+        return _GaugeChild(self._lock)
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames=(), registry=None, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(float(bound) for bound in buckets if not math.isinf(bound)))
+        super().__init__(name, documentation, labelnames, registry)
+
+    def _new_child(self):
+        return _HistogramChild(self._lock, self.buckets)
+
+    def _sample(self, child):
+        return {"counts": list(child.counts), "sum": child.sum}
+
+    def collect(self) -> dict:
+        return {**super().collect(), "buckets": list(self.buckets)}
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: Metric):
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric {metric.name} is already registered")
+            self._metrics[metric.name] = metric
+
+    def collect(self) -> list:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return [metric.collect() for metric in metrics]
+
+    def clear(self):
+        """Drop every recorded series, for test isolation."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        for metric in metrics:
+            metric.clear()
+
+
+REGISTRY = MetricsRegistry()
+
+AGENT_SECONDS = Histogram("repliq_agent_duration_seconds", "Agent task latency including cache lookups.", ("agent", "cache"), REGISTRY)
+REVIEW_STAGE_SECONDS = Histogram("repliq_review_stage_duration_seconds", "Latency of one review processing stage.", ("stage",), REGISTRY)
+REVIEW_STAGE_FAILURES = Counter("repliq_review_stage_failures_total", "Review stages that raised and returned no result.", ("stage",), REGISTRY)
+REVIEW_STAGES_RESUMED = Counter("repliq_review_stages_resumed_total", "Stage outputs reused from review_stage_state instead of calling the model again.", ("stage",), REGISTRY)
+REVIEWS = Counter("repliq_reviews_total", "Reviews handled by the background flows, by outcome.", ("flow", "outcome"), REGISTRY)
+REVIEW_SKIPS = Counter("repliq_review_save_skips_total", "Reviews not saved because a stage produced no result, by missing stage.", ("flow", "reason"), REGISTRY)
+REVIEWS_IN_FLIGHT = Gauge("repliq_reviews_in_flight", "Reviews currently being processed.", ("flow",), REGISTRY)
+REVIEW_BATCHES_IN_FLIGHT = Gauge("repliq_review_batches_in_flight", "Batch pipeline runs currently in progress.", (), REGISTRY)
+JOB_LEASES = Counter("repliq_job_leases_total", "Job items leased, by priority class and reason (fair_share or overdue).", ("priority_class", "reason"), REGISTRY)
+JOB_ITEMS_IN_FLIGHT = Gauge("repliq_job_items_in_flight", "Leased job items currently being processed by this process.", (), REGISTRY)
+REVIEW_WATCHER_REVIEWS = Counter("repliq_review_watcher_reviews_total", "New reviews enqueued by the review watcher, by mode (change_stream or poll).", ("mode",), REGISTRY)
+REVIEW_WATCHER_LAG_SECONDS = Histogram("repliq_review_watcher_lag_seconds", "Time from a review's insert (its ObjectId) to its enqueue by the watcher.", (), REGISTRY)
+LLM_REQUEST_SECONDS = Histogram("repliq_llm_request_duration_seconds", "Latency of one model call, including limiter waits and 429 retries.", ("model", "agent"), REGISTRY)
+LLM_REQUESTS = Counter("repliq_llm_requests_total", "Model calls by outcome.", ("model", "outcome"), REGISTRY)
+LLM_TOKENS = Counter("repliq_llm_tokens_total", "Tokens reported by the provider.", ("model",), REGISTRY)
+MODEL_TIER_DECISIONS = Counter("repliq_model_tier_decisions_total", "Reviews routed to each model tier, by reason.", ("tier", "reason"), REGISTRY)
+LLM_FAILOVERS = Counter("repliq_llm_failovers_total", "Agent calls moved to the next model of the pool after an error, by failed model.", ("agent", "model"), REGISTRY)
+LLM_HEDGES = Counter("repliq_llm_hedged_requests_total", "Agent calls duplicated to a second model after the hedge delay, by winner.", ("agent", "winner"), REGISTRY)
+LLM_CIRCUIT_TRIPS = Counter("repliq_llm_circuit_trips_total", "Times a model's circuit breaker opened.", ("model",), REGISTRY)
+MONGO_COMMAND_SECONDS = Histogram("repliq_mongo_command_duration_seconds", "Mongo command round-trip time.", ("command", "collection"), REGISTRY)
+MONGO_COMMAND_FAILURES = Counter("repliq_mongo_command_failures_total", "Mongo commands that failed.", ("command", "collection"), REGISTRY)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra=()) -> str:
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(str(value))}"' for name, value in pairs) + "}"
+
+
+def _number(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value))
+
+
+def render(families: list) -> str:
+    """Prometheus text exposition (format 0.0.4) of collected families."""
+    lines = []
+    for family in families:
+        name, names = family["name"], family["labels"]
+        lines.append(f"# HELP {name} {family['help']}")
+        lines.append(f"# TYPE {name} {family['type']}")
+        for values, sample in family["samples"]:
+            if family["type"] != "histogram":
+                lines.append(f"{name}{_labels(names, values)} {_number(sample)}")
+                continue
+            cumulative = 0
+            for bound, count in zip(list(family["buckets"]) + [math.inf], sample["counts"]):
+                cumulative += count
+                lines.append(f"{name}_bucket{_labels(names, values, [('le', _number(bound))])} {cumulative}")
+            lines.append(f"{name}_sum{_labels(names, values)} {_number(sample['sum'])}")
+            lines.append(f"{name}_count{_labels(names, values)} {cumulative}")
+    return "\n".join(lines) + "\n"
+
+
+def with_pid(family: dict, pid: int = None) -> dict:
+    """``family`` with a ``pid`` label added to every series (this process by default)."""
+    pid = os.getpid() if pid is None else pid
+    return {**family, "labels": family["labels"] + ["pid"], "samples": [[values + [str(pid)], sample] for values, sample in family["samples"]]}
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _merge(snapshots: list) -> list:
+    """Sum counters and histograms across processes; gauges keep one series per live pid."""
+    merged = {}
+    for snapshot in snapshots:
+        pid = snapshot["pid"]
+        for family in snapshot["families"]:
+            if family["type"] == "gauge":
+                if not _pid_alive(pid):
+                    continue
+                family = with_pid(family, pid)
+            target = merged.setdefault(family["name"], {**family, "samples": {}})
+            for values, sample in family["samples"]:
+                key = tuple(values)
+                current = target["samples"].get(key)
+                if current is None or family["type"] == "gauge":
+                    target["samples"][key] = sample
+                elif family["type"] == "histogram":
+                    target["samples"][key] = {
+                        "counts": [a + b for a, b in zip(current["counts"], sample["counts"])],
+                        "sum": current["sum"] + sample["sum"],
+                    }
+                else:
+                    target["samples"][key] = current + sample
+    return [{**family, "samples": [[list(key), sample] for key, sample in family["samples"].items()]} for family in merged.values()]
+
+
+def multiprocess_dir() -> str:
+    return os.getenv("METRICS_MULTIPROC_DIR", "")
+
+
+def write_snapshot(directory: str = None, registry: MetricsRegistry = REGISTRY):
+    """Persist this process's metrics so any worker can serve the aggregate."""
+    directory = directory or multiprocess_dir()
+    if not directory:
+        return
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{os.getpid()}.json")
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as handle:
+        json.dump({"pid": os.getpid(), "families": registry.collect()}, handle)
+    os.replace(tmp_path, path)
+
+
+def collect_families(registry: MetricsRegistry = REGISTRY) -> list:
+    """Families to expose for this scrape.
+
+    Without ``METRICS_MULTIPROC_DIR`` every series carries a ``pid`` label so
+    workers behind one port stay distinguishable. With it, counters and
+    histograms are summed over the snapshots of all workers (including ones
+    that exited) and only gauges keep the ``pid`` label.
+    """
+    directory = multiprocess_dir()
+    if not directory:
+        return [with_pid(family, os.getpid()) for family in registry.collect()]
+    write_snapshot(directory, registry)
+    snapshots = []
+    for path in sorted(glob.glob(os.path.join(directory, "*.json"))):
+        try:
+            with open(path, encoding="utf-8") as handle:
+                snapshots.append(json.load(handle))
+        except (OSError, ValueError) as e:
+            logging.warning(f"Skipping unreadable metrics snapshot {path}: {e}")
+    return _merge(snapshots)
+
+
+class MetricsSnapshotWriter:
+    """Writes this process's snapshot every ``METRICS_FLUSH_SECONDS`` while multiprocess mode is on."""
+
+    def __init__(self, interval: float = None):
+        self.interval = interval or float(os.getenv("METRICS_FLUSH_SECONDS", "5"))
+        self._stopping = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if not multiprocess_dir() or self._thread is not None:
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="metrics-writer", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stopping.wait(self.interval):
+            self.flush()
+
+    def flush(self):
+        try:
+            write_snapshot()
+        except OSError as e:
+            logging.error(f"Failed to write metrics snapshot: {e}")
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._stopping.set()
+        self._thread.join(timeout=self.interval)
+        self._thread = None
+        self.flush()
@@ -0,0 +1,32 @@
+import threading
+from pymongo import monitoring
+from src.utils.metrics import MONGO_COMMAND_FAILURES, MONGO_COMMAND_SECONDS
+
+
+class MongoCommandMetricsListener(monitoring.CommandListener):
+    """Feeds Mongo command durations and failures into the metrics registry."""
+
+    def __init__(self):
+        self._collections = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(event):
+        return event.request_id, event.connection_id
+
+    def started(self, event):
+        collection = event.command.get(event.command_name)
+        with self._lock:
+            self._collections[self._key(event)] = collection if isinstance(collection, str) else ""
+
+    def _collection(self, event) -> str:
+        with self._lock:
+            return self._collections.pop(self._key(event), "")
+
+    def succeeded(self, event):
+        MONGO_COMMAND_SECONDS.labels(event.command_name, self._collection(event)).observe(event.duration_micros / 1e6)
+
+    def failed(self, event):
+        collection = self._collection(event)
+        MONGO_COMMAND_SECONDS.labels(event.command_name, collection).observe(event.duration_micros / 1e6)
+        MONGO_COMMAND_FAILURES.labels(event.command_name, collection).inc()
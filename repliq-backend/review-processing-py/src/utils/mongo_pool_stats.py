@@ -0,0 +1,65 @@
+import threading
+from pymongo import monitoring
+
+
+class PoolStatsListener(monitoring.ConnectionPoolListener):
+    """Counts connection pool events so pool usage can be reported at runtime."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.created = 0
+        self.closed = 0
+        self.checked_out = 0
+        self.checkouts = 0
+        self.checkout_failures = 0
+        self.pools_cleared = 0
+
+    def _incr(self, **deltas):
+        with self._lock:
+            for name, delta in deltas.items():
+                setattr(self, name, getattr(self, name) + delta)
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        self._incr(pools_cleared=1)
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        self._incr(created=1)
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        self._incr(closed=1)
+
+    def connection_check_out_started(self, event):
+        pass
+
+    def connection_check_out_failed(self, event):
+        self._incr(checkout_failures=1)
+
+    def connection_checked_out(self, event):
+        self._incr(checked_out=1, checkouts=1)
+
+    def connection_checked_in(self, event):
+        self._incr(checked_out=-1)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "open_connections": self.created - self.closed,
+                "in_use": self.checked_out,
+                "checkouts": self.checkouts,
+                "checkout_failures": self.checkout_failures,
+                "connections_created": self.created,
+                "connections_closed": self.closed,
+                "pools_cleared": self.pools_cleared,
+            }
@@ -1,30 +1,77 @@
+import asyncio
 import logging
+import os
+import threading
+import time
+from datetime import datetime, timezone
 from google.adk.sessions.base_session_service import BaseSessionService
 from google.adk.sessions.session import Session
+from pymongo import DeleteOne, InsertOne
 from pymongo.collection import Collection
 from .db_service import DatabaseService
-import asyncio
+from .async_db_service import AsyncDatabaseService
 
 class MongoSessionService(BaseSessionService):
-    def __init__(self, db_service=None):
+    """Session store backed by the ``sessions`` collection.
+
+    Writes are buffered and flushed with one ``bulk_write`` once
+    ``SESSION_WRITE_BATCH_SIZE`` operations are pending or
+    ``SESSION_FLUSH_INTERVAL_SECONDS`` have passed. A session created and
+    deleted between two flushes never reaches Mongo, and a TTL index on
+    ``createdAt`` removes sessions whose delete was never issued. Flushes
+    triggered from async agent code go through the async client so they never
+    block the event loop.
+    """
+
+    def __init__(self, db_service=None, batch_size: int = None, flush_interval: float = None, ttl_seconds: int = None, async_db_service=None):
         self.db_service = db_service or DatabaseService()
         self.db_service.connect()
+        self.async_db_service = async_db_service or AsyncDatabaseService()
         self.collection: Collection = self.db_service.get_collection("sessions")
+        self.batch_size = batch_size or int(os.getenv("SESSION_WRITE_BATCH_SIZE", "100"))
+        self.flush_interval = flush_interval if flush_interval is not None else float(os.getenv("SESSION_FLUSH_INTERVAL_SECONDS", "1.0"))
+        self.ttl_seconds = ttl_seconds or int(os.getenv("SESSION_TTL_SECONDS", "600"))
+        self._pending_inserts = {}
+        self._pending_deletes = set()
+        # Writes taken by a flush whose bulk_write has not completed yet
+        self._flushing_inserts = {}
+        self._flushing_deletes = set()
+        self._flush_tasks = set()
+        self._lock = threading.Lock()
+        self._last_flush = time.monotonic()
+        self.ensure_ttl_index()
+
+    def ensure_ttl_index(self):
+        try:
+            self.collection.create_index("createdAt", expireAfterSeconds=self.ttl_seconds, name="createdAt_ttl")
+        except Exception as e:
+            logging.error(f"Failed to create TTL index on sessions: {e}")
 
     def create_session(self, session_id: str, session: Session):
         session_data = {
             "_id": session_id,
             "app_name": session.app_name,
             "user_id": session.user_id,
+            "createdAt": datetime.now(timezone.utc),
         }
-        self.collection.insert_one(session_data)
+        with self._lock:
+            self._pending_deletes.discard(session_id)
+            self._pending_inserts[session_id] = session_data
+        self._maybe_flush()
 
     def delete_session(self, session_id: str):
-        self.collection.delete_one({"_id": session_id})
+        with self._lock:
+            # Never written yet: dropping the buffered insert is enough
+            if self._pending_inserts.pop(session_id, None) is None:
+                self._pending_deletes.add(session_id)
+        self._maybe_flush()
 
-    async def get_session(self, session_id: str, app_name: str = None, user_id: str = None) -> Session:
-        await asyncio.sleep(0)  # Simulate async behavior
-        session_data = self.collection.find_one({"_id": session_id})
+    async def get_session(self, session_id: str = None, app_name: str = None, user_id: str = None, **kwargs) -> Session:
+        with self._lock:
+            deleted = session_id in self._pending_deletes or (session_id in self._flushing_deletes and session_id not in self._pending_inserts)
+            session_data = self._pending_inserts.get(session_id) or self._flushing_inserts.get(session_id)
+        if session_data is None and not deleted:
+            session_data = await self.async_db_service.get_collection("sessions").find_one({"_id": session_id})
         if session_data:
             return Session(
                 id=session_data["_id"],
@@ -35,6 +82,7 @@ class MongoSessionService(BaseSessionService):
         return None
 
     def list_sessions(self):
+        self.flush_writes()
         sessions = self.collection.find()
         return [
             Session(
@@ -46,5 +94,57 @@ class MongoSessionService(BaseSessionService):
             for session in sessions
         ]
 
+    def _maybe_flush(self):
+        pending = len(self._pending_inserts) + len(self._pending_deletes)
+        if pending < self.batch_size and time.monotonic() - self._last_flush < self.flush_interval:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self.flush_writes()
+            return
+        task = loop.create_task(self.flush_writes_async())
+        self._flush_tasks.add(task)
+        task.add_done_callback(self._flush_tasks.discard)
+
+    def _take_pending(self):
+        with self._lock:
+            inserts, deletes = self._pending_inserts, self._pending_deletes
+            self._pending_inserts, self._pending_deletes = {}, set()
+            self._flushing_inserts.update(inserts)
+            self._flushing_deletes.update(deletes)
+            self._last_flush = time.monotonic()
+        operations = [InsertOne(doc) for doc in inserts.values()] + [DeleteOne({"_id": session_id}) for session_id in deletes]
+        return inserts, deletes, operations
+
+    def _flushed(self, inserts: dict, deletes: set):
+        with self._lock:
+            for session_id in inserts:
+                self._flushing_inserts.pop(session_id, None)
+            self._flushing_deletes.difference_update(deletes)
+
+    def flush_writes(self) -> int:
+        """Write all buffered inserts and deletes with a single bulk_write."""
+        inserts, deletes, operations = self._take_pending()
+        if operations:
+            try:
+                self.collection.bulk_write(operations, ordered=False)
+            except Exception as e:
+                logging.error(f"Failed to flush {len(operations)} session writes: {e}")
+        self._flushed(inserts, deletes)
+        return len(operations)
+
+    async def flush_writes_async(self) -> int:
+        """``flush_writes`` through the async client, for callers on an event loop."""
+        inserts, deletes, operations = self._take_pending()
+        if operations:
+            try:
+                await self.async_db_service.get_collection("sessions").bulk_write(operations, ordered=False)
+            except Exception as e:
+                logging.error(f"Failed to flush {len(operations)} session writes: {e}")
+        self._flushed(inserts, deletes)
+        return len(operations)
+
     def close(self):
         logging.info("Closing MongoDB session service")
+        self.flush_writes()
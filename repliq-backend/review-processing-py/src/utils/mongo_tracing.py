@@ -0,0 +1,47 @@
+import threading
+from pymongo import monitoring
+from opentelemetry.trace import SpanKind, Status, StatusCode
+from src.utils.tracing import get_tracer, tracing_enabled
+
+
+class MongoTracingListener(monitoring.CommandListener):
+    """Records a client span for every Mongo command while tracing is enabled.
+
+    Command events are raised in the task or thread issuing the command, so
+    each span is parented to the caller's current span.
+    """
+
+    def __init__(self):
+        self._spans = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(event):
+        return event.request_id, event.connection_id
+
+    def started(self, event):
+        if not tracing_enabled():
+            return
+        collection = event.command.get(event.command_name)
+        attributes = {"db.system": "mongodb", "db.operation.name": event.command_name, "db.namespace": event.database_name}
+        if isinstance(collection, str):
+            attributes["db.collection.name"] = collection
+        name = f"{event.command_name} {collection}" if isinstance(collection, str) else event.command_name
+        span = get_tracer().start_span(name, kind=SpanKind.CLIENT, attributes=attributes)
+        with self._lock:
+            self._spans[self._key(event)] = span
+
+    def _finish(self, event, error: str = None):
+        with self._lock:
+            span = self._spans.pop(self._key(event), None)
+        if span is None:
+            return
+        if error is not None:
+            span.set_status(Status(StatusCode.ERROR, error))
+        span.end()
+
+    def succeeded(self, event):
+        self._finish(event)
+
+    def failed(self, event):
+        self._finish(event, str(event.failure.get("errmsg", "Mongo command failed")) if isinstance(event.failure, dict) else "Mongo command failed")
@@ -0,0 +1,62 @@
+import os
+import threading
+from src.utils.ttl_cache import TTLCache
+
+
+class ProductCatalog:
+    """In-process cache of known ``productId`` values.
+
+    Hits answer without a Mongo round trip. A miss costs one indexed,
+    projected ``find_one``; unknown ids are remembered for a shorter TTL so a
+    client retrying a typo does not reach the database on every request.
+    ``refresh`` reloads the known ids with a single projected query.
+    """
+
+    _instance = None
+    _lock = threading.Lock()
+
+    @classmethod
+    def reset_instance(cls):
+        """Reset the singleton instance for test isolation."""
+        cls._instance = None
+
+    def __new__(cls, *args, **kwargs):
+        with cls._lock:
+            if not cls._instance:
+                instance = super(ProductCatalog, cls).__new__(cls)
+                max_size = int(os.getenv("PRODUCT_CACHE_MAX_ENTRIES", "10000"))
+                instance.known = TTLCache(max_size=max_size, ttl_seconds=float(os.getenv("PRODUCT_CACHE_TTL_SECONDS", "300")))
+                instance.unknown = TTLCache(max_size=max_size, ttl_seconds=float(os.getenv("PRODUCT_CACHE_NEGATIVE_TTL_SECONDS", "30")))
+                cls._instance = instance
+        return cls._instance
+
+    async def exists(self, db, product_id: str) -> bool:
+        if product_id in self.known:
+            return True
+        if product_id in self.unknown:
+            return False
+        product = await db.products.find_one({"productId": product_id}, {"_id": 1})
+        if product is None:
+            self.unknown.set(product_id, True)
+            return False
+        self.known.set(product_id, True)
+        return True
+
+    async def refresh(self, db) -> int:
+        """Replace the cached ids with the current ``products`` collection; returns how many were loaded."""
+        products = await db.products.find({}, {"productId": 1, "_id": 0}).limit(self.known.max_size).to_list(None)
+        self.known.clear()
+        self.unknown.clear()
+        for product in products:
+            if product.get("productId") is not None:
+                self.known.set(product["productId"], True)
+        return len(self.known)
+
+    def invalidate(self, product_id: str = None):
+        """Forget one id, or every cached id when ``product_id`` is omitted."""
+        if product_id is None:
+            self.known.clear()
+            self.unknown.clear()
+            return
+        self.known.pop(product_id)
+        self.unknown.pop(product_id)
@@ -0,0 +1,36 @@
+import os
+import threading
+from .ephemeral_session_service import EphemeralSessionService
+from .mongo_session_service import MongoSessionService
+
+SESSION_BACKENDS = {
+    "memory": lambda db_service: EphemeralSessionService(),
+    "mongo": lambda db_service: MongoSessionService(db_service=db_service),
+}
+
+_session_services = {}
+_lock = threading.Lock()
+
+
+def get_session_service(db_service=None):
+    """Return the shared session service selected by ``SESSION_BACKEND`` (memory or mongo)."""
+    backend = os.getenv("SESSION_BACKEND", "memory").lower()
+    if backend not in SESSION_BACKENDS:
+        raise ValueError("Invalid SESSION_BACKEND. Must be 'memory' or 'mongo'.")
+    service = _session_services.get(backend)
+    if service is None:
+        with _lock:
+            service = _session_services.get(backend)
+            if service is None:
+                service = SESSION_BACKENDS[backend](db_service)
+                _session_services[backend] = service
+    return service
+
+
+def close_session_services():
+    """Flush and drop every shared session service (used on shutdown and in tests)."""
+    with _lock:
+        services = list(_session_services.values())
+        _session_services.clear()
+    for service in services:
+        service.close()
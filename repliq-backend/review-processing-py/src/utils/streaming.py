@@ -0,0 +1,58 @@
+import json
+import logging
+from fastapi.responses import StreamingResponse
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+SSE_MEDIA_TYPE = "text/event-stream"
+
+
+def encode_event(event: dict, stream_format: str = "ndjson") -> str:
+    payload = json.dumps(event, ensure_ascii=False)
+    if stream_format == "sse":
+        return f"event: {event['type']}\ndata: {payload}\n\n"
+    return payload + "\n"
+
+
+def stream_events(events, result_key: str, stream_format: str = "ndjson") -> StreamingResponse:
+    """Stream ``delta``/``done`` events as NDJSON lines or Server-Sent Events.
+
+    The ``done`` event carries the final result under ``result_key``, matching
+    the body of the non-streaming endpoint. Failures end the stream with an
+    ``error`` event since the status code has already been sent.
+    """
+    async def body():
+        try:
+            async for event in events:
+                if event["type"] == "done":
+                    event = {"type": "done", result_key: event["result"]}
+                yield encode_event(event, stream_format)
+        except Exception as e:
+            logging.error(f"Streaming response failed: {e}")
+            yield encode_event({"type": "error", "error": str(e)}, stream_format)
+
+    media_type = SSE_MEDIA_TYPE if stream_format == "sse" else NDJSON_MEDIA_TYPE
+    return StreamingResponse(body(), media_type=media_type, headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+async def iter_lines(chunks, max_line_bytes: int = 4096):
+    """Yield the non-empty lines of a streamed request body as text.
+
+    Only one partial line is buffered between chunks; a line longer than
+    ``max_line_bytes`` raises ``ValueError`` so a body without newlines cannot
+    grow the buffer without bound.
+    """
+    buffer = b""
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        if len(buffer) > max_line_bytes:
+            raise ValueError(f"Line exceeds {max_line_bytes} bytes")
+        for line in lines:
+            if len(line) > max_line_bytes:
+                raise ValueError(f"Line exceeds {max_line_bytes} bytes")
+            text = line.decode("utf-8").strip()
+            if text:
+                yield text
+    text = buffer.decode("utf-8").strip()
+    if text:
+        yield text
@@ -0,0 +1,72 @@
+OPEN_TAG = "<think>"
+CLOSE_TAG = "</think>"
+
+
+class ThinkTagStripper:
+    """Remove ``<think>...</think>`` blocks from text that arrives in chunks.
+
+    Equivalent to ``re.sub(r"<think>.*?</think>", "", text, flags=re.DOTALL).strip()``
+    on the concatenated stream, but emits visible text as soon as it can no
+    longer be the start of a tag. Leading whitespace is dropped and trailing
+    whitespace is held back until more visible text follows.
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self.in_think = False
+        self.started = False
+        self.pending_space = ""
+        self.search_from = 0
+
+    @staticmethod
+    def _partial_tag_length(text: str, tag: str) -> int:
+        """Length of the longest suffix of ``text`` that is a prefix of ``tag``."""
+        for length in range(min(len(text), len(tag) - 1), 0, -1):
+            if tag.startswith(text[-length:]):
+                return length
+        return 0
+
+    def _emit(self, text: str) -> str:
+        if not self.started:
+            text = text.lstrip()
+            if not text:
+                return ""
+            self.started = True
+        text = self.pending_space + text
+        stripped = text.rstrip()
+        self.pending_space = text[len(stripped):]
+        return stripped
+
+    def feed(self, chunk: str) -> str:
+        self.buffer += chunk
+        output = []
+        while self.buffer:
+            if self.in_think:
+                # Reasoning is held until its closing tag arrives, because an
+                # unclosed block is kept verbatim, exactly as the regex does
+                end = self.buffer.find(CLOSE_TAG, self.search_from)
+                if end == -1:
+                    self.search_from = max(0, len(self.buffer) - len(CLOSE_TAG) + 1)
+                    break
+                self.buffer = self.buffer[end + len(CLOSE_TAG):]
+                self.in_think = False
+            else:
+                start = self.buffer.find(OPEN_TAG)
+                if start == -1:
+                    keep = self._partial_tag_length(self.buffer, OPEN_TAG)
+                    visible, self.buffer = self.buffer[:len(self.buffer) - keep], self.buffer[len(self.buffer) - keep:]
+                    output.append(self._emit(visible))
+                    break
+                output.append(self._emit(self.buffer[:start]))
+                self.buffer = self.buffer[start:]
+                self.search_from = len(OPEN_TAG)
+                self.in_think = True
+        return "".join(output)
+
+    def flush(self) -> str:
+        """Emit what is left at the end of the stream, including an unclosed think block."""
+        rest, self.buffer = self.buffer, ""
+        self.in_think = False
+        text = self._emit(rest)
+        self.pending_space = ""
+        return text
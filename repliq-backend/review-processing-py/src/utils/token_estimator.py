@@ -0,0 +1,5 @@
+def estimate_tokens(text: str) -> int:
+    """Rough token count: about four ASCII characters or one CJK character per token."""
+    text = text or ""
+    ascii_chars = sum(1 for ch in text if ord(ch) < 128)
+    return ascii_chars // 4 + (len(text) - ascii_chars) + 1
@@ -0,0 +1,211 @@
+import json
+import logging
+import os
+import threading
+from opentelemetry import context as otel_context, propagate, trace
+from opentelemetry.sdk.resources import Resource
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter, SpanExporter, SpanExportResult
+from opentelemetry.trace import SpanKind, Status, StatusCode
+
+TRACER_NAME = "repliq.review_processing"
+
+_provider = None
+_lock = threading.Lock()
+
+
+def _otlp_value(value) -> dict:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    if isinstance(value, (list, tuple)):
+        return {"arrayValue": {"values": [_otlp_value(item) for item in value]}}
+    return {"stringValue": str(value)}
+
+
+def _otlp_attributes(attributes) -> list:
+    return [{"key": key, "value": _otlp_value(value)} for key, value in (attributes or {}).items()]
+
+
+def encode_otlp_json(spans) -> dict:
+    """Encode finished spans as an OTLP/JSON ``ExportTraceServiceRequest``."""
+    resources = {}
+    for span in spans:
+        resource = resources.setdefault(id(span.resource), {"resource": span.resource, "scopes": {}})
+        scope = span.instrumentation_scope
+        scope_key = (scope.name, scope.version) if scope else ("", None)
+        context = span.get_span_context()
+        resource["scopes"].setdefault(scope_key, []).append({
+            "traceId": format(context.trace_id, "032x"),
+            "spanId": format(context.span_id, "016x"),
+            "parentSpanId": format(span.parent.span_id, "016x") if span.parent else "",
+            "name": span.name,
+            "kind": span.kind.value + 1,  # OTLP enums start at SPAN_KIND_INTERNAL = 1
+            "startTimeUnixNano": str(span.start_time),
+            "endTimeUnixNano": str(span.end_time),
+            "attributes": _otlp_attributes(span.attributes),
+            "events": [
+                {"timeUnixNano": str(event.timestamp), "name": event.name, "attributes": _otlp_attributes(event.attributes)}
+                for event in span.events
+            ],
+            "links": [
+                {"traceId": format(link.context.trace_id, "032x"), "spanId": format(link.context.span_id, "016x"), "attributes": _otlp_attributes(link.attributes)}
+                for link in span.links
+            ],
+            "status": {"code": span.status.status_code.value, **({"message": span.status.description} if span.status.description else {})},
+        })
+    return {
+        "resourceSpans": [
+            {
+                "resource": {"attributes": _otlp_attributes(entry["resource"].attributes)},
+                "scopeSpans": [
+                    {"scope": {"name": name, **({"version": version} if version else {})}, "spans": encoded}
+                    for (name, version), encoded in entry["scopes"].items()
+                ],
+            }
+            for entry in resources.values()
+        ]
+    }
+
+
+class OTLPJsonFileExporter(SpanExporter):
+    """Appends each export batch as one OTLP/JSON line, readable offline or by a collector's file receiver."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def export(self, spans) -> SpanExportResult:
+        try:
+            line = json.dumps(encode_otlp_json(spans), ensure_ascii=False)
+            with self._lock, open(self.path, "a", encoding="utf-8") as handle:
+                handle.write(line + "\n")
+            return SpanExportResult.SUCCESS
+        except Exception as e:
+            logging.error(f"Failed to write spans to {self.path}: {e}")
+            return SpanExportResult.FAILURE
+
+
+def build_exporter(name: str):
+    """Exporter for ``OTEL_TRACES_EXPORTER``: ``none``, ``console``, ``file`` or ``otlp``."""
+    if name == "none":
+        return None
+    if name == "console":
+        return ConsoleSpanExporter()
+    if name == "file":
+        return OTLPJsonFileExporter(os.getenv("OTEL_TRACES_FILE", "traces.otlp.jsonl"))
+    if name == "otlp":
+        try:
+            from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        except ImportError:
+            logging.warning("OTEL_TRACES_EXPORTER=otlp needs opentelemetry-exporter-otlp-proto-http; tracing disabled")
+            return None
+        return OTLPSpanExporter()
+    raise ValueError(f"Unsupported OTEL_TRACES_EXPORTER: {name}")
+
+
+def configure_tracing(exporter=None, set_global: bool = True) -> bool:
+    """Install a tracer provider exporting to ``exporter`` or the one selected by ``OTEL_TRACES_EXPORTER``.
+
+    Returns whether tracing is enabled. Setting the global provider also
+    exports the spans google-adk records for agent and model calls.
+    """
+    global _provider
+    with _lock:
+        if _provider is not None:
+            return True
+        if exporter is None:
+            exporter = build_exporter(os.getenv("OTEL_TRACES_EXPORTER", "none").lower())
+        if exporter is None:
+            return False
+        provider = TracerProvider(resource=Resource.create({"service.name": os.getenv("OTEL_SERVICE_NAME", "review-processing")}))
+        provider.add_span_processor(BatchSpanProcessor(exporter))
+        if set_global:
+            trace.set_tracer_provider(provider)
+        _provider = provider
+    logging.info(f"Tracing enabled with {type(exporter).__name__}")
+    return True
+
+
+def shutdown_tracing():
+    """Flush pending spans and disable tracing."""
+    global _provider
+    with _lock:
+        provider, _provider = _provider, None
+    if provider is not None:
+        provider.shutdown()
+
+
+def tracing_enabled() -> bool:
+    return _provider is not None
+
+
+def get_tracer():
+    return (_provider or trace.get_tracer_provider()).get_tracer(TRACER_NAME)
+
+
+def record_error(span, error: BaseException):
+    span.record_exception(error)
+    span.set_status(Status(StatusCode.ERROR, str(error)))
+
+
+def bind_context(coro):
+    """Run ``coro`` under the caller's trace context even when it is scheduled on another loop or thread."""
+    ctx = otel_context.get_current()
+
+    async def run():
+        token = otel_context.attach(ctx)
+        try:
+            return await coro
+        finally:
+            otel_context.detach(token)
+    return run()
+
+
+def inject_context() -> dict:
+    """Current trace context as a W3C ``traceparent`` carrier (empty when tracing is off)."""
+    carrier = {}
+    if tracing_enabled():
+        propagate.inject(carrier)
+    return carrier
+
+
+def link_from_carrier(carrier: dict):
+    """A span link to the context stored by ``inject_context``, or ``None``."""
+    if not carrier:
+        return None
+    span_context = trace.get_current_span(propagate.extract(carrier)).get_span_context()
+    return trace.Link(span_context) if span_context.is_valid else None
+
+
+class TracingMiddleware:
+    """ASGI middleware wrapping each HTTP request, including streamed bodies, in a server span."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not tracing_enabled():
+            await self.app(scope, receive, send)
+            return
+        headers = {key.decode("latin-1"): value.decode("latin-1") for key, value in scope.get("headers", [])}
+        method = scope.get("method", "GET")
+        attributes = {"http.request.method": method, "url.path": scope.get("path", "")}
+        with get_tracer().start_as_current_span(f"{method} {scope.get('path', '')}", context=propagate.extract(headers), kind=SpanKind.SERVER, attributes=attributes) as span:
+            async def send_with_status(message):
+                if message["type"] == "http.response.start":
+                    span.set_attribute("http.response.status_code", message["status"])
+                    if message["status"] >= 500:
+                        span.set_status(Status(StatusCode.ERROR))
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_with_status)
+            finally:
+                route = scope.get("route")
+                if getattr(route, "path", None):
+                    span.set_attribute("http.route", route.path)
+                    span.update_name(f"{method} {route.path}")
@@ -0,0 +1,65 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """Thread-safe LRU cache bounded by entry count and time-to-live."""
+
+    def __init__(self, max_size: int = 1000, ttl_seconds: float = 300.0):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return default
+            value, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl_seconds: float = None):
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def pop(self, key, default=None):
+        with self._lock:
+            entry = self._data.pop(key, None)
+        return default if entry is None else entry[0]
+
+    def __contains__(self, key):
+        return self.get(key, _MISSING) is not _MISSING
+
+    def __len__(self):
+        return len(self._data)
+
+    def evict_expired(self) -> int:
+        """Drop every expired entry and return how many were removed."""
+        now = time.monotonic()
+        with self._lock:
+            expired = [key for key, (_, expires_at) in self._data.items() if expires_at <= now]
+            for key in expired:
+                del self._data[key]
+        return len(expired)
+
+    def values(self):
+        now = time.monotonic()
+        with self._lock:
+            return [value for value, expires_at in self._data.values() if expires_at > now]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+_MISSING = object()
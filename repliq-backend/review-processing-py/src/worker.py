@@ -0,0 +1,46 @@
+import asyncio
+import logging
+import os
+import signal
+from src.jobs.job_queue import JobQueue
+from src.jobs.worker import JobWorker
+from src.jobs.review_watcher import ReviewWatcher, ReviewWatcherRunner
+from src.utils.metrics import MetricsSnapshotWriter
+from src.utils.tracing import configure_tracing, shutdown_tracing
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s %(levelname)s %(threadName)s %(thread)d %(message)s",
+    force=True
+)
+
+# Standalone entry point for review job workers: `python -m src.worker`.
+# Runs JOB_WORKER_COUNT consumers against the same queue as the API process,
+# plus the review watcher when REVIEW_WATCHER_ENABLED is true.
+
+
+async def main():
+    worker_count = int(os.getenv("JOB_WORKER_COUNT", "2"))
+    await JobQueue().ensure_indexes()
+    workers = [JobWorker() for _ in range(worker_count)]
+    # The watcher holds a lease, so enabling it here and in the API runs one instance
+    if ReviewWatcherRunner.enabled():
+        workers.append(ReviewWatcher())
+
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, lambda: [worker.stop() for worker in workers])
+
+    await asyncio.gather(*(worker.run() for worker in workers))
+
+
+if __name__ == "__main__":
+    configure_tracing()
+    # With METRICS_MULTIPROC_DIR shared with the API, its /metrics includes these workers
+    metrics_writer = MetricsSnapshotWriter()
+    metrics_writer.start()
+    try:
+        asyncio.run(main())
+    finally:
+        metrics_writer.stop()
+        shutdown_tracing()
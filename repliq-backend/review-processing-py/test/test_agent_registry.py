@@ -0,0 +1,62 @@
+import threading
+import pytest
+from src.agents.agent_registry import AgentRegistry
+
+
+class DummyAgent:
+    PROMPT_VERSION = "v1"
+    built = 0
+    def __init__(self, model=None, db_service=None):
+        type(self).built += 1
+        self.model = model
+        self.db_service = db_service
+
+class OtherAgent(DummyAgent):
+    PROMPT_VERSION = "v2"
+
+@pytest.fixture
+def registry():
+    AgentRegistry.reset_instance()
+    DummyAgent.built = 0
+    yield AgentRegistry()
+    AgentRegistry.reset_instance()
+
+def test_get_builds_once(registry):
+    first = registry.get(DummyAgent)
+    second = AgentRegistry().get(DummyAgent)
+    assert first is second
+    assert DummyAgent.built == 1
+
+def test_key_includes_model_and_prompt_version(registry, monkeypatch):
+    monkeypatch.setenv("MODEL_NAME", "model-a")
+    a = registry.get(DummyAgent)
+    b = registry.get(DummyAgent, model="model-b")
+    assert a is not b
+    assert a.model == "model-a" and b.model == "model-b"
+    assert AgentRegistry.make_key(OtherAgent, "m") == (OtherAgent, "m", "v2")
+
+def test_concurrent_get_is_thread_safe(registry):
+    results = []
+    def worker():
+        results.append(registry.get(DummyAgent))
+    threads = [threading.Thread(target=worker) for _ in range(20)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert DummyAgent.built == 1
+    assert all(r is results[0] for r in results)
+
+def test_warm_up_and_invalidate(registry):
+    built = registry.warm_up([DummyAgent, OtherAgent])
+    assert len(built) == 2 and len(registry) == 2
+    assert registry.invalidate(OtherAgent) == 1
+    assert len(registry) == 1
+    assert registry.invalidate() == 1
+    assert len(registry) == 0
+
+def test_warm_up_logs_failures(registry):
+    class Broken:
+        def __init__(self, **kwargs):
+            raise RuntimeError("no model")
+    assert registry.warm_up([Broken]) == []
@@ -0,0 +1,38 @@
+import asyncio
+import json
+import pytest
+from src.agents.ai_agents.ai_agent_review_batch_analyzer import AIAgentReviewBatchAnalyzer, estimate_tokens, parse_batch_analysis
+
+ANALYSIS = {"sentiment": "Positive", "issues": [], "new_requests": []}
+
+
+@pytest.fixture
+def agent(monkeypatch):
+    monkeypatch.setenv("ANALYZER_BATCH_SIZE", "3")
+    monkeypatch.setenv("ANALYZER_BATCH_TOKEN_BUDGET", "50")
+    return AIAgentReviewBatchAnalyzer()
+
+def test_estimate_tokens_counts_cjk_per_character():
+    assert estimate_tokens("good app") == 3
+    assert estimate_tokens("良いアプリ") == 6
+
+def test_pack_respects_size_and_token_budget(agent):
+    reviews = [(f"r{i}", "short review") for i in range(7)] + [("long", "長" * 80), ("after", "ok")]
+    batches = agent.pack(reviews)
+    assert [len(batch) for batch in batches] == [3, 3, 1, 1, 1]
+    assert batches[3] == [("long", "長" * 80)]
+
+def test_parse_marks_missing_and_malformed_entries():
+    response = json.dumps([{"id": "1", **ANALYSIS}, {"id": "2", "sentiment": "Negative"}, {"id": "9", **ANALYSIS}])
+    assert parse_batch_analysis(response, ["1", "2", "3"]) == {"1": ANALYSIS, "2": None, "3": None}
+    assert parse_batch_analysis("not json", ["1"]) == {"1": None}
+
+def test_perform_task_maps_local_ids_back(agent, monkeypatch):
+    sent = []
+    async def fake_run_agent(input_data, app_name):
+        sent.append(json.loads(input_data))
+        return json.dumps([{"id": "2", **ANALYSIS}, {"id": "1", **ANALYSIS, "sentiment": "Negative"}])
+    monkeypatch.setattr(agent, "run_agent", fake_run_agent)
+    result = asyncio.run(agent.analyze_many([("srcA", "bad"), ("srcB", "good")]))
+    assert sent == [[{"id": "1", "text": "bad"}, {"id": "2", "text": "good"}]]
+    assert result == {"srcA": {**ANALYSIS, "sentiment": "Negative"}, "srcB": ANALYSIS}
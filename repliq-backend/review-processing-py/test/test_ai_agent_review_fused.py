@@ -0,0 +1,21 @@
+import json
+from src.agents.ai_agents.ai_agent_review_fused import parse_fused_response, is_complete_fused_result
+
+ANALYSIS = {"sentiment": "Negative", "issues": [], "new_requests": []}
+
+
+def test_parse_complete_response():
+    response = json.dumps({"enReview": " It crashes ", "analysis": ANALYSIS, "ai_reply": "ごめんなさい", "en_reply": "Sorry"})
+    result = parse_fused_response(f"<think>plan</think>{response}")
+    assert result == {"enReview": "It crashes", "analysis": ANALYSIS, "reply": {"ai_reply": "ごめんなさい", "en_reply": "Sorry"}}
+    assert is_complete_fused_result(result)
+
+def test_parse_marks_invalid_fields_only():
+    response = json.dumps({"enReview": "It crashes", "analysis": {"sentiment": "Negative"}, "ai_reply": "ごめんなさい"})
+    result = parse_fused_response(response)
+    assert result == {"enReview": "It crashes", "analysis": None, "reply": None}
+    assert not is_complete_fused_result(result)
+
+def test_parse_invalid_json():
+    assert parse_fused_response("not json") == {"enReview": None, "analysis": None, "reply": None}
+    assert parse_fused_response(None) == {"enReview": None, "analysis": None, "reply": None}
@@ -0,0 +1,51 @@
+import asyncio
+import pytest
+from src.utils.async_db_service import AsyncDatabaseService
+from src.utils.db_service import mongo_client_options
+from src.utils.mongo_pool_stats import PoolStatsListener
+
+
+@pytest.fixture
+def async_db(monkeypatch):
+    monkeypatch.setenv("MONGODB_URI", "mongodb://localhost:27017/testdb")
+    AsyncDatabaseService.reset_instance()
+    yield AsyncDatabaseService()
+    AsyncDatabaseService.reset_instance()
+
+def test_client_options_from_env(monkeypatch):
+    monkeypatch.setenv("MONGODB_MAX_POOL_SIZE", "7")
+    monkeypatch.setenv("MONGODB_WAIT_QUEUE_TIMEOUT_MS", "250")
+    options = mongo_client_options()
+    assert options["maxPoolSize"] == 7
+    assert options["waitQueueTimeoutMS"] == 250
+    assert "socketTimeoutMS" not in options
+
+def test_one_client_per_event_loop(async_db):
+    async def get_client():
+        first = async_db.get_client()
+        assert async_db.get_client() is first
+        db = async_db.db
+        assert db.name == "testdb"
+        await async_db.close()
+        return id(first)
+    assert asyncio.run(get_client()) != asyncio.run(get_client())
+
+def test_get_client_requires_running_loop(async_db):
+    with pytest.raises(RuntimeError):
+        async_db.get_client()
+
+def test_pool_statistics(async_db):
+    stats = async_db.pool_statistics()
+    assert stats["max_pool_size"] == mongo_client_options()["maxPoolSize"]
+    assert stats["in_use"] == 0
+
+def test_pool_stats_listener_counts_checkouts():
+    listener = PoolStatsListener()
+    listener.connection_created(None)
+    listener.connection_checked_out(None)
+    listener.connection_checked_out(None)
+    listener.connection_checked_in(None)
+    snapshot = listener.snapshot()
+    assert snapshot["in_use"] == 1
+    assert snapshot["checkouts"] == 2
+    assert snapshot["open_connections"] == 1
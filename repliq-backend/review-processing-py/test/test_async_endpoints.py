@@ -0,0 +1,89 @@
+import asyncio
+import time
+import anyio.to_thread
+import httpx
+from fastapi import FastAPI
+import src.tasks.translation_tasks as translation_tasks
+import src.tasks.review_analysis_tasks as review_analysis_tasks
+import src.tasks.reply_generation_tasks as reply_generation_tasks
+from src.controllers.translation_controller import TranslationController
+from src.controllers.review_analysis_controller import ReviewAnalysisController
+from src.controllers.reply_generator_controller import ReplyGeneratorController
+from src.utils.async_runtime import AsyncRuntime
+
+LLM_LATENCY = 0.2
+
+
+class SlowAgent:
+    in_flight = 0
+    peak = 0
+    loops = set()
+    async def perform_task(self, input_data, bypass_cache=False):
+        SlowAgent.loops.add(asyncio.get_running_loop())
+        SlowAgent.in_flight += 1
+        SlowAgent.peak = max(SlowAgent.peak, SlowAgent.in_flight)
+        await asyncio.sleep(LLM_LATENCY)
+        SlowAgent.in_flight -= 1
+        return f"done: {input_data}"
+
+class DummyRegistry:
+    def get(self, agent_class, db_service=None):
+        return SlowAgent()
+
+def build_app(monkeypatch):
+    for module in (translation_tasks, review_analysis_tasks, reply_generation_tasks):
+        monkeypatch.setattr(module, "AgentRegistry", DummyRegistry)
+    SlowAgent.in_flight = SlowAgent.peak = 0
+    SlowAgent.loops = set()
+    app = FastAPI()
+    app.include_router(TranslationController().router)
+    app.include_router(ReviewAnalysisController().router)
+    app.include_router(ReplyGeneratorController().router)
+
+    @app.get("/health")
+    def health():
+        return {"status": "ok"}
+    return app
+
+def test_endpoints_are_not_bounded_by_the_threadpool(monkeypatch):
+    app = build_app(monkeypatch)
+    requests = 60
+
+    async def main():
+        # A single worker thread: sync handlers would run strictly one at a time
+        anyio.to_thread.current_default_thread_limiter().total_tokens = 1
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            calls = []
+            for i in range(requests):
+                if i % 3 == 0:
+                    calls.append(client.post("/translate", json={"japanese_text": f"t{i}"}))
+                elif i % 3 == 1:
+                    calls.append(client.post("/analyze-review", json={"review_text": f"r{i}"}))
+                else:
+                    calls.append(client.post("/generate-reply", json={"customer_review": f"c{i}", "customer_name": "Ken"}))
+            started = time.monotonic()
+            pending = asyncio.gather(*calls)
+            await asyncio.sleep(LLM_LATENCY / 4)
+            health = await client.get("/health")
+            health_latency = time.monotonic() - started
+            responses = await pending
+            return responses, health, health_latency, time.monotonic() - started
+
+    responses, health, health_latency, elapsed = asyncio.run(main())
+    assert all(r.status_code == 200 for r in responses)
+    assert responses[0].json() == {"translated_text": "done: t0"}
+    assert SlowAgent.peak == requests
+    assert elapsed < LLM_LATENCY * requests / 5
+    assert health.status_code == 200 and health_latency < LLM_LATENCY
+
+def test_sync_task_wrappers_still_work(monkeypatch):
+    AsyncRuntime.reset_instance()
+    build_app(monkeypatch)
+    try:
+        assert translation_tasks.translation_flow("こんにちは") == "done: こんにちは"
+        assert review_analysis_tasks.review_analysis_flow("good") == "done: good"
+        assert reply_generation_tasks.reply_generation_flow("good", "Ken") == "done: Review: good\nName: Ken"
+        # Every call reuses the runtime loop, and with it that loop's Mongo client
+        assert SlowAgent.loops == set(AsyncRuntime().loops)
+    finally:
+        AsyncRuntime.reset_instance()
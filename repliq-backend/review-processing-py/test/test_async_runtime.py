@@ -0,0 +1,73 @@
+import asyncio
+import threading
+import pytest
+from src.utils.async_runtime import AsyncRuntime
+
+
+@pytest.fixture
+def runtime():
+    AsyncRuntime.reset_instance()
+    rt = AsyncRuntime()
+    rt.start(num_loops=2)
+    yield rt
+    AsyncRuntime.reset_instance()
+
+def test_singleton_instance(runtime):
+    assert AsyncRuntime() is runtime
+    assert runtime.is_running
+    assert len(runtime.threads) == 2
+
+def test_run_executes_on_runtime_thread(runtime):
+    async def which_thread():
+        return threading.current_thread().name
+    assert runtime.run(which_thread()).startswith("review-runtime-")
+
+def test_many_coroutines_share_fixed_threads(runtime):
+    seen = set()
+
+    async def work():
+        seen.add(threading.current_thread().name)
+        await asyncio.sleep(0.01)
+
+    async def fan_out():
+        await asyncio.gather(*(work() for _ in range(500)))
+
+    runtime.run(fan_out())
+    assert len(seen) == 1
+    assert threading.active_count() < 50
+
+def test_run_propagates_exceptions(runtime):
+    async def boom():
+        raise ValueError("boom")
+    with pytest.raises(ValueError):
+        runtime.run(boom())
+
+def test_run_from_loop_thread_raises(runtime):
+    async def nested():
+        return runtime.run(asyncio.sleep(0))
+    with pytest.raises(RuntimeError):
+        runtime.run(nested())
+
+def test_submit_starts_lazily():
+    AsyncRuntime.reset_instance()
+    rt = AsyncRuntime()
+    assert not rt.is_running
+    assert rt.submit(asyncio.sleep(0, result=42)).result(timeout=5) == 42
+    assert rt.is_running
+    rt.stop()
+    assert not rt.is_running
+    AsyncRuntime.reset_instance()
+
+def test_log_and_run_decorator_async_returns_none_on_error():
+    from src.tasks.process_review_tasks import log_and_run_decorator
+
+    @log_and_run_decorator
+    async def failing():
+        raise RuntimeError("fail")
+
+    @log_and_run_decorator
+    async def ok():
+        return "ok"
+
+    assert asyncio.run(failing()) is None
+    assert asyncio.run(ok()) == "ok"
@@ -0,0 +1,203 @@
+import asyncio
+import pytest
+from src.agents.model_tiering import ModelTieringPolicy
+from src.tasks.batch_review_pipeline import BatchReviewPipeline
+from src.tasks.near_duplicate_index import NearDuplicateIndex
+from src.tasks.process_review_tasks import ReviewProcessor
+
+
+class DummyCursor:
+    def __init__(self, items):
+        self._items = items
+    async def to_list(self, length=None):
+        return list(self._items)
+    def __aiter__(self):
+        async def iterate():
+            for item in self._items:
+                yield item
+        return iterate()
+
+def matches(item, query):
+    for field, condition in query.items():
+        if isinstance(condition, dict):
+            if item.get(field) not in condition["$in"]:
+                return False
+        elif item.get(field) != condition:
+            return False
+    return True
+
+class DummyCollection:
+    def __init__(self, db, data=None):
+        self.db = db
+        self._data = data or []
+        self.written = []
+    def find(self, query, projection=None):
+        self.db.round_trips += 1
+        return DummyCursor([item for item in self._data if matches(item, query)])
+    async def bulk_write(self, operations, ordered=True):
+        self.db.round_trips += 1
+        self.written.extend({**op._filter, **op._doc["$setOnInsert"]} for op in operations)
+    async def delete_many(self, query):
+        self.db.round_trips += 1
+        self._data = [item for item in self._data if not matches(item, query)]
+
+class DummyDB:
+    def __init__(self, reviews=None, processed=None):
+        self.round_trips = 0
+        self.reviews = DummyCollection(self, reviews)
+        self.processed_review = DummyCollection(self, processed)
+        self.review_stage_state = DummyCollection(self)
+    def __getitem__(self, name):
+        return getattr(self, name)
+
+class DummyService:
+    def __init__(self, db):
+        self.db = db
+
+class DummyProcessor:
+    def __init__(self, fail_ids=()):
+        self.fail_ids = set(fail_ids)
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.reply_only = []
+        self.batch_analysis_enabled = False
+        self.tiering = ModelTieringPolicy(enabled=False)
+    def route_review(self, review_text):
+        return self.tiering.decide(review_text)
+    async def run_missing_stages(self, review_text, customer_name, completed=None, match=None, language=None, tier=None, analysis_source=None, on_stage=None):
+        if match is not None:
+            self.reply_only.append(customer_name)
+            return {"translation": match["enReview"], "reply": {"ai_reply": "personal", "en_reply": "personal"}, "analysis": match["analysis"]}, {}
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(0)
+        self.in_flight -= 1
+        results = {"translation": "en"}
+        analysis = await analysis_source() if analysis_source else {"sentiment": "Positive"}
+        if analysis is not None:
+            results["analysis"] = analysis
+        if customer_name not in self.fail_ids:
+            results["reply"] = {"ai_reply": "ok", "en_reply": "ok"}
+        return results, {stage: "no result" for stage in ("translation", "reply", "analysis") if stage not in results}
+
+def make_review(i, title="T", body="B"):
+    return {
+        "sourceReviewId": f"r{i}",
+        "productId": "p1",
+        "source": "S",
+        "rawReview": {"attributes": {"title": title, "body": body, "reviewerNickname": f"r{i}", "createdDate": "D"}},
+    }
+
+@pytest.fixture(autouse=True)
+def fresh_near_duplicate_index():
+    NearDuplicateIndex.reset_instance()
+    yield
+    NearDuplicateIndex.reset_instance()
+
+def test_batch_uses_constant_round_trips():
+    db = DummyDB(reviews=[make_review(i) for i in range(500)])
+    processor = DummyProcessor()
+    pipeline = BatchReviewPipeline(processor=processor, db_service=DummyService(db), concurrency=8, write_chunk_size=100)
+    statuses = asyncio.run(pipeline.run([f"r{i}" for i in range(500)]))
+    assert set(statuses.values()) == {"processed"}
+    assert len(db.processed_review.written) == 500
+    # two lookups, one stage checkpoint load, one near-duplicate index load for the product, five chunked writes
+    assert db.round_trips == 4 + 5
+    assert processor.max_in_flight <= 8
+
+def test_batch_statuses():
+    db = DummyDB(
+        reviews=[make_review(1), make_review(2), make_review(3)],
+        processed=[{"orgReviewId": "r1", "isProcessed": True}],
+    )
+    pipeline = BatchReviewPipeline(processor=DummyProcessor(fail_ids={"r3"}), db_service=DummyService(db))
+    statuses = asyncio.run(pipeline.run(["r1", "r2", "r3", "r4", "r2"]))
+    assert statuses == {"r1": "already_processed", "r2": "processed", "r3": "failed", "r4": "not_found"}
+    assert [doc["orgReviewId"] for doc in db.processed_review.written] == ["r2"]
+
+def test_batch_requires_database():
+    pipeline = BatchReviewPipeline(processor=DummyProcessor(), db_service=DummyService(None))
+    with pytest.raises(RuntimeError):
+        asyncio.run(pipeline.run(["r1"]))
+
+def test_near_duplicates_reuse_translation_and_analysis():
+    processed = {
+        "orgReviewId": "r0", "productId": "p1", "isProcessed": True,
+        "rawReview": {"title": "Great app!!", "body": "Works really well 😀"},
+        "enReview": "Great app! Works really well", "analysis": {"sentiment": "Positive", "issues": [], "new_requests": []},
+    }
+    db = DummyDB(
+        reviews=[make_review(1, "great app", "works really well"), make_review(2, "Crashes on start", "Cannot log in")],
+        processed=[processed],
+    )
+    processor = DummyProcessor()
+    pipeline = BatchReviewPipeline(processor=processor, db_service=DummyService(db))
+    statuses = asyncio.run(pipeline.run(["r1", "r2"]))
+    assert statuses == {"r1": "processed", "r2": "processed"}
+    assert processor.reply_only == ["r1"]
+    written = {doc["orgReviewId"]: doc for doc in db.processed_review.written}
+    assert written["r1"]["enReview"] == processed["enReview"]
+    assert written["r1"]["analysis"] == processed["analysis"]
+    assert written["r1"]["nearDuplicateOf"]["orgReviewId"] == "r0"
+    assert "nearDuplicateOf" not in written["r2"]
+    assert len(NearDuplicateIndex().products["p1"]) == 3
+
+class DummyBatchAnalyzer:
+    concurrency = 4
+    def __init__(self, pack_size):
+        self.pack_size = pack_size
+    def pack(self, reviews):
+        return [reviews[start:start + self.pack_size] for start in range(0, len(reviews), self.pack_size)]
+
+class DummyBatchProcessor(DummyProcessor):
+    start_packed_analysis = ReviewProcessor.start_packed_analysis
+    def __init__(self, pack_size=8, delays=None):
+        super().__init__()
+        self.batch_analysis_enabled = True
+        self.pack_size = pack_size
+        self.delays = delays or {}
+        self.batched = []
+        self.tiers = []
+        self.events = []
+    def batch_analyzer(self, tier=None):
+        return DummyBatchAnalyzer(self.pack_size)
+    async def analyze_reviews_batched(self, reviews, tier=None, limiter=None):
+        ids = [review_id for review_id, _ in reviews]
+        self.batched.append(ids)
+        self.tiers.append(tier)
+        await asyncio.sleep(self.delays.get(ids[0], 0))
+        self.events.append(f"pack {ids[0]}")
+        return {review_id: {"sentiment": "Positive"} for review_id in ids if review_id != "r3"}
+    async def run_missing_stages(self, review_text, customer_name, *args, **kwargs):
+        results = await super().run_missing_stages(review_text, customer_name, *args, **kwargs)
+        self.events.append(f"review {customer_name}")
+        return results
+
+def test_batch_analysis_is_shared_across_reviews():
+    db = DummyDB(reviews=[make_review(i) for i in range(1, 4)])
+    processor = DummyBatchProcessor()
+    pipeline = BatchReviewPipeline(processor=processor, db_service=DummyService(db))
+    statuses = asyncio.run(pipeline.run(["r1", "r2", "r3"]))
+    assert processor.batched == [["r1", "r2", "r3"]]
+    assert statuses == {"r1": "processed", "r2": "processed", "r3": "failed"}
+    assert all(doc["analysis"] == {"sentiment": "Positive"} for doc in db.processed_review.written)
+
+def test_batch_analysis_is_packed_per_model_tier():
+    db = DummyDB(reviews=[make_review(1), make_review(2, body="The playlist screen is slow to load. " * 10), make_review(3)])
+    processor = DummyBatchProcessor()
+    processor.tiering = ModelTieringPolicy(enabled=True, small_model="mini", large_model="large")
+    pipeline = BatchReviewPipeline(processor=processor, db_service=DummyService(db))
+    asyncio.run(pipeline.run(["r1", "r2", "r3"]))
+    assert dict(zip(processor.tiers, processor.batched)) == {"small": ["r1", "r3"], "large": ["r2"]}
+    routing = {doc["orgReviewId"]: doc["modelRouting"] for doc in db.processed_review.written}
+    assert routing["r1"]["model"] == "mini" and routing["r2"]["reason"] == "long"
+
+def test_reviews_only_wait_for_their_own_analysis_pack():
+    db = DummyDB(reviews=[make_review(i) for i in range(1, 5)])
+    processor = DummyBatchProcessor(pack_size=2, delays={"r3": 0.1})
+    pipeline = BatchReviewPipeline(processor=processor, db_service=DummyService(db))
+    statuses = asyncio.run(pipeline.run(["r1", "r2", "r3", "r4"]))
+    assert processor.batched == [["r1", "r2"], ["r3", "r4"]]
+    assert statuses == {"r1": "processed", "r2": "processed", "r3": "failed", "r4": "processed"}
+    # The first pack's reviews finish while the slow second pack is still running
+    assert processor.events.index("review r2") < processor.events.index("pack r3")
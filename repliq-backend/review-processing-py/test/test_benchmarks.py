@@ -0,0 +1,62 @@
+import asyncio
+import json
+from fastapi.testclient import TestClient
+from pymongo import UpdateOne
+from benchmarks.fake_llm_server import FakeLLMConfig, canned_response, classify_agent, create_fake_llm_app
+from benchmarks.memory_mongo import MemoryDatabase
+from benchmarks.run_benchmark import compare_results, make_reviews, percentiles
+from src.agents.ai_agents.ai_agent_review_batch_analyzer import parse_batch_analysis
+from src.agents.ai_agents.ai_agent_review_fused import is_complete_fused_result, parse_fused_response
+from src.agents.prompts.ai_agent_review_batch_analyzer.v1 import PROMPT as BATCH_PROMPT
+from src.agents.prompts.ai_agent_review_analyzer.v1 import PROMPT as ANALYZER_PROMPT
+from src.agents.prompts.ai_agent_translator.v1 import PROMPT as TRANSLATOR_PROMPT
+
+
+def test_agents_are_recognized_from_their_prompts():
+    assert classify_agent([{"role": "system", "content": BATCH_PROMPT}]) == "batch_analyzer"
+    assert classify_agent([{"role": "system", "content": ANALYZER_PROMPT}]) == "analyzer"
+    assert classify_agent([{"role": "system", "content": TRANSLATOR_PROMPT}]) == "translator"
+
+def test_canned_responses_pass_the_agents_parsers():
+    assert is_complete_fused_result(parse_fused_response(canned_response("fused", "レビュー")))
+    batch = canned_response("batch_analyzer", json.dumps([{"id": "1", "text": "a"}, {"id": "2", "text": "b"}]))
+    assert all(parse_batch_analysis(batch, ["1", "2"]).values())
+
+def test_fake_server_streams_and_injects_rate_limits():
+    client = TestClient(create_fake_llm_app(FakeLLMConfig(latency_ms=0, token_delay_ms=0)))
+    body = {"model": "m", "stream": True, "messages": [{"role": "system", "content": TRANSLATOR_PROMPT}, {"role": "user", "content": "こんにちは"}]}
+    lines = [line for line in client.post("/v1/chat/completions", json=body).text.splitlines() if line.startswith("data: ")]
+    assert lines[-1] == "data: [DONE]"
+    text = "".join(json.loads(line[6:])["choices"][0]["delta"].get("content", "") for line in lines[:-1])
+    assert text == canned_response("translator", "こんにちは")
+    assert client.get("/stats").json()["by_agent"]["translator"]["requests"] == 1
+
+    throttled = TestClient(create_fake_llm_app(FakeLLMConfig(latency_ms=0, rate_limit_rate=1.0)))
+    assert throttled.post("/v1/chat/completions", json={"messages": []}).status_code == 429
+
+def test_memory_mongo_queries_and_counts_round_trips():
+    db = MemoryDatabase()
+    async def scenario():
+        await db.reviews.insert_many([{"sourceReviewId": "a", "rawReview": {"title": "t", "body": "b"}}, {"sourceReviewId": "b"}])
+        found = await db.reviews.find({"sourceReviewId": {"$in": ["a", "c"]}}, {"_id": 0, "rawReview.title": 1}).to_list(None)
+        await db.processed_review.bulk_write([UpdateOne({"orgReviewId": "a"}, {"$setOnInsert": {"isProcessed": True}}, upsert=True)] * 2)
+        processed = await db.processed_review.find_one({"orgReviewId": "a", "isProcessed": True})
+        return found, processed
+    found, processed = asyncio.run(scenario())
+    assert found == [{"rawReview": {"title": "t"}}]
+    assert processed["isProcessed"] is True and len(db.processed_review.docs) == 1
+    assert dict(db.round_trips) == {"reviews": 2, "processed_review": 2}
+
+def test_percentiles_and_regression_comparison():
+    stats = percentiles([i / 1000 for i in range(1, 101)])
+    assert stats["p50_ms"] == 51.0 and stats["p99_ms"] == 99.0 and stats["max_ms"] == 100.0
+    baseline = {"pipeline": {"split": {"reviews_per_second": 10.0, "mongo": {"round_trips_per_review": 0.4}}}}
+    current = {"pipeline": {"split": {"reviews_per_second": 8.0, "mongo": {"round_trips_per_review": 0.41}}}}
+    rows = {row["metric"]: row for row in compare_results(baseline, current, tolerance=0.1)}
+    assert rows["reviews_per_second"]["regressed"] is True
+    assert rows["mongo.round_trips_per_review"]["regressed"] is False
+
+def test_synthetic_reviews_include_near_duplicates():
+    reviews = make_reviews(50, products=2, duplicate_ratio=0.5, english_ratio=0.0, seed=1)
+    bodies = [r["rawReview"]["attributes"]["body"] for r in reviews]
+    assert len(reviews) == 50 and any(body.endswith("！") for body in bodies)
@@ -0,0 +1,53 @@
+import asyncio
+from pymongo.errors import OperationFailure, ServerSelectionTimeoutError
+from src.utils.db_indexes import ensure_indexes, REQUIRED_INDEXES
+
+
+class DummyCollection:
+    def __init__(self, fail=None):
+        self.indexes = {"_id_": {"key": [("_id", 1)]}}
+        self.fail = fail
+    async def create_index(self, keys, name=None, unique=False, **options):
+        if self.fail:
+            raise self.fail
+        if name in self.indexes and self.indexes[name].get("expireAfterSeconds") != options.get("expireAfterSeconds"):
+            raise OperationFailure("Index already exists with different options", code=85)
+        self.indexes[name] = {"key": keys, **({"unique": True} if unique else {}), **options}
+    async def index_information(self):
+        return self.indexes
+
+class DummyDB(dict):
+    def __missing__(self, name):
+        self[name] = DummyCollection()
+        return self[name]
+    async def command(self, name, collection, index):
+        assert name == "collMod"
+        for info in self[collection].indexes.values():
+            if dict(info["key"]) == index["keyPattern"]:
+                info["expireAfterSeconds"] = index["expireAfterSeconds"]
+
+def test_ensure_indexes_creates_and_verifies():
+    db = DummyDB()
+    report = asyncio.run(ensure_indexes(db))
+    assert all(report.values())
+    assert len(report) == sum(len(specs) for specs in REQUIRED_INDEXES.values())
+    assert db["processed_review"].indexes["orgReviewId_unique"]["unique"] is True
+
+def test_ensure_indexes_reports_missing():
+    db = DummyDB()
+    db["processed_review"] = DummyCollection(fail=Exception("E11000 duplicate key"))
+    report = asyncio.run(ensure_indexes(db))
+    assert report["processed_review.orgReviewId_unique"] is False
+    assert report["products.productId"] is True
+
+def test_ensure_indexes_stops_when_unreachable():
+    db = DummyDB()
+    db["processed_review"] = DummyCollection(fail=ServerSelectionTimeoutError("down"))
+    assert asyncio.run(ensure_indexes(db)) == {}
+
+def test_ensure_indexes_updates_a_changed_ttl():
+    db = DummyDB()
+    db["llm_cache"].indexes["createdAt_ttl"] = {"key": [("createdAt", 1)], "expireAfterSeconds": 60}
+    report = asyncio.run(ensure_indexes(db))
+    assert report["llm_cache.createdAt_ttl"] is True
+    assert db["llm_cache"].indexes["createdAt_ttl"]["expireAfterSeconds"] == REQUIRED_INDEXES["llm_cache"][0]["expireAfterSeconds"]
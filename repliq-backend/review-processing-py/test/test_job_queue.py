@@ -0,0 +1,268 @@
+import asyncio
+import itertools
+import types
+from datetime import datetime, timedelta, timezone
+import pytest
+from src.jobs import job_queue as jq
+from src.jobs.job_queue import JobQueue
+from src.jobs.scheduler import FairShareScheduler, parse_weights, review_priority_class
+from src.jobs.worker import JobWorker
+
+
+def matches(doc, query):
+    for key, cond in query.items():
+        if key == "$or":
+            if not any(matches(doc, sub) for sub in cond):
+                return False
+            continue
+        value = doc.get(key)
+        if isinstance(cond, dict):
+            for op, arg in cond.items():
+                if op == "$in" and value not in arg:
+                    return False
+                if op == "$lte" and not (value is not None and value <= arg):
+                    return False
+                if op == "$lt" and not (value is not None and value < arg):
+                    return False
+                if op == "$gte" and not (value is not None and value >= arg):
+                    return False
+        elif value != cond:
+            return False
+    return True
+
+def apply_update(doc, update):
+    doc.update(update.get("$set", {}))
+    for key, delta in update.get("$inc", {}).items():
+        doc[key] = doc.get(key, 0) + delta
+    for key in update.get("$unset", {}):
+        doc.pop(key, None)
+
+class DummyCursor:
+    def __init__(self, docs):
+        self.docs = docs
+    def sort(self, *a, **k):
+        return self
+    def skip(self, n):
+        return DummyCursor(self.docs[n:])
+    def limit(self, n):
+        return DummyCursor(self.docs[:n])
+    async def to_list(self, length=None):
+        return list(self.docs)
+    def __aiter__(self):
+        async def gen():
+            for doc in self.docs:
+                yield doc
+        return gen()
+
+class DummyCollection:
+    ids = itertools.count(1)
+    def __init__(self):
+        self.docs = []
+    async def create_index(self, *a, **k):
+        pass
+    async def insert_one(self, doc):
+        self.docs.append({"_id": next(self.ids), **doc})
+    async def insert_many(self, docs, ordered=True):
+        for doc in docs:
+            await self.insert_one(doc)
+    async def find_one(self, query, projection=None):
+        return next((dict(d) for d in self.docs if matches(d, query)), None)
+    def find(self, query, projection=None):
+        return DummyCursor([dict(d) for d in self.docs if matches(d, query)])
+    async def update_one(self, query, update):
+        for doc in self.docs:
+            if matches(doc, query):
+                apply_update(doc, update)
+                break
+    async def update_many(self, query, update):
+        hits = [d for d in self.docs if matches(d, query)]
+        for doc in hits:
+            apply_update(doc, update)
+        return types.SimpleNamespace(modified_count=len(hits))
+    async def find_one_and_update(self, query, update, sort=None, return_document=None):
+        candidates = sorted((d for d in self.docs if matches(d, query)), key=lambda d: d["availableAt"])
+        if not candidates:
+            return None
+        apply_update(candidates[0], update)
+        return dict(candidates[0])
+    async def bulk_write(self, operations, ordered=True):
+        for op in operations:
+            await self.update_one(op._filter, op._doc)
+    async def aggregate(self, pipeline):
+        # Supports the $match + $group shapes the queue uses ($sum: 1 and $min)
+        docs = [d for d in self.docs if matches(d, pipeline[0]["$match"])]
+        spec = pipeline[1]["$group"]
+        field = lambda doc, ref: doc.get(ref[1:])
+        groups = {}
+        for doc in docs:
+            key = {name: field(doc, ref) for name, ref in spec["_id"].items()} if isinstance(spec["_id"], dict) else field(doc, spec["_id"])
+            row = groups.setdefault(repr(key), {"_id": key})
+            for name, acc in spec.items():
+                if name == "_id":
+                    continue
+                if "$sum" in acc:
+                    row[name] = row.get(name, 0) + acc["$sum"]
+                elif "$min" in acc:
+                    value = field(doc, acc["$min"])
+                    row[name] = value if name not in row else min(row[name], value)
+        return DummyCursor(list(groups.values()))
+
+class DummyService:
+    def __init__(self):
+        self.collections = {}
+    def get_collection(self, name):
+        return self.collections.setdefault(name, DummyCollection())
+
+@pytest.fixture
+def queue():
+    return JobQueue(db_service=DummyService(), lease_seconds=60, max_attempts=2, retry_base_seconds=10, retry_max_seconds=60)
+
+def test_enqueue_lease_and_complete(queue):
+    async def scenario():
+        job_id = await queue.create_job("p1", ["r1", "r2"])
+        items = await queue.lease("w1", limit=5)
+        assert {i["sourceReviewId"] for i in items} == {"r1", "r2"}
+        assert await queue.lease("w2", limit=5) == []
+        await queue.settle("w1", {i["_id"]: {"result": "processed"} for i in items})
+        return await queue.job_status(job_id)
+    status = asyncio.run(scenario())
+    assert status["total"] == 2
+    assert status["counts"] == {"done": 2}
+    assert status["completed"] is True
+    assert {i["result"] for i in status["items"]} == {"processed"}
+
+def test_failed_items_back_off_then_dead_letter(queue, monkeypatch):
+    async def scenario():
+        job_id = await queue.create_job("p1", ["r1"])
+        item, = await queue.lease("w1")
+        await queue.settle("w1", {item["_id"]: {"error": "boom", "attempts": item["attempts"]}})
+        assert await queue.lease("w1") == []
+        later = jq.utcnow() + timedelta(seconds=11)
+        monkeypatch.setattr(jq, "utcnow", lambda: later)
+        item, = await queue.lease("w1")
+        assert item["attempts"] == 2
+        await queue.settle("w1", {item["_id"]: {"error": "boom", "attempts": item["attempts"]}})
+        return await queue.job_status(job_id)
+    status = asyncio.run(scenario())
+    assert status["counts"] == {"dead": 1}
+    assert status["items"][0]["lastError"] == "boom"
+
+def test_expired_lease_is_released(queue, monkeypatch):
+    async def scenario():
+        await queue.create_job("p1", ["r1"])
+        first, = await queue.lease("w1")
+        later = jq.utcnow() + timedelta(seconds=61)
+        monkeypatch.setattr(jq, "utcnow", lambda: later)
+        second, = await queue.lease("w2")
+        return first, second
+    first, second = asyncio.run(scenario())
+    assert first["_id"] == second["_id"]
+    assert second["leaseOwner"] == "w2"
+
+def test_item_whose_worker_keeps_dying_is_dead_lettered(queue, monkeypatch):
+    async def scenario():
+        job_id = await queue.create_job("p1", ["r1"])
+        now = jq.utcnow()
+        for attempt in range(1, 3):
+            item, = await queue.lease(f"w{attempt}")
+            assert item["attempts"] == attempt
+            # The worker dies without settling
+            later = now + timedelta(seconds=61 * attempt)
+            monkeypatch.setattr(jq, "utcnow", lambda later=later: later)
+        assert await queue.lease("w3") == []
+        return await queue.job_status(job_id)
+    status = asyncio.run(scenario())
+    assert status["counts"] == {"dead": 1}
+    assert status["items"][0]["lastError"] == "lease expired on the last attempt"
+
+def test_backoff_is_capped(queue):
+    assert queue.backoff_seconds(1) == 10
+    assert queue.backoff_seconds(2) == 20
+    assert queue.backoff_seconds(10) == 60
+
+def test_worker_settles_pipeline_results(queue):
+    class DummyPipeline:
+        async def run(self, ids):
+            return {"r1": "processed", "r2": "failed", "r3": "not_found"}
+    worker = JobWorker(queue=queue, pipeline=DummyPipeline(), batch_size=10)
+    async def scenario():
+        job_id = await queue.create_job("p1", ["r1", "r2", "r3"])
+        assert await worker.run_once() == 3
+        return await queue.job_status(job_id)
+    status = asyncio.run(scenario())
+    by_id = {i["sourceReviewId"]: i for i in status["items"]}
+    assert by_id["r1"]["status"] == "done"
+    assert by_id["r3"]["result"] == "not_found"
+    assert by_id["r2"]["status"] == "queued"
+    assert by_id["r2"]["lastError"]
+
+
+@pytest.fixture
+def fair_queue():
+    return JobQueue(db_service=DummyService(), lease_seconds=60, max_wait_seconds=600)
+
+def lease_order(queue, count):
+    async def scenario():
+        return [item for _ in range(count) for item in await queue.lease("w1")]
+    return [(item["priorityClass"], item["productId"]) for item in asyncio.run(scenario())]
+
+def test_backfill_does_not_delay_new_and_urgent_work(fair_queue):
+    async def setup():
+        await fair_queue.create_job("p1", [f"b{i}" for i in range(50)], default_class="backfill")
+        await fair_queue.create_job("p2", ["n1", "n2"])
+        await fair_queue.create_job("p3", ["u1"], priority_classes={"u1": "urgent"})
+    asyncio.run(setup())
+    order = lease_order(fair_queue, 5)
+    assert order[0] == ("urgent", "p3")
+    assert order[:4].count(("new", "p2")) == 2
+    assert ("backfill", "p1") in order
+
+def test_products_share_a_class_equally(fair_queue):
+    async def setup():
+        await fair_queue.create_job("p1", [f"a{i}" for i in range(50)], default_class="backfill")
+        await fair_queue.create_job("p2", [f"b{i}" for i in range(3)], default_class="backfill")
+    asyncio.run(setup())
+    order = lease_order(fair_queue, 8)
+    assert [product for _, product in order[:6]].count("p2") == 3
+    assert order[6:] == [("backfill", "p1")] * 2
+
+def test_overdue_items_are_leased_first(fair_queue, monkeypatch):
+    start = jq.utcnow()
+    async def scenario():
+        monkeypatch.setattr(jq, "utcnow", lambda: start)
+        await fair_queue.create_job("p1", ["old"], default_class="backfill")
+        monkeypatch.setattr(jq, "utcnow", lambda: start + timedelta(seconds=500))
+        await fair_queue.create_job("p2", ["fresh"], priority_classes={"fresh": "urgent"})
+        monkeypatch.setattr(jq, "utcnow", lambda: start + timedelta(seconds=601))
+        return await fair_queue.lease("w1", limit=2)
+    first, second = asyncio.run(scenario())
+    assert (first["sourceReviewId"], second["sourceReviewId"]) == ("old", "fresh")
+
+def test_queue_depth_by_class(fair_queue):
+    async def scenario():
+        await fair_queue.create_job("p1", ["a", "b"], default_class="backfill")
+        await fair_queue.create_job("p2", ["c"])
+        return await fair_queue.queue_depth_by_class()
+    depth = asyncio.run(scenario())
+    assert depth["backfill"]["queued"] == 2 and depth["new"]["queued"] == 1
+    assert depth["new"]["oldest_age_seconds"] >= 0
+
+def test_weighted_share_between_classes():
+    scheduler = FairShareScheduler(class_weights={"new": 3, "backfill": 1})
+    groups = [("new", "p1"), ("backfill", "p2")]
+    picks = [scheduler.next_group(groups)[0] for _ in range(8)]
+    assert picks.count("new") == 6 and picks.count("backfill") == 2
+
+def test_review_priority_class():
+    now = datetime(2026, 1, 10, tzinfo=timezone.utc)
+    review = lambda rating, created: {"rawReview": {"attributes": {"rating": rating, "createdDate": created}}}
+    assert review_priority_class(review(1, "2026-01-09T08:00:00-07:00"), "backfill", now) == "urgent"
+    assert review_priority_class(review(1, "2025-06-01T00:00:00Z"), "backfill", now) == "backfill"
+    assert review_priority_class(review(5, "2026-01-09T00:00:00Z"), "new", now) == "new"
+    assert review_priority_class(review(2, "not a date"), "new", now) == "new"
+    assert review_priority_class({}, "new", now) == "new"
+
+def test_parse_weights():
+    assert parse_weights("urgent=10, backfill=0.5", {"new": 4}) == {"new": 4, "urgent": 10, "backfill": 0.5}
+    with pytest.raises(ValueError):
+        parse_weights("new=0")
@@ -0,0 +1,37 @@
+import pytest
+from src.utils.language_detector import LanguageDetector
+
+
+@pytest.fixture
+def detector(monkeypatch):
+    monkeypatch.setenv("LANGUAGE_DETECTION_THRESHOLD", "0.9")
+    LanguageDetector.reset_instance()
+    yield LanguageDetector()
+    LanguageDetector.reset_instance()
+
+@pytest.mark.parametrize("text,code", [
+    ("The app keeps crashing when I open my playlist, please fix it.", "en"),
+    ("再生リストを開くとアプリが落ちます。", "ja"),
+    ("这个应用很好用", "zh"),
+    ("좋은 앱입니다", "ko"),
+    ("La aplicación se cierra cuando abro mi lista de reproducción", "es"),
+    ("Die App stürzt ständig ab, wenn ich die Playlist öffne", "de"),
+])
+def test_detects_language(detector, text, code):
+    assert detector.detect(text)["code"] == code
+
+def test_short_or_empty_text_is_not_confident(detector):
+    assert detector.detect("")["code"] == "und"
+    assert not detector.is_confident(detector.detect("ok"), "en")
+    assert detector.is_confident(detector.detect("I love it, works perfectly with my headphones"), "en")
+
+def test_mixed_script_confidence_reflects_script_share(detector):
+    language = detector.detect("このアプリのplaylist機能が好きです")
+    assert language["code"] == "ja" and language["confidence"] < 1.0
+
+def test_stats_breakdown(detector):
+    detector.record({"code": "en", "confidence": 1.0})
+    detector.record({"code": "ja", "confidence": 1.0})
+    detector.record({"code": "en", "confidence": 0.95})
+    detector.record_skipped_translation()
+    assert detector.stats() == {"threshold": 0.9, "languages": {"en": 2, "ja": 1}, "translations_skipped": 1}
@@ -0,0 +1,83 @@
+import asyncio
+import pytest
+from src.agents.llm_rate_limiter import LLMRateLimiter, ModelLimiter, TokenBucket, is_rate_limit_error
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+    def __call__(self):
+        return self.now
+
+class RateLimitError(Exception):
+    status_code = 429
+
+@pytest.fixture
+def limiter_env(monkeypatch):
+    monkeypatch.setenv("LLM_MAX_CONCURRENCY", "4")
+    monkeypatch.setenv("LLM_MIN_CONCURRENCY", "1")
+    LLMRateLimiter.reset_instance()
+    yield
+    LLMRateLimiter.reset_instance()
+
+def test_detects_rate_limit_errors():
+    assert is_rate_limit_error(RateLimitError("slow down"))
+    assert is_rate_limit_error(Exception("Error code: 429 - Rate limit reached"))
+    assert not is_rate_limit_error(ValueError("bad json"))
+
+def test_token_bucket_refills_over_a_minute():
+    clock = FakeClock()
+    bucket = TokenBucket(60, clock)
+    bucket.take(60)
+    assert bucket.wait_time(1) == pytest.approx(1.0)
+    clock.now = 1.0
+    assert bucket.wait_time(1) == 0.0
+    assert TokenBucket(0, clock).wait_time(10 ** 6) == 0.0
+
+def test_concurrency_cap_and_aimd(limiter_env):
+    clock = FakeClock()
+    limiter = ModelLimiter("m", clock)
+    assert all(limiter.try_acquire(10) == 0 for _ in range(4))
+    assert limiter.try_acquire(10) > 0
+    limiter.on_throttled()
+    assert limiter.limit == 2
+    assert limiter.try_acquire(10) == pytest.approx(limiter.cooldown_seconds)
+    for _ in range(3):
+        limiter.on_success(0.1, 10)
+    clock.now = 10.0
+    assert limiter.limit > 2
+    assert limiter.snapshot()["throttled"] == 1 and limiter.snapshot()["in_flight"] == 0
+
+def test_requests_wait_for_a_slot(limiter_env, monkeypatch):
+    monkeypatch.setenv("LLM_MAX_CONCURRENCY", "2")
+    limiter = ModelLimiter("m")
+    peak = []
+
+    async def call():
+        await limiter.acquire(1)
+        peak.append(limiter.in_flight)
+        await asyncio.sleep(0.01)
+        limiter.on_success(0.01, 1)
+
+    async def main():
+        await asyncio.gather(*(call() for _ in range(6)))
+
+    asyncio.run(main())
+    assert max(peak) <= 2
+    assert limiter.counters["succeeded"] == 6 and limiter.waiting == 0
+
+def test_run_agent_retries_after_throttling(limiter_env, monkeypatch):
+    monkeypatch.setenv("LLM_THROTTLE_COOLDOWN_SECONDS", "0")
+    from src.agents.ai_agents.ai_agent_translator import AIAgentTranslator
+    agent = AIAgentTranslator(model="test-model")
+    calls = []
+    async def flaky_run_once(input_data, app_name, model=None):
+        calls.append(input_data)
+        if len(calls) == 1:
+            raise RateLimitError("429 rate limit")
+        return "Hello", 42
+    monkeypatch.setattr(agent, "_run_once", flaky_run_once)
+    assert asyncio.run(agent.run_agent("こんにちは", "translation_app")) == "Hello"
+    state = LLMRateLimiter().snapshot()["models"]["test-model"]
+    assert len(calls) == 2
+    assert state["throttled"] == 1 and state["succeeded"] == 1 and state["in_flight"] == 0
@@ -0,0 +1,141 @@
+import asyncio
+import json
+import os
+from types import SimpleNamespace
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from src.utils import metrics
+from src.utils.mongo_command_metrics import MongoCommandMetricsListener
+from src.agents.llm_rate_limiter import LLMRateLimiter
+from src.agents.response_cache import ResponseCache
+from src.agents.model_tiering import ModelTieringPolicy
+from src.tasks.process_review_tasks import ReviewProcessor, log_and_run_decorator
+
+
+@pytest.fixture(autouse=True)
+def clean_registry(monkeypatch):
+    monkeypatch.delenv("METRICS_MULTIPROC_DIR", raising=False)
+    metrics.REGISTRY.clear()
+    yield
+    metrics.REGISTRY.clear()
+
+def sample(family_name, **labels):
+    for family in metrics.REGISTRY.collect():
+        if family["name"] != family_name:
+            continue
+        for values, value in family["samples"]:
+            if dict(zip(family["labels"], values)) == {key: str(v) for key, v in labels.items()}:
+                return value
+    return None
+
+def test_render_histogram_counter_and_escaping():
+    registry = metrics.MetricsRegistry()
+    latency = metrics.Histogram("demo_seconds", "Demo latency.", ("stage",), registry, buckets=(0.1, 1.0))
+    errors = metrics.Counter("demo_errors_total", "Demo errors.", ("reason",), registry)
+    latency.labels("translate").observe(0.05)
+    latency.labels("translate").observe(0.5)
+    latency.labels("translate").observe(5)
+    errors.labels('bad "quote"\n').inc(2)
+    text = metrics.render(registry.collect())
+    assert "# TYPE demo_seconds histogram" in text
+    assert 'demo_seconds_bucket{stage="translate",le="0.1"} 1' in text
+    assert 'demo_seconds_bucket{stage="translate",le="1.0"} 2' in text
+    assert 'demo_seconds_bucket{stage="translate",le="+Inf"} 3' in text
+    assert 'demo_seconds_count{stage="translate"} 3' in text
+    assert 'demo_seconds_sum{stage="translate"} 5.55' in text
+    assert 'demo_errors_total{reason="bad \\"quote\\"\\n"} 2.0' in text
+
+def test_label_count_is_checked_and_names_are_unique():
+    registry = metrics.MetricsRegistry()
+    gauge = metrics.Gauge("demo_in_flight", "Demo.", ("flow",), registry)
+    with pytest.raises(ValueError):
+        gauge.labels("a", "b")
+    with pytest.raises(ValueError):
+        metrics.Gauge("demo_in_flight", "Again.", (), registry)
+
+def test_stage_latency_and_failures_from_subtasks():
+    @log_and_run_decorator
+    async def analysis_task():
+        raise RuntimeError("model down")
+    assert asyncio.run(analysis_task()) is None
+    assert sample("repliq_review_stage_failures_total", stage="analysis_task") == 1
+    assert sum(sample("repliq_review_stage_duration_seconds", stage="analysis_task")["counts"]) == 1
+
+def test_skip_reason_counted_when_analysis_is_missing(monkeypatch):
+    import src.tasks.process_review_tasks as tasks
+    processor = ReviewProcessor.__new__(ReviewProcessor)
+    processor.near_duplicates = SimpleNamespace(find_matches=lambda candidates: asyncio.sleep(0, {}))
+    processor.tiering = ModelTieringPolicy(enabled=False)
+    async def stages(review_text, customer_name, completed, match, language, tier=None, on_stage=None):
+        assert metrics.REVIEWS_IN_FLIGHT.labels("single").value == 1
+        return {"translation": "Hello", "reply": "Thanks"}, {"analysis": "no result"}
+    processor.run_missing_stages = stages
+    monkeypatch.setattr(tasks, "load_stage_states", lambda db, ids: asyncio.sleep(0, {}))
+    monkeypatch.setattr(tasks, "fetch_review_details_task_async", lambda review_id: asyncio.sleep(0, {}))
+    monkeypatch.setattr(tasks, "extract_review_fields", lambda details: dict.fromkeys(["review_text", "customer_name", "review_date", "source", "product_id", "raw_review"], "x"))
+    monkeypatch.setattr(tasks, "detect_review_language", lambda text: None)
+    asyncio.run(processor.process_review_flow_async("r1"))
+    assert sample("repliq_review_save_skips_total", flow="single", reason="analysis_missing") == 1
+    assert sample("repliq_reviews_total", flow="single", outcome="skipped") == 1
+    assert metrics.REVIEWS_IN_FLIGHT.labels("single").value == 0
+
+def test_llm_calls_record_tokens_latency_and_throttling(monkeypatch):
+    monkeypatch.setenv("LLM_THROTTLE_COOLDOWN_SECONDS", "0")
+    monkeypatch.setenv("LLM_CACHE_ENABLED", "false")
+    LLMRateLimiter.reset_instance()
+    ResponseCache.reset_instance()
+    from src.agents.ai_agents.ai_agent_translator import AIAgentTranslator
+    agent = AIAgentTranslator(model="test-model")
+    calls = []
+    async def flaky_run_once(input_data, app_name, model=None):
+        calls.append(input_data)
+        if len(calls) == 1:
+            raise RuntimeError("429 rate limit exceeded")
+        return "Hello", 42
+    monkeypatch.setattr(agent, "_run_once", flaky_run_once)
+    assert asyncio.run(agent.perform_task("こんにちは")) == "Hello"
+    LLMRateLimiter.reset_instance()
+    ResponseCache.reset_instance()
+    assert sample("repliq_llm_tokens_total", model="test-model") == 42
+    assert sample("repliq_llm_requests_total", model="test-model", outcome="throttled") == 1
+    assert sample("repliq_llm_requests_total", model="test-model", outcome="ok") == 1
+    assert sum(sample("repliq_llm_request_duration_seconds", model="test-model", agent=agent.name)["counts"]) == 1
+    assert sum(sample("repliq_agent_duration_seconds", agent=agent.name, cache="disabled")["counts"]) == 1
+
+def test_mongo_listener_records_command_latency_and_failures():
+    listener = MongoCommandMetricsListener()
+    started = SimpleNamespace(command_name="find", command={"find": "reviews"}, request_id=1, connection_id=("db", 27017))
+    listener.started(started)
+    listener.failed(SimpleNamespace(command_name="find", request_id=1, connection_id=("db", 27017), duration_micros=2500, failure={}))
+    histogram = sample("repliq_mongo_command_duration_seconds", command="find", collection="reviews")
+    assert histogram["sum"] == pytest.approx(0.0025)
+    assert sample("repliq_mongo_command_failures_total", command="find", collection="reviews") == 1
+
+def test_multiprocess_snapshots_sum_counters_and_keep_live_gauges(tmp_path, monkeypatch):
+    monkeypatch.setenv("METRICS_MULTIPROC_DIR", str(tmp_path))
+    metrics.LLM_TOKENS.labels("m").inc(10)
+    metrics.REVIEWS_IN_FLIGHT.labels("batch").set(2)
+    exited = {"pid": 2 ** 22 + 1, "families": [
+        {"name": "repliq_llm_tokens_total", "type": "counter", "help": "", "labels": ["model"], "samples": [[["m"], 5.0]]},
+        {"name": "repliq_reviews_in_flight", "type": "gauge", "help": "", "labels": ["flow"], "samples": [[["batch"], 7.0]]},
+    ]}
+    (tmp_path / "exited.json").write_text(json.dumps(exited))
+    text = metrics.render(metrics.collect_families())
+    assert 'repliq_llm_tokens_total{model="m"} 15.0' in text
+    assert f'repliq_reviews_in_flight{{flow="batch",pid="{os.getpid()}"}} 2.0' in text
+    assert "7.0" not in text
+    assert (tmp_path / f"{os.getpid()}.json").exists()
+
+def test_metrics_route_exposes_text_format_with_pid_label(monkeypatch):
+    from src.routes.metrics import router
+    from src.utils.async_db_service import AsyncDatabaseService
+    monkeypatch.setattr(AsyncDatabaseService, "db", property(lambda self: None))
+    metrics.REVIEWS.labels("batch", "processed").inc(3)
+    app = FastAPI()
+    app.include_router(router)
+    response = TestClient(app).get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    assert f'repliq_reviews_total{{flow="batch",outcome="processed",pid="{os.getpid()}"}} 3.0' in response.text
+    assert "# TYPE repliq_llm_cache_events_total counter" in response.text
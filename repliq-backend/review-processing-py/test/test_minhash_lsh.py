@@ -0,0 +1,44 @@
+import numpy as np
+import pytest
+from src.utils.minhash_lsh import MinHasher, MinHashLSH, normalize_for_shingles
+
+
+def test_normalization_ignores_case_punctuation_and_emoji():
+    assert normalize_for_shingles("Great app!! 😀") == normalize_for_shingles("great   app")
+    assert normalize_for_shingles("とても良い。") == "とても良い"
+
+def test_signatures_are_batched_and_deterministic():
+    hasher = MinHasher(num_perm=32, chunk_rows=8)
+    texts = ["great app!!", "Great app", "The app crashes every time I open it", "", "短い"]
+    signatures = hasher.signatures(texts)
+    assert signatures.shape == (5, 32) and signatures.dtype == np.uint32
+    assert np.array_equal(signatures, MinHasher(num_perm=32).signatures(texts))
+    assert (signatures[0] == signatures[1]).all()
+    assert (signatures[0] == signatures[2]).mean() < 0.5
+
+def test_lsh_finds_near_duplicates_across_sorted_and_tail_rows():
+    hasher = MinHasher()
+    index = MinHashLSH(tail_limit=3)
+    texts = [f"review number {i} about feature {i * 7} and its performance" for i in range(10)]
+    index.add_many([f"r{i}" for i in range(10)], hasher.signatures(texts))
+    assert len(index) == 10
+    for i in (0, 9):
+        query = hasher.signatures([texts[i].upper() + "!!"])[0]
+        assert index.query(query, 0.85) == (f"r{i}", 1.0)
+    assert index.query(hasher.signatures(["completely unrelated text"])[0], 0.85) is None
+
+def test_tail_merge_matches_a_full_stable_sort():
+    rng = np.random.default_rng(3)
+    index = MinHashLSH(num_perm=8, bands=4, tail_limit=5)
+    # Few distinct values so buckets hold rows from several merges
+    signatures = rng.integers(0, 3, size=(23, 8), dtype=np.uint32)
+    for start in range(0, 23, 4):
+        index.add_many([f"r{i}" for i in range(start, min(start + 4, 23))], signatures[start:start + 4])
+    keys = index._band_keys[:index._sorted_count].T
+    order = np.argsort(keys, axis=1, kind="stable")
+    assert np.array_equal(index._sorted_rows, order)
+    assert np.array_equal(index._sorted_keys, np.take_along_axis(keys, order, axis=1))
+
+def test_lsh_rejects_bad_banding():
+    with pytest.raises(ValueError):
+        MinHashLSH(num_perm=64, bands=10)
@@ -0,0 +1,160 @@
+import asyncio
+import pytest
+from src.agents.llm_rate_limiter import LLMRateLimiter
+from src.agents.response_cache import ResponseCache
+from src.agents.model_router import CIRCUIT_CLOSED, CIRCUIT_HALF_OPEN, CIRCUIT_OPEN, ModelHealth, ModelRouter, model_pool, percentile
+from src.utils import metrics
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+    def __call__(self):
+        return self.now
+
+@pytest.fixture(autouse=True)
+def router_env(monkeypatch):
+    monkeypatch.setenv("MODEL_ROUTER_BREAKER_CONSECUTIVE_FAILURES", "3")
+    monkeypatch.setenv("MODEL_ROUTER_BREAKER_MIN_REQUESTS", "4")
+    monkeypatch.setenv("MODEL_ROUTER_BREAKER_OPEN_SECONDS", "30")
+    monkeypatch.delenv("MODEL_POOL", raising=False)
+    ModelRouter.reset_instance()
+    LLMRateLimiter.reset_instance()
+    metrics.REGISTRY.clear()
+    yield
+    ModelRouter.reset_instance()
+    LLMRateLimiter.reset_instance()
+    metrics.REGISTRY.clear()
+
+def translator(monkeypatch, answers, pool="primary,backup"):
+    """A translator whose model calls return ``answers[model]`` (an exception is raised)."""
+    monkeypatch.setenv("MODEL_POOL", pool)
+    from src.agents.ai_agents.ai_agent_translator import AIAgentTranslator
+    agent = AIAgentTranslator(model="primary")
+    calls = []
+    async def run_once(input_data, app_name, model=None):
+        calls.append(model)
+        delay, answer = answers[model]
+        await asyncio.sleep(delay)
+        if isinstance(answer, Exception):
+            raise answer
+        return answer, 10
+    monkeypatch.setattr(agent, "_run_once", run_once)
+    return agent, calls
+
+def test_model_pool_puts_the_agent_model_first(monkeypatch):
+    monkeypatch.setenv("MODEL_POOL", "gpt-4.1-mini, gpt-4.1,gpt-4.1-mini")
+    assert model_pool("ai_agent_translator", "gpt-4.1") == ["gpt-4.1", "gpt-4.1-mini"]
+    monkeypatch.setenv("MODEL_POOL_REPLY_GENERATOR", "claude,gpt-4.1")
+    assert model_pool("reply_generator", "gpt-4.1") == ["gpt-4.1", "claude"]
+    monkeypatch.delenv("MODEL_POOL")
+    assert model_pool("ai_agent_translator", "gpt-4.1") == ["gpt-4.1"]
+
+def test_breaker_opens_on_consecutive_failures_and_probes_after_cooldown():
+    clock = FakeClock()
+    health = ModelHealth("m", clock)
+    for _ in range(3):
+        health.record(1.0, ok=False)
+    assert health.state == CIRCUIT_OPEN and not health.available()
+    clock.now = 31.0
+    assert health.state == CIRCUIT_HALF_OPEN
+    health.record(1.0, ok=False)
+    assert health.state == CIRCUIT_OPEN
+    clock.now = 62.0
+    health.record(0.5, ok=True)
+    assert health.state == CIRCUIT_CLOSED
+    assert health.snapshot()["trips"] == 2
+    assert metrics.LLM_CIRCUIT_TRIPS.labels("m").value == 2
+
+def test_breaker_opens_on_error_rate_once_the_window_is_large_enough():
+    health = ModelHealth("m", FakeClock())
+    for ok in (True, False, True, False):
+        health.record(0.2, ok=ok)
+    assert health.state == CIRCUIT_OPEN
+
+def test_candidates_skip_open_models_but_never_return_nothing():
+    router = ModelRouter()
+    for _ in range(3):
+        router.record("primary", 1.0, ok=False)
+    assert router.candidates(["primary", "backup"]) == ["backup"]
+    assert router.candidates(["primary"]) == ["primary"]
+
+def test_hedge_delay_uses_the_latency_percentile(monkeypatch):
+    monkeypatch.setenv("MODEL_ROUTER_HEDGE_MIN_SAMPLES", "5")
+    monkeypatch.setenv("MODEL_ROUTER_HEDGE_MIN_DELAY_SECONDS", "0.1")
+    assert ModelRouter().hedge_delay("m") is None
+    ModelRouter.reset_instance()
+    monkeypatch.setenv("MODEL_ROUTER_HEDGE_ENABLED", "true")
+    router = ModelRouter()
+    for latency in (0.2, 0.4, 0.6, 0.8):
+        router.record("m", latency, ok=True)
+    assert router.hedge_delay("m") is None
+    router.record("m", 1.0, ok=True)
+    assert router.hedge_delay("m") == percentile([0.2, 0.4, 0.6, 0.8, 1.0], 95) == 1.0
+    assert ModelRouter().snapshot()["models"]["m"]["latency_p50_seconds"] == 0.6
+
+def test_run_agent_fails_over_to_the_next_model(monkeypatch):
+    agent, calls = translator(monkeypatch, {"primary": (0, RuntimeError("provider down")), "backup": (0, "Hello")})
+    assert asyncio.run(agent.run_agent("こんにちは", "translation_app")) == "Hello"
+    assert calls == ["primary", "backup"]
+    assert metrics.LLM_FAILOVERS.labels(agent.name, "primary").value == 1
+    assert metrics.LLM_REQUESTS.labels("backup", "ok").value == 1
+    assert ModelRouter().snapshot()["models"]["primary"]["failed"] == 1
+
+def test_run_agent_skips_a_model_with_an_open_circuit(monkeypatch):
+    agent, calls = translator(monkeypatch, {"primary": (0, "unused"), "backup": (0, "Hello")})
+    for _ in range(3):
+        ModelRouter().record("primary", 1.0, ok=False)
+    assert asyncio.run(agent.run_agent("こんにちは", "translation_app")) == "Hello"
+    assert calls == ["backup"]
+
+def test_slow_primary_is_hedged_to_the_secondary(monkeypatch):
+    monkeypatch.setenv("MODEL_ROUTER_HEDGE_ENABLED", "true")
+    monkeypatch.setenv("MODEL_ROUTER_HEDGE_MIN_SAMPLES", "1")
+    monkeypatch.setenv("MODEL_ROUTER_HEDGE_MIN_DELAY_SECONDS", "0.01")
+    ModelRouter().record("primary", 0.01, ok=True)
+    agent, calls = translator(monkeypatch, {"primary": (5, "slow"), "backup": (0, "fast")})
+    assert asyncio.run(asyncio.wait_for(agent.run_agent("こんにちは", "translation_app"), timeout=2)) == "fast"
+    assert calls == ["primary", "backup"]
+    assert metrics.LLM_HEDGES.labels(agent.name, "secondary").value == 1
+    # The cancelled primary call gave its limiter slot back
+    assert LLMRateLimiter().snapshot()["models"]["primary"]["in_flight"] == 0
+
+def test_single_model_pool_raises_the_model_error(monkeypatch):
+    agent, calls = translator(monkeypatch, {"primary": (0, RuntimeError("provider down"))}, pool="")
+    with pytest.raises(RuntimeError):
+        asyncio.run(agent.run_agent("こんにちは", "translation_app"))
+    assert calls == ["primary"]
+
+def test_fallback_answers_are_not_cached_under_the_primary_model(monkeypatch):
+    monkeypatch.setenv("LLM_CACHE_MONGO_ENABLED", "false")
+    ResponseCache.reset_instance()
+    answers = {"primary": (0, RuntimeError("provider down")), "backup": (0, "Hello from backup")}
+    agent, calls = translator(monkeypatch, answers)
+    assert asyncio.run(agent.perform_task("こんにちは")) == "Hello from backup"
+    assert ResponseCache().stats()["stores"] == 0
+    answers["primary"] = (0, "Hello")
+    assert asyncio.run(agent.perform_task("こんにちは")) == "Hello"
+    assert asyncio.run(agent.perform_task("こんにちは")) == "Hello"
+    assert calls == ["primary", "backup", "primary"]
+    ResponseCache.reset_instance()
+
+def test_streamed_fallback_answers_are_not_cached_and_the_model_does_not_leak(monkeypatch):
+    from src.agents.response_cache import answering_model
+    monkeypatch.setenv("LLM_CACHE_MONGO_ENABLED", "false")
+    ResponseCache.reset_instance()
+    agent, _ = translator(monkeypatch, {})
+    streamed = []
+    async def events(input_data, app_name, streaming=False, model=None):
+        streamed.append(model)
+        yield f"Hello from {model}", 10
+    monkeypatch.setattr(agent, "_events", events)
+    for _ in range(3):
+        ModelRouter().record("primary", 1.0, ok=False)
+
+    async def consume():
+        results = [event async for event in agent.stream_task("こんにちは")]
+        return results[-1]["result"], answering_model.get()
+    assert asyncio.run(consume()) == ("Hello from backup", None)
+    assert streamed == ["backup"] and ResponseCache().stats()["stores"] == 0
+    ResponseCache.reset_instance()
@@ -0,0 +1,40 @@
+import pytest
+from src.agents.model_tiering import TIER_LARGE, TIER_SMALL, ModelTieringPolicy
+
+
+@pytest.fixture
+def policy(monkeypatch):
+    monkeypatch.delenv("MODEL_TIERING_COMPLAINT_KEYWORDS", raising=False)
+    monkeypatch.setenv("MODEL_TIERING_MAX_TOKENS", "40")
+    monkeypatch.setenv("MODEL_TIERING_MAX_CHARS", "200")
+    return ModelTieringPolicy(enabled=True, small_model="gpt-4.1-mini", large_model="gpt-4.1")
+
+def test_short_praise_goes_to_the_small_model(policy):
+    route = policy.decide("使いやすい！")
+    assert (route["tier"], route["reason"], route["model"]) == (TIER_SMALL, "short", "gpt-4.1-mini")
+    assert route["features"]["script"] == "kana"
+    assert policy.decide("Love it, great app")["tier"] == TIER_SMALL
+
+def test_complaints_keep_the_large_model_however_short(policy):
+    assert policy.decide("すぐ落ちる")["reason"] == "complaint"
+    assert policy.decide("App CRASHES")["reason"] == "complaint"
+    assert policy.decide("Ｒｅｆｕｎｄ please")["reason"] == "complaint"
+
+def test_long_reviews_keep_the_large_model(policy):
+    route = policy.decide("The new design looks nice and the colors are pleasant. " * 5)
+    assert (route["tier"], route["reason"], route["model"]) == (TIER_LARGE, "long", "gpt-4.1")
+    # CJK text is counted per character, so fewer characters already exceed the token limit
+    assert policy.decide("とても良いアプリです" * 5)["reason"] == "long"
+
+def test_scripts_outside_the_allowed_set_keep_the_large_model(monkeypatch):
+    monkeypatch.setenv("MODEL_TIERING_SCRIPTS", "latin")
+    policy = ModelTieringPolicy(enabled=True)
+    assert policy.decide("ดีมาก")["reason"] == "script"
+    assert policy.decide("Nice")["tier"] == TIER_SMALL
+
+def test_disabled_policy_and_custom_keywords(monkeypatch):
+    assert ModelTieringPolicy(enabled=False).decide("Nice")["reason"] == "disabled"
+    monkeypatch.setenv("MODEL_TIERING_COMPLAINT_KEYWORDS", "slow, ads")
+    policy = ModelTieringPolicy(enabled=True)
+    assert policy.decide("Too many ADS")["reason"] == "complaint"
+    assert policy.decide("App crashes")["tier"] == TIER_SMALL
@@ -1,6 +1,8 @@
+import asyncio
 import pytest
-from fastapi import HTTPException, BackgroundTasks
+from fastapi import HTTPException
 from src.controllers.process_review_controller import ProcessReviewController
+from src.utils.product_catalog import ProductCatalog
 
 
 class DummyDB:
@@ -8,31 +10,65 @@ class DummyDB:
         self.products = DummyCollection(products)
         self.reviews = DummyCollection(reviews)
 
+class DummyCursor:
+    def __init__(self, items):
+        self._items = items
+    def limit(self, n):
+        return DummyCursor(self._items[:n])
+    async def to_list(self, length=None):
+        return list(self._items)
+
 class DummyCollection:
     def __init__(self, data=None):
         self._data = data or []
-    def find_one(self, query):
+        self.calls = []
+    async def find_one(self, query, projection=None):
+        self.calls.append(("find_one", query))
         for item in self._data:
             if all(item.get(k) == v for k, v in query.items()):
                 return item
         return None
-    def find(self, query):
+    def find(self, query, projection=None):
+        self.calls.append(("find", query))
+        if not query:
+            return DummyCursor(list(self._data))
         # Only supports {"sourceReviewId": {"$in": [...]}, "productId": ...}
         source_ids = query.get("sourceReviewId", {}).get("$in", [])
         product_id = query.get("productId")
-        return [item for item in self._data if item.get("sourceReviewId") in source_ids and item.get("productId") == product_id]
+        return DummyCursor([item for item in self._data if item.get("sourceReviewId") in source_ids and item.get("productId") == product_id])
 
 
 class DummyService:
     def __init__(self, products, reviews):
         self.db = DummyDB(products, reviews)
 
+class DummyJobQueue:
+    def __init__(self):
+        self.jobs = {}
+    async def create_job(self, product_id, source_review_ids=None, ingesting=False, priority_classes=None):
+        job_id = f"job{len(self.jobs) + 1}"
+        self.jobs[job_id] = {"jobId": job_id, "productId": product_id, "items": list(source_review_ids or [])}
+        return job_id
+    async def enqueue_new(self, job_id, product_id, source_review_ids, priority_classes=None):
+        items = self.jobs[job_id]["items"]
+        new = [sid for sid in source_review_ids if sid not in items]
+        items.extend(new)
+        return len(new)
+    async def finish_ingest(self, job_id, accepted, rejected, error=None):
+        self.jobs[job_id]["ingest"] = {"accepted": accepted, "rejected": rejected, "error": error}
+    async def job_status(self, job_id, skip=0, limit=1000):
+        return self.jobs.get(job_id)
+
 def patch_db(monkeypatch, products, reviews):
-    from src.utils.db_service import DatabaseService
-    DatabaseService.reset_instance()
     dummy_service = DummyService(products, reviews)
-    DatabaseService._instance = dummy_service
-    monkeypatch.setattr("src.utils.db_service.DatabaseService.__new__", lambda cls, *a, **kw: dummy_service)
+    monkeypatch.setattr("src.utils.async_db_service.AsyncDatabaseService.__new__", lambda cls, *a, **kw: dummy_service)
+    return dummy_service
+
+@pytest.fixture(autouse=True)
+def reset_catalog():
+    ProductCatalog.reset_instance()
+    yield
+    ProductCatalog.reset_instance()
 
 @pytest.fixture
 def controller(monkeypatch):
@@ -43,34 +79,60 @@ def controller(monkeypatch):
         {"sourceReviewId": "r2", "productId": "p1"}
     ]
     patch_db(monkeypatch, products, reviews)
-    c = ProcessReviewController()
-    # Ensure controller.db is set to the dummy DB
-    from src.utils.db_service import DatabaseService
-    c.db = DatabaseService._instance.db
-    return c
+    return ProcessReviewController(job_queue=DummyJobQueue())
 
 def test_valid_process_reviews(controller):
-    tasks = BackgroundTasks()
-    result = controller.validate_and_process_reviews("p1", ["r1", "r2"], tasks)
+    result = asyncio.run(controller.validate_and_process_reviews("p1", ["r1", "r2"]))
     assert result["status"] == "Tasks submitted for processing"
     assert result["product_id"] == "p1"
     assert result["sourceReviewIds"] == ["r1", "r2"]
+    assert controller.job_queue.jobs[result["jobId"]]["items"] == ["r1", "r2"]
+
+def test_duplicate_ids_are_queued_once(controller):
+    result = asyncio.run(controller.validate_and_process_reviews("p1", ["r1", "r2", "r1"]))
+    assert result["sourceReviewIds"] == ["r1", "r2"]
+    assert controller.job_queue.jobs[result["jobId"]]["items"] == ["r1", "r2"]
+
+def test_job_status(controller):
+    result = asyncio.run(controller.validate_and_process_reviews("p1", ["r1"]))
+    status = asyncio.run(controller.get_job_status(result["jobId"]))
+    assert status["productId"] == "p1"
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(controller.get_job_status("missing"))
+    assert exc.value.status_code == 404
 
 def test_product_not_found(monkeypatch):
     patch_db(monkeypatch, [], [])
-    c = ProcessReviewController()
-    from src.utils.db_service import DatabaseService
-    c.db = DatabaseService._instance.db
-    tasks = BackgroundTasks()
+    c = ProcessReviewController(job_queue=DummyJobQueue())
     with pytest.raises(HTTPException) as exc:
-        c.validate_and_process_reviews("p1", ["r1"], tasks)
+        asyncio.run(c.validate_and_process_reviews("p1", ["r1"]))
     assert exc.value.status_code == 404
     assert "Product not found" in str(exc.value.detail)
 
+def test_product_lookups_are_cached(monkeypatch):
+    service = patch_db(monkeypatch, [{"productId": "p1"}], [{"sourceReviewId": "r1", "productId": "p1"}])
+    c = ProcessReviewController(job_queue=DummyJobQueue())
+    for _ in range(3):
+        asyncio.run(c.validate_and_process_reviews("p1", ["r1"]))
+        with pytest.raises(HTTPException):
+            asyncio.run(c.validate_and_process_reviews("typo", ["r1"]))
+    assert service.db.products.calls == [("find_one", {"productId": "p1"}), ("find_one", {"productId": "typo"})]
+    # Only the review ids are validated per request, with one query
+    assert service.db.reviews.calls == [("find", {"sourceReviewId": {"$in": ["r1"]}, "productId": "p1"})] * 3
+
+def test_refresh_reloads_known_products(monkeypatch):
+    service = patch_db(monkeypatch, [], [{"sourceReviewId": "r1", "productId": "p2"}])
+    c = ProcessReviewController(job_queue=DummyJobQueue())
+    with pytest.raises(HTTPException):
+        asyncio.run(c.validate_and_process_reviews("p2", ["r1"]))
+    service.db.products._data.append({"productId": "p2"})
+    assert asyncio.run(ProductCatalog().refresh(service.db)) == 1
+    result = asyncio.run(c.validate_and_process_reviews("p2", ["r1"]))
+    assert result["product_id"] == "p2"
+
 def test_invalid_source_review_ids(controller):
-    tasks = BackgroundTasks()
     with pytest.raises(HTTPException) as exc:
-        controller.validate_and_process_reviews("p1", "notalist", tasks)
+        asyncio.run(controller.validate_and_process_reviews("p1", "notalist"))
     assert exc.value.status_code == 400
     assert "sourceReviewIds must be a list of strings" in str(exc.value.detail)
 
@@ -78,20 +140,45 @@ def test_some_reviews_not_found(monkeypatch):
     products = [{"productId": "p1"}]
     reviews = [{"sourceReviewId": "r1", "productId": "p1"}]
     patch_db(monkeypatch, products, reviews)
-    c = ProcessReviewController()
-    from src.utils.db_service import DatabaseService
-    c.db = DatabaseService._instance.db
-    tasks = BackgroundTasks()
+    c = ProcessReviewController(job_queue=DummyJobQueue())
     with pytest.raises(HTTPException) as exc:
-        c.validate_and_process_reviews("p1", ["r1", "r2"], tasks)
+        asyncio.run(c.validate_and_process_reviews("p1", ["r1", "r2"]))
     assert exc.value.status_code == 404
     assert "Some reviews not found" in str(exc.value.detail)
+    assert exc.value.detail["missingSourceReviewIds"] == ["r2"]
 
 def test_db_not_connected(monkeypatch):
     class DummyService:
         db = None
-    monkeypatch.setattr("src.utils.db_service.DatabaseService.__new__", lambda cls, *a, **kw: DummyService())
-    c = ProcessReviewController()
-    tasks = BackgroundTasks()
+    monkeypatch.setattr("src.utils.async_db_service.AsyncDatabaseService.__new__", lambda cls, *a, **kw: DummyService())
+    c = ProcessReviewController(job_queue=DummyJobQueue())
     with pytest.raises(RuntimeError):
-        c.validate_and_process_reviews("p1", ["r1"], tasks)
+        asyncio.run(c.validate_and_process_reviews("p1", ["r1"]))
+
+async def body_chunks(*chunks):
+    for chunk in chunks:
+        yield chunk
+
+def test_bulk_ingest_validates_and_enqueues_in_batches(monkeypatch):
+    reviews = [{"sourceReviewId": f"r{i}", "productId": "p1"} for i in range(5)]
+    service = patch_db(monkeypatch, [{"productId": "p1"}], reviews)
+    c = ProcessReviewController(job_queue=DummyJobQueue())
+    # Lines split across chunks, mixed line formats, a duplicate and an unknown id
+    chunks = body_chunks(b'"r0"\n{"sourceRev', b'iewId": "r1"}\nr2\n\nr2\nbogus\nr3\nr', b"4")
+    result = asyncio.run(c.ingest_review_stream("p1", chunks, batch_size=2))
+    assert result["accepted"] == 5 and result["rejected"] == 1 and result["duplicates"] == 1
+    assert result["rejectedSample"] == ["bogus"]
+    assert "sourceReviewIds" not in result
+    job = c.job_queue.jobs[result["jobId"]]
+    assert job["items"] == ["r0", "r1", "r2", "r3", "r4"]
+    assert job["ingest"] == {"accepted": 5, "rejected": 1, "error": None}
+    assert len(service.db.reviews.calls) == 4
+
+def test_bulk_ingest_rejects_malformed_lines(monkeypatch):
+    patch_db(monkeypatch, [{"productId": "p1"}], [{"sourceReviewId": "r1", "productId": "p1"}])
+    c = ProcessReviewController(job_queue=DummyJobQueue())
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(c.ingest_review_stream("p1", body_chunks(b'r1\n{"id": 1}\n'), batch_size=1))
+    assert exc.value.status_code == 400
+    assert exc.value.detail["accepted"] == 1
+    assert c.job_queue.jobs[exc.value.detail["jobId"]]["ingest"]["error"]
@@ -14,6 +14,11 @@ class DummyCollection:
     def insert_one(self, doc):
         self.inserted.append(doc)
         return types.SimpleNamespace(inserted_id="dummyid")
+    def update_one(self, query, update, upsert=False):
+        if self.find_one(query) or any(all(d.get(k) == v for k, v in query.items()) for d in self.inserted):
+            return types.SimpleNamespace(upserted_id=None)
+        self.inserted.append({**query, **update["$setOnInsert"]})
+        return types.SimpleNamespace(upserted_id="dummyid")
     def find(self, query):
         return self._data
 
@@ -26,6 +31,25 @@ class DummyService:
     def __init__(self, reviews=None, processed=None):
         self.db = DummyDB(reviews, processed)
 
+class DummyAsyncCollection:
+    def __init__(self, collection):
+        self.collection = collection
+    async def find_one(self, query):
+        return self.collection.find_one(query)
+    async def insert_one(self, doc):
+        return self.collection.insert_one(doc)
+    async def update_one(self, query, update, upsert=False):
+        return self.collection.update_one(query, update, upsert=upsert)
+
+class DummyAsyncDB:
+    def __init__(self, db):
+        self.reviews = DummyAsyncCollection(db.reviews)
+        self.processed_review = DummyAsyncCollection(db.processed_review)
+
+class DummyAsyncService:
+    def __init__(self, service):
+        self.db = DummyAsyncDB(service.db)
+
 class DummyAgent:
     def __init__(self, result):
         self.result = result
@@ -40,18 +64,23 @@ def patch_db(monkeypatch):
         DatabaseService._instance = dummy
         DatabaseService._instance.db = dummy.db
         monkeypatch.setattr("src.utils.db_service.DatabaseService.__new__", lambda cls, *a, **kw: dummy)
+        async_dummy = DummyAsyncService(dummy)
+        monkeypatch.setattr("src.utils.async_db_service.AsyncDatabaseService.__new__", lambda cls, *a, **kw: async_dummy)
         return dummy
     return _patch
 
 @pytest.fixture
 def patch_agents(monkeypatch):
-    def _patch(trans="en", reply="reply", analysis={"score": 1}):
+    def _patch(trans="en", reply="reply", analysis={"score": 1}, fused=None):
         import src.tasks.process_review_tasks as prt
         import importlib
+        from src.agents.agent_registry import AgentRegistry
         importlib.reload(prt)
-        monkeypatch.setattr(prt, "AIAgentTranslator", lambda: DummyAgent(trans))
-        monkeypatch.setattr(prt, "AIAgentReplyGenerator", lambda: DummyAgent(reply))
-        monkeypatch.setattr(prt, "AIAgentReviewAnalyzer", lambda: DummyAgent(analysis))
+        AgentRegistry.reset_instance()
+        monkeypatch.setattr(prt, "AIAgentTranslator", lambda **kwargs: DummyAgent(trans))
+        monkeypatch.setattr(prt, "AIAgentReplyGenerator", lambda **kwargs: DummyAgent(reply))
+        monkeypatch.setattr(prt, "AIAgentReviewAnalyzer", lambda **kwargs: DummyAgent(analysis))
+        monkeypatch.setattr(prt, "AIAgentReviewFused", lambda **kwargs: DummyAgent(fused))
     return _patch
 
 def make_review():
@@ -140,7 +169,16 @@ def test_save_to_database_task_skips_if_processed(monkeypatch):
     importlib.reload(prt)
     prt.save_to_database_task("r1", "en", "reply", {"score": 1}, "D", "S", "p1", {"foo": "bar"})
     # Should not insert again, so nothing new in inserted
-    # (no assertion needed, just no error)
+    assert not dummy.db.processed_review.inserted
+
+def test_save_to_database_task_is_idempotent(monkeypatch):
+    dummy = patch_db(monkeypatch)(processed=[])
+    import src.tasks.process_review_tasks as prt
+    importlib.reload(prt)
+    prt.save_to_database_task("r1", "en", "reply", {"score": 1}, "D", "S", "p1", {"foo": "bar"})
+    prt.save_to_database_task("r1", "en2", "reply2", {"score": 2}, "D", "S", "p1", {"foo": "bar"})
+    assert len(dummy.db.processed_review.inserted) == 1
+    assert dummy.db.processed_review.inserted[0]["orgReviewId"] == "r1"
 
 def test_review_processor_flow_success(monkeypatch, patch_agents):
     dummy = patch_db(monkeypatch)(reviews=[make_review()], processed=[])
@@ -153,6 +191,7 @@ def test_review_processor_flow_success(monkeypatch, patch_agents):
     patch_agents()
     proc = prt.ReviewProcessor()
     proc.process_review_flow("r1")
+    assert dummy.db.processed_review.inserted[0]["enReview"] == "en"
 
 def test_review_processor_flow_already_processed(monkeypatch, patch_agents):
     dummy = patch_db(monkeypatch)(reviews=[make_review()], processed=[{"orgReviewId": "r1", "isProcessed": True}])
@@ -164,7 +203,8 @@ def test_review_processor_flow_already_processed(monkeypatch, patch_agents):
     importlib.reload(prt)
     patch_agents()
     proc = prt.ReviewProcessor()
-    proc.process_review_flow("r1")  # Should skip
+    proc.process_review_flow("r1")  # The upsert matches the existing document
+    assert not dummy.db.processed_review.inserted
 
 def test_review_processor_flow_missing_review(monkeypatch, patch_agents):
     dummy = patch_db(monkeypatch)(reviews=[], processed=[])
@@ -190,3 +230,94 @@ def test_review_processor_flow_subtask_fail(monkeypatch, patch_agents):
     patch_agents(trans=None)  # translation_task will fail
     proc = prt.ReviewProcessor()
     proc.process_review_flow("r1")  # Should log and skip DB save
+    assert not dummy.db.processed_review.inserted
+
+def test_review_processor_fused_mode_falls_back_per_field(monkeypatch, patch_agents):
+    dummy = patch_db(monkeypatch)(reviews=[make_review()], processed=[])
+    monkeypatch.setenv("REVIEW_AGENT_MODE", "fused")
+    import src.tasks.process_review_tasks as prt
+    importlib.reload(prt)
+    fused = {"enReview": "fused en", "analysis": None, "reply": {"ai_reply": "a", "en_reply": "b"}}
+    patch_agents(analysis={"sentiment": "Positive"}, fused=fused)
+    proc = prt.ReviewProcessor()
+    proc.process_review_flow("r1")
+    saved = dummy.db.processed_review.inserted[0]
+    assert saved["enReview"] == "fused en"
+    assert saved["aiGeneratedReply"]["aiReply"] == {"ai_reply": "a", "en_reply": "b"}
+    assert saved["analysis"] == {"sentiment": "Positive"}
+    # The agent's answer (a cached object in production) is left as the model produced it
+    assert fused["analysis"] is None
+
+def test_review_agent_mode_rejects_unknown(monkeypatch):
+    monkeypatch.setenv("REVIEW_AGENT_MODE", "triple")
+    import src.tasks.process_review_tasks as prt
+    with pytest.raises(ValueError):
+        prt.review_agent_mode()
+
+def test_review_processor_skips_translation_for_english(monkeypatch, patch_agents):
+    review = make_review()
+    review["rawReview"]["attributes"]["body"] = "The app keeps crashing when I open my playlist, please fix it soon."
+    dummy = patch_db(monkeypatch)(reviews=[review], processed=[])
+    import src.tasks.process_review_tasks as prt
+    importlib.reload(prt)
+    patch_agents(trans=None)  # a translator call would fail the flow
+    proc = prt.ReviewProcessor()
+    proc.process_review_flow("r1")
+    saved = dummy.db.processed_review.inserted[0]
+    assert saved["enReview"] == "T\nThe app keeps crashing when I open my playlist, please fix it soon."
+    assert saved["language"]["code"] == "en"
+    assert saved["language"]["confidence"] >= 0.9
+
+def test_analyze_reviews_batched_retries_failed_entries(monkeypatch, patch_agents):
+    patch_db(monkeypatch)(reviews=[], processed=[])
+    import src.tasks.process_review_tasks as prt
+    importlib.reload(prt)
+    patch_agents(analysis={"sentiment": "Neutral"})
+    class DummyBatchAgent:
+        concurrency = 4
+        async def analyze_many(self, reviews, limiter=None):
+            return {"r1": {"sentiment": "Positive"}, "r2": None}
+    monkeypatch.setattr(prt, "AIAgentReviewBatchAnalyzer", lambda **kwargs: DummyBatchAgent())
+    proc = prt.ReviewProcessor()
+    import asyncio
+    results = asyncio.run(proc.analyze_reviews_batched([("r1", "good"), ("r2", "meh")]))
+    assert results == {"r1": {"sentiment": "Positive"}, "r2": {"sentiment": "Neutral"}}
+
+def test_analyze_reviews_batched_bounds_the_individual_retries(monkeypatch, patch_agents):
+    patch_db(monkeypatch)(reviews=[], processed=[])
+    import src.tasks.process_review_tasks as prt
+    importlib.reload(prt)
+    patch_agents()
+    import asyncio
+    class SlowAnalyzer:
+        in_flight = peak = 0
+        async def perform_task(self, *a, **k):
+            SlowAnalyzer.in_flight += 1
+            SlowAnalyzer.peak = max(SlowAnalyzer.peak, SlowAnalyzer.in_flight)
+            await asyncio.sleep(0.01)
+            SlowAnalyzer.in_flight -= 1
+            return {"sentiment": "Neutral"}
+    class DummyBatchAgent:
+        concurrency = 2
+        async def analyze_many(self, reviews, limiter=None):
+            return {}
+    monkeypatch.setattr(prt, "AIAgentReviewAnalyzer", lambda **kwargs: SlowAnalyzer())
+    monkeypatch.setattr(prt, "AIAgentReviewBatchAnalyzer", lambda **kwargs: DummyBatchAgent())
+    proc = prt.ReviewProcessor()
+    results = asyncio.run(proc.analyze_reviews_batched([(f"r{i}", "meh") for i in range(10)]))
+    assert len(results) == 10 and SlowAnalyzer.peak == 2
+
+def test_review_processor_routes_short_reviews_to_the_small_model(monkeypatch, patch_agents):
+    dummy = patch_db(monkeypatch)(reviews=[make_review()], processed=[])
+    monkeypatch.setenv("MODEL_TIERING_ENABLED", "true")
+    monkeypatch.setenv("MODEL_NAME_SMALL", "mini")
+    import src.tasks.process_review_tasks as prt
+    importlib.reload(prt)
+    patch_agents()
+    monkeypatch.setattr(prt, "AIAgentTranslator", lambda **kwargs: DummyAgent(f"en via {kwargs.get('model')}"))
+    proc = prt.ReviewProcessor()
+    proc.process_review_flow("r1")
+    saved = dummy.db.processed_review.inserted[0]
+    assert saved["enReview"] == "en via mini"
+    assert saved["modelRouting"]["tier"] == "small" and saved["modelRouting"]["reason"] == "short"
+    assert saved["modelRouting"]["features"]["complaint"] is False
@@ -0,0 +1,93 @@
+import asyncio
+import pytest
+from src.agents.response_cache import ResponseCache, cached_response, normalize_input
+
+
+class DummyAsyncCollection:
+    def __init__(self):
+        self.docs = {}
+    async def find_one(self, query, projection=None):
+        return self.docs.get(query["_id"])
+    async def update_one(self, query, update, upsert=False):
+        self.docs[query["_id"]] = {"_id": query["_id"], **update["$set"]}
+
+class DummyAsyncDB:
+    def __init__(self):
+        self.llm_cache = DummyAsyncCollection()
+
+class DummyAsyncService:
+    def __init__(self, db=None):
+        self.db = db
+
+class DummyAgent:
+    PROMPT_VERSION = "v1"
+    def __init__(self, results, model="model-a"):
+        self.name = "dummy_agent"
+        self.model = model
+        self.results = list(results)
+        self.calls = 0
+    @cached_response()
+    async def perform_task(self, input_data):
+        self.calls += 1
+        return self.results.pop(0)
+
+@pytest.fixture
+def cache(monkeypatch):
+    def _cache(db=None, **env):
+        for key, value in env.items():
+            monkeypatch.setenv(key, value)
+        service = DummyAsyncService(db)
+        monkeypatch.setattr("src.utils.async_db_service.AsyncDatabaseService.__new__", lambda cls, *a, **kw: service)
+        ResponseCache.reset_instance()
+        return ResponseCache()
+    yield _cache
+    ResponseCache.reset_instance()
+
+def test_key_normalizes_input_and_includes_model_and_version():
+    assert normalize_input("  こんにちは\n\n世界  ") == "こんにちは 世界"
+    key = ResponseCache.make_key("a", "m", "v1", "hello  world")
+    assert key == ResponseCache.make_key("a", "m", "v1", " hello world ")
+    assert key != ResponseCache.make_key("a", "m2", "v1", "hello world")
+    assert key != ResponseCache.make_key("a", "m", "v2", "hello world")
+    assert key != ResponseCache.make_key("b", "m", "v1", "hello world")
+
+def test_memory_hit_skips_model_call(cache):
+    c = cache()
+    agent = DummyAgent(["first", "second"])
+    assert asyncio.run(agent.perform_task("text")) == "first"
+    assert asyncio.run(agent.perform_task("text ")) == "first"
+    assert agent.calls == 1
+    stats = c.stats()
+    assert stats["memory_hits"] == 1 and stats["misses"] == 1 and stats["stores"] == 1
+
+def test_errors_are_not_cached(cache):
+    cache()
+    agent = DummyAgent([{"error": "boom"}, {"sentiment": "positive"}])
+    assert asyncio.run(agent.perform_task("text")) == {"error": "boom"}
+    assert asyncio.run(agent.perform_task("text")) == {"sentiment": "positive"}
+    assert agent.calls == 2
+
+def test_bypass_forces_fresh_call(cache):
+    cache()
+    agent = DummyAgent(["old", "new"])
+    asyncio.run(agent.perform_task("text"))
+    assert asyncio.run(agent.perform_task("text", bypass_cache=True)) == "new"
+    assert asyncio.run(agent.perform_task("text")) == "new"
+
+def test_mongo_tier_serves_other_processes(cache):
+    db = DummyAsyncDB()
+    cache(db=db)
+    asyncio.run(DummyAgent(["shared"]).perform_task("text"))
+    assert len(db.llm_cache.docs) == 1
+    c = cache(db=db)
+    agent = DummyAgent(["fresh"])
+    assert asyncio.run(agent.perform_task("text")) == "shared"
+    assert agent.calls == 0
+    assert c.stats()["mongo_hits"] == 1
+
+def test_disabled_cache_always_calls_model(cache):
+    cache(LLM_CACHE_ENABLED="false")
+    agent = DummyAgent(["a", "b"])
+    asyncio.run(agent.perform_task("text"))
+    asyncio.run(agent.perform_task("text"))
+    assert agent.calls == 2
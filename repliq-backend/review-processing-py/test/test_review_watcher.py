@@ -0,0 +1,233 @@
+import asyncio
+import time
+from datetime import datetime, timedelta, timezone
+import pytest
+from bson import ObjectId
+from pymongo.errors import DuplicateKeyError, OperationFailure
+from src.jobs.review_watcher import ReviewWatcher, ReviewWatcherRunner
+from src.utils.async_runtime import AsyncRuntime
+from src.utils import metrics
+
+
+class DummyCursor:
+    def __init__(self, docs):
+        self.docs = docs
+    def sort(self, *a, **k):
+        return self
+    def limit(self, n):
+        return DummyCursor(self.docs[:n])
+    async def to_list(self, length=None):
+        return list(self.docs)
+
+class DummyStream:
+    def __init__(self, changes, on_empty):
+        self.changes = list(changes)
+        self.on_empty = on_empty
+        self.resume_token = None
+    async def __aenter__(self):
+        return self
+    async def __aexit__(self, *exc):
+        return False
+    async def try_next(self):
+        if not self.changes:
+            self.on_empty()
+            return None
+        change = self.changes.pop(0)
+        self.resume_token = change["_id"]
+        return change
+
+class DummyReviews:
+    def __init__(self, docs=(), changes=None, watch_error=None):
+        self.docs = list(docs)
+        self.changes = changes or []
+        self.watch_error = watch_error
+        self.watch_kwargs = None
+        self.on_empty = lambda: None
+    def find(self, query, projection=None):
+        after = query["_id"]["$gt"]
+        return DummyCursor(sorted((d for d in self.docs if d["_id"] > after), key=lambda d: d["_id"]))
+    async def watch(self, pipeline, **kwargs):
+        self.watch_kwargs = kwargs
+        if self.watch_error is not None:
+            raise self.watch_error
+        return DummyStream(self.changes, self.on_empty)
+
+class DummyState:
+    def __init__(self, doc=None):
+        self.doc = doc
+    def _owned(self, query):
+        for cond in query["$or"]:
+            if "leaseOwner" in cond and cond["leaseOwner"] == {"$exists": False} and "leaseOwner" not in self.doc:
+                return True
+            if cond.get("leaseOwner") == self.doc.get("leaseOwner"):
+                return True
+            if "leaseExpiresAt" in cond and self.doc.get("leaseExpiresAt") < cond["leaseExpiresAt"]["$lt"]:
+                return True
+        return False
+    async def find_one_and_update(self, query, update, upsert=False, return_document=None):
+        if self.doc is None:
+            self.doc = {"_id": query["_id"]}
+        elif not self._owned(query):
+            # The upsert collides with the existing state document
+            raise DuplicateKeyError("duplicate key", code=11000)
+        self.doc.update(update["$set"])
+        return dict(self.doc)
+    async def find_one(self, query):
+        return dict(self.doc) if self.doc else None
+    async def update_one(self, query, update):
+        if self.doc is None or query.get("leaseOwner", self.doc.get("leaseOwner")) != self.doc.get("leaseOwner"):
+            return
+        self.doc.update(update.get("$set", {}))
+        for key in update.get("$unset", {}):
+            self.doc.pop(key, None)
+
+class DummyDbService:
+    def __init__(self, reviews, state):
+        self.collections = {"reviews": reviews, "review_watcher_state": state}
+    def get_collection(self, name):
+        return self.collections[name]
+
+class DummyJobQueue:
+    def __init__(self, error=None, on_create=lambda: None):
+        self.jobs = []
+        self.error = error
+        self.on_create = on_create
+    async def create_job(self, product_id, review_ids, priority_classes=None, **kwargs):
+        if self.error is not None:
+            raise self.error
+        self.jobs.append((product_id, review_ids, priority_classes))
+        self.on_create()
+
+@pytest.fixture(autouse=True)
+def clean_registry():
+    metrics.REGISTRY.clear()
+    yield
+    metrics.REGISTRY.clear()
+
+def review(product_id, source_id, rating=5):
+    return {"_id": ObjectId(), "productId": product_id, "sourceReviewId": source_id,
+            "rawReview": {"attributes": {"rating": rating, "createdDate": datetime.now(timezone.utc).isoformat()}}}
+
+def make_watcher(reviews, state=None, job_queue=None, **kwargs):
+    state = state or DummyState()
+    job_queue = job_queue or DummyJobQueue()
+    options = {"batch_size": 2, "batch_seconds": 60, "poll_interval": 0.01, "lease_seconds": 30, **kwargs}
+    watcher = ReviewWatcher(db_service=DummyDbService(reviews, state), job_queue=job_queue, **options)
+    return watcher, state, job_queue
+
+def test_poll_catch_up_batches_by_count_and_checkpoints_last_id():
+    start = ObjectId.from_datetime(datetime.now(timezone.utc) - timedelta(minutes=1))
+    docs = [review("p1", "r1"), review("p2", "r2", rating=1), review("p1", "r3")]
+    watcher, state, job_queue = make_watcher(DummyReviews(docs), mode="poll")
+    async def scenario():
+        assert await watcher.acquire_lease()
+        return await watcher.catch_up(start)
+    assert asyncio.run(scenario()) == docs[-1]["_id"]
+    assert job_queue.jobs == [("p1", ["r1"], {"r1": "new"}), ("p2", ["r2"], {"r2": "urgent"}), ("p1", ["r3"], {"r3": "new"})]
+    assert state.doc["lastId"] == docs[-1]["_id"]
+    assert metrics.REVIEW_WATCHER_REVIEWS.labels("poll").value == 3
+    assert sum(metrics.REVIEW_WATCHER_LAG_SECONDS.labels().counts) == 3
+
+def test_change_stream_flushes_full_batches_and_stores_resume_token():
+    docs = [review("p1", f"r{i}") for i in range(3)]
+    reviews = DummyReviews(changes=[{"_id": {"_data": f"t{i}"}, "fullDocument": doc} for i, doc in enumerate(docs)])
+    watcher, state, job_queue = make_watcher(reviews, state=DummyState({"_id": "reviews", "resumeToken": {"_data": "t-old"}}), mode="change_stream")
+    reviews.on_empty = watcher.stop
+    async def scenario():
+        assert await watcher.acquire_lease()
+        await watcher.run_as_leader()
+    asyncio.run(scenario())
+    assert reviews.watch_kwargs["resume_after"] == {"_data": "t-old"}
+    assert job_queue.jobs == [("p1", ["r0", "r1"], {"r0": "new", "r1": "new"})]
+    # The third review is not checkpointed yet, so a restart re-reads it
+    assert state.doc["resumeToken"] == {"_data": "t1"}
+    assert state.doc["lastId"] == docs[1]["_id"]
+
+def test_auto_mode_falls_back_to_polling_without_change_streams():
+    start = ObjectId.from_datetime(datetime.now(timezone.utc) - timedelta(minutes=1))
+    reviews = DummyReviews([review("p1", "r1")], watch_error=OperationFailure("not a replica set", code=40573))
+    watcher, state, job_queue = make_watcher(reviews, state=DummyState({"_id": "reviews", "lastId": start}))
+    job_queue.on_create = watcher.stop
+    async def scenario():
+        assert await watcher.acquire_lease()
+        await watcher.run_as_leader()
+    asyncio.run(scenario())
+    assert watcher.mode == "poll"
+    assert job_queue.jobs == [("p1", ["r1"], {"r1": "new"})]
+
+def test_invalid_resume_token_is_dropped():
+    reviews = DummyReviews(watch_error=OperationFailure("resume point no longer in oplog", code=286))
+    watcher, state, _ = make_watcher(reviews, state=DummyState({"_id": "reviews", "resumeToken": {"_data": "gone"}}))
+    async def scenario():
+        assert await watcher.acquire_lease()
+        await watcher.run_as_leader()
+    asyncio.run(scenario())
+    assert "resumeToken" not in state.doc
+
+def test_only_one_watcher_holds_the_lease():
+    now = datetime.now(timezone.utc)
+    state = DummyState({"_id": "reviews", "leaseOwner": "other", "leaseExpiresAt": now + timedelta(seconds=30)})
+    watcher, _, _ = make_watcher(DummyReviews(), state=state)
+    assert asyncio.run(watcher.acquire_lease()) is False
+    state.doc["leaseExpiresAt"] = now - timedelta(seconds=1)
+    assert asyncio.run(watcher.acquire_lease()) is True
+    assert state.doc["leaseOwner"] == watcher.owner
+
+def test_stopped_watcher_releases_its_lease():
+    start = ObjectId.from_datetime(datetime.now(timezone.utc) - timedelta(minutes=1))
+    watcher, state, job_queue = make_watcher(DummyReviews([review("p1", "r1")]), state=DummyState({"_id": "reviews", "lastId": start}), mode="poll")
+    job_queue.on_create = watcher.stop
+    asyncio.run(watcher.run())
+    assert job_queue.jobs == [("p1", ["r1"], {"r1": "new"})]
+    assert "leaseOwner" not in state.doc
+    successor, _, _ = make_watcher(DummyReviews(), state=state)
+    assert asyncio.run(successor.acquire_lease()) is True
+
+def test_catch_up_stops_once_the_lease_is_lost():
+    start = ObjectId.from_datetime(datetime.now(timezone.utc) - timedelta(minutes=1))
+    state = DummyState({"_id": "reviews", "leaseOwner": "other", "leaseExpiresAt": datetime.now(timezone.utc) + timedelta(seconds=30)})
+    watcher, _, job_queue = make_watcher(DummyReviews([review("p1", "r1")]), state=state)
+    assert asyncio.run(watcher.catch_up(start)) == start
+    assert job_queue.jobs == []
+
+def test_failed_enqueue_keeps_reviews_pending_and_checkpoint_unchanged():
+    start = ObjectId.from_datetime(datetime.now(timezone.utc) - timedelta(minutes=1))
+    watcher, state, _ = make_watcher(DummyReviews(), state=DummyState({"_id": "reviews", "lastId": start}), job_queue=DummyJobQueue(error=RuntimeError("mongo down")))
+    watcher.add(review("p1", "r1"))
+    async def scenario():
+        assert await watcher.acquire_lease()
+        await watcher.flush("poll")
+    with pytest.raises(RuntimeError):
+        asyncio.run(scenario())
+    assert [r["sourceReviewId"] for r in watcher._pending] == ["r1"]
+    assert state.doc["lastId"] == start
+
+def test_runner_is_disabled_by_default(monkeypatch):
+    monkeypatch.delenv("REVIEW_WATCHER_ENABLED", raising=False)
+    runner = ReviewWatcherRunner(watcher_factory=lambda: pytest.fail("watcher should not start"))
+    runner.start()
+    assert runner.future is None
+
+def test_stop_services_waits_for_the_watcher_to_release_its_lease(monkeypatch):
+    import src.app as app_module
+    class SlowState(DummyState):
+        async def update_one(self, query, update):
+            await asyncio.sleep(0.05)
+            await super().update_one(query, update)
+    monkeypatch.setenv("REVIEW_WATCHER_ENABLED", "true")
+    state = SlowState({"_id": "reviews", "lastId": ObjectId()})
+    runner = ReviewWatcherRunner(watcher_factory=lambda: make_watcher(DummyReviews(), state=state, mode="poll")[0])
+    monkeypatch.setattr(app_module, "review_watcher", runner)
+    AsyncRuntime.reset_instance()
+    runner.start()
+    deadline = time.monotonic() + 2
+    while "leaseOwner" not in state.doc and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert "leaseOwner" in state.doc
+    asyncio.run(app_module.stop_services())
+    assert "leaseOwner" not in state.doc
+    assert runner.future is None
+
+def test_unknown_mode_is_rejected():
+    with pytest.raises(ValueError):
+        make_watcher(DummyReviews(), mode="tail")
@@ -0,0 +1,129 @@
+import asyncio
+import time
+import pytest
+from google.adk.sessions.session import Session
+from src.utils.ttl_cache import TTLCache
+from src.utils.ephemeral_session_service import EphemeralSessionService
+from src.utils.mongo_session_service import MongoSessionService
+from src.utils import session_service_factory
+from pymongo import InsertOne
+
+
+class DummyCollection:
+    def __init__(self):
+        self.docs = {}
+        self.bulk_calls = 0
+        self.async_bulk_calls = 0
+        self.indexes = []
+    def create_index(self, key, **kwargs):
+        self.indexes.append((key, kwargs))
+    def bulk_write(self, operations, ordered=True):
+        self.bulk_calls += 1
+        for op in operations:
+            if isinstance(op, InsertOne):
+                self.docs[op._doc["_id"]] = op._doc
+            else:
+                self.docs.pop(op._filter["_id"], None)
+    def find_one(self, query):
+        return self.docs.get(query["_id"])
+    def find(self):
+        return list(self.docs.values())
+
+class DummyService:
+    def __init__(self):
+        self.collection = DummyCollection()
+    def connect(self):
+        pass
+    def get_collection(self, name):
+        return self.collection
+
+class DummyAsyncCollection:
+    def __init__(self, collection):
+        self.collection = collection
+    async def find_one(self, query):
+        return self.collection.find_one(query)
+    async def bulk_write(self, operations, ordered=True):
+        self.collection.async_bulk_calls += 1
+        await asyncio.sleep(0)
+        self.collection.bulk_write(operations, ordered)
+
+class DummyAsyncService:
+    def __init__(self, service):
+        self.service = service
+    def get_collection(self, name):
+        return DummyAsyncCollection(self.service.get_collection(name))
+
+def make_session(session_id="s1"):
+    return Session(app_name="app", user_id="u", id=session_id)
+
+def test_ttl_cache_evicts_lru_and_expired():
+    cache = TTLCache(max_size=2, ttl_seconds=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert "b" not in cache
+    assert cache.get("a") == 1
+    cache.set("d", 4, ttl_seconds=0)
+    assert cache.get("d") is None
+
+def test_ephemeral_session_roundtrip():
+    service = EphemeralSessionService(max_sessions=10, ttl_seconds=60)
+    session = make_session()
+    service.create_session(session.id, session)
+    assert asyncio.run(service.get_session(app_name="app", user_id="u", session_id="s1")) is session
+    service.delete_session("s1")
+    assert asyncio.run(service.get_session("s1")) is None
+
+def test_ephemeral_session_is_bounded():
+    service = EphemeralSessionService(max_sessions=3, ttl_seconds=60)
+    for i in range(10):
+        service.create_session(str(i), make_session(str(i)))
+    assert len(service.list_sessions()) == 3
+
+def test_mongo_session_create_then_delete_skips_mongo():
+    db = DummyService()
+    service = MongoSessionService(db_service=db, batch_size=100, flush_interval=60, async_db_service=DummyAsyncService(db))
+    service.create_session("s1", make_session())
+    assert asyncio.run(service.get_session("s1")).id == "s1"
+    service.delete_session("s1")
+    assert service.flush_writes() == 0
+    assert db.collection.bulk_calls == 0
+    assert db.collection.indexes[0][1]["expireAfterSeconds"] == service.ttl_seconds
+
+def test_mongo_session_batches_writes():
+    db = DummyService()
+    service = MongoSessionService(db_service=db, batch_size=3, flush_interval=60, async_db_service=DummyAsyncService(db))
+    for i in range(3):
+        service.create_session(str(i), make_session(str(i)))
+    assert db.collection.bulk_calls == 1
+    assert set(db.collection.docs) == {"0", "1", "2"}
+    service.delete_session("0")
+    service.close()
+    assert "0" not in db.collection.docs
+    assert asyncio.run(service.get_session("1")).id == "1"
+
+def test_mongo_session_flush_on_the_event_loop_uses_the_async_client():
+    db = DummyService()
+    service = MongoSessionService(db_service=db, batch_size=2, flush_interval=60, async_db_service=DummyAsyncService(db))
+    async def scenario():
+        service.create_session("s1", make_session("s1"))
+        service.create_session("s2", make_session("s2"))
+        # The flush is in flight; its sessions stay readable
+        assert (await service.get_session("s2")).id == "s2"
+        await asyncio.gather(*service._flush_tasks)
+    asyncio.run(scenario())
+    assert db.collection.async_bulk_calls == 1
+    assert set(db.collection.docs) == {"s1", "s2"}
+    assert not service._flushing_inserts
+
+def test_factory_selects_backend(monkeypatch):
+    session_service_factory.close_session_services()
+    monkeypatch.setenv("SESSION_BACKEND", "memory")
+    service = session_service_factory.get_session_service()
+    assert isinstance(service, EphemeralSessionService)
+    assert session_service_factory.get_session_service() is service
+    monkeypatch.setenv("SESSION_BACKEND", "bogus")
+    with pytest.raises(ValueError):
+        session_service_factory.get_session_service()
+    session_service_factory.close_session_services()
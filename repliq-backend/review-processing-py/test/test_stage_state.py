@@ -0,0 +1,282 @@
+import asyncio
+from types import SimpleNamespace
+import pytest
+from pymongo.errors import BulkWriteError
+from src.agents.ai_agents.ai_agent_translator import TRANSLATION_FAILED
+from src.agents.model_tiering import ModelTieringPolicy
+from src.tasks import stage_state
+from src.tasks.batch_review_pipeline import BatchReviewPipeline
+from src.tasks.near_duplicate_index import NearDuplicateIndex
+from src.tasks.process_review_tasks import ReviewProcessor
+from src.utils import metrics
+
+
+class DummyCursor:
+    def __init__(self, items):
+        self._items = items
+    async def to_list(self, length=None):
+        return list(self._items)
+    def __aiter__(self):
+        async def iterate():
+            for item in self._items:
+                yield item
+        return iterate()
+
+def matches(item, query):
+    for field, condition in query.items():
+        if isinstance(condition, dict):
+            if item.get(field) not in condition["$in"]:
+                return False
+        elif item.get(field) != condition:
+            return False
+    return True
+
+def set_path(doc, path, value):
+    *parents, leaf = path.split(".")
+    for key in parents:
+        doc = doc.setdefault(key, {})
+    doc[leaf] = value
+
+class DummyCollection:
+    def __init__(self, data=None, error=None):
+        self._data = list(data or [])
+        self.error = error
+        self.calls = []
+    def find(self, query, projection=None):
+        self.calls.append("find")
+        if self.error is not None:
+            raise self.error
+        return DummyCursor([item for item in self._data if matches(item, query)])
+    def _apply(self, query, update):
+        doc = next((item for item in self._data if matches(item, query)), None)
+        if doc is None:
+            doc = dict(query)
+            self._data.append(doc)
+            for path, value in update.get("$setOnInsert", {}).items():
+                set_path(doc, path, value)
+        for path, value in update.get("$set", {}).items():
+            set_path(doc, path, value)
+        for path, amount in update.get("$inc", {}).items():
+            *parents, leaf = path.split(".")
+            counters = doc
+            for key in parents:
+                counters = counters.setdefault(key, {})
+            counters[leaf] = counters.get(leaf, 0) + amount
+    async def update_one(self, query, update, upsert=False):
+        self.calls.append("update_one")
+        self._apply(query, update)
+    async def bulk_write(self, operations, ordered=True):
+        self.calls.append("bulk_write")
+        for op in operations:
+            self._apply(op._filter, op._doc)
+    async def delete_many(self, query):
+        self.calls.append("delete_many")
+        self._data = [item for item in self._data if not matches(item, query)]
+    def get(self, _id):
+        return next((item for item in self._data if item.get("_id") == _id), None)
+
+class DummyDB:
+    def __init__(self, reviews=None):
+        self.reviews = DummyCollection(reviews)
+        self.processed_review = DummyCollection()
+        self.review_stage_state = DummyCollection()
+    def __getitem__(self, name):
+        return getattr(self, name)
+
+@pytest.fixture(autouse=True)
+def clean_state():
+    NearDuplicateIndex.reset_instance()
+    metrics.REGISTRY.clear()
+    yield
+    NearDuplicateIndex.reset_instance()
+    metrics.REGISTRY.clear()
+
+def make_processor(outputs):
+    """A processor whose stage tasks answer from ``outputs[stage]`` (a list, one answer per call)."""
+    processor = ReviewProcessor.__new__(ReviewProcessor)
+    processor.fused_agent = None
+    processor.batch_analysis_enabled = False
+    processor.tiering = ModelTieringPolicy(enabled=False)
+    processor.language_detector = SimpleNamespace(is_confident=lambda language, code: False)
+    processor.near_duplicates = SimpleNamespace(find_matches=lambda candidates: asyncio.sleep(0, {}), add=lambda reviews: None)
+    processor.calls = []
+    def task(stage):
+        async def run(*args):
+            processor.calls.append(stage)
+            return outputs[stage].pop(0)
+        return run
+    processor.translation_task = task("translation")
+    processor.reply_task = task("reply")
+    processor.analysis_task = task("analysis")
+    return processor
+
+def test_stage_failure_detects_error_dicts_and_failed_translations():
+    assert stage_state.stage_failure("reply", {"ai_reply": "Thanks", "en_reply": "Thanks"}) is None
+    assert stage_state.stage_failure("analysis", {"error": "Failed to parse JSON"}) == "Failed to parse JSON"
+    assert stage_state.stage_failure("analysis", None) == "no result"
+    assert stage_state.stage_failure("translation", TRANSLATION_FAILED) == TRANSLATION_FAILED
+    assert stage_state.stage_failure("translation", "  ") == TRANSLATION_FAILED
+
+def test_checkpoints_keep_outputs_and_count_failed_attempts():
+    db = DummyDB()
+    asyncio.run(stage_state.checkpoint_stages(db, "r1", {"translation": "Hello"}, {"reply": "timeout"}))
+    asyncio.run(stage_state.checkpoint_stages(db, "r1", {"analysis": {"sentiment": "Positive"}}, {"reply": "timeout"}))
+    state = db.review_stage_state.get("r1")
+    assert state["attempts"] == {"reply": 2} and state["lastErrors"] == {"reply": "timeout"}
+    loaded = asyncio.run(stage_state.load_stage_states(db, ["r1", "r2"]))
+    assert loaded == {"r1": {"translation": "Hello", "analysis": {"sentiment": "Positive"}}}
+
+def test_unreadable_checkpoints_fall_back_to_running_every_stage():
+    db = DummyDB()
+    db.review_stage_state.error = RuntimeError("mongo down")
+    assert asyncio.run(stage_state.load_stage_states(db, ["r1"])) == {}
+    assert asyncio.run(stage_state.load_stage_states(None, ["r1"])) == {}
+
+def patch_single_flow(monkeypatch, db, saved):
+    import src.tasks.process_review_tasks as tasks
+    async def save(review_id, translation, reply, analysis, *args):
+        saved.append((review_id, translation, reply, analysis))
+        return True
+    monkeypatch.setattr(tasks, "AsyncDatabaseService", lambda: SimpleNamespace(db=db))
+    monkeypatch.setattr(tasks, "save_to_database_task_async", save)
+    monkeypatch.setattr(tasks, "fetch_review_details_task_async", lambda review_id: asyncio.sleep(0, {}))
+    monkeypatch.setattr(tasks, "extract_review_fields", lambda details: dict.fromkeys(["review_text", "customer_name", "review_date", "source", "product_id", "raw_review"], "x"))
+    monkeypatch.setattr(tasks, "detect_review_language", lambda text: None)
+
+def test_retry_runs_only_the_failed_stage(monkeypatch):
+    db = DummyDB()
+    saved = []
+    patch_single_flow(monkeypatch, db, saved)
+    reply = {"ai_reply": "ありがとう", "en_reply": "Thanks"}
+    processor = make_processor({
+        "translation": ["Hello"],
+        "reply": [{"error": "Failed to parse JSON"}, reply],
+        "analysis": [{"sentiment": "Positive"}],
+    })
+
+    asyncio.run(processor.process_review_flow_async("r1"))
+    assert saved == []
+    state = db.review_stage_state.get("r1")
+    assert set(state["stages"]) == {"translation", "analysis"}
+    assert state["lastErrors"] == {"reply": "Failed to parse JSON"}
+    assert db.review_stage_state.calls == ["find", "bulk_write"]
+
+    asyncio.run(processor.process_review_flow_async("r1"))
+    assert processor.calls.count("translation") == 1 and processor.calls.count("analysis") == 1
+    assert processor.calls.count("reply") == 2
+    assert saved == [("r1", "Hello", reply, {"sentiment": "Positive"})]
+    assert db.review_stage_state.get("r1") is None
+    assert db.review_stage_state.calls[2:] == ["find", "delete_many"]
+    assert metrics.REVIEW_STAGES_RESUMED.labels("analysis").value == 1
+
+def test_single_review_saved_in_time_writes_no_checkpoint(monkeypatch):
+    db = DummyDB()
+    saved = []
+    patch_single_flow(monkeypatch, db, saved)
+    processor = make_processor({"translation": ["Hello"], "reply": [{"ai_reply": "ok", "en_reply": "ok"}], "analysis": [{"sentiment": "Positive"}]})
+    asyncio.run(processor.process_review_flow_async("r1"))
+    assert len(saved) == 1
+    assert db.review_stage_state.calls == ["find"]
+
+def batch_reviews(*numbers):
+    return [
+        {"sourceReviewId": f"r{i}", "productId": "p1", "source": "S",
+         "rawReview": {"attributes": {"title": "T", "body": f"B{i}", "reviewerNickname": f"n{i}", "createdDate": "D"}}}
+        for i in numbers
+    ]
+
+def test_batch_checkpoints_partial_reviews_and_resumes_them():
+    db = DummyDB(batch_reviews(1, 2))
+    processor = make_processor({
+        "translation": ["en", "en"],
+        "analysis": [{"sentiment": "Positive"}, {"sentiment": "Positive"}],
+    })
+    replies = {"n1": [{"ai_reply": "ok", "en_reply": "ok"}], "n2": [None, {"ai_reply": "ok", "en_reply": "ok"}]}
+    async def reply_task(review_text, customer_name, tier=None):
+        processor.calls.append("reply")
+        return replies[customer_name].pop(0)
+    processor.reply_task = reply_task
+    pipeline = BatchReviewPipeline(processor=processor, db_service=SimpleNamespace(db=db), concurrency=1)
+
+    assert asyncio.run(pipeline.run(["r1", "r2"])) == {"r1": "processed", "r2": "failed"}
+    assert set(db.review_stage_state.get("r2")["stages"]) == {"translation", "analysis"}
+    assert db.review_stage_state.calls == ["find", "bulk_write"]
+
+    assert asyncio.run(pipeline.run(["r1", "r2"])) == {"r1": "already_processed", "r2": "processed"}
+    assert processor.calls.count("translation") == 2 and processor.calls.count("analysis") == 2
+    written = {doc["orgReviewId"]: doc for doc in db.processed_review._data}
+    assert written["r2"]["enReview"] == "en" and written["r2"]["aiGeneratedReply"]["aiReply"] == {"ai_reply": "ok", "en_reply": "ok"}
+    assert db.review_stage_state.get("r2") is None
+
+def test_fused_retry_does_not_redo_a_checkpointed_translation():
+    processor = make_processor({"translation": [], "reply": [], "analysis": []})
+    processor.fused_agent = object()
+    async def fused_task(review_text, customer_name, tier=None):
+        processor.calls.append("fused")
+        return {"reply": {"ai_reply": "ok", "en_reply": "ok"}, "analysis": {"sentiment": "Positive"}}
+    processor.fused_task = fused_task
+    results, failures = asyncio.run(processor.run_missing_stages("レビュー", "n1", completed={"translation": "Review"}))
+    assert processor.calls == ["fused"]
+    assert failures == {} and results["translation"] == "Review"
+
+def test_batch_checkpoints_stages_as_they_finish(monkeypatch):
+    monkeypatch.setenv("REVIEW_STAGE_CHECKPOINT_SECONDS", "0")
+    db = DummyDB(batch_reviews(1))
+    processor = make_processor({"translation": ["en"], "analysis": [{"sentiment": "Positive"}]})
+    async def stuck_reply(review_text, customer_name, tier=None):
+        await asyncio.Event().wait()
+    processor.reply_task = stuck_reply
+    pipeline = BatchReviewPipeline(processor=processor, db_service=SimpleNamespace(db=db))
+    # The worker dies while the reply is still running
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(asyncio.wait_for(pipeline.run(["r1"]), timeout=0.2))
+    assert set(db.review_stage_state.get("r1")["stages"]) == {"translation", "analysis"}
+
+def test_batch_keeps_finished_stages_of_a_review_that_raised():
+    db = DummyDB(batch_reviews(1))
+    processor = make_processor({"translation": ["en"], "analysis": [{"sentiment": "Positive"}]})
+    async def broken_reply(review_text, customer_name, tier=None):
+        raise RuntimeError("provider down")
+    processor.reply_task = broken_reply
+    pipeline = BatchReviewPipeline(processor=processor, db_service=SimpleNamespace(db=db))
+    assert asyncio.run(pipeline.run(["r1"])) == {"r1": "failed"}
+    assert set(db.review_stage_state.get("r1")["stages"]) == {"translation", "analysis"}
+
+def test_batch_checkpoints_documents_whose_write_failed():
+    db = DummyDB(batch_reviews(1))
+    async def failing_bulk_write(operations, ordered=True):
+        raise RuntimeError("write concern error")
+    db.processed_review.bulk_write = failing_bulk_write
+    processor = make_processor({"translation": ["en"], "reply": [{"ai_reply": "ok", "en_reply": "ok"}], "analysis": [{"sentiment": "Positive"}]})
+    pipeline = BatchReviewPipeline(processor=processor, db_service=SimpleNamespace(db=db))
+    assert asyncio.run(pipeline.run(["r1"])) == {"r1": "failed"}
+    stages = db.review_stage_state.get("r1")["stages"]
+    assert {stage: entry["value"] for stage, entry in stages.items()} == {
+        "translation": "en", "reply": {"ai_reply": "ok", "en_reply": "ok"}, "analysis": {"sentiment": "Positive"},
+    }
+
+def test_partial_bulk_write_failure_only_fails_the_listed_documents():
+    db = DummyDB(batch_reviews(1, 2, 3))
+    written = []
+    async def partial_bulk_write(operations, ordered=True):
+        errors = []
+        for index, op in enumerate(operations):
+            review_id = op._filter["orgReviewId"]
+            if review_id == "r2":
+                errors.append({"index": index, "code": 11000, "errmsg": "E11000 duplicate key"})
+            elif review_id == "r3":
+                errors.append({"index": index, "code": 121, "errmsg": "Document failed validation"})
+            else:
+                written.append(review_id)
+        raise BulkWriteError({"writeErrors": errors, "nInserted": 0, "nUpserted": len(written)})
+    db.processed_review.bulk_write = partial_bulk_write
+    processor = make_processor({
+        "translation": ["en"] * 3,
+        "reply": [{"ai_reply": "ok", "en_reply": "ok"}] * 3,
+        "analysis": [{"sentiment": "Positive"}] * 3,
+    })
+    pipeline = BatchReviewPipeline(processor=processor, db_service=SimpleNamespace(db=db))
+    assert asyncio.run(pipeline.run(["r1", "r2", "r3"])) == {"r1": "processed", "r2": "already_processed", "r3": "failed"}
+    assert written == ["r1"]
+    assert [doc["_id"] for doc in db.review_stage_state._data] == ["r3"]
+    assert len(NearDuplicateIndex().products["p1"]) == 1
@@ -0,0 +1,152 @@
+import asyncio
+import json
+from types import SimpleNamespace
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from src.agents.llm_rate_limiter import LLMRateLimiter
+from src.agents.response_cache import ResponseCache
+from src.agents.ai_agents.ai_agent_translator import AIAgentTranslator, TRANSLATION_FAILED
+from src.agents.ai_agents.ai_agent_reply_generator import AIAgentReplyGenerator
+import src.agents.base.base_agent as base_agent
+import src.controllers.translation_controller as translation_controller
+import src.controllers.reply_generator_controller as reply_generator_controller
+
+
+def make_event(text, partial=False, final=False):
+    return SimpleNamespace(
+        partial=partial,
+        content=SimpleNamespace(parts=[SimpleNamespace(text=text)]),
+        usage_metadata=None,
+        is_final_response=lambda: final,
+    )
+
+class DummySessionService:
+    def create_session(self, session_id, session):
+        pass
+    def delete_session(self, session_id):
+        pass
+
+class DummyRunner:
+    events = []
+    def __init__(self, **kwargs):
+        pass
+    async def run_async(self, **kwargs):
+        DummyRunner.last_kwargs = kwargs
+        for event in DummyRunner.events:
+            yield event
+
+def collect(events):
+    async def main():
+        return [event async for event in events]
+    return asyncio.run(main())
+
+@pytest.fixture(autouse=True)
+def isolate(monkeypatch):
+    monkeypatch.setenv("LLM_CACHE_MONGO_ENABLED", "false")
+    ResponseCache.reset_instance()
+    LLMRateLimiter.reset_instance()
+    yield
+    ResponseCache.reset_instance()
+    LLMRateLimiter.reset_instance()
+
+def fake_stream(chunks):
+    async def stream_agent(input_data, app_name):
+        for chunk in chunks:
+            yield chunk
+    return stream_agent
+
+def test_stream_agent_yields_partial_text_and_skips_aggregate(monkeypatch):
+    monkeypatch.setattr(base_agent, "AgentRunner", DummyRunner)
+    monkeypatch.setattr(base_agent, "get_session_service", lambda db_service: DummySessionService())
+    DummyRunner.events = [make_event("Hel", partial=True), make_event("lo", partial=True), make_event("Hello", final=True)]
+    agent = AIAgentTranslator(model="test-model")
+    assert collect(agent.stream_agent("こんにちは", "translation_app")) == ["Hel", "lo"]
+    assert DummyRunner.last_kwargs["run_config"].streaming_mode.name == "SSE"
+    assert LLMRateLimiter().snapshot()["models"]["test-model"]["succeeded"] == 1
+
+def test_translator_stream_strips_think_and_caches_result(monkeypatch):
+    agent = AIAgentTranslator(model="test-model")
+    monkeypatch.setattr(agent, "stream_agent", fake_stream(["<think>hmm", "</think> Hello", " world"]))
+    events = collect(agent.stream_task("こんにちは世界"))
+    assert [e["text"] for e in events if e["type"] == "delta"] == ["Hello", " world"]
+    assert events[-1] == {"type": "done", "result": "Hello world"}
+    monkeypatch.setattr(agent, "stream_agent", fake_stream(["should not be called"]))
+    assert collect(agent.stream_task("こんにちは世界")) == [{"type": "done", "result": "Hello world"}]
+    assert asyncio.run(agent.perform_task("こんにちは世界")) == "Hello world"
+
+def test_translator_stream_failure_is_not_cached(monkeypatch):
+    agent = AIAgentTranslator(model="test-model")
+    async def broken(input_data, app_name):
+        raise RuntimeError("boom")
+        yield
+    monkeypatch.setattr(agent, "stream_agent", broken)
+    assert collect(agent.stream_task("テキスト")) == [{"type": "done", "result": TRANSLATION_FAILED}]
+    assert ResponseCache().stats()["stores"] == 0
+
+def test_translator_stream_failure_after_partial_output_is_not_finalized(monkeypatch):
+    agent = AIAgentTranslator(model="test-model")
+    async def truncated(input_data, app_name):
+        yield "Hello, this is half"
+        raise RuntimeError("connection reset")
+    monkeypatch.setattr(agent, "stream_agent", truncated)
+    events = []
+    async def consume():
+        async for event in agent.stream_task("テキスト"):
+            events.append(event)
+    with pytest.raises(RuntimeError):
+        asyncio.run(consume())
+    assert events == [{"type": "delta", "text": "Hello, this is half"}]
+    assert ResponseCache().stats()["stores"] == 0
+    monkeypatch.setattr(translation_controller, "translate_text_stream_task", lambda *a, **kw: agent.stream_task("テキスト"))
+    app = FastAPI()
+    app.include_router(translation_controller.TranslationController().router)
+    lines = [json.loads(line) for line in TestClient(app).post("/translate/stream", json={"japanese_text": "テキスト"}).text.splitlines()]
+    assert lines == [{"type": "delta", "text": "Hello, this is half"}, {"type": "error", "error": "connection reset"}]
+
+def test_reply_stream_parses_final_json(monkeypatch):
+    agent = AIAgentReplyGenerator(model="test-model")
+    monkeypatch.setattr(agent, "stream_agent", fake_stream(['{"ai_reply": "ありがとう', '", "en_reply": "Thanks"}']))
+    events = collect(agent.stream_task("Review: good\nName: Ken"))
+    assert events[-1] == {"type": "done", "result": {"ai_reply": "ありがとう", "en_reply": "Thanks"}}
+
+def test_stream_endpoints_emit_ndjson_and_sse(monkeypatch):
+    async def events(*args, **kwargs):
+        yield {"type": "delta", "text": "Hi"}
+        yield {"type": "done", "result": "Hi"}
+    monkeypatch.setattr(translation_controller, "translate_text_stream_task", lambda *a, **kw: events())
+    monkeypatch.setattr(reply_generator_controller, "generate_reply_stream_task", lambda *a, **kw: events())
+    app = FastAPI()
+    app.include_router(translation_controller.TranslationController().router)
+    app.include_router(reply_generator_controller.ReplyGeneratorController().router)
+    client = TestClient(app)
+
+    response = client.post("/translate/stream", json={"japanese_text": "やあ"})
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert lines == [{"type": "delta", "text": "Hi"}, {"type": "done", "translated_text": "Hi"}]
+
+    response = client.post("/generate-reply/stream?format=sse", json={"customer_review": "good", "customer_name": "Ken"})
+    assert response.headers["content-type"].startswith("text/event-stream")
+    assert 'event: done\ndata: {"type": "done", "generated_reply": "Hi"}\n\n' in response.text
+
+def test_stream_endpoint_reports_errors_in_band(monkeypatch):
+    async def events(*args, **kwargs):
+        yield {"type": "delta", "text": "Hi"}
+        raise RuntimeError("connection lost")
+    monkeypatch.setattr(translation_controller, "translate_text_stream_task", lambda *a, **kw: events())
+    app = FastAPI()
+    app.include_router(translation_controller.TranslationController().router)
+    lines = [json.loads(line) for line in TestClient(app).post("/translate/stream", json={"japanese_text": "やあ"}).text.splitlines()]
+    assert lines[-1] == {"type": "error", "error": "connection lost"}
+
+def test_iter_lines_buffers_one_partial_line():
+    from src.utils.streaming import iter_lines
+    async def chunks(*parts):
+        for part in parts:
+            yield part
+    async def collect(lines):
+        return [line async for line in lines]
+    assert asyncio.run(collect(iter_lines(chunks(b"a\nb", b"c\n\n", "é".encode("utf-8")[:1], "é".encode("utf-8")[1:])))) == ["a", "bc", "é"]
+    with pytest.raises(ValueError):
+        asyncio.run(collect(iter_lines(chunks(b"x" * 10, b"y" * 10), max_line_bytes=15)))
@@ -0,0 +1,40 @@
+import random
+import re
+from src.utils.think_tag_stripper import ThinkTagStripper
+
+
+def strip_all(text):
+    return re.sub(r"<think>.*?</think>", "", text, flags=re.DOTALL).strip()
+
+
+def run_chunks(chunks):
+    stripper = ThinkTagStripper()
+    return "".join(stripper.feed(chunk) for chunk in chunks) + stripper.flush()
+
+
+def test_removes_think_block_split_across_chunks():
+    chunks = ["<thi", "nk>plan the", " answer</th", "ink>\n  Hello", " world  "]
+    assert run_chunks(chunks) == "Hello world"
+
+
+def test_emits_visible_text_before_stream_ends():
+    stripper = ThinkTagStripper()
+    assert stripper.feed("<think>x</think>Hello ") == "Hello"
+    assert stripper.feed("there") == " there"
+    assert stripper.feed(" <th") == ""
+    assert stripper.feed("ink>hidden</think>!") == " !"
+    assert stripper.flush() == ""
+
+
+def test_unclosed_think_block_is_kept_like_the_regex():
+    assert run_chunks(["Answer <think>never", " closed"]) == strip_all("Answer <think>never closed")
+
+
+def test_matches_regex_for_random_chunking():
+    rng = random.Random(3)
+    pieces = ["<think>", "</think>", "<thin", "</th", " ", "\n", "abc", "<", ">", "日本語"]
+    for _ in range(300):
+        text = "".join(rng.choice(pieces) for _ in range(rng.randint(0, 20)))
+        cuts = sorted(rng.sample(range(len(text) + 1), min(len(text) + 1, rng.randint(0, 6))))
+        chunks = [text[i:j] for i, j in zip([0] + cuts, cuts + [len(text)])]
+        assert run_chunks(chunks) == strip_all(text)
@@ -0,0 +1,143 @@
+import asyncio
+import json
+from types import SimpleNamespace
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+from src.utils import tracing
+from src.utils.async_runtime import AsyncRuntime
+from src.utils.mongo_tracing import MongoTracingListener
+from src.agents.llm_rate_limiter import LLMRateLimiter
+from src.agents.response_cache import ResponseCache
+from src.tasks.process_review_tasks import log_and_run_decorator
+
+
+class SpanMap(dict):
+    """Finished spans by name (the last one wins), keeping every span in ``all``."""
+    def __init__(self, spans):
+        super().__init__((span.name, span) for span in spans)
+        self.all = list(spans)
+
+def tracing_spans(span_map):
+    return sorted(span_map.all, key=lambda span: span.start_time)
+
+@pytest.fixture
+def spans():
+    exporter = InMemorySpanExporter()
+    tracing.configure_tracing(exporter=exporter, set_global=False)
+
+    def finished():
+        tracing._provider.force_flush()
+        return SpanMap(exporter.get_finished_spans())
+    yield finished
+    tracing.shutdown_tracing()
+
+def test_context_crosses_to_the_runtime_loop_thread(spans):
+    AsyncRuntime.reset_instance()
+    async def child():
+        with tracing.get_tracer().start_as_current_span("child"):
+            pass
+    with tracing.get_tracer().start_as_current_span("parent"):
+        AsyncRuntime().run(child())
+    AsyncRuntime.reset_instance()
+    finished = spans()
+    assert finished["child"].parent.span_id == finished["parent"].context.span_id
+    assert finished["child"].context.trace_id == finished["parent"].context.trace_id
+
+def test_context_crosses_asyncio_run(spans):
+    async def child():
+        with tracing.get_tracer().start_as_current_span("child"):
+            pass
+    with tracing.get_tracer().start_as_current_span("parent"):
+        asyncio.run(child())
+    finished = spans()
+    assert finished["child"].parent.span_id == finished["parent"].context.span_id
+
+def test_subtask_span_records_thread_and_swallowed_errors(spans):
+    @log_and_run_decorator
+    async def translation_task():
+        raise RuntimeError("model down")
+    assert asyncio.run(translation_task()) is None
+    span = spans()["translation_task"]
+    assert span.status.status_code.name == "ERROR"
+    assert "thread.name" in span.attributes and span.events[0].name == "exception"
+
+def test_llm_span_has_model_tokens_retries_and_cache_hit(spans, monkeypatch):
+    monkeypatch.setenv("LLM_THROTTLE_COOLDOWN_SECONDS", "0")
+    monkeypatch.setenv("LLM_CACHE_MONGO_ENABLED", "false")
+    LLMRateLimiter.reset_instance()
+    ResponseCache.reset_instance()
+    from src.agents.ai_agents.ai_agent_translator import AIAgentTranslator
+    agent = AIAgentTranslator(model="test-model")
+    calls = []
+    async def flaky_run_once(input_data, app_name, model=None):
+        calls.append(input_data)
+        if len(calls) == 1:
+            raise RuntimeError("429 rate limit exceeded")
+        return "Hello", 42
+    monkeypatch.setattr(agent, "_run_once", flaky_run_once)
+    assert asyncio.run(agent.perform_task("こんにちは")) == "Hello"
+    assert asyncio.run(agent.perform_task("こんにちは")) == "Hello"
+    LLMRateLimiter.reset_instance()
+    ResponseCache.reset_instance()
+    finished = spans()
+    llm = finished["llm ai_agent_translator"]
+    assert llm.attributes["gen_ai.request.model"] == "test-model"
+    assert llm.attributes["gen_ai.usage.total_tokens"] == 42 and llm.attributes["repliq.llm.retries"] == 1
+    agent_spans = [span for span in tracing_spans(finished) if span.name == "agent ai_agent_translator"]
+    assert [span.attributes["repliq.cache.hit"] for span in agent_spans] == [False, True]
+    assert agent_spans[1].attributes["repliq.cache.tier"] == "memory"
+    assert llm.parent.span_id == agent_spans[0].context.span_id
+
+def test_mongo_listener_records_command_spans(spans):
+    listener = MongoTracingListener()
+    event = SimpleNamespace(command_name="find", command={"find": "reviews"}, database_name="repliq", request_id=1, connection_id=("db", 27017))
+    with tracing.get_tracer().start_as_current_span("request"):
+        listener.started(event)
+    listener.failed(SimpleNamespace(request_id=1, connection_id=("db", 27017), failure={"errmsg": "timeout"}))
+    span = spans()["find reviews"]
+    assert span.attributes["db.collection.name"] == "reviews"
+    assert span.parent.span_id == spans()["request"].context.span_id
+    assert span.status.description == "timeout"
+
+def test_middleware_continues_incoming_trace(spans):
+    app = FastAPI()
+    app.add_middleware(tracing.TracingMiddleware)
+
+    @app.get("/items/{item_id}")
+    async def item(item_id: str):
+        return {"id": item_id}
+
+    traceparent = "00-0af7651916cd43dd8448eb211c80319c-b7ad6b7169203331-01"
+    assert TestClient(app).get("/items/1", headers={"traceparent": traceparent}).status_code == 200
+    span = spans()["GET /items/{item_id}"]
+    assert format(span.context.trace_id, "032x") == "0af7651916cd43dd8448eb211c80319c"
+    assert span.attributes["http.response.status_code"] == 200
+
+def test_job_items_carry_trace_context_for_worker_links(spans):
+    with tracing.get_tracer().start_as_current_span("POST /process-review") as request_span:
+        carrier = tracing.inject_context()
+    link = tracing.link_from_carrier(carrier)
+    assert link.context.span_id == request_span.get_span_context().span_id
+    assert tracing.link_from_carrier({}) is None
+
+def test_file_exporter_writes_otlp_json(tmp_path):
+    path = tmp_path / "traces.jsonl"
+    tracing.configure_tracing(exporter=tracing.OTLPJsonFileExporter(str(path)), set_global=False)
+    with tracing.get_tracer().start_as_current_span("parent"):
+        with tracing.get_tracer().start_as_current_span("child", attributes={"tokens": 3}):
+            pass
+    tracing.shutdown_tracing()
+    request = json.loads(path.read_text().splitlines()[0])
+    exported = {s["name"]: s for s in request["resourceSpans"][0]["scopeSpans"][0]["spans"]}
+    assert exported["child"]["parentSpanId"] == exported["parent"]["spanId"]
+    assert exported["child"]["attributes"] == [{"key": "tokens", "value": {"intValue": "3"}}]
+    assert {"key": "service.name", "value": {"stringValue": "review-processing"}} in request["resourceSpans"][0]["resource"]["attributes"]
+
+def test_tracing_is_off_by_default(monkeypatch):
+    monkeypatch.delenv("OTEL_TRACES_EXPORTER", raising=False)
+    assert tracing.configure_tracing() is False and not tracing.tracing_enabled()
+    monkeypatch.setenv("OTEL_TRACES_EXPORTER", "zipkin")
+    with pytest.raises(ValueError):
+        tracing.configure_tracing()
@@ -2,6 +2,14 @@ import pytest
 import asyncio
 from unittest.mock import patch, MagicMock, AsyncMock
 from src.agents.ai_agents.ai_agent_reply_generator import AIAgentReplyGenerator
+from src.agents.response_cache import ResponseCache
+
+@pytest.fixture(autouse=True)
+def no_response_cache(monkeypatch):
+    monkeypatch.setenv("LLM_CACHE_ENABLED", "false")
+    ResponseCache.reset_instance()
+    yield
+    ResponseCache.reset_instance()
 
 @pytest.mark.asyncio
 async def test_perform_task_success():
@@ -12,8 +20,7 @@ async def test_perform_task_success():
     mock_part = MagicMock()
     mock_part.text = '{"ai_reply": "Thanks!", "en_reply": "Thank you!"}'
     mock_event.content.parts = [mock_part]
-    with patch("src.agents.ai_agents.ai_agent_reply_generator.AgentRunner") as MockRunner, \
-         patch("src.agents.ai_agents.ai_agent_reply_generator.MongoSessionService") as MockSessionService:
+    with patch("src.agents.base.base_agent.AgentRunner") as MockRunner:
         mock_runner = MockRunner.return_value
         mock_runner.run_async.return_value = AsyncMock()
         mock_runner.run_async.return_value.__aiter__.return_value = [mock_event]
@@ -29,8 +36,7 @@ async def test_perform_task_invalid_json():
     mock_part = MagicMock()
     mock_part.text = 'not a json'
     mock_event.content.parts = [mock_part]
-    with patch("src.agents.ai_agents.ai_agent_reply_generator.AgentRunner") as MockRunner, \
-         patch("src.agents.ai_agents.ai_agent_reply_generator.MongoSessionService") as MockSessionService:
+    with patch("src.agents.base.base_agent.AgentRunner") as MockRunner:
         mock_runner = MockRunner.return_value
         mock_runner.run_async.return_value = AsyncMock()
         mock_runner.run_async.return_value.__aiter__.return_value = [mock_event]